@@ -0,0 +1,8 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import fire
+from qlib.data.cache import DiskCacheCLI
+
+if __name__ == "__main__":
+    fire.Fire(DiskCacheCLI)
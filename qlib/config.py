@@ -166,7 +166,39 @@ _default_config = {
     "maxtasksperchild": None,
     # If joblib_backend is None, use loky
     "joblib_backend": "multiprocessing",
+    # The engine of `DatasetProvider.dataset_processor` to calculate the instruments in parallel
+    # - "process": a process pool with `joblib_backend`
+    # - "thread": a thread pool in the current process; no spawn, pickling or copy of the results, suitable for the
+    #   I/O bound raw fields and the numpy operators which release the GIL
+    # - "auto": choose the engine by the complexity of the expressions and the number of instruments
+    "dataset_engine": "process",
+    # The number of instruments calculated by one task of `DatasetProvider.dataset_processor`
+    # - "auto": split the instruments into about `DatasetProvider.CHUNKS_PER_WORKER` chunks per worker (one instrument
+    #   per task if `maxtasksperchild` is set, so that the memory is freed as before)
+    # - int: the fixed number of instruments per task
+    "dataset_chunk_size": "auto",
+    # The max idle seconds of the worker pool of `DatasetProvider.dataset_processor`, which is reused across calls
+    # - 0: create a new pool for each call
+    # - None: keep the pool until `qlib.init` is called again or the process exits
+    "dataset_pool_lifetime": 0,
+    # How the results of the workers of `DatasetProvider.dataset_processor` are sent to the main process
+    # - "pickle": each worker returns the DataFrame of each instrument, and the DataFrames are concatenated
+    # - "shm": the workers write the values into a pre-sized float32 panel in shared memory, which is wrapped as the
+    #   result without copy (the values are float32; `inst_processors` are not supported and use "pickle")
+    "dataset_result_transport": "pickle",
+    # Evaluate the fields of an instrument with one `qlib.data.plan.ExpressionPlan` in `LocalExpressionProvider`, so that
+    # the sub-expressions shared by the fields are calculated once (the plan is not used with an expression cache)
+    "expression_plan": True,
+    # The dtype of the results of the operators in `qlib.data.ops`, e.g. "float32" keeps the float32 features float32
+    # through the expressions, which halves the memory of the intermediate results. The element-wise operators
+    # calculate in this dtype and the Cython rolling kernels write into panels of this dtype, but the kernels still
+    # accumulate in float64 (one float64 column at a time), and the rolling operators based on pandas (e.g. `Sum`,
+    # `Corr`) calculate the whole series/panel in float64 before the cast. None keeps the dtypes promoted by
+    # numpy/pandas (mostly float64)
+    "expression_dtype": None,
     "default_disk_cache": 1,  # 0:skip/1:use
+    # the limit of each memory cache, in items for "length" and in bytes for "sizeof"/"nbytes"; "nbytes" counts the
+    # data of the cached series and evicts the ones cheapest to recompute first (`H.stats()` reports the hit rates)
     "mem_cache_size_limit": 500,
     "mem_cache_limit_type": "length",
     # memory cache expire second, only in used 'DatasetURICache' and 'client D.calendar'
@@ -175,6 +207,17 @@ _default_config = {
     # cache dir name
     "dataset_cache_dir_name": "dataset_cache",
     "features_cache_dir_name": "features_cache",
+    # the reader/writer locks of the disk caches between the processes; only "file" (the lock files in the
+    # `cache_lock_dir_name` directory of the data, for the processes on the same machine) is supported
+    "cache_lock": "file",
+    "cache_lock_dir_name": "cache_locks",
+    # the disk budget in bytes of the disk caches (the expression and the dataset caches) of a data uri; None is
+    # unlimited. When a new cache exceeds it, the caches are evicted by `disk_cache_eviction` ("lru": the least
+    # recently visited first; "value": the least visits * generation seconds / bytes first) until
+    # `disk_cache_gc_target` of the budget is used. Please refer to `qlib.data.cache.DiskCacheManager`
+    "disk_cache_size_limit": None,
+    "disk_cache_eviction": "lru",
+    "disk_cache_gc_target": 0.8,
     # redis
     # in order to use cache
     "redis_host": "127.0.0.1",
@@ -439,7 +482,7 @@ class QlibConfig(Config):
         default_conf : str
             the default config template chosen by user: "server", "client"
         """
-        from .utils import set_log_with_config, get_module_logger, can_use_cache  # pylint: disable=C0415
+        from .utils import set_log_with_config, get_module_logger  # pylint: disable=C0415
 
         self.reset()
 
@@ -462,23 +505,11 @@ class QlibConfig(Config):
 
         self.resolve_path()
 
-        if not (self["expression_cache"] is None and self["dataset_cache"] is None):
-            # check redis
-            if not can_use_cache():
-                log_str = ""
-                # check expression cache
-                if self.is_depend_redis(self["expression_cache"]):
-                    log_str += self["expression_cache"]
-                    self["expression_cache"] = None
-                # check dataset cache
-                if self.is_depend_redis(self["dataset_cache"]):
-                    log_str += f" and {self['dataset_cache']}" if log_str else self["dataset_cache"]
-                    self["dataset_cache"] = None
-                if log_str:
-                    logger.warning(
-                        f"redis connection failed(host={self['redis_host']} port={self['redis_port']}), "
-                        f"{log_str} will not be used!"
-                    )
+        if self["cache_lock"] != "file":
+            raise ValueError(
+                f"Unsupported cache_lock: {self['cache_lock']!r}. Only the \"file\" locks (the lock files in the "
+                f"`cache_lock_dir_name` directory of the data) are supported by the disk caches"
+            )
 
     def register(self):
         from .utils import init_instance_by_config  # pylint: disable=C0415
@@ -16,6 +16,7 @@ class HighFreqHandler(DataHandlerLP):
         fit_start_time=None,
         fit_end_time=None,
         drop_raw=True,
+        **kwargs,
     ):
         infer_processors = check_transform_proc(infer_processors, fit_start_time, fit_end_time)
         learn_processors = check_transform_proc(learn_processors, fit_start_time, fit_end_time)
@@ -36,6 +37,7 @@ class HighFreqHandler(DataHandlerLP):
             infer_processors=infer_processors,
             learn_processors=learn_processors,
             drop_raw=drop_raw,
+            **kwargs,
         )
 
     def get_feature_config(self):
@@ -115,6 +117,7 @@ class HighFreqGeneralHandler(DataHandlerLP):
         freq="1min",
         columns=["$open", "$high", "$low", "$close", "$vwap"],
         inst_processors=None,
+        **kwargs,
     ):
         self.day_length = day_length
         self.columns = columns
@@ -139,6 +142,7 @@ class HighFreqGeneralHandler(DataHandlerLP):
             infer_processors=infer_processors,
             learn_processors=learn_processors,
             drop_raw=drop_raw,
+            **kwargs,
         )
 
     def get_feature_config(self):
@@ -316,6 +320,7 @@ class HighFreqOrderHandler(DataHandlerLP):
         fit_end_time=None,
         inst_processors=None,
         drop_raw=True,
+        **kwargs,
     ):
         infer_processors = check_transform_proc(infer_processors, fit_start_time, fit_end_time)
         learn_processors = check_transform_proc(learn_processors, fit_start_time, fit_end_time)
@@ -337,6 +342,7 @@ class HighFreqOrderHandler(DataHandlerLP):
             infer_processors=infer_processors,
             learn_processors=learn_processors,
             drop_raw=drop_raw,
+            **kwargs,
         )
 
     def get_feature_config(self):
@@ -15,6 +15,7 @@ from .data import (
     LocalCalendarProvider,
     LocalInstrumentProvider,
     LocalFeatureProvider,
+    PanelFeatureProvider,
     LocalPITProvider,
     LocalExpressionProvider,
     LocalDatasetProvider,
@@ -31,6 +32,7 @@ from .cache import (
     DatasetCache,
     DiskExpressionCache,
     DiskDatasetCache,
+    DiskCacheManager,
     SimpleDatasetCache,
     DatasetURICache,
     MemoryCalendarCache,
@@ -46,6 +48,7 @@ __all__ = [
     "LocalCalendarProvider",
     "LocalInstrumentProvider",
     "LocalFeatureProvider",
+    "PanelFeatureProvider",
     "LocalPITProvider",
     "LocalExpressionProvider",
     "LocalDatasetProvider",
@@ -59,6 +62,7 @@ __all__ = [
     "DatasetCache",
     "DiskExpressionCache",
     "DiskDatasetCache",
+    "DiskCacheManager",
     "SimpleDatasetCache",
     "DatasetURICache",
     "MemoryCalendarCache",
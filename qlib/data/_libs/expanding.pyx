@@ -4,6 +4,8 @@ cimport cython
 cimport numpy as np
 import numpy as np
 
+from .rolling import _prep_values, _shift_by_mean
+from .rolling import rolling_rank, rolling_quantile, rolling_median, rolling_mad
 from libc.math cimport sqrt, isnan, NAN
 from libcpp.vector cimport vector
 
@@ -127,12 +129,268 @@ cdef class Rsquare(Expanding):
         return rvalue * rvalue
 
 
+cdef class Var(Expanding):
+    """1-D array expanding variance (ddof=1)
+
+    Welford's algorithm with the Kahan compensation; the same as `pandas.core.window.Expanding.var`
+    """
+    cdef int nobs
+    cdef double mean_x
+    cdef double ssqdm_x
+    cdef double compensation
+    cdef int n_same
+    cdef double prev_value
+    def __init__(self):
+        super(Var, self).__init__()
+        self.nobs = 0
+        self.mean_x = 0
+        self.ssqdm_x = 0
+        self.compensation = 0
+        self.n_same = 0
+        self.prev_value = NAN
+
+    cdef double update(self, double val):
+        cdef double prev_mean, y, t, result
+        if not isnan(val):
+            self.nobs += 1
+            prev_mean = self.mean_x - self.compensation
+            y = val - self.compensation
+            t = y - self.mean_x
+            self.compensation = t + self.mean_x - y
+            self.mean_x += t / self.nobs
+            self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+            if val == self.prev_value:
+                self.n_same += 1
+            else:
+                self.n_same = 1
+            self.prev_value = val
+        if self.nobs < 2:
+            return NAN
+        if self.n_same >= self.nobs:
+            return 0
+        result = self.ssqdm_x / (self.nobs - 1)
+        return result if result > 0 else 0
+
+
+cdef class Std(Var):
+    """1-D array expanding standard deviation (ddof=1)"""
+    cdef double update(self, double val):
+        return sqrt(Var.update(self, val))
+
+
+cdef class Moment(Expanding):
+    """1-D array expanding power sums for skewness and kurtosis
+
+    The same as `pandas.core.window.Expanding.skew/kurt`; please refer to `Moment` in rolling.pyx
+    """
+    cdef int nobs
+    cdef double x[4]
+    cdef double comp[4]
+    cdef int n_same
+    cdef double prev_value
+    def __init__(self):
+        super(Moment, self).__init__()
+        self.nobs = 0
+        cdef int k
+        for k in range(4):
+            self.x[k] = 0
+            self.comp[k] = 0
+        self.n_same = 0
+        self.prev_value = NAN
+
+    cdef double update(self, double val):
+        cdef double y, t, p = 1
+        cdef int k
+        if not isnan(val):
+            self.nobs += 1
+            for k in range(4):
+                p *= val
+                y = p - self.comp[k]
+                t = self.x[k] + y
+                self.comp[k] = t - self.x[k] - y
+                self.x[k] = t
+            if val == self.prev_value:
+                self.n_same += 1
+            else:
+                self.n_same = 1
+            self.prev_value = val
+        return self.moment()
+
+    cdef double moment(self):
+        pass
+
+
+cdef class Skew(Moment):
+    """1-D array expanding skewness (bias corrected)"""
+    cdef double moment(self):
+        cdef double n = self.nobs, A, B, C, R
+        if self.nobs < 3:
+            return NAN
+        if self.n_same >= self.nobs:
+            return 0
+        A = self.x[0] / n
+        B = self.x[1] / n - A * A
+        C = self.x[2] / n - A * A * A - 3 * A * B
+        if B <= 1e-14:
+            return NAN
+        R = sqrt(B)
+        return (sqrt(n * (n - 1.)) * C) / ((n - 2) * R * R * R)
+
+
+cdef class Kurt(Moment):
+    """1-D array expanding kurtosis (bias corrected, Fisher's definition)"""
+    cdef double moment(self):
+        cdef double n = self.nobs, A, B, C, D, R, K
+        if self.nobs < 4:
+            return NAN
+        if self.n_same >= self.nobs:
+            return -3.
+        A = self.x[0] / n
+        R = A * A
+        B = self.x[1] / n - R
+        R = R * A
+        C = self.x[2] / n - R - 3 * A * B
+        R = R * A
+        D = self.x[3] / n - R - 6 * B * A * A - 4 * C * A
+        if B <= 1e-14:
+            return NAN
+        K = (n * n - 1.) * D / (B * B) - 3 * ((n - 1.) ** 2)
+        return K / ((n - 2.) * (n - 3.))
+
+
+cdef class Extremum(Expanding):
+    """1-D array expanding max/min (and their positions)
+
+    NaN is skipped like `pandas.core.window.Expanding.max`; `argext` follows `np.argmax` on the raw window, i.e. the
+    first position of the extremum or of the first NaN (1-based)
+    """
+    cdef double ext_v
+    cdef int ext_i
+    cdef int nan_i
+    cdef int i
+    cdef int is_max
+    cdef int argext
+    def __init__(self, int is_max, int argext):
+        super(Extremum, self).__init__()
+        self.ext_v = NAN
+        self.ext_i = -1
+        self.nan_i = -1
+        self.i = -1
+        self.is_max = is_max
+        self.argext = argext
+
+    cdef double update(self, double val):
+        self.i += 1
+        if isnan(val):
+            if self.nan_i < 0:
+                self.nan_i = self.i
+        elif self.ext_i < 0 or (self.is_max and val > self.ext_v) or (not self.is_max and val < self.ext_v):
+            self.ext_v = val
+            self.ext_i = self.i
+        if self.ext_i < 0:
+            return NAN
+        if not self.argext:
+            return self.ext_v
+        if self.nan_i >= 0:
+            return self.nan_i + 1
+        return self.ext_i + 1
+
+
+cdef class WMA(Expanding):
+    """1-D array expanding weighted mean
+
+    The same as `np.nanmean(w * x)` with the linear weights `w` of the window normalized to 1
+    """
+    cdef double ix_sum
+    cdef int size
+    cdef int nobs
+    def __init__(self):
+        super(WMA, self).__init__()
+        self.ix_sum = 0
+        self.size = 0
+        self.nobs = 0
+
+    cdef double update(self, double val):
+        self.size += 1
+        if not isnan(val):
+            self.ix_sum += self.size * val
+            self.nobs += 1
+        if self.nobs == 0:
+            return NAN
+        return self.ix_sum / (self.size * (self.size + 1) / 2.) / self.nobs
+
+
+cdef class PairExpanding:
+    """1-D arrays expanding co-moments of the pairs without NaN
+
+    The same as `pandas.core.window.Expanding.cov/corr` with another series (ddof=1)
+    """
+    cdef int nobs
+    cdef double mean_x
+    cdef double mean_y
+    cdef double cxy
+    cdef double m2x
+    cdef double m2y
+    def __init__(self):
+        self.nobs = 0
+        self.mean_x = 0
+        self.mean_y = 0
+        self.cxy = 0
+        self.m2x = 0
+        self.m2y = 0
+
+    cdef double update(self, double x, double y):
+        cdef double dx, prev_mean_y
+        if not isnan(x) and not isnan(y):
+            self.nobs += 1
+            dx = x - self.mean_x
+            self.mean_x += dx / self.nobs
+            prev_mean_y = self.mean_y
+            self.mean_y += (y - self.mean_y) / self.nobs
+            self.cxy += dx * (y - self.mean_y)
+            self.m2x += dx * (x - self.mean_x)
+            self.m2y += (y - prev_mean_y) * (y - self.mean_y)
+        return self.comoment()
+
+    cdef double comoment(self):
+        pass
+
+
+cdef class Cov(PairExpanding):
+    """1-D arrays expanding covariance"""
+    cdef double comoment(self):
+        if self.nobs < 2:
+            return NAN
+        return self.cxy / (self.nobs - 1)
+
+
+cdef class Corr(PairExpanding):
+    """1-D arrays expanding correlation"""
+    cdef double comoment(self):
+        cdef double denominator = self.m2x * self.m2y
+        if self.nobs < 2 or denominator <= 0:
+            return NAN
+        return self.cxy / sqrt(denominator)
+
+
 cdef np.ndarray[double, ndim=1] expanding(Expanding r, np.ndarray a):
     cdef int  i
     cdef int  N = len(a)
+    cdef const double[:] x = np.asarray(a, dtype=np.float64)
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    for i in range(N):
+        ret[i] = r.update(x[i])
+    return ret
+
+
+cdef np.ndarray[double, ndim=1] pair_expanding(PairExpanding r, np.ndarray a, np.ndarray b):
+    cdef int  i
+    cdef int  N = len(a)
+    cdef const double[:] x = np.asarray(a, dtype=np.float64)
+    cdef const double[:] y = np.asarray(b, dtype=np.float64)
     cdef np.ndarray[double, ndim=1] ret = np.empty(N)
     for i in range(N):
-        ret[i] = r.update(a[i])
+        ret[i] = r.update(x[i], y[i])
     return ret
 
 def expanding_mean(np.ndarray a):
@@ -150,3 +408,87 @@ def expanding_rsquare(np.ndarray a):
 def expanding_resi(np.ndarray a):
     cdef Resi r = Resi()
     return expanding(r, a)
+
+def expanding_var(np.ndarray a):
+    cdef Var r = Var()
+    return expanding(r, _prep_values(a))
+
+def expanding_std(np.ndarray a):
+    cdef Std r = Std()
+    return expanding(r, _prep_values(a))
+
+def expanding_skew(np.ndarray a):
+    cdef Skew r = Skew()
+    return expanding(r, _shift_by_mean(a))
+
+def expanding_kurt(np.ndarray a):
+    cdef Kurt r = Kurt()
+    return expanding(r, _shift_by_mean(a))
+
+def expanding_max(np.ndarray a):
+    cdef Extremum r = Extremum(1, 0)
+    return expanding(r, _prep_values(a))
+
+def expanding_min(np.ndarray a):
+    cdef Extremum r = Extremum(0, 0)
+    return expanding(r, _prep_values(a))
+
+def expanding_idxmax(np.ndarray a):
+    cdef Extremum r = Extremum(1, 1)
+    return expanding(r, _prep_values(a))
+
+def expanding_idxmin(np.ndarray a):
+    cdef Extremum r = Extremum(0, 1)
+    return expanding(r, _prep_values(a))
+
+def expanding_wma(np.ndarray a):
+    cdef WMA r = WMA()
+    return expanding(r, _prep_values(a))
+
+def expanding_cov(np.ndarray a, np.ndarray b):
+    cdef Cov r = Cov()
+    return pair_expanding(r, _prep_values(a), _prep_values(b))
+
+def expanding_corr(np.ndarray a, np.ndarray b):
+    cdef Corr r = Corr()
+    return pair_expanding(r, _prep_values(a), _prep_values(b))
+
+def expanding_ema(np.ndarray a):
+    """expanding exponentially weighted mean with the span of the window size, i.e. `EMA(feature, 0)`
+
+    The decay of each window depends on its size, so the weights are recalculated for each window (O(n^2))
+    """
+    cdef int  i, j
+    cdef int  N = len(a)
+    cdef const double[:] x = _prep_values(a)
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef double alpha, w, w_sum, wx_sum
+    cdef int nobs
+    for i in range(N):
+        alpha = 1 - 2. / (i + 2)
+        w = 1
+        w_sum = 0
+        wx_sum = 0
+        nobs = 0
+        for j in range(i, -1, -1):
+            w_sum += w
+            if not isnan(x[j]):
+                wx_sum += w * x[j]
+                nobs += 1
+            w *= alpha
+        ret[i] = wx_sum / w_sum if nobs > 0 else NAN
+    return ret
+
+
+# the order statistics of an expanding window are the ones of a rolling window as long as the array
+def expanding_rank(np.ndarray a):
+    return rolling_rank(a, len(a))
+
+def expanding_quantile(np.ndarray a, double qscore):
+    return rolling_quantile(a, len(a), qscore)
+
+def expanding_median(np.ndarray a):
+    return rolling_median(a, len(a))
+
+def expanding_mad(np.ndarray a):
+    return rolling_mad(a, len(a))
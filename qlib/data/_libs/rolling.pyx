@@ -6,6 +6,7 @@ import numpy as np
 
 from libc.math cimport sqrt, isnan, NAN
 from libcpp.deque cimport deque
+from libcpp.vector cimport vector
 
 
 cdef class Rolling:
@@ -182,14 +183,531 @@ cdef class Rsquare(Rolling):
         return rvalue * rvalue
 
     
+cdef class Var(Rolling):
+    """1-D array rolling variance (ddof=1)
+
+    Welford's algorithm with the Kahan compensation; the same as `pandas.core.window.Rolling.var`
+    """
+    cdef int nobs
+    cdef double mean_x
+    cdef double ssqdm_x
+    cdef double compensation
+    cdef int n_same
+    cdef double prev_value
+    def __init__(self, int window):
+        super(Var, self).__init__(window)
+        self.nobs = 0
+        self.mean_x = 0
+        self.ssqdm_x = 0
+        self.compensation = 0
+        self.n_same = 0
+        self.prev_value = NAN
+
+    cdef void add(self, double val):
+        cdef double prev_mean, y, t
+        if isnan(val):
+            return
+        self.nobs += 1
+        prev_mean = self.mean_x - self.compensation
+        y = val - self.compensation
+        t = y - self.mean_x
+        self.compensation = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+        # the number of the consecutive same values, the variance of the same values is 0
+        if val == self.prev_value:
+            self.n_same += 1
+        else:
+            self.n_same = 1
+        self.prev_value = val
+
+    cdef void remove(self, double val):
+        cdef double prev_mean, y, t
+        if isnan(val):
+            return
+        self.nobs -= 1
+        if self.nobs > 0:
+            prev_mean = self.mean_x - self.compensation
+            y = val - self.compensation
+            t = y - self.mean_x
+            self.compensation = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0
+            self.ssqdm_x = 0
+
+    cdef double var(self):
+        cdef double result
+        if self.nobs < 2:
+            return NAN
+        if self.n_same >= self.nobs:
+            return 0
+        result = self.ssqdm_x / (self.nobs - 1)
+        return result if result > 0 else 0
+
+    cdef double update(self, double val):
+        self.barv.push_back(val)
+        self.remove(self.barv.front())
+        self.barv.pop_front()
+        self.add(val)
+        return self.var()
+
+
+cdef class Std(Var):
+    """1-D array rolling standard deviation (ddof=1)"""
+    cdef double update(self, double val):
+        return sqrt(Var.update(self, val))
+
+
+cdef class Moment(Rolling):
+    """1-D array rolling power sums for skewness and kurtosis
+
+    The same as `pandas.core.window.Rolling.skew/kurt`: the sums are accumulated with the Kahan compensation, and
+    the values should be shifted by their mean in advance (please refer to `_shift_by_mean`)
+    """
+    cdef int nobs
+    cdef double x[4]
+    cdef double comp[4]
+    cdef int n_same
+    cdef double prev_value
+    def __init__(self, int window):
+        super(Moment, self).__init__(window)
+        self.nobs = 0
+        cdef int k
+        for k in range(4):
+            self.x[k] = 0
+            self.comp[k] = 0
+        self.n_same = 0
+        self.prev_value = NAN
+
+    cdef void accumulate(self, double val, double sign):
+        cdef double y, t, p = 1
+        cdef int k
+        for k in range(4):
+            p *= val
+            y = sign * p - self.comp[k]
+            t = self.x[k] + y
+            self.comp[k] = t - self.x[k] - y
+            self.x[k] = t
+
+    cdef double update(self, double val):
+        self.barv.push_back(val)
+        cdef double old = self.barv.front()
+        self.barv.pop_front()
+        if not isnan(old):
+            self.nobs -= 1
+            self.accumulate(old, -1)
+        if not isnan(val):
+            self.nobs += 1
+            self.accumulate(val, 1)
+            if val == self.prev_value:
+                self.n_same += 1
+            else:
+                self.n_same = 1
+            self.prev_value = val
+        return self.moment()
+
+    cdef double moment(self):
+        pass
+
+
+cdef class Skew(Moment):
+    """1-D array rolling skewness (bias corrected)"""
+    cdef double moment(self):
+        cdef double n = self.nobs, A, B, C, R
+        if self.nobs < 3:
+            return NAN
+        if self.n_same >= self.nobs:
+            return 0
+        A = self.x[0] / n
+        B = self.x[1] / n - A * A
+        C = self.x[2] / n - A * A * A - 3 * A * B
+        if B <= 1e-14:
+            return NAN
+        R = sqrt(B)
+        return (sqrt(n * (n - 1.)) * C) / ((n - 2) * R * R * R)
+
+
+cdef class Kurt(Moment):
+    """1-D array rolling kurtosis (bias corrected, Fisher's definition)"""
+    cdef double moment(self):
+        cdef double n = self.nobs, A, B, C, D, R, K
+        if self.nobs < 4:
+            return NAN
+        if self.n_same >= self.nobs:
+            return -3.
+        A = self.x[0] / n
+        R = A * A
+        B = self.x[1] / n - R
+        R = R * A
+        C = self.x[2] / n - R - 3 * A * B
+        R = R * A
+        D = self.x[3] / n - R - 6 * B * A * A - 4 * C * A
+        if B <= 1e-14:
+            return NAN
+        K = (n * n - 1.) * D / (B * B) - 3 * ((n - 1.) ** 2)
+        return K / ((n - 2.) * (n - 3.))
+
+
+cdef class Extremum(Rolling):
+    """1-D array rolling max/min (and their positions) with a monotonic deque
+
+    NaN is skipped like `pandas.core.window.Rolling.max`; `argext` follows `np.argmax` on the raw window, i.e. the
+    first position of the extremum or of the first NaN in the window (1-based)
+    """
+    cdef deque[double] ext_v
+    cdef deque[int] ext_i
+    cdef deque[int] nan_i
+    cdef int i
+    cdef int is_max
+    cdef int argext
+    def __init__(self, int window, int is_max, int argext):
+        super(Extremum, self).__init__(window)
+        self.i = -1
+        self.is_max = is_max
+        self.argext = argext
+
+    cdef double update(self, double val):
+        self.i += 1
+        if isnan(val):
+            self.nan_i.push_back(self.i)
+        else:
+            # the earlier same values are kept, so the front is the first extremum
+            while not self.ext_v.empty() and (
+                (self.is_max and self.ext_v.back() < val) or (not self.is_max and self.ext_v.back() > val)
+            ):
+                self.ext_v.pop_back()
+                self.ext_i.pop_back()
+            self.ext_v.push_back(val)
+            self.ext_i.push_back(self.i)
+        while not self.ext_i.empty() and self.ext_i.front() <= self.i - self.window:
+            self.ext_v.pop_front()
+            self.ext_i.pop_front()
+        while not self.nan_i.empty() and self.nan_i.front() <= self.i - self.window:
+            self.nan_i.pop_front()
+        if self.ext_i.empty():
+            return NAN
+        if not self.argext:
+            return self.ext_v.front()
+        cdef int start = self.i - self.window + 1 if self.i >= self.window else 0
+        if not self.nan_i.empty():
+            return self.nan_i.front() - start + 1
+        return self.ext_i.front() - start + 1
+
+
+cdef class WMA(Rolling):
+    """1-D array rolling weighted mean
+
+    The same as `np.nanmean(w * x)` with the linear weights `w` of the window normalized to 1
+    """
+    cdef double x_sum
+    cdef double ix_sum
+    cdef int size
+    cdef int nobs
+    def __init__(self, int window):
+        super(WMA, self).__init__(window)
+        self.x_sum = 0
+        self.ix_sum = 0
+        self.size = 0
+        self.nobs = 0
+
+    cdef double update(self, double val):
+        self.barv.push_back(val)
+        cdef double old = self.barv.front()
+        self.barv.pop_front()
+        if self.size == self.window:
+            # the weights of the remained values decrease by 1
+            if not isnan(old):
+                self.x_sum -= old
+                self.ix_sum -= old
+                self.nobs -= 1
+            self.ix_sum -= self.x_sum
+        else:
+            self.size += 1
+        if not isnan(val):
+            self.x_sum += val
+            self.ix_sum += self.size * val
+            self.nobs += 1
+        if self.nobs == 0:
+            return NAN
+        return self.ix_sum / (self.size * (self.size + 1) / 2.) / self.nobs
+
+
+cdef class PairRolling:
+    """1-D arrays rolling co-moments of the pairs without NaN
+
+    The same as `pandas.core.window.Rolling.cov/corr` with another series (ddof=1)
+    """
+    cdef int window
+    cdef deque[double] barx
+    cdef deque[double] bary
+    cdef int nobs
+    cdef double mean_x
+    cdef double mean_y
+    cdef double cxy
+    cdef double m2x
+    cdef double m2y
+    def __init__(self, int window):
+        self.window = window
+        cdef int i
+        for i in range(window):
+            self.barx.push_back(NAN)
+            self.bary.push_back(NAN)
+        self.nobs = 0
+        self.mean_x = 0
+        self.mean_y = 0
+        self.cxy = 0
+        self.m2x = 0
+        self.m2y = 0
+
+    cdef void add(self, double x, double y):
+        cdef double dx, prev_mean_y
+        if isnan(x) or isnan(y):
+            return
+        self.nobs += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.nobs
+        prev_mean_y = self.mean_y
+        self.mean_y += (y - self.mean_y) / self.nobs
+        self.cxy += dx * (y - self.mean_y)
+        self.m2x += dx * (x - self.mean_x)
+        self.m2y += (y - prev_mean_y) * (y - self.mean_y)
+
+    cdef void remove(self, double x, double y):
+        cdef double dx, prev_mean_y
+        if isnan(x) or isnan(y):
+            return
+        self.nobs -= 1
+        if self.nobs == 0:
+            self.mean_x = self.mean_y = self.cxy = self.m2x = self.m2y = 0
+            return
+        dx = x - self.mean_x
+        self.mean_x -= dx / self.nobs
+        prev_mean_y = self.mean_y
+        self.mean_y -= (y - self.mean_y) / self.nobs
+        self.cxy -= dx * (y - self.mean_y)
+        self.m2x -= dx * (x - self.mean_x)
+        self.m2y -= (y - prev_mean_y) * (y - self.mean_y)
+
+    cdef double update(self, double x, double y):
+        self.barx.push_back(x)
+        self.bary.push_back(y)
+        self.remove(self.barx.front(), self.bary.front())
+        self.barx.pop_front()
+        self.bary.pop_front()
+        self.add(x, y)
+        return self.comoment()
+
+    cdef double comoment(self):
+        pass
+
+
+cdef class Cov(PairRolling):
+    """1-D arrays rolling covariance"""
+    cdef double comoment(self):
+        if self.nobs < 2:
+            return NAN
+        return self.cxy / (self.nobs - 1)
+
+
+cdef class Corr(PairRolling):
+    """1-D arrays rolling correlation"""
+    cdef double comoment(self):
+        cdef double denominator = self.m2x * self.m2y
+        if self.nobs < 2 or denominator <= 0:
+            return NAN
+        return self.cxy / sqrt(denominator)
+
+
+cdef class OrderStatistic(Rolling):
+    """1-D array rolling order statistics
+
+    The values of the window are counted in a Fenwick tree over the ranks of the distinct values of the array, so
+    adding/removing a value, the rank of a value, the k-th smallest value and the sum of the smallest values are
+    O(log(n)).
+    """
+    cdef const double[:] uniques
+    cdef int size
+    cdef int top  # the highest power of 2 <= size
+    cdef vector[int] cnt_tree
+    cdef vector[double] sum_tree
+    cdef int nobs
+    cdef double vsum
+    def __init__(self, int window, np.ndarray uniques):
+        super(OrderStatistic, self).__init__(window)
+        self.uniques = uniques
+        self.size = len(uniques)
+        self.top = 1
+        while self.top * 2 <= self.size:
+            self.top *= 2
+        self.cnt_tree.resize(self.size + 1, 0)
+        self.sum_tree.resize(self.size + 1, 0)
+        self.nobs = 0
+        self.vsum = 0
+
+    cdef int bisect_right(self, double val):
+        """the number of the distinct values <= val"""
+        cdef int lo = 0, hi = self.size, mid
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.uniques[mid] <= val:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    cdef void add(self, double val, int sign):
+        cdef int i = self.bisect_right(val)  # 1-based rank of val
+        self.nobs += sign
+        self.vsum += sign * val
+        while i <= self.size:
+            self.cnt_tree[i] += sign
+            self.sum_tree[i] += sign * val
+            i += i & -i
+
+    cdef int count_le(self, int rank):
+        """the number of the values with the (1-based) rank <= rank"""
+        cdef int cnt = 0
+        while rank > 0:
+            cnt += self.cnt_tree[rank]
+            rank -= rank & -rank
+        return cnt
+
+    cdef double sum_le(self, int rank):
+        """the sum of the values with the (1-based) rank <= rank"""
+        cdef double vsum = 0
+        while rank > 0:
+            vsum += self.sum_tree[rank]
+            rank -= rank & -rank
+        return vsum
+
+    cdef double kth(self, int k):
+        """the k-th (0-based) smallest value"""
+        cdef int pos = 0, step = self.top
+        while step > 0:
+            if pos + step <= self.size and self.cnt_tree[pos + step] <= k:
+                pos += step
+                k -= self.cnt_tree[pos]
+            step //= 2
+        return self.uniques[pos]
+
+    cdef double update(self, double val):
+        self.barv.push_back(val)
+        if not isnan(self.barv.front()):
+            self.add(self.barv.front(), -1)
+        self.barv.pop_front()
+        if not isnan(val):
+            self.add(val, 1)
+        return self.statistic(val)
+
+    cdef double statistic(self, double val):
+        pass
+
+
+cdef class Rank(OrderStatistic):
+    """1-D array rolling percentile rank of the last value
+
+    The same as `pandas.core.window.Rolling.rank(pct=True)` (the average rank of the ties)
+    """
+    cdef double statistic(self, double val):
+        if isnan(val):
+            return NAN
+        cdef int rank = self.bisect_right(val)
+        cdef int less = self.count_le(rank - 1)
+        cdef int equal = self.count_le(rank) - less
+        return (less + (equal + 1) / 2.) / self.nobs
+
+
+cdef class Quantile(OrderStatistic):
+    """1-D array rolling quantile with the linear interpolation"""
+    cdef double qscore
+    def __init__(self, int window, np.ndarray uniques, double qscore):
+        super(Quantile, self).__init__(window, uniques)
+        self.qscore = qscore
+
+    cdef double statistic(self, double val):
+        cdef double idx_with_fraction, vlow
+        cdef int idx
+        if self.nobs == 0:
+            return NAN
+        idx_with_fraction = self.qscore * (self.nobs - 1)
+        idx = <int> idx_with_fraction
+        vlow = self.kth(idx)
+        if idx == idx_with_fraction:
+            return vlow
+        return vlow + (self.kth(idx + 1) - vlow) * (idx_with_fraction - idx)
+
+
+cdef class Median(OrderStatistic):
+    """1-D array rolling median"""
+    cdef double statistic(self, double val):
+        if self.nobs == 0:
+            return NAN
+        if self.nobs % 2 == 1:
+            return self.kth(self.nobs // 2)
+        return (self.kth(self.nobs // 2 - 1) + self.kth(self.nobs // 2)) / 2
+
+
+cdef class Mad(OrderStatistic):
+    """1-D array rolling mean absolute deviation around the mean
+
+    mean(|x - m|) = (m * n_le - sum_le + (sum - sum_le) - m * (n - n_le)) / n, where n_le and sum_le are the
+    number and the sum of the values <= m
+    """
+    cdef double statistic(self, double val):
+        cdef double mean, sum_le
+        cdef int rank, n_le
+        if self.nobs == 0:
+            return NAN
+        mean = self.vsum / self.nobs
+        rank = self.bisect_right(mean)
+        n_le = self.count_le(rank)
+        sum_le = self.sum_le(rank)
+        return (mean * n_le - sum_le + (self.vsum - sum_le) - mean * (self.nobs - n_le)) / self.nobs
+
+
 cdef np.ndarray[double, ndim=1] rolling(Rolling r, np.ndarray a):
     cdef int  i
     cdef int  N = len(a)
+    cdef const double[:] x = np.asarray(a, dtype=np.float64)
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    for i in range(N):
+        ret[i] = r.update(x[i])
+    return ret
+
+
+cdef np.ndarray[double, ndim=1] pair_rolling(PairRolling r, np.ndarray a, np.ndarray b):
+    cdef int  i
+    cdef int  N = len(a)
+    cdef const double[:] x = np.asarray(a, dtype=np.float64)
+    cdef const double[:] y = np.asarray(b, dtype=np.float64)
     cdef np.ndarray[double, ndim=1] ret = np.empty(N)
     for i in range(N):
-        ret[i] = r.update(a[i])
+        ret[i] = r.update(x[i], y[i])
     return ret
 
+
+def _prep_values(np.ndarray a):
+    """convert the values to float64 and +/-inf to NaN, the same as the window functions of pandas"""
+    a = np.asarray(a, dtype=np.float64)
+    inf = np.isinf(a)
+    if inf.any():
+        a = np.where(inf, NAN, a)
+    return a
+
+
+def _shift_by_mean(np.ndarray a):
+    """shift the values by their (rounded) mean for the precision of the power sums, the same as pandas"""
+    a = _prep_values(a)
+    valid = a[~np.isnan(a)]
+    if len(valid) == 0:
+        return a
+    mean_val = valid.mean()
+    if valid.min() - mean_val > -1e5:
+        return a - round(mean_val)
+    return a
+
 def rolling_mean(np.ndarray a, int window):
     cdef Mean r = Mean(window)
     return rolling(r, a)
@@ -205,3 +723,91 @@ def rolling_rsquare(np.ndarray a, int window):
 def rolling_resi(np.ndarray a, int window):
     cdef Resi r = Resi(window)
     return rolling(r, a)
+
+def rolling_var(np.ndarray a, int window):
+    cdef Var r = Var(window)
+    return rolling(r, _prep_values(a))
+
+def rolling_std(np.ndarray a, int window):
+    cdef Std r = Std(window)
+    return rolling(r, _prep_values(a))
+
+def rolling_skew(np.ndarray a, int window):
+    cdef Skew r = Skew(window)
+    return rolling(r, _shift_by_mean(a))
+
+def rolling_kurt(np.ndarray a, int window):
+    cdef Kurt r = Kurt(window)
+    return rolling(r, _shift_by_mean(a))
+
+def rolling_max(np.ndarray a, int window):
+    cdef Extremum r = Extremum(window, 1, 0)
+    return rolling(r, _prep_values(a))
+
+def rolling_min(np.ndarray a, int window):
+    cdef Extremum r = Extremum(window, 0, 0)
+    return rolling(r, _prep_values(a))
+
+def rolling_idxmax(np.ndarray a, int window):
+    cdef Extremum r = Extremum(window, 1, 1)
+    return rolling(r, _prep_values(a))
+
+def rolling_idxmin(np.ndarray a, int window):
+    cdef Extremum r = Extremum(window, 0, 1)
+    return rolling(r, _prep_values(a))
+
+def rolling_wma(np.ndarray a, int window):
+    cdef WMA r = WMA(window)
+    return rolling(r, _prep_values(a))
+
+def rolling_cov(np.ndarray a, np.ndarray b, int window):
+    cdef Cov r = Cov(window)
+    return pair_rolling(r, _prep_values(a), _prep_values(b))
+
+def rolling_corr(np.ndarray a, np.ndarray b, int window):
+    cdef Corr r = Corr(window)
+    return pair_rolling(r, _prep_values(a), _prep_values(b))
+
+def ewm_mean(np.ndarray a, double alpha):
+    """exponentially weighted mean, the same as `pd.Series.ewm(alpha=alpha, min_periods=1).mean()`"""
+    cdef int  i
+    cdef int  N = len(a)
+    cdef const double[:] x = _prep_values(a)
+    cdef np.ndarray[double, ndim=1] ret = np.empty(N)
+    cdef double old_wt_factor = 1. - alpha
+    cdef double weighted = NAN, old_wt = 1., cur
+    for i in range(N):
+        cur = x[i]
+        if not isnan(weighted):
+            old_wt *= old_wt_factor
+            if not isnan(cur):
+                if weighted != cur:
+                    weighted = (old_wt * weighted + cur) / (old_wt + 1.)
+                old_wt += 1.
+        elif not isnan(cur):
+            weighted = cur
+        ret[i] = weighted
+    return ret
+
+def _uniques(np.ndarray a):
+    return np.unique(a[~np.isnan(a)])
+
+def rolling_rank(np.ndarray a, int window):
+    a = _prep_values(a)
+    cdef Rank r = Rank(window, _uniques(a))
+    return rolling(r, a)
+
+def rolling_quantile(np.ndarray a, int window, double qscore):
+    a = _prep_values(a)
+    cdef Quantile r = Quantile(window, _uniques(a), qscore)
+    return rolling(r, a)
+
+def rolling_median(np.ndarray a, int window):
+    a = _prep_values(a)
+    cdef Median r = Median(window, _uniques(a))
+    return rolling(r, a)
+
+def rolling_mad(np.ndarray a, int window):
+    a = _shift_by_mean(a)
+    cdef Mad r = Mad(window, _uniques(a))
+    return rolling(r, a)
@@ -6,10 +6,59 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
+import time
+import numpy as np
 import pandas as pd
 from ..log import get_module_logger
 
 
+def _is_bool_panel(data: pd.DataFrame) -> bool:
+    return len(data.columns) > 0 and (data.dtypes == bool).all()
+
+
+class ExpressionKey:
+    """The structural key of an expression in the in-process caches
+
+    Two expressions have the same key if they are of the same type with the same attributes, where the sub-expressions
+    are compared by their keys. Unlike `str(expr)`, the parameters missing in `__str__` (e.g. of a custom operator)
+    are not ignored. The hash is calculated once, so the key is cheap to look up.
+
+    NOTE: the hash depends on the process, so the key is not used by the disk caches.
+    """
+
+    __slots__ = ("type_name", "_structure", "_hash")
+
+    def __init__(self, expr: "Expression"):
+        attrs = []
+        for attr, value in sorted(vars(expr).items()):
+            if attr == "_cache_key":
+                continue
+            if isinstance(value, Expression):
+                attrs.append((attr, value.cache_key))
+            else:
+                attrs.append((attr, type(value).__name__, value))
+        structure = (type(expr), tuple(attrs))
+        try:
+            self._hash = hash(structure)
+        except TypeError:
+            # the expressions with unhashable attributes are identified by their strings
+            structure = (type(expr), str(expr))
+            self._hash = hash(structure)
+        self._structure = structure
+        self.type_name = type(expr).__name__
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return isinstance(other, ExpressionKey) and self._hash == other._hash and self._structure == other._structure
+
+    def __repr__(self):
+        return f"{type(self).__name__}<{self.type_name}, {self._hash}>"
+
+
 class Expression(abc.ABC):
     """
     Expression base class
@@ -29,6 +78,14 @@ class Expression(abc.ABC):
     def __repr__(self):
         return str(self)
 
+    @property
+    def cache_key(self) -> ExpressionKey:
+        """the structural key of the expression in `H["f"]` (the expression should not be changed after it is used)"""
+        key = self.__dict__.get("_cache_key")
+        if key is None:
+            key = self._cache_key = ExpressionKey(self)
+        return key
+
     def __gt__(self, other):
         from .ops import Gt  # pylint: disable=C0415
 
@@ -184,12 +241,14 @@ class Expression(abc.ABC):
         from .cache import H  # pylint: disable=C0415
 
         # cache
-        cache_key = str(self), instrument, start_index, end_index, *args
-        if cache_key in H["f"]:
-            return H["f"][cache_key]
+        cache_key = self.cache_key, instrument, start_index, end_index, *args
+        series = H["f"].get(cache_key)
+        if series is not None:
+            return series
         if start_index is not None and end_index is not None and start_index > end_index:
             raise ValueError("Invalid index range: {} {}".format(start_index, end_index))
         try:
+            _start = time.perf_counter()
             series = self._load_internal(instrument, start_index, end_index, *args)
         except Exception as e:
             get_module_logger("data").debug(
@@ -199,13 +258,89 @@ class Expression(abc.ABC):
             )
             raise
         series.name = str(self)
-        H["f"][cache_key] = series
+        # the load time is the cost to recompute the series after it is evicted
+        H["f"].set(cache_key, series, cost=time.perf_counter() - _start)
         return series
 
     @abc.abstractmethod
     def _load_internal(self, instrument, start_index, end_index, *args) -> pd.Series:
         raise NotImplementedError("This function must be implemented in your newly defined feature")
 
+    def load_panel(self, instruments, start_index, end_index, *args):
+        """load the feature/expression of a group of instruments at once
+
+        This is the panel engine of the expressions. Each operator is calculated once on the whole
+        ``calendar x instrument`` panel instead of once for each instrument.
+
+        Parameters
+        ----------
+        instruments : list
+            instrument codes, the columns of the panel.
+        start_index : int
+            feature start index [in calendar].
+        end_index : int
+            feature end  index  [in calendar].
+        *args :
+            the same as `load`.
+
+        Returns
+        ----------
+        (pd.DataFrame, np.ndarray)
+            - the panel: the index is the calendar index in [start_index, end_index], the columns are the instruments
+            - the valid mask: bool array of the same shape; True if the calendar index is in the index of the series
+              loaded by `load` for the instrument
+        """
+        if start_index > end_index:
+            raise ValueError("Invalid index range: {} {}".format(start_index, end_index))
+        try:
+            if self._support_panel():
+                data, valid = self._load_panel_internal(instruments, start_index, end_index, *args)
+            else:
+                data, valid = self._load_panel_by_instrument(instruments, start_index, end_index, *args)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading panel error: expression={str(self)}, start_index={start_index}, "
+                f"end_index={end_index}, args={args}. error info: {str(e)}"
+            )
+            raise
+        if not valid.all():
+            # the cells out of the series of the instruments are ignored by the following operators
+            data = data.where(valid, False if _is_bool_panel(data) else np.nan)
+        return data, valid
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        """calculate the expression on the panel
+
+        The expressions without a panel implementation are loaded instrument by instrument.
+        """
+        return self._load_panel_by_instrument(instruments, start_index, end_index, *args)
+
+    @classmethod
+    def _support_panel(cls) -> bool:
+        """whether `_load_panel_internal` is consistent with `_load_internal`
+
+        The subclasses (e.g. the custom operators) overriding `_load_internal` only are loaded instrument by instrument.
+        """
+        for klass in cls.__mro__:
+            if "_load_panel_internal" in vars(klass):
+                return True
+            if "_load_internal" in vars(klass):
+                return False
+        return False
+
+    def _load_panel_by_instrument(self, instruments, start_index, end_index, *args):
+        """assemble the panel from the series loaded by `load` for each instrument"""
+        series_l = [self.load(inst, start_index, end_index, *args) for inst in instruments]
+        dtype = np.result_type(np.float32, *[series.dtype for series in series_l])
+        data = np.full((end_index - start_index + 1, len(instruments)), np.nan, dtype=dtype)
+        valid = np.zeros(data.shape, dtype=bool)
+        for i, series in enumerate(series_l):
+            pos = series.index.values.astype(int) - start_index
+            keep = (pos >= 0) & (pos < len(data))
+            data[pos[keep], i] = series.values[keep]
+            valid[pos[keep], i] = True
+        return pd.DataFrame(data, index=pd.RangeIndex(start_index, end_index + 1), columns=instruments), valid
+
     @abc.abstractmethod
     def get_longest_back_rolling(self):
         """Get the longest length of historical data the feature has accessed
@@ -5,36 +5,42 @@
 from __future__ import division
 from __future__ import print_function
 
+import io
 import os
 import sys
 import stat
 import time
 import pickle
 import traceback
+
 # import redis_lock  # Redis is not needed according to user requirements
 import contextlib
 import abc
+import heapq
+import itertools
+import threading
 from pathlib import Path
 import numpy as np
 import pandas as pd
+from joblib import delayed
 from typing import Union, Iterable
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict, Counter
 
 from ..config import C
 from ..utils import (
     hash_args,
-    get_redis_connection,
     read_bin,
-    parse_field,
     remove_fields_space,
     normalize_cache_fields,
     normalize_cache_instruments,
 )
+from ..utils.file import FileRWLock, atomic_write
+from ..utils.paral import ParallelExt
 from ..utils.pickle_utils import restricted_pickle_load
 
 from ..log import get_module_logger
 from .base import Feature
-from .ops import Operators  # pylint: disable=W0611  # noqa: F401
+from .parser import parse_expression
 
 
 class QlibCacheException(RuntimeError):
@@ -48,27 +54,50 @@ class MemCacheUnit(abc.ABC):
         self.size_limit = kwargs.pop("size_limit", 0)
         self._size = 0
         self.od = OrderedDict()
+        # the cache is shared by the threads of `DatasetProvider.dataset_processor` when `C.dataset_engine` is "thread"
+        self._lock = threading.RLock()
+        # the hits/misses/evictions of each type of the cached items
+        self._counter = defaultdict(Counter)
 
     def __setitem__(self, key, value):
-        # TODO: thread safe?__setitem__ failure might cause inconsistent size?
+        self.set(key, value)
 
-        # precalculate the size after od.__setitem__
-        self._adjust_size(key, value)
+    def set(self, key, value, cost: float = None):
+        """set the value of `key`
 
-        self.od.__setitem__(key, value)
+        Parameters
+        ----------
+        cost : float
+            the cost (e.g. the seconds) to recompute the value, which is only used by the cost-aware units
+        """
+        with self._lock:
+            # precalculate the size after od.__setitem__
+            self._adjust_size(key, value)
 
-        # move the key to end,make it latest
-        self.od.move_to_end(key)
+            self.od.__setitem__(key, value)
 
-        if self.limited:
-            # pop the oldest items beyond size limit
-            while self._size > self.size_limit:
-                self.popitem(last=False)
+            # move the key to end,make it latest
+            self.od.move_to_end(key)
+
+            if self.limited:
+                # evict the items beyond size limit
+                while self._size > self.size_limit:
+                    self._evict()
 
     def __getitem__(self, key):
-        v = self.od.__getitem__(key)
-        self.od.move_to_end(key)
-        return v
+        with self._lock:
+            v = self.od.__getitem__(key)
+            self.od.move_to_end(key)
+            self._counter[self._key_type(key)]["hits"] += 1
+            return v
+
+    def get(self, key, default=None):
+        """return the value of `key` (and make it latest) if `key` is in the cache, else `default`"""
+        with self._lock:
+            if key not in self.od:
+                self._counter[self._key_type(key)]["misses"] += 1
+                return default
+            return self.__getitem__(key)
 
     def __contains__(self, key):
         return key in self.od
@@ -92,20 +121,58 @@ class MemCacheUnit(abc.ABC):
         return self._size
 
     def clear(self):
-        self._size = 0
-        self.od.clear()
+        with self._lock:
+            self._size = 0
+            self.od.clear()
+            self._counter.clear()
+
+    def stats(self) -> pd.DataFrame:
+        """the statistics of each type of the cached items
+
+        Returns
+        -------
+        pd.DataFrame
+            indexed by the type with the columns: entries, bytes, hits, misses, evictions and hit_rate
+        """
+        with self._lock:
+            stats = defaultdict(Counter, {t: Counter(c) for t, c in self._counter.items()})
+            for key, value in self.od.items():
+                stats[self._key_type(key)]["entries"] += 1
+                stats[self._key_type(key)]["bytes"] += _nbytes(value)
+        columns = ["entries", "bytes", "hits", "misses", "evictions"]
+        df = pd.DataFrame.from_dict(stats, orient="index", columns=columns).fillna(0).astype(np.int64)
+        df.index.name = "type"
+        df["hit_rate"] = df["hits"] / (df["hits"] + df["misses"]).where(lambda s: s > 0)
+        return df.sort_index()
+
+    @staticmethod
+    def _key_type(key) -> str:
+        """the type of the cached item in the statistics, e.g. the type of the expression of the key"""
+        head = key[0] if isinstance(key, tuple) and key else key
+        return getattr(head, "type_name", type(head).__name__)
+
+    def _evict(self):
+        key = self._victim()
+        self.pop(key)
+        self._counter[self._key_type(key)]["evictions"] += 1
+
+    def _victim(self):
+        """the key to evict when the cache is beyond the size limit: the least recently used one by default"""
+        return next(iter(self.od))
 
     def popitem(self, last=True):
-        k, v = self.od.popitem(last=last)
-        self._size -= self._get_value_size(v)
+        with self._lock:
+            k, v = self.od.popitem(last=last)
+            self._size -= self._get_value_size(v)
 
-        return k, v
+            return k, v
 
     def pop(self, key):
-        v = self.od.pop(key)
-        self._size -= self._get_value_size(v)
+        with self._lock:
+            v = self.od.pop(key)
+            self._size -= self._get_value_size(v)
 
-        return v
+            return v
 
     def _adjust_size(self, key, value):
         if key in self.od:
@@ -134,29 +201,128 @@ class MemCacheSizeofUnit(MemCacheUnit):
         return sys.getsizeof(value)
 
 
+def _nbytes(value) -> int:
+    """the bytes of the data of `value` (the index of each pandas object is counted)"""
+    if isinstance(value, pd.Series):
+        return value.values.nbytes + value.index.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemCacheNbytesUnit(MemCacheUnit):
+    """Memory cache unit limited by the bytes of the data, which evicts the cheapest data to recompute
+
+    The items are evicted by GreedyDual-Size: the priority of an item is `L + cost / nbytes` when it is set or hit and
+    the item with the lowest priority is evicted, where `L` is the priority of the last evicted item. So a large item
+    cheap to recompute is evicted before the small expensive ones, and the items not hit for long are evicted at last.
+    """
+
+    def __init__(self, size_limit=0):
+        super().__init__(size_limit=size_limit)
+        self._clock = 0.0
+        # key -> (the sequence of the latest entry of the key in the heap, cost / nbytes, nbytes)
+        self._items = {}
+        # the entries (priority, sequence, key); the entries replaced by later ones are dropped when they are popped
+        self._heap = []
+        self._seq = itertools.count()
+
+    def set(self, key, value, cost: float = None):
+        with self._lock:
+            nbytes = _nbytes(value)
+            if key in self._items:
+                self._size -= self._items[key][2]
+            self._size += nbytes
+            self._touch(key, (cost or 0.0) / max(nbytes, 1), nbytes)
+
+            self.od.__setitem__(key, value)
+            self.od.move_to_end(key)
+
+            if self.limited:
+                while self._size > self.size_limit:
+                    self._evict()
+
+    def __getitem__(self, key):
+        with self._lock:
+            v = super().__getitem__(key)
+            self._touch(key, *self._items[key][1:])
+            return v
+
+    def _touch(self, key, density, nbytes):
+        seq = next(self._seq)
+        self._items[key] = seq, density, nbytes
+        heapq.heappush(self._heap, (self._clock + density, seq, key))
+        if len(self._heap) > 2 * len(self._items) + 64:
+            # drop the replaced entries
+            self._heap = [e for e in self._heap if self._items.get(e[2], (None,))[0] == e[1]]
+            heapq.heapify(self._heap)
+
+    def _victim(self):
+        while True:
+            priority, seq, key = heapq.heappop(self._heap)
+            if self._items.get(key, (None,))[0] == seq:
+                self._clock = priority
+                return key
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._clock = 0.0
+            self._items.clear()
+            self._heap.clear()
+
+    def popitem(self, last=True):
+        with self._lock:
+            k, v = self.od.popitem(last=last)
+            self._size -= self._items.pop(k)[2]
+            return k, v
+
+    def pop(self, key):
+        with self._lock:
+            v = self.od.pop(key)
+            self._size -= self._items.pop(key)[2]
+            return v
+
+    def _get_value_size(self, value):
+        return _nbytes(value)
+
+
 class MemCache:
     """Memory cache."""
 
-    def __init__(self, mem_cache_size_limit=None, limit_type="length"):
+    def __init__(self, mem_cache_size_limit=None, limit_type=None):
         """
 
         Parameters
         ----------
         mem_cache_size_limit:
-            cache max size.
+            cache max size; the default value is `C.mem_cache_size_limit`.
         limit_type:
-            length or sizeof; length(call fun: len), size(call fun: sys.getsizeof).
+            length, sizeof or nbytes; the default value is `C.mem_cache_limit_type`.
+            length(call fun: len), size(call fun: sys.getsizeof), nbytes(the bytes of the data, and the data cheapest
+            to recompute is evicted first, please refer to `MemCacheNbytesUnit`).
         """
+        self._mem_cache_size_limit = mem_cache_size_limit
+        self._limit_type = limit_type
+        self.reset()
 
-        size_limit = C.mem_cache_size_limit if mem_cache_size_limit is None else mem_cache_size_limit
-        limit_type = C.mem_cache_limit_type if limit_type is None else limit_type
+    def reset(self):
+        """rebuild the empty caches, e.g. after the size limit or the limit type in `C` is changed"""
+        size_limit = C.mem_cache_size_limit if self._mem_cache_size_limit is None else self._mem_cache_size_limit
+        limit_type = C.mem_cache_limit_type if self._limit_type is None else self._limit_type
 
         if limit_type == "length":
             klass = MemCacheLengthUnit
         elif limit_type == "sizeof":
             klass = MemCacheSizeofUnit
+        elif limit_type == "nbytes":
+            klass = MemCacheNbytesUnit
         else:
-            raise ValueError(f"limit_type must be length or sizeof, your limit_type is {limit_type}")
+            raise ValueError(f"limit_type must be length, sizeof or nbytes, your limit_type is {limit_type}")
 
         self.__calendar_mem_cache = klass(size_limit)
         self.__instrument_mem_cache = klass(size_limit)
@@ -177,6 +343,11 @@ class MemCache:
         self.__instrument_mem_cache.clear()
         self.__feature_mem_cache.clear()
 
+    def stats(self) -> pd.DataFrame:
+        """the statistics of the caches indexed by (cache, type), where cache is c/i/f; please refer to
+        `MemCacheUnit.stats`"""
+        return pd.concat({key: self[key].stats() for key in ["c", "i", "f"]}, names=["cache"])
+
 
 class MemCacheExpire:
     CACHE_EXPIRE = C.mem_cache_expire
@@ -210,6 +381,17 @@ class MemCacheExpire:
 class CacheUtils:
     LOCK_ID = "QLIB"
 
+    @staticmethod
+    def get_lock_client():
+        """the "file" locks (please refer to `C.cache_lock`) need no client"""
+        return None
+
+    @staticmethod
+    def file_lock(lock_name: str, timeout: float = None) -> FileRWLock:
+        """the file lock of `lock_name` ("<data uri>:<name>") in the `C.cache_lock_dir_name` directory of the data uri"""
+        data_uri, _, name = lock_name.rpartition(":")
+        return FileRWLock(Path(data_uri).joinpath(C.cache_lock_dir_name, f"{name}.lock"), timeout=timeout)
+
     @staticmethod
     def organize_meta_file():
         pass
@@ -221,19 +403,20 @@ class CacheUtils:
 
     @staticmethod
     def visit(cache_path: Union[str, Path]):
-        # FIXME: Because read_lock was canceled when reading the cache, multiple processes may have read and write exceptions here
+        # NOTE: the readers share the reader lock, so the concurrent visits may be counted once. The meta file is
+        # replaced atomically, so the readers never read a partial one
         try:
             cache_path = Path(cache_path)
             meta_path = cache_path.with_suffix(".meta")
             with meta_path.open("rb") as f:
                 d = restricted_pickle_load(f)
-            with meta_path.open("wb") as f:
-                try:
-                    d["meta"]["last_visit"] = str(time.time())
-                    d["meta"]["visits"] = d["meta"]["visits"] + 1
-                except KeyError as key_e:
-                    raise KeyError("Unknown meta keyword") from key_e
-                pickle.dump(d, f, protocol=C.dump_protocol_version)
+            try:
+                d["meta"]["last_visit"] = str(time.time())
+                d["meta"]["visits"] = d["meta"]["visits"] + 1
+            except KeyError as key_e:
+                raise KeyError("Unknown meta keyword") from key_e
+            atomic_write(meta_path, pickle.dumps(d, protocol=C.dump_protocol_version))
+            meta_path.chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
         except Exception as e:
             get_module_logger("CacheUtils").warning(f"visit {cache_path} cache error: {e}")
 
@@ -245,14 +428,15 @@ class CacheUtils:
     @staticmethod
     @contextlib.contextmanager
     def reader_lock(redis_t, lock_name: str):
-        # Redis is not needed according to user requirements
-        yield
+        with CacheUtils.file_lock(lock_name).reader():
+            yield
 
     @staticmethod
     @contextlib.contextmanager
-    def writer_lock(redis_t, lock_name):
-        # Redis is not needed according to user requirements
-        yield
+    def writer_lock(redis_t, lock_name, timeout: float = None):
+        """`timeout` is the seconds to wait before `TimeoutError` is raised"""
+        with CacheUtils.file_lock(lock_name, timeout=timeout).writer():
+            yield
 
 
 class BaseProviderCache:
@@ -308,6 +492,13 @@ class ExpressionCache(BaseProviderCache):
         except NotImplementedError:
             return self.provider.expression(instrument, field, start_time, end_time, freq)
 
+    def expressions(self, instrument, fields, start_time, end_time, freq):
+        """Get the data of a list of expressions; each of them is loaded with the cache.
+
+        .. note:: Same interface as `expressions` method in expression provider
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
     def _uri(self, instrument, field, start_time, end_time, freq):
         """Get expression cache file uri.
 
@@ -455,7 +646,7 @@ class DiskExpressionCache(ExpressionCache):
 
     def __init__(self, provider, **kwargs):
         super(DiskExpressionCache, self).__init__(provider)
-        self.r = get_redis_connection()
+        self.r = CacheUtils.get_lock_client()
         # remote==True means client is using this module, writing behaviour will not be allowed.
         self.remote = kwargs.get("remote", False)
 
@@ -477,76 +668,98 @@ class DiskExpressionCache(ExpressionCache):
         _calendar = Cal.calendar(freq=freq)
 
         _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq, future=False)
+        lock_name = f"{str(C.dpm.get_data_uri(freq))}:expression-{_cache_uri}"
 
         if self.check_cache_exists(cache_path, suffix_list=[".meta"]):
-            """
-            In most cases, we do not need reader_lock.
-            Because updating data is a small probability event compare to reading data.
-
-            """
-            # FIXME: Removing the reader lock may result in conflicts.
-            # with CacheUtils.reader_lock(self.r, 'expression-%s' % _cache_uri):
+            # the reader lock waits for the writers generating or updating the cache
+            with CacheUtils.reader_lock(self.r, lock_name):
+                # the cache may be evicted (please refer to `DiskCacheManager.gc`) while waiting for the lock
+                if self.check_cache_exists(cache_path, suffix_list=[".meta"]):
+                    # modify expression cache meta file
+                    try:
+                        if not self.remote:
+                            CacheUtils.visit(cache_path)
+                        series = read_bin(cache_path, start_index, end_index)
+                        return series
+                    except Exception:
+                        series = None
+                        self.logger.error("reading %s file error : %s" % (cache_path, traceback.format_exc()))
+                    return series
 
-            # modify expression cache meta file
-            try:
-                # FIXME: Multiple readers may result in error visit number
-                if not self.remote:
-                    CacheUtils.visit(cache_path)
-                series = read_bin(cache_path, start_index, end_index)
+        # normalize field
+        field = remove_fields_space(field)
+        # cache unavailable, generate the cache
+        _instrument_dir.mkdir(parents=True, exist_ok=True)
+        if not isinstance(parse_expression(field), Feature):
+            # When the expression is not a raw feature
+            # generate expression cache if the feature is not a Feature
+            # instance
+            _start = time.perf_counter()
+            series = self.provider.expression(instrument, field, _calendar[0], _calendar[-1], freq)
+            cost = time.perf_counter() - _start
+            if not series.empty:
+                # This expression is empty, we don't generate any cache for it.
+                with CacheUtils.writer_lock(self.r, lock_name):
+                    # the cache may be generated by another process while the series is calculated
+                    if self.check_cache_exists(cache_path, suffix_list=[".meta"]):
+                        return series.loc[start_index:end_index]
+                    nbytes = self.gen_expression_cache(
+                        expression_data=series,
+                        cache_path=cache_path,
+                        instrument=instrument,
+                        field=field,
+                        freq=freq,
+                        last_update=str(_calendar[-1]),
+                        cost=cost,
+                    )
+                DiskCacheManager(freq).add(nbytes)
+                return series.loc[start_index:end_index]
+            else:
                 return series
-            except Exception:
-                series = None
-                self.logger.error("reading %s file error : %s" % (cache_path, traceback.format_exc()))
-            return series
         else:
-            # normalize field
-            field = remove_fields_space(field)
-            # cache unavailable, generate the cache
-            _instrument_dir.mkdir(parents=True, exist_ok=True)
-            if not isinstance(eval(parse_field(field)), Feature):
-                # When the expression is not a raw feature
-                # generate expression cache if the feature is not a Feature
-                # instance
-                series = self.provider.expression(instrument, field, _calendar[0], _calendar[-1], freq)
-                if not series.empty:
-                    # This expression is empty, we don't generate any cache for it.
-                    with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:expression-{_cache_uri}"):
-                        self.gen_expression_cache(
-                            expression_data=series,
-                            cache_path=cache_path,
-                            instrument=instrument,
-                            field=field,
-                            freq=freq,
-                            last_update=str(_calendar[-1]),
-                        )
-                    return series.loc[start_index:end_index]
-                else:
-                    return series
-            else:
-                # If the expression is a raw feature(such as $close, $open)
-                return self.provider.expression(instrument, field, start_time, end_time, freq)
+            # If the expression is a raw feature(such as $close, $open)
+            return self.provider.expression(instrument, field, start_time, end_time, freq)
+
+    def gen_expression_cache(
+        self, expression_data, cache_path, instrument, field, freq, last_update, cost: float = 0.0
+    ) -> int:
+        """use bin file to save like feature-data.
 
-    def gen_expression_cache(self, expression_data, cache_path, instrument, field, freq, last_update):
-        """use bin file to save like feature-data."""
+        `cost` is the seconds to calculate the data; it is recorded in the meta file (with the size of the data) for
+        the eviction of `DiskCacheManager`. The size in bytes of the data is returned.
+        """
         # Make sure the cache runs right when the directory is deleted
         # while running
+        df = expression_data.to_frame()
+        r = np.hstack([df.index[0], expression_data]).astype("<f")
         meta = {
             "info": {"instrument": instrument, "field": field, "freq": freq, "last_update": last_update},
-            "meta": {"last_visit": time.time(), "visits": 1},
+            "meta": {"last_visit": time.time(), "visits": 1, "size": r.nbytes, "cost": cost},
         }
         self.logger.debug(f"generating expression cache: {meta}")
         self.clear_cache(cache_path)
         meta_path = cache_path.with_suffix(".meta")
 
-        with meta_path.open("wb") as f:
-            pickle.dump(meta, f, protocol=C.dump_protocol_version)
-        meta_path.chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
-        df = expression_data.to_frame()
+        # the cache exists once the meta file is written, so the data is written at first
+        atomic_write(cache_path, r.tobytes())
+        cache_path.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
 
-        r = np.hstack([df.index[0], expression_data]).astype("<f")
-        r.tofile(str(cache_path))
+        atomic_write(meta_path, pickle.dumps(meta, protocol=C.dump_protocol_version))
+        meta_path.chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
+        return r.nbytes
 
     def update(self, sid, cache_uri, freq: str = "day"):
+        """Update the expression cache to the latest calendar incrementally
+
+        Only the tail of the cache is recomputed: the new days and the last `rght_etd` days, which used the future data
+        missing at the last update (the lookback of the expression is loaded before them by the provider). The
+        expressions depending on the whole history (e.g. `Mean($close, 0)`) are recomputed from the start of the cache.
+
+        Returns
+        -------
+        int
+            0(successful update)/ 1(no need to update)/ 2(update failure).
+        """
         cp_cache_uri = self.get_cache_dir(freq).joinpath(sid).joinpath(cache_uri)
         meta_path = cp_cache_uri.with_suffix(".meta")
         if not self.check_cache_exists(cp_cache_uri, suffix_list=[".meta"]):
@@ -554,7 +767,7 @@ class DiskExpressionCache(ExpressionCache):
             self.clear_cache(cp_cache_uri)
             return 2
 
-        with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri())}:expression-{cache_uri}"):
+        with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:expression-{cache_uri}"):
             with meta_path.open("rb") as f:
                 d = restricted_pickle_load(f)
             instrument = d["info"]["instrument"]
@@ -566,53 +779,92 @@ class DiskExpressionCache(ExpressionCache):
             from .data import Cal, ExpressionD  # pylint: disable=C0415
 
             whole_calendar = Cal.calendar(start_time=None, end_time=None, freq=freq)
-            # calendar since last updated.
-            new_calendar = Cal.calendar(start_time=last_update_time, end_time=None, freq=freq)
-
-            # get append data
-            if len(new_calendar) <= 1:
-                # Including last updated calendar, we only get 1 item.
+            last_update_index = Cal.locate_index(last_update_time, last_update_time, freq=freq)[3]
+            if last_update_index >= len(whole_calendar) - 1:
                 # No future updating is needed.
                 return 1
+
+            # The existing data [ref_start_index, ref_end_index]
+            size_bytes = os.path.getsize(cp_cache_uri)
+            ele_size = np.dtype("<f").itemsize
+            assert size_bytes % ele_size == 0
+            ele_n = size_bytes // ele_size - 1
+            with open(cp_cache_uri, "rb") as f:
+                ref_start_index = int(np.frombuffer(f.read(ele_size), dtype="<f")[0])
+            ref_end_index = ref_start_index + ele_n - 1
+
+            expr = ExpressionD.get_expression_instance(field)
+            lft_etd, rght_etd = expr.get_extended_window_size()
+            if np.isinf(expr.get_longest_back_rolling()):
+                update_start = ref_start_index
             else:
-                # get the data needed after the historical data are removed.
-                # The start index of new data
-                current_index = len(whole_calendar) - len(new_calendar) + 1
-
-                # The existing data length
-                size_bytes = os.path.getsize(cp_cache_uri)
-                ele_size = np.dtype("<f").itemsize
-                assert size_bytes % ele_size == 0
-                ele_n = size_bytes // ele_size - 1
-
-                expr = ExpressionD.get_expression_instance(field)
-                lft_etd, rght_etd = expr.get_extended_window_size()
                 # The expression used the future data after rght_etd days.
-                # So the last rght_etd data should be removed.
-                # There are most `ele_n` period of data can be remove
-                remove_n = min(rght_etd, ele_n)
-                assert new_calendar[1] == whole_calendar[current_index]
-                data = self.provider.expression(
-                    instrument, field, whole_calendar[current_index - remove_n], new_calendar[-1], freq
-                )
-                with open(cp_cache_uri, "ab") as f:
-                    data = np.array(data).astype("<f")
-                    # Remove the last bits
-                    f.truncate(size_bytes - ele_size * remove_n)
-                    f.write(data)
-                # update meta file
-                d["info"]["last_update"] = str(new_calendar[-1])
-                with meta_path.open("wb") as f:
-                    pickle.dump(d, f, protocol=C.dump_protocol_version)
+                # So the last rght_etd data should be recomputed.
+                update_start = max(min(ref_end_index, last_update_index) + 1 - rght_etd, ref_start_index)
+            data = self.provider.expression(instrument, field, whole_calendar[update_start], whole_calendar[-1], freq)
+            with open(cp_cache_uri, "r+b") as f:
+                # overwrite the data since update_start; the stale tail is dropped even if there are no new rows
+                f.truncate(ele_size * (1 + update_start - ref_start_index))
+                if not data.empty:
+                    data = data.reindex(range(update_start, data.index[-1] + 1))
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.asarray(data, dtype="<f").tobytes())
+            # update meta file
+            d["info"]["last_update"] = str(whole_calendar[-1])
+            d["meta"]["size"] = os.path.getsize(cp_cache_uri)
+            atomic_write(meta_path, pickle.dumps(d, protocol=C.dump_protocol_version))
+            meta_path.chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
         return 0
 
+    def update_cache(self, freq: str = "day", n_jobs: int = None) -> pd.Series:
+        """Update all the expression caches of `freq` to the latest calendar, e.g. after the data is dumped
+
+        Parameters
+        ----------
+        freq : str
+        n_jobs : int
+            the number of the processes; the default value is `C.kernels`. The processes use the registered
+            `ExpressionD`, so `C.expression_cache` should be DiskExpressionCache when n_jobs > 1.
+
+        Returns
+        -------
+        pd.Series
+            the results of `update` indexed by (instrument, cache uri)
+        """
+        # the calendar, the instruments and the features in the memory caches are outdated by the new data
+        H.clear()
+        task_l = sorted((p.parent.name, p.stem) for p in self.get_cache_dir(freq).glob("*/*.meta"))
+        n_jobs = min(C.kernels if n_jobs is None else n_jobs, len(task_l))
+        if n_jobs <= 1:
+            res = [self.update(sid, cache_uri, freq) for sid, cache_uri in task_l]
+        else:
+            res = ParallelExt(n_jobs=n_jobs, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)(
+                delayed(DiskExpressionCache._update_worker)(sid, cache_uri, freq, C) for sid, cache_uri in task_l
+            )
+        index = pd.MultiIndex.from_tuples(task_l, names=["instrument", "cache_uri"])
+        return pd.Series(res, index=index, dtype=np.int64)
+
+    @staticmethod
+    def _update_worker(sid, cache_uri, freq, g_config):
+        C.register_from_C(g_config)
+        H.clear()
+        from .data import ExpressionD  # pylint: disable=C0415
+
+        return ExpressionD.update(sid, cache_uri, freq)
+
 
 class DiskDatasetCache(DatasetCache):
-    """Prepared cache mechanism for server."""
+    """Prepared cache mechanism for server.
+
+    The datasets are stored in the columnar format (please refer to `gen_dataset_cache`); the legacy HDF5 caches are
+    migrated to it when they are used or updated (please refer to `migrate`).
+    """
+
+    FORMAT = "columnar"
 
     def __init__(self, provider, **kwargs):
         super(DiskDatasetCache, self).__init__(provider)
-        self.r = get_redis_connection()
+        self.r = CacheUtils.get_lock_client()
         self.remote = kwargs.get("remote", False)
 
     @staticmethod
@@ -623,18 +875,40 @@ class DiskDatasetCache(DatasetCache):
         return super(DiskDatasetCache, self).get_cache_dir(C.dataset_cache_dir_name, freq)
 
     @classmethod
-    def read_data_from_cache(cls, cache_path: Union[str, Path], start_time, end_time, fields):
+    def read_data_from_cache(cls, cache_path: Union[str, Path], start_time, end_time, fields, instruments=None):
         """read_cache_from
 
-        This function can read data from the disk cache dataset
+        This function can read data from the disk cache dataset. Only the rows of the instruments in
+        [start_time, end_time] and the columns of the fields are read from the columnar cache.
 
         :param cache_path:
         :param start_time:
         :param end_time:
         :param fields: The fields order of the dataset cache is sorted. So rearrange the columns to make it consistent.
+        :param instruments: the names of the instruments to read; None reads all the instruments.
         :return:
         """
+        cache_path = Path(cache_path)
+        if cls.is_legacy_cache(cache_path):
+            df = cls._read_legacy_cache(cache_path, start_time, end_time)
+            if instruments is not None and not df.empty:
+                df = df.loc[df.index.get_level_values("instrument").isin(instruments)]
+        else:
+            df = cls._read_columnar_cache(cache_path, start_time, end_time, remove_fields_space(fields), instruments)
+        if df.empty:
+            return pd.DataFrame(columns=fields)
+        # read cache and need to replace not-space fields to field
+        return cls.cache_to_origin_data(df, fields)
 
+    @staticmethod
+    def is_legacy_cache(cache_path: Union[str, Path]) -> bool:
+        """whether the cache is in the legacy format (HDF5 data and index), which is read with pytables"""
+        with Path(cache_path).with_suffix(".meta").open("rb") as f:
+            d = restricted_pickle_load(f)
+        return d["info"].get("format") != DiskDatasetCache.FORMAT
+
+    @staticmethod
+    def _read_legacy_cache(cache_path: Path, start_time=None, end_time=None) -> pd.DataFrame:
         im = DiskDatasetCache.IndexManager(cache_path)
         index_data = im.get_index(start_time, end_time)
         if index_data.shape[0] > 0:
@@ -648,13 +922,49 @@ class DiskDatasetCache(DatasetCache):
         with pd.HDFStore(cache_path, mode="r") as store:
             if "/{}".format(im.KEY) in store.keys():
                 df = store.select(key=im.KEY, start=start, stop=stop)
-                df = df.swaplevel("datetime", "instrument").sort_index()
-                # read cache and need to replace not-space fields to field
-                df = cls.cache_to_origin_data(df, fields)
+                return df.swaplevel("datetime", "instrument").sort_index()
+        return pd.DataFrame()
 
-            else:
-                df = pd.DataFrame(columns=fields)
-        return df
+    @staticmethod
+    def _read_columnar_cache(
+        cache_path: Path, start_time=None, end_time=None, columns=None, instruments=None
+    ) -> pd.DataFrame:
+        """read the columns (the fields without space; None reads all the columns) of the columnar cache"""
+        with cache_path.with_suffix(".meta").open("rb") as f:
+            cache_columns = restricted_pickle_load(f)["info"]["fields"]
+        with np.load(cache_path.with_suffix(".index"), allow_pickle=False) as index:
+            inst_arr, offsets, cal_idx, calendar = (index[k] for k in ["instruments", "offsets", "cal_idx", "calendar"])
+        columns = cache_columns if columns is None else list(columns)
+
+        # the rows of each instrument are sorted by datetime, so the rows in [start_time, end_time] are located by the
+        # key (the position of the instrument, the position of the datetime in the calendar)
+        lo, hi = 0, len(calendar)
+        if start_time is not None:
+            lo = calendar.searchsorted(pd.Timestamp(start_time).to_datetime64(), "left")
+        if end_time is not None:
+            hi = calendar.searchsorted(pd.Timestamp(end_time).to_datetime64(), "right")
+        inst_ids = np.arange(len(inst_arr))
+        if instruments is not None:
+            inst_ids = inst_ids[np.isin(inst_arr, list(instruments))]
+        key = np.repeat(np.arange(len(inst_arr), dtype=np.int64), np.diff(offsets)) * len(calendar) + cal_idx
+        row_lo = key.searchsorted(inst_ids * len(calendar) + lo, "left")
+        row_hi = key.searchsorted(inst_ids * len(calendar) + hi, "left")
+        lengths = row_hi - row_lo
+        rows = np.arange(lengths.sum()) + np.repeat(row_lo - (np.cumsum(lengths) - lengths), lengths)
+
+        if len(cal_idx) > 0:
+            data = np.memmap(cache_path, dtype="<f4", mode="r", shape=(len(cache_columns), len(cal_idx)))
+        else:
+            # the empty file can't be mapped
+            data = np.empty((len(cache_columns), 0), dtype="<f4")
+        # only the pages of the rows of the columns are read
+        values = {col: data[cache_columns.index(col)][rows] for col in columns}
+        del data
+        index = pd.MultiIndex.from_arrays(
+            [np.repeat(inst_arr[inst_ids], lengths).astype(object), calendar[cal_idx[rows]]],
+            names=["instrument", "datetime"],
+        )
+        return pd.DataFrame(values, index=index, columns=columns)
 
     def _dataset(
         self, instruments, fields, start_time=None, end_time=None, freq="day", disk_cache=0, inst_processors=[]
@@ -686,11 +996,17 @@ class DiskDatasetCache(DatasetCache):
         gen_flag = False
 
         if self.check_cache_exists(cache_path):
+            if disk_cache == 1 and not self.remote and self.is_legacy_cache(cache_path):
+                self.migrate(_cache_uri, freq)
             if disk_cache == 1:
                 # use cache
                 with CacheUtils.reader_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{_cache_uri}"):
-                    CacheUtils.visit(cache_path)
-                    features = self.read_data_from_cache(cache_path, start_time, end_time, fields)
+                    # the cache may be evicted (please refer to `DiskCacheManager.gc`) while waiting for the lock
+                    if self.check_cache_exists(cache_path):
+                        CacheUtils.visit(cache_path)
+                        features = self.read_data_from_cache(cache_path, start_time, end_time, fields)
+                    else:
+                        gen_flag = True
             elif disk_cache == 2:
                 gen_flag = True
         else:
@@ -699,6 +1015,10 @@ class DiskDatasetCache(DatasetCache):
         if gen_flag:
             # cache unavailable, generate the cache
             with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{_cache_uri}"):
+                if disk_cache == 1 and self.check_cache_exists(cache_path):
+                    # the cache has been generated by another process while waiting for the lock
+                    CacheUtils.visit(cache_path)
+                    return self.read_data_from_cache(cache_path, start_time, end_time, fields)
                 features = self.gen_dataset_cache(
                     cache_path=cache_path,
                     instruments=instruments,
@@ -706,6 +1026,8 @@ class DiskDatasetCache(DatasetCache):
                     freq=freq,
                     inst_processors=inst_processors,
                 )
+            if self.check_cache_exists(cache_path):
+                DiskCacheManager(freq).add(DiskCacheManager.cache_size(cache_path))
             if not features.empty:
                 features = features.sort_index().loc(axis=0)[:, start_time:end_time]
         return features
@@ -745,6 +1067,9 @@ class DiskDatasetCache(DatasetCache):
         else:
             # cache unavailable, generate the cache
             with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{_cache_uri}"):
+                if self.check_cache_exists(cache_path):
+                    # the cache has been generated by another process while waiting for the lock
+                    return _cache_uri
                 self.gen_dataset_cache(
                     cache_path=cache_path,
                     instruments=instruments,
@@ -827,26 +1152,21 @@ class DiskDatasetCache(DatasetCache):
 
         - index : cache/d41366901e25de3ec47297f12e2ba11d.index
 
-            - The content of the file may be in following format(pandas.Series)
-
-                .. code-block:: python
+            - A numpy `.npz` file with the following arrays
 
-                                        start end
-                    1999-11-10 00:00:00     0   1
-                    1999-11-11 00:00:00     1   2
-                    1999-11-12 00:00:00     2   3
-                    ...
-
-                .. note:: The start is closed. The end is open!!!!!
-
-            - Each line contains two element <start_index, end_index> with a timestamp as its index.
-            - It indicates the `start_index` (included) and `end_index` (excluded) of the data for `timestamp`
+                - instruments: the sorted names of the instruments
+                - offsets: the rows of the i-th instrument are [offsets[i], offsets[i + 1])
+                - cal_idx: the position of the datetime of each row in the calendar
+                - calendar: the calendar (datetime64) when the cache is generated
 
         - meta data: cache/d41366901e25de3ec47297f12e2ba11d.meta
 
+            - The fields (without space) of the columns, the format and the information to update the cache
+
         - data     : cache/d41366901e25de3ec47297f12e2ba11d
 
-            - This is a hdf file sorted by datetime
+            - The float32 columns one after another, whose rows are sorted by (instrument, datetime). So the data is
+              opened with `np.memmap` and only the rows of the requested instruments, datetime and columns are read
 
         :param cache_path:  The path to store the cache.
         :param instruments:  The instruments to store the cache.
@@ -866,62 +1186,125 @@ class DiskDatasetCache(DatasetCache):
         # while running
         self.clear_cache(cache_path)
 
+        _start = time.perf_counter()
         features = self.provider.dataset(
             instruments, fields, _calendar[0], _calendar[-1], freq, inst_processors=inst_processors
         )
+        cost = time.perf_counter() - _start
 
         if features.empty:
             return features
 
-        # swap index and sorted
-        features = features.swaplevel("instrument", "datetime").sort_index()
-
-        # write cache data
-        with pd.HDFStore(str(cache_path.with_suffix(".data"))) as store:
-            cache_to_orig_map = dict(zip(remove_fields_space(features.columns), features.columns))
-            orig_to_cache_map = dict(zip(features.columns, remove_fields_space(features.columns)))
-            cache_features = features[list(cache_to_orig_map.values())].rename(columns=orig_to_cache_map)
-            # cache columns
-            cache_columns = sorted(cache_features.columns)
-            cache_features = cache_features.loc[:, cache_columns]
-            cache_features = cache_features.loc[:, ~cache_features.columns.duplicated()]
-            store.append(DatasetCache.HDF_KEY, cache_features, append=False)
-        # write meta file
+        info = {
+            "instruments": instruments,
+            "freq": freq,
+            "last_update": str(_calendar[-1]),  # The last_update to store the cache
+            "inst_processors": inst_processors,
+        }
+        self._write_columnar_cache(cache_path, self._to_cache_columns(features), _calendar, info, {"cost": cost})
+        return features
+
+    @staticmethod
+    def _to_cache_columns(features: pd.DataFrame) -> pd.DataFrame:
+        """rename the fields to the ones without space and sort them, which are the columns of the cache"""
+        orig_to_cache_map = dict(zip(features.columns, remove_fields_space(features.columns)))
+        cache_features = features.rename(columns=orig_to_cache_map)
+        cache_features = cache_features.loc[:, ~cache_features.columns.duplicated()]
+        return cache_features.loc[:, sorted(cache_features.columns)]
+
+    @staticmethod
+    def _write_columnar_cache(cache_path: Path, cache_features: pd.DataFrame, calendar, info: dict, meta: dict = None):
+        """write the data (indexed by (instrument, datetime)) in the columnar format; please refer to
+        `gen_dataset_cache`
+
+        `meta` updates the visits, the generation cost, etc. of the meta file (the size is recorded by this method)
+        """
+        # the unit of the datetime (e.g. us in pandas>=3) is kept
+        calendar = pd.DatetimeIndex(calendar).values
+        datetime = pd.DatetimeIndex(cache_features.index.get_level_values("datetime")).values.astype(calendar.dtype)
+        cal_idx = calendar.searchsorted(datetime)
+        if not np.array_equal(calendar[np.minimum(cal_idx, len(calendar) - 1)], datetime):
+            raise ValueError("The datetime of the data is not in the calendar")
+        instrument = np.asarray(cache_features.index.get_level_values("instrument"), dtype=str)
+        inst_arr, inst_codes = np.unique(instrument, return_inverse=True)
+        order = np.lexsort((cal_idx, inst_codes))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(inst_codes, minlength=len(inst_arr)))])
+
+        buffer = io.BytesIO()
+        cal_idx = cal_idx[order].astype(np.int32)
+        np.savez(buffer, instruments=inst_arr, offsets=offsets, cal_idx=cal_idx, calendar=calendar)
+
+        size = buffer.getbuffer().nbytes + cache_features.shape[1] * len(cal_idx) * np.dtype("<f4").itemsize
         meta = {
-            "info": {
-                "instruments": instruments,
-                "fields": list(cache_features.columns),
-                "freq": freq,
-                "last_update": str(_calendar[-1]),  # The last_update to store the cache
-                "inst_processors": inst_processors,  # The last_update to store the cache
-            },
-            "meta": {"last_visit": time.time(), "visits": 1},
+            "info": {**info, "fields": list(cache_features.columns), "format": DiskDatasetCache.FORMAT},
+            "meta": {"last_visit": time.time(), "visits": 1, "cost": 0.0, **(meta or {}), "size": size},
         }
-        with cache_path.with_suffix(".meta").open("wb") as f:
-            pickle.dump(meta, f, protocol=C.dump_protocol_version)
-        cache_path.with_suffix(".meta").chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
-        # write index file
-        im = DiskDatasetCache.IndexManager(cache_path)
-        index_data = im.build_index_from_data(features)
-        im.update(index_data)
+        meta_path = cache_path.with_suffix(".meta")
+        atomic_write(meta_path, pickle.dumps(meta, protocol=C.dump_protocol_version))
+        meta_path.chmod(stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
+        atomic_write(cache_path.with_suffix(".index"), buffer.getvalue())
+
+        # the data is renamed at last, after which the cache exists
+        data_path = cache_path.with_suffix(".data")
+        with data_path.open("wb") as f:
+            for col in cache_features.columns:
+                np.asarray(cache_features[col].values, dtype="<f4")[order].tofile(f)
+        os.replace(data_path, cache_path)
+        for path in [cache_path, cache_path.with_suffix(".index")]:
+            path.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
 
-        # rename the file after the cache has been generated
-        # this doesn't work well on windows, but our server won't use windows
-        # temporarily
-        cache_path.with_suffix(".data").rename(cache_path)
-        # the fields of the cached features are converted to the original fields
-        return features.swaplevel("datetime", "instrument")
+    def migrate(self, cache_uri, freq: str = "day") -> int:
+        """Migrate the legacy HDF5 cache to the columnar format
+
+        pytables is required to read the legacy cache. The cache which can't be read is removed, so it will be
+        generated again.
+
+        Returns
+        -------
+        int
+            0(successful migration)/ 1(no need to migrate)/ 2(migration failure)
+        """
+        cache_path = self.get_cache_dir(freq).joinpath(cache_uri)
+        with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{cache_uri}"):
+            if not self.check_cache_exists(cache_path):
+                return 2
+            if not self.is_legacy_cache(cache_path):
+                return 1
+            with cache_path.with_suffix(".meta").open("rb") as f:
+                d = restricted_pickle_load(f)
+            from .data import Cal  # pylint: disable=C0415
+
+            try:
+                df = self._read_legacy_cache(cache_path)
+                info = {k: v for k, v in d["info"].items() if k != "fields"}
+                self._write_columnar_cache(
+                    cache_path, df.loc[:, d["info"]["fields"]], Cal.calendar(freq=freq), info, d["meta"]
+                )
+            except Exception:
+                self.logger.warning(
+                    f"Failed to migrate the dataset cache {cache_path}, it will be removed: {traceback.format_exc()}"
+                )
+                self.clear_cache(cache_path)
+                return 2
+        self.logger.info(f"The dataset cache {cache_path} is migrated to the {self.FORMAT} format")
+        return 0
 
     def update(self, cache_uri, freq: str = "day"):
+        """Update the dataset cache to the latest calendar
+
+        The new days and the last `rght_etd` days (which used the future data missing at the last update) are
+        recomputed, and the cache is rewritten with them and the rest of the cached data.
+        """
         cp_cache_uri = self.get_cache_dir(freq).joinpath(cache_uri)
         meta_path = cp_cache_uri.with_suffix(".meta")
         if not self.check_cache_exists(cp_cache_uri):
             self.logger.info(f"The cache {cp_cache_uri} has corrupted. It will be removed")
             self.clear_cache(cp_cache_uri)
             return 2
+        if self.is_legacy_cache(cp_cache_uri) and self.migrate(cache_uri, freq) == 2:
+            return 2
 
-        im = DiskDatasetCache.IndexManager(cp_cache_uri)
-        with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri())}:dataset-{cache_uri}"):
+        with CacheUtils.writer_lock(self.r, f"{str(C.dpm.get_data_uri(freq))}:dataset-{cache_uri}"):
             with meta_path.open("rb") as f:
                 d = restricted_pickle_load(f)
             instruments = d["info"]["instruments"]
@@ -929,7 +1312,6 @@ class DiskDatasetCache(DatasetCache):
             freq = d["info"]["freq"]
             last_update_time = d["info"]["last_update"]
             inst_processors = d["info"].get("inst_processors", [])
-            index_data = im.get_index()
 
             self.logger.debug("Updating dataset: {}".format(d))
             from .data import Inst  # pylint: disable=C0415
@@ -939,89 +1321,271 @@ class DiskDatasetCache(DatasetCache):
                 return 1
 
             # get newest calendar
-            from .data import Cal  # pylint: disable=C0415
+            from .data import Cal, ExpressionD  # pylint: disable=C0415
 
             whole_calendar = Cal.calendar(start_time=None, end_time=None, freq=freq)
-            # The calendar since last updated
-            new_calendar = Cal.calendar(start_time=last_update_time, end_time=None, freq=freq)
-
-            # get append data
-            if len(new_calendar) <= 1:
-                # Including last updated calendar, we only get 1 item.
+            last_update_index = Cal.locate_index(last_update_time, last_update_time, freq=freq)[3]
+            if last_update_index >= len(whole_calendar) - 1:
                 # No future updating is needed.
                 return 1
+
+            exprs = [ExpressionD.get_expression_instance(field) for field in fields]
+            if any(np.isinf(expr.get_longest_back_rolling()) for expr in exprs):
+                # the expressions depending on the whole history are recomputed
+                update_start = 0
             else:
-                # get the data needed after the historical data are removed.
-                # The start index of new data
-                current_index = len(whole_calendar) - len(new_calendar) + 1
-
-                # To avoid recursive import
-                from .data import ExpressionD  # pylint: disable=C0415
-
-                # The existing data length
-                lft_etd = rght_etd = 0
-                for field in fields:
-                    expr = ExpressionD.get_expression_instance(field)
-                    l, r = expr.get_extended_window_size()
-                    lft_etd = max(lft_etd, l)
-                    rght_etd = max(rght_etd, r)
-                # remove the period that should be updated.
-                if index_data.empty:
-                    # We don't have any data for such dataset. Nothing to remove
-                    rm_n_period = rm_lines = 0
-                else:
-                    rm_n_period = min(rght_etd, index_data.shape[0])
-                    rm_lines = (
-                        (index_data["end"] - index_data["start"])
-                        .loc[whole_calendar[current_index - rm_n_period] :]
-                        .sum()
-                        .item()
-                    )
+                rght_etd = max(expr.get_extended_window_size()[1] for expr in exprs)
+                update_start = max(last_update_index + 1 - rght_etd, 0)
 
-                data = self.provider.dataset(
-                    instruments,
-                    fields,
-                    whole_calendar[current_index - rm_n_period],
-                    new_calendar[-1],
-                    freq,
-                    inst_processors=inst_processors,
-                )
+            start_time, end_time = whole_calendar[update_start], whole_calendar[-1]
+            data = self.provider.dataset(
+                instruments, fields, start_time, end_time, freq, inst_processors=inst_processors
+            )
+            data = self._to_cache_columns(data)
+            if update_start > 0:
+                history = self._read_columnar_cache(cp_cache_uri, None, whole_calendar[update_start - 1], fields)
+                data = pd.concat([history, data.reindex(columns=fields)])
 
-                if not data.empty:
-                    data.reset_index(inplace=True)
-                    data.set_index(["datetime", "instrument"], inplace=True)
-                    data.sort_index(inplace=True)
+            d["info"]["last_update"] = str(whole_calendar[-1])
+            info = {k: v for k, v in d["info"].items() if k not in ["fields", "format"]}
+            self._write_columnar_cache(cp_cache_uri, data.reindex(columns=fields), whole_calendar, info, d["meta"])
+            return 0
+
+
+class DiskCacheManager:
+    """The disk budget of the disk caches (`DiskExpressionCache` and `DiskDatasetCache`) of the data uri of a freq
+
+    Each cache entry records its last visit, its visits, its size in bytes and the seconds to generate it in its
+    `.meta` file. When `C.disk_cache_size_limit` is set, each process counts the new entries in the usage (which is
+    scanned again by each collection, so the entries of the other processes are counted there too) and runs `gc`
+    once the budget is exceeded.
+
+    The entries are removed under their writer locks, which are only tried, so the entries being read, generated or
+    updated are skipped; the readers check the cache again after they get the reader lock.
+
+    The caches can be managed from the command line too:
+
+        .. code-block:: bash
+
+            python -m qlib.cli.cache stats --provider_uri ~/.qlib/qlib_data/cn_data
+            python -m qlib.cli.cache gc --provider_uri ~/.qlib/qlib_data/cn_data --size_limit 10e9
+            python -m qlib.cli.cache warm --provider_uri ~/.qlib/qlib_data/cn_data --market csi300 \\
+                --fields '["Mean($close, 5)", "Std($close, 20)"]'
+    """
+
+    EVICTIONS = ("lru", "value")
+    COLUMNS = ["kind", "uri", "instrument", "name", "bytes", "visits", "last_visit", "cost", "path"]
+    # the usage counted in the process by data uri
+    _usage = {}
+    _usage_lock = threading.Lock()
+
+    def __init__(self, freq: str = "day"):
+        self.freq = freq
+        self.data_uri = Path(C.dpm.get_data_uri(freq))
+        self.logger = get_module_logger(self.__class__.__name__)
+
+    @staticmethod
+    def cache_size(cache_path: Union[str, Path]) -> int:
+        """the bytes of the data and the index of a cache entry"""
+        cache_path = Path(cache_path)
+        return sum(p.stat().st_size for p in [cache_path, cache_path.with_suffix(".index")] if p.exists())
+
+    def entries(self) -> pd.DataFrame:
+        """the cache entries
+
+        Returns
+        -------
+        pd.DataFrame
+            the columns are kind ("expression"/"dataset"), uri, instrument (the market of the dataset caches), name
+            (the field of the expression caches and the uri of the dataset caches), bytes, visits, last_visit (the
+            seconds since the epoch), cost (the seconds to generate the entry) and path
+        """
+        rows = []
+        for kind, pattern in [
+            ("expression", f"{C.features_cache_dir_name}/*/*.meta"),
+            ("dataset", f"{C.dataset_cache_dir_name}/*.meta"),
+        ]:
+            for meta_path in self.data_uri.glob(pattern):
+                cache_path = meta_path.with_suffix("")
+                try:
+                    with meta_path.open("rb") as f:
+                        d = restricted_pickle_load(f)
+                    info, meta = d["info"], d["meta"]
+                except FileNotFoundError:
+                    # removed after the scan
+                    continue
+                except Exception:
+                    self.logger.warning(f"Failed to read the meta file {meta_path}: {traceback.format_exc()}")
+                    continue
+                if kind == "expression":
+                    instrument, name = info["instrument"], info["field"]
                 else:
-                    return 0  # No data to update cache
-
-                store = pd.HDFStore(cp_cache_uri)
-                # FIXME:
-                # Because the feature cache are stored as .bin file.
-                # So the series read from features are all float32.
-                # However, the first dataset cache is calculated based on the
-                # raw data. So the data type may be float64.
-                # Different data type will result in failure of appending data
-                if "/{}".format(DatasetCache.HDF_KEY) in store.keys():
-                    schema = store.select(DatasetCache.HDF_KEY, start=0, stop=0)
-                    for col, dtype in schema.dtypes.items():
-                        data[col] = data[col].astype(dtype)
-                if rm_lines > 0:
-                    store.remove(key=im.KEY, start=-rm_lines)
-                store.append(DatasetCache.HDF_KEY, data)
-                store.close()
-
-                # update index file
-                new_index_data = im.build_index_from_data(
-                    data.loc(axis=0)[whole_calendar[current_index] :, :],
-                    start_index=0 if index_data.empty else index_data["end"].iloc[-1],
+                    instruments = info["instruments"]
+                    if isinstance(instruments, dict) and "market" in instruments:
+                        instrument = instruments["market"]
+                    else:
+                        instrument = f"{len(instruments)} instruments"
+                    name = cache_path.name
+                rows.append(
+                    {
+                        "kind": kind,
+                        "uri": cache_path.name,
+                        "instrument": instrument,
+                        "name": name,
+                        # the entries generated before the size is recorded
+                        "bytes": meta.get("size", self.cache_size(cache_path)),
+                        "visits": int(meta.get("visits", 1)),
+                        "last_visit": float(meta.get("last_visit", 0)),
+                        "cost": float(meta.get("cost", 0)),
+                        "path": str(cache_path),
+                    }
                 )
-                im.append_index(new_index_data)
+        return pd.DataFrame(rows, columns=self.COLUMNS)
+
+    def usage(self) -> int:
+        """the bytes of all the cache entries"""
+        return int(self.entries()["bytes"].sum())
+
+    def stats(self) -> pd.DataFrame:
+        """the entries, the bytes and the hit rate of each expression (over the instruments) and each dataset cache
+
+        The hits are the visits after the generation, and the misses are the generations of the existing entries.
+        """
+        df = self.entries()
+        df = df.assign(hits=df["visits"] - 1, misses=1)
+        res = df.groupby(["kind", "name"]).agg(
+            entries=("uri", "size"),
+            bytes=("bytes", "sum"),
+            hits=("hits", "sum"),
+            misses=("misses", "sum"),
+            last_visit=("last_visit", "max"),
+        )
+        res["hit_rate"] = res["hits"] / (res["hits"] + res["misses"])
+        res["last_visit"] = pd.to_datetime(res["last_visit"], unit="s")
+        return res.sort_values("bytes", ascending=False)
+
+    def gc(self, size_limit: int = None, eviction: str = None, target: float = None) -> pd.DataFrame:
+        """evict the cache entries until `target` of `size_limit` is used if the usage exceeds `size_limit`
+
+        Parameters
+        ----------
+        size_limit : int
+            the budget in bytes; the default value is `C.disk_cache_size_limit` (None does nothing)
+        eviction : str
+            "lru" evicts the least recently visited entries first; "value" evicts the entries with the least visits *
+            cost / bytes first. The default value is `C.disk_cache_eviction`
+        target : float
+            the default value is `C.disk_cache_gc_target`
+
+        Returns
+        -------
+        pd.DataFrame
+            the evicted entries; please refer to `entries`
+        """
+        size_limit = C.disk_cache_size_limit if size_limit is None else size_limit
+        eviction = C.disk_cache_eviction if eviction is None else eviction
+        target = C.disk_cache_gc_target if target is None else target
+        if eviction not in self.EVICTIONS:
+            raise ValueError(f"Unknown eviction {eviction}, please use one of {self.EVICTIONS}")
+
+        df = self.entries()
+        total = int(df["bytes"].sum())
+        evicted = []
+        if size_limit is not None and total > size_limit:
+            if eviction == "lru":
+                df = df.sort_values("last_visit", kind="stable")
+            else:
+                value = df["visits"] * df["cost"] / df["bytes"].clip(lower=1)
+                df = df.assign(value=value).sort_values(["value", "last_visit"], kind="stable")
+            for idx, row in df.iterrows():
+                if total <= size_limit * target:
+                    break
+                if self._evict(row):
+                    total -= row["bytes"]
+                    evicted.append(idx)
+            self.logger.info(f"{len(evicted)} disk caches are evicted, {total} bytes are used in {self.data_uri}")
+        with self._usage_lock:
+            self._usage[str(self.data_uri)] = total
+        return df.loc[evicted, self.COLUMNS]
+
+    def _evict(self, entry: pd.Series) -> bool:
+        lock_name = f"{str(self.data_uri)}:{entry['kind']}-{entry['uri']}"
+        cache_path = Path(entry["path"])
+        try:
+            with CacheUtils.writer_lock(CacheUtils.get_lock_client(), lock_name, timeout=0):
+                try:
+                    with cache_path.with_suffix(".meta").open("rb") as f:
+                        last_visit = float(restricted_pickle_load(f)["meta"].get("last_visit", 0))
+                except FileNotFoundError:
+                    return False
+                if last_visit != entry["last_visit"]:
+                    # visited after the scan
+                    return False
+                BaseProviderCache.clear_cache(cache_path)
+                return True
+        except TimeoutError:
+            # being read or written
+            return False
+
+    def add(self, nbytes: int):
+        """count a new cache entry of `nbytes` bytes in the usage, and run `gc` if the usage exceeds the budget"""
+        if C.disk_cache_size_limit is None:
+            return
+        key = str(self.data_uri)
+        with self._usage_lock:
+            usage = self._usage.get(key)
+            if usage is not None:
+                usage = self._usage[key] = usage + nbytes
+        if usage is None:
+            # the entry is counted by the scan
+            usage = self.usage()
+            with self._usage_lock:
+                self._usage[key] = usage
+        if usage > C.disk_cache_size_limit:
+            self.gc()
+
+    def warm(self, fields: list, instruments="all", start_time=None, end_time=None, disk_cache: int = 1):
+        """generate the caches of `fields` of `instruments` (a market or a list of instruments) with `D.features`
+
+        The expression caches are generated if `C.expression_cache` is `DiskExpressionCache`, and the dataset cache is
+        generated if `C.dataset_cache` is `DiskDatasetCache` and `disk_cache` is not 0.
+        """
+        from .data import D  # pylint: disable=C0415
+
+        if isinstance(instruments, str):
+            instruments = D.instruments(instruments)
+        D.features(instruments, fields, start_time, end_time, freq=self.freq, disk_cache=disk_cache)
+
 
-                # update meta file
-                d["info"]["last_update"] = str(new_calendar[-1])
-                with meta_path.open("wb") as f:
-                    pickle.dump(d, f, protocol=C.dump_protocol_version)
-                return 0
+class DiskCacheCLI:
+    """The command line of `DiskCacheManager`, e.g. `python -m qlib.cli.cache stats --provider_uri <data dir>`"""
+
+    def __init__(self, provider_uri: str = "~/.qlib/qlib_data/cn_data", freq: str = "day", region: str = "cn"):
+        from .. import init  # pylint: disable=C0415
+
+        init(
+            provider_uri=provider_uri,
+            region=region,
+            expression_cache="DiskExpressionCache",
+            dataset_cache="DiskDatasetCache",
+        )
+        self._manager = DiskCacheManager(freq)
+
+    def stats(self) -> str:
+        """report the bytes and the hit rates of the expression and the dataset caches"""
+        res = self._manager.stats()
+        return f"{res.to_string()}\n{res['entries'].sum()} caches, {res['bytes'].sum()} bytes"
+
+    def gc(self, size_limit: int = None, eviction: str = None, target: float = None) -> str:
+        """evict the caches beyond the budget; please refer to `DiskCacheManager.gc`"""
+        evicted = self._manager.gc(size_limit=size_limit, eviction=eviction, target=target)
+        usage = self._manager.usage()
+        return f"{len(evicted)} caches ({evicted['bytes'].sum()} bytes) are evicted, {usage} bytes are used"
+
+    def warm(self, fields: list, market: str = "all", start_time=None, end_time=None, disk_cache: int = 1) -> str:
+        """generate the caches of `fields` of `market`"""
+        self._manager.warm(fields, market, start_time, end_time, disk_cache=disk_cache)
+        return self.stats()
 
 
 class SimpleDatasetCache(DatasetCache):
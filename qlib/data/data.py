@@ -5,19 +5,25 @@
 from __future__ import division
 from __future__ import print_function
 
+import os
 import re
 import abc
 import copy
+import atexit
+import tempfile
 import queue
 import bisect
+from pathlib import Path
 import numpy as np
 import pandas as pd
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional, Sequence
 
 # For supporting multiprocessing in outer code, joblib is used
 from joblib import delayed
 
 from .cache import H
+from .membership import InstrumentMembership
+from .parser import parse_expression
 from ..config import C
 from .inst_processor import InstProcessor
 
@@ -28,16 +34,15 @@ from ..utils import (
     init_instance_by_config,
     register_wrapper,
     get_module_by_module_path,
-    parse_field,
     hash_args,
     normalize_cache_fields,
+    remove_fields_space,
     code_to_fname,
+    fname_to_code,
     time_to_slc_point,
-    read_period_data,
-    get_period_list,
 )
-from ..utils.paral import ParallelExt
-from .ops import Operators  # pylint: disable=W0611  # noqa: F401
+from ..utils.paral import ParallelExt, ParallelPool
+from .plan import ExpressionPlan
 
 
 class ProviderBackendMixin:
@@ -379,6 +384,60 @@ class PITProvider(abc.ABC):
         """
         raise NotImplementedError(f"Please implement the `period_feature` method")
 
+    def period_values(
+        self,
+        instrument,
+        field,
+        cur_times: pd.DatetimeIndex,
+        offsets: Sequence[int] = (0,),
+        period: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        get the values of the periods observed at each of `cur_times`
+
+        The default implementation calls `period_feature` for each time; the providers are expected to override it
+        with a vectorized one.
+
+        Parameters
+        ----------
+        cur_times: pd.DatetimeIndex
+            the observation times
+        offsets: Sequence[int]
+            the non-positive offsets of the periods relative to the latest period observed at each time (e.g. 0 is the
+            latest period and -1 is the previous one)
+        period: int
+            the specific period, which overrides `offsets`
+
+        Returns
+        -------
+        np.ndarray
+            the values with shape (len(cur_times), len(offsets)) (one column for `period`); NaN if the period is not
+            observed
+
+        Raises
+        ------
+        FileNotFoundError
+            This exception will be raised if the queried data do not exist.
+        """
+        offsets = [0] if period is not None else list(offsets)
+        values = np.full((len(cur_times), len(offsets)), np.nan)
+        for i, cur_time in enumerate(cur_times):
+            s = self.period_feature(instrument, field, min(offsets), 0, pd.Timestamp(cur_time), period)
+            for j, offset in enumerate(offsets):
+                # the last element of `s` is the latest period
+                if len(s) - 1 + offset >= 0:
+                    values[i, j] = s.iloc[len(s) - 1 + offset]
+        return values
+
+    def revision_dates(self, instrument, field) -> Optional[np.ndarray]:
+        """
+        get the sorted dates (int, e.g. 20190102) when the data of the field is published or revised
+
+        The data observed at any time between two adjacent revision dates is the same. None means the dates are
+        unknown.
+        """
+        return None
+
 
 class ExpressionProvider(abc.ABC):
     """Expression provider class
@@ -386,16 +445,10 @@ class ExpressionProvider(abc.ABC):
     Provide Expression data.
     """
 
-    def __init__(self):
-        self.expression_instance_cache = {}
-
     def get_expression_instance(self, field):
+        """parse the field into the expression, which is cached in the process (please refer to `parse_expression`)"""
         try:
-            if field in self.expression_instance_cache:
-                expression = self.expression_instance_cache[field]
-            else:
-                expression = eval(parse_field(field))
-                self.expression_instance_cache[field] = expression
+            expression = parse_expression(field)
         except NameError as e:
             get_module_logger("data").exception(
                 "ERROR: field [%s] contains invalid operator/variable [%s]" % (str(field), str(e).split()[1])
@@ -442,6 +495,56 @@ class ExpressionProvider(abc.ABC):
         """
         raise NotImplementedError("Subclass of ExpressionProvider must implement `Expression` method")
 
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day") -> Dict[str, pd.Series]:
+        """Get the data of a list of expressions of an instrument.
+
+        Parameters
+        ----------
+        instrument : str
+            a certain instrument.
+        fields : list
+            a list of fields of feature.
+        start_time : str
+            start of the time range.
+        end_time : str
+            end of the time range.
+        freq : str
+            time frequency, available: year/quarter/month/week/day.
+
+        Returns
+        -------
+        Dict[str, pd.Series]
+            the data of each field, the same as `expression`
+        """
+        return {field: self.expression(instrument, field, start_time, end_time, freq) for field in fields}
+
+    def expression_panel(self, instruments, field, start_time=None, end_time=None, freq="day"):
+        """Get Expression data of a group of instruments at once (the panel engine).
+
+        Each operator of the expression is calculated once on the ``calendar x instrument`` panel
+        (please refer to `Expression.load_panel`).
+
+        Parameters
+        ----------
+        instruments : list
+            a list of instruments.
+        field : str
+            a certain field of feature.
+        start_time : str
+            start of the time range.
+        end_time : str
+            end of the time range.
+        freq : str
+            time frequency, available: year/quarter/month/week/day.
+
+        Returns
+        -------
+        (pd.DataFrame, np.ndarray)
+            - the data: the index is the calendar index in the time range, the columns are the instruments
+            - the valid mask: True if the calendar index is in the result of `expression` for the instrument
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support the panel engine")
+
 
 class DatasetProvider(abc.ABC):
     """Dataset provider class
@@ -449,6 +552,16 @@ class DatasetProvider(abc.ABC):
     Provide Dataset data.
     """
 
+    # `C.dataset_engine == "auto"`: the thread pool is used if the estimated number of operator calls
+    # (instruments * operators) does not exceed this value; loading the raw fields is regarded as I/O bound
+    AUTO_THREAD_MAX_OPS = 20000
+    # `C.dataset_chunk_size == "auto"`: the number of chunks of instruments per worker, more chunks balance the load
+    # better and fewer chunks reduce the overhead of the tasks
+    CHUNKS_PER_WORKER = 4
+    # `C.dataset_result_transport == "shm"`: the directory of the shared panel; tmpfs is used if it is available
+    SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    DATASET_ENGINES = ("thread", "process", "auto")
+
     @abc.abstractmethod
     def dataset(self, instruments, fields, start_time=None, end_time=None, freq="day", inst_processors=[]):
         """Get dataset data.
@@ -475,6 +588,14 @@ class DatasetProvider(abc.ABC):
         """
         raise NotImplementedError("Subclass of DatasetProvider must implement `Dataset` method")
 
+    def panel_dataset(self, instruments, fields, start_time=None, end_time=None, freq="day", inst_processors=[]):
+        """Get dataset data with the panel engine.
+
+        The parameters and the result are the same as `dataset`, but each field is calculated once for all the
+        instruments (please refer to `ExpressionProvider.expression_panel`) instead of once for each instrument.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support the panel engine")
+
     def _uri(
         self,
         instruments,
@@ -544,16 +665,67 @@ class DatasetProvider(abc.ABC):
         # parse and check the input fields
         return [ExpressionD.get_expression_instance(f) for f in fields]
 
+    @staticmethod
+    def get_dataset_engine(column_names, inst_num, inst_processors=[]) -> str:
+        """
+        Get the engine ("thread" or "process") used by `dataset_processor` according to `C.dataset_engine`.
+
+        In the "auto" mode, the thread pool is chosen for the cheap workloads (raw fields, simple expressions or a
+        few instruments), for which the process spawning and the pickling of the results cost more than the
+        calculation; the process pool is chosen for the workloads dominated by the calculation of the operators,
+        which holds the GIL.
+
+        The PIT fields (`$$`) are always calculated by the process pool, because `LocalPITProvider` is not
+        multi-threading-safe.
+        """
+        engine = C.get("dataset_engine", "process")
+        if engine not in DatasetProvider.DATASET_ENGINES:
+            raise ValueError(
+                f"dataset_engine must be one of {DatasetProvider.DATASET_ENGINES}, your dataset_engine is {engine}"
+            )
+        if any("$$" in str(field) for field in column_names):
+            # the PIT provider (the fields of `$$`) is not multi-threading-safe
+            if engine == "thread":
+                get_module_logger("data").warning('The PIT fields ("$$") are calculated by the "process" engine')
+            return "process"
+        if engine != "auto":
+            return engine
+        # every operator (and every instrument processor) is regarded as one unit of CPU bound work
+        ops_num = sum(len(re.findall(r"[A-Za-z_]\w*\s*\(", str(field))) for field in column_names)
+        ops_num += len([_p for _p in inst_processors if _p]) * len(column_names)
+        return "thread" if inst_num * ops_num <= DatasetProvider.AUTO_THREAD_MAX_OPS else "process"
+
+    @staticmethod
+    def get_chunk_size(inst_num, workers) -> int:
+        """
+        Get the number of instruments calculated by one task of `dataset_processor` according to
+        `C.dataset_chunk_size`.
+        """
+        chunk_size = C.get("dataset_chunk_size", "auto")
+        if chunk_size == "auto":
+            if C.maxtasksperchild is not None:
+                return 1
+            return max(int(np.ceil(inst_num / (workers * DatasetProvider.CHUNKS_PER_WORKER))), 1)
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError(f"dataset_chunk_size must be 'auto' or a positive int, your value is {chunk_size}")
+        return chunk_size
+
     @staticmethod
     def dataset_processor(instruments_d, column_names, start_time, end_time, freq, inst_processors=[]):
         """
         Load and process the data, return the data set.
         - default using multi-kernel method.
+        - the instruments are calculated by a thread pool or a process pool according to `C.dataset_engine`
+        - the instruments are grouped into chunks (`C.dataset_chunk_size`) and each task calculates one chunk
+        - the pool of workers is reused across calls if `C.dataset_pool_lifetime` is not 0
 
         """
         normalize_column_names = normalize_cache_fields(column_names)
-        # One process for one task, so that the memory will be freed quicker.
+        # each task calculates a chunk of the instruments (please refer to `get_chunk_size`)
         workers = max(min(C.get_kernels(freq), len(instruments_d)), 1)
+        engine = DatasetProvider.get_dataset_engine(normalize_column_names, len(instruments_d), inst_processors)
+        backend = "threading" if engine == "thread" else C.joblib_backend
+        chunk_size = DatasetProvider.get_chunk_size(len(instruments_d), workers)
 
         # create iterator
         if isinstance(instruments_d, dict):
@@ -561,22 +733,33 @@ class DatasetProvider(abc.ABC):
         else:
             it = zip(instruments_d, [None] * len(instruments_d))
 
-        inst_l = []
-        task_l = []
+        inst_l, spans_l = [], []
         for inst, spans in it:
             inst_l.append(inst)
+            spans_l.append(spans)
+
+        if C.get("dataset_result_transport", "pickle") == "shm" and len(inst_l) > 0 and not any(inst_processors):
+            return DatasetProvider._shm_dataset_processor(
+                inst_l, spans_l, column_names, normalize_column_names, start_time, end_time, freq, workers, backend
+            )
+
+        task_l = []
+        for i in range(0, len(inst_l), chunk_size):
             task_l.append(
-                delayed(DatasetProvider.inst_calculator)(
-                    inst, start_time, end_time, freq, normalize_column_names, spans, C, inst_processors
+                delayed(DatasetProvider.inst_chunk_calculator)(
+                    inst_l[i : i + chunk_size],
+                    start_time,
+                    end_time,
+                    freq,
+                    normalize_column_names,
+                    spans_l[i : i + chunk_size],
+                    C,
+                    inst_processors,
                 )
             )
 
-        data = dict(
-            zip(
-                inst_l,
-                ParallelExt(n_jobs=workers, backend=C.joblib_backend, maxtasksperchild=C.maxtasksperchild)(task_l),
-            )
-        )
+        res_l = DatasetProvider._run_tasks(task_l, workers, backend, freq)
+        data = dict(zip(inst_l, (_res for _chunk_res in res_l for _res in _chunk_res)))
 
         new_data = dict()
         for inst in sorted(data.keys()):
@@ -596,6 +779,160 @@ class DatasetProvider(abc.ABC):
 
         return data
 
+    @staticmethod
+    def _run_tasks(task_l, workers, backend, freq) -> list:
+        """run the tasks of `dataset_processor` with a new pool or the persistent pool (`C.dataset_pool_lifetime`)"""
+        parallel_kwargs = dict(n_jobs=workers, backend=backend, maxtasksperchild=C.maxtasksperchild)
+        lifetime = C.get("dataset_pool_lifetime", 0)
+        if lifetime == 0:
+            return ParallelExt(**parallel_kwargs)(task_l)
+        # the calendar is loaded before the workers are forked, so the workers are initialized with it
+        Cal.calendar(freq=freq)
+        # the size of the pool does not depend on the number of instruments, so that the pool can be reused
+        parallel_kwargs["n_jobs"] = max(C.get_kernels(freq), 1)
+        return ParallelPool.run(task_l, lifetime=lifetime, **parallel_kwargs)
+
+    @staticmethod
+    def _shm_dataset_processor(
+        inst_l, spans_l, column_names, normalize_column_names, start_time, end_time, freq, workers, backend
+    ):
+        """
+        `dataset_processor` with `C.dataset_result_transport == "shm"`.
+
+        The parent pre-sizes one float32 panel in shared memory (a file in `SHM_DIR`) with a block of rows for each
+        instrument; the rows of a block are the calendar points in [start_time, end_time] covered by the spans of
+        the instrument. The workers write the values of the instruments into their blocks and only return the
+        datetime index. The blocks are compacted in place and the panel is wrapped as the result without copy.
+        """
+        calendar = np.asarray(Cal.calendar(start_time, end_time, freq))
+        # the same order as the result of the default transport
+        order = sorted(range(len(inst_l)), key=lambda i: inst_l[i])
+        inst_l = [inst_l[i] for i in order]
+        spans_l = [spans_l[i] for i in order]
+        sizes = []
+        for spans in spans_l:
+            if spans is None:
+                sizes.append(len(calendar))
+            else:
+                mask = np.zeros(len(calendar), dtype=bool)
+                for begin, end in spans:
+                    mask |= (calendar >= np.datetime64(begin)) & (calendar <= np.datetime64(end))
+                sizes.append(int(mask.sum()))
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        shape = (max(int(offsets[-1]), 1), len(column_names))
+        # the columns are written by name in the order of `column_names`, so that the panel needs no reordering
+        panel_columns = remove_fields_space(column_names)
+
+        fd, panel_path = tempfile.mkstemp(prefix="qlib_dataset_", suffix=".bin", dir=DatasetProvider.SHM_DIR)
+        os.close(fd)
+        try:
+            panel = np.memmap(panel_path, dtype=np.float32, mode="w+", shape=shape)
+            chunk_size = DatasetProvider.get_chunk_size(len(inst_l), workers)
+            task_l = [
+                delayed(DatasetProvider.inst_chunk_writer)(
+                    inst_l[i : i + chunk_size],
+                    start_time,
+                    end_time,
+                    freq,
+                    normalize_column_names,
+                    spans_l[i : i + chunk_size],
+                    C,
+                    panel_path,
+                    shape,
+                    [(int(offsets[j]), sizes[j]) for j in range(i, min(i + chunk_size, len(inst_l)))],
+                    panel_columns,
+                )
+                for i in range(0, len(inst_l), chunk_size)
+            ]
+            index_l = [
+                _index
+                for _chunk_res in DatasetProvider._run_tasks(task_l, workers, backend, freq)
+                for _index in _chunk_res
+            ]
+        finally:
+            try:
+                # the memory is released when the panel is released
+                os.remove(panel_path)
+            except OSError:
+                atexit.register(lambda: os.path.exists(panel_path) and os.remove(panel_path))
+
+        # compact the blocks; the rows of an instrument are written at the beginning of its block
+        nrows = 0
+        for offset, _index in zip(offsets, index_l):
+            if offset != nrows and len(_index) > 0:
+                panel[nrows : nrows + len(_index)] = panel[offset : offset + len(_index)]
+            nrows += len(_index)
+        if nrows == 0:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+                columns=column_names,
+                dtype=np.float32,
+            )
+        index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(np.array(inst_l, dtype=object), [len(_index) for _index in index_l]),
+                pd.DatetimeIndex(np.concatenate([_index for _index in index_l if len(_index) > 0])),
+            ],
+            names=["instrument", "datetime"],
+        )
+        return pd.DataFrame(
+            panel[:nrows].view(np.ndarray), index=index, columns=[str(f) for f in column_names], copy=False
+        )
+
+    @staticmethod
+    def inst_chunk_writer(
+        inst_l,
+        start_time,
+        end_time,
+        freq,
+        column_names,
+        spans_l,
+        g_config,
+        panel_path,
+        panel_shape,
+        blocks,
+        panel_columns=None,
+    ):
+        """
+        Calculate the expressions for a chunk of instruments and write the values into their blocks of the shared
+        panel (please refer to `_shm_dataset_processor`). The columns are selected by the names in `panel_columns`,
+        since the columns of the results are not always in the order of `column_names`.
+
+        return value: A list of the datetime index of each instrument.
+
+        """
+        res = DatasetProvider.inst_chunk_calculator(inst_l, start_time, end_time, freq, column_names, spans_l, g_config)
+        panel = np.memmap(panel_path, dtype=np.float32, mode="r+", shape=panel_shape)
+        index_l = []
+        for inst, (offset, size), data in zip(inst_l, blocks, res):
+            if len(data) > size:
+                raise ValueError(f"{inst}: {len(data)} rows can not be written into the block of {size} rows")
+            if panel_columns is not None:
+                data = data.reindex(columns=panel_columns)
+            panel[offset : offset + len(data)] = data.values
+            index_l.append(data.index.values)
+        del panel
+        return index_l
+
+    @staticmethod
+    def inst_chunk_calculator(
+        inst_l, start_time, end_time, freq, column_names, spans_l=None, g_config=None, inst_processors=[]
+    ):
+        """
+        Calculate the expressions for a chunk of instruments.
+
+        return value: A list of the results of `inst_calculator` of each instrument.
+
+        """
+        if spans_l is None:
+            spans_l = [None] * len(inst_l)
+        return [
+            DatasetProvider.inst_calculator(
+                inst, start_time, end_time, freq, column_names, spans, g_config, inst_processors
+            )
+            for inst, spans in zip(inst_l, spans_l)
+        ]
+
     @staticmethod
     def inst_calculator(inst, start_time, end_time, freq, column_names, spans=None, g_config=None, inst_processors=[]):
         """
@@ -609,10 +946,8 @@ class DatasetProvider(abc.ABC):
         # NOTE: This place is compatible with windows, windows multi-process is spawn
         C.register_from_C(g_config)
 
-        obj = dict()
-        for field in column_names:
-            #  The client does not have expression provider, the data will be loaded from cache using static method.
-            obj[field] = ExpressionD.expression(inst, field, start_time, end_time, freq)
+        #  The client does not have expression provider, the data will be loaded from cache using static method.
+        obj = ExpressionD.expressions(inst, column_names, start_time, end_time, freq)
 
         data = pd.DataFrame(obj)
         if not data.empty and not np.issubdtype(data.index.dtype, np.dtype("M")):
@@ -627,12 +962,72 @@ class DatasetProvider(abc.ABC):
                 mask |= (data.index >= begin) & (data.index <= end)
             data = data[mask]
 
+        return DatasetProvider.process_inst_data(data, inst, inst_processors)
+
+    @staticmethod
+    def process_inst_data(data, inst, inst_processors=[]):
+        """apply `inst_processors` to the data of **one** instrument"""
         for _processor in inst_processors:
             if _processor:
                 _processor_obj = init_instance_by_config(_processor, accept_types=InstProcessor)
                 data = _processor_obj(data, instrument=inst)
         return data
 
+    @staticmethod
+    def panel_dataset_processor(instruments_d, column_names, start_time, end_time, freq, inst_processors=[]):
+        """
+        Load and process the data with the panel engine, return the data set.
+        - each field is calculated once for all the instruments in the main process
+        - the result is the same as `dataset_processor`
+
+        """
+        normalize_column_names = normalize_cache_fields(column_names)
+        empty_data = pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")),
+            columns=column_names,
+            dtype=np.float32,
+        )
+        inst_l = sorted(set(instruments_d))
+        if len(inst_l) == 0:
+            return empty_data
+        calendar = np.asarray(Cal.calendar(start_time, end_time, freq))
+
+        panel_l, valid = [], None
+        for field in normalize_column_names:
+            data, _valid = ExpressionD.expression_panel(inst_l, field, start_time, end_time, freq)
+            panel_l.append(data.values)
+            # the rows of an instrument are the union of the rows of its fields
+            valid = _valid if valid is None else valid | _valid
+        if isinstance(instruments_d, dict):
+            for i, inst in enumerate(inst_l):
+                mask = np.zeros(len(calendar), dtype=bool)
+                for begin, end in instruments_d[inst]:
+                    mask |= (calendar >= np.datetime64(begin)) & (calendar <= np.datetime64(end))
+                valid[:, i] &= mask
+
+        # instrument-major rows, the same order as concatenating the data of the sorted instruments
+        insts, rows = np.nonzero(valid.T)
+        values = np.empty((len(rows), len(column_names)), dtype=np.float32)
+        for i, field in enumerate(remove_fields_space(column_names)):
+            values[:, i] = panel_l[normalize_column_names.index(field)][rows, insts]
+        data = pd.DataFrame(
+            values,
+            index=pd.MultiIndex.from_arrays(
+                [np.array(inst_l, dtype=object)[insts], pd.DatetimeIndex(calendar[rows])],
+                names=["instrument", "datetime"],
+            ),
+            columns=column_names,
+        )
+        if any(inst_processors):
+            data_d = {}
+            for inst in inst_l:
+                if inst in data.index.levels[0]:
+                    _data = DatasetProvider.process_inst_data(data.loc[inst], inst, inst_processors)
+                    if len(_data) > 0:
+                        data_d[inst] = _data
+            data = pd.concat(data_d, names=["instrument"], sort=False) if len(data_d) > 0 else empty_data
+        return data if len(data) > 0 else empty_data
+
 
 class LocalCalendarProvider(CalendarProvider, ProviderBackendMixin):
     """Local calendar data provider class
@@ -688,30 +1083,30 @@ class LocalInstrumentProvider(InstrumentProvider, ProviderBackendMixin):
     def _load_instruments(self, market, freq):
         return self.backend_obj(market=market, freq=freq).data
 
+    def membership(self, market, freq="day") -> InstrumentMembership:
+        """the membership index of the instruments of the market, which is built once and cached in `H["i"]`
+
+        Please refer to `InstrumentMembership`, e.g. ``Inst.membership("csi500").members("2020-01-02")``.
+        """
+        key = (market, freq)
+        if key in H["i"]:
+            return H["i"][key]
+        membership = InstrumentMembership(self._load_instruments(market, freq=freq), Cal.calendar(freq=freq))
+        H["i"][key] = membership
+        return membership
+
     def list_instruments(self, instruments, start_time=None, end_time=None, freq="day", as_list=False):
-        market = instruments["market"]
-        if market in H["i"]:
-            _instruments = H["i"][market]
-        else:
-            _instruments = self._load_instruments(market, freq=freq)
-            H["i"][market] = _instruments
+        membership = self.membership(instruments["market"], freq=freq)
         # strip
         # use calendar boundary
         cal = Cal.calendar(freq=freq)
         start_time = pd.Timestamp(start_time or cal[0])
         end_time = pd.Timestamp(end_time or cal[-1])
-        _instruments_filtered = {
-            inst: list(
-                filter(
-                    lambda x: x[0] <= x[1],
-                    [(max(start_time, pd.Timestamp(x[0])), min(end_time, pd.Timestamp(x[1]))) for x in spans],
-                )
-            )
-            for inst, spans in _instruments.items()
-        }
-        _instruments_filtered = {key: value for key, value in _instruments_filtered.items() if value}
-        # filter
         filter_pipe = instruments["filter_pipe"]
+        if as_list and not filter_pipe:
+            return membership.active(start_time, end_time)
+        _instruments_filtered = membership.spans(start_time, end_time)
+        # filter
         for filter_config in filter_pipe:
             from . import filter as F  # pylint: disable=C0415
 
@@ -741,93 +1136,209 @@ class LocalFeatureProvider(FeatureProvider, ProviderBackendMixin):
         return self.backend_obj(instrument=instrument, field=field, freq=freq)[start_index : end_index + 1]
 
 
+class PanelFeatureProvider(LocalFeatureProvider):
+    """Panel feature data provider class
+
+    Provide feature data from the field-major panel format (please refer to `qlib.data.storage.panel_storage`).
+    Besides the per-instrument `feature`, it supports loading one field of many instruments with a single read.
+    """
+
+    def get_default_backend(self):
+        return {"class": "PanelFeatureStorage", "module_path": "qlib.data.storage.panel_storage"}
+
+    def panel(self, field, start_index, end_index, freq, instruments=None) -> pd.DataFrame:
+        """Get the cross-sectional data of a field.
+
+        Parameters
+        ----------
+        field : str
+            a certain field of feature, e.g. `$close`.
+        start_index : int
+            start index in calendar (closed).
+        end_index : int
+            end index in calendar (closed).
+        freq : str
+            time frequency.
+        instruments : list
+            instruments to load; all the instruments in the panel are loaded if it is None.
+
+        Returns
+        -------
+        pd.DataFrame
+            index is the calendar index and columns are the instruments;
+            the instruments that are not in the panel are filled with NaN.
+        """
+        field_storage = self.backend_obj(instrument="", field=str(field)[1:], freq=freq).field_storage
+        df = field_storage[start_index : end_index + 1]
+        if instruments is None:
+            df.columns = [fname_to_code(c).upper() for c in df.columns]
+            return df
+        instruments = list(instruments)
+        index = field_storage.panel_index
+        cols = [index.get(code_to_fname(inst).lower(), (-1,))[0] for inst in instruments]
+        values = df.values
+        res = np.full((len(df), len(instruments)), np.nan, dtype=np.float32)
+        _valid = np.array(cols, dtype=int) >= 0
+        if _valid.any():
+            res[:, _valid] = values[:, np.array(cols)[_valid]]
+        return pd.DataFrame(res, index=df.index, columns=instruments)
+
+
+class PITRecords:
+    """The records of a PIT field of an instrument (the `<field>.data` file)
+
+    The records are sorted by the dates when they are published. So the data observed at a date is the first `loc`
+    records, and the value of a period is the one of the last record of the period in them (the `_next` links of the
+    file follow the same order). The periods are represented by their ordinals in the calculation: year * 4 + quarter - 1
+    for the quarterly fields and year for the annual ones.
+    """
+
+    def __init__(self, data_path: Union[str, Path], quarterly: bool):
+        dtype = np.dtype(
+            [
+                ("date", C.pit_record_type["date"]),
+                ("period", C.pit_record_type["period"]),
+                ("value", C.pit_record_type["value"]),
+                ("_next", C.pit_record_type["index"]),
+            ]
+        )
+        self.quarterly = quarterly
+        if os.path.getsize(data_path) > 0:
+            data = np.memmap(data_path, dtype=dtype, mode="r")
+        else:
+            data = np.empty(0, dtype=dtype)
+        self.dates = np.array(data["date"], dtype=np.int64)
+        self.values = np.array(data["value"])
+        ordinals = self.to_ordinal(np.array(data["period"], dtype=np.int64))
+        del data
+        # the latest and the earliest periods observed with the first i + 1 records
+        self.last_ordinal = np.maximum.accumulate(ordinals)
+        self.first_ordinal = np.minimum.accumulate(ordinals)
+        # the positions of the records sorted by (period, position), to search the last record of a period before `loc`
+        self._keys = np.sort(ordinals * (len(ordinals) + 1) + np.arange(len(ordinals)))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_ordinal(self, period):
+        if self.quarterly:
+            return period // 100 * 4 + period % 100 - 1
+        return period
+
+    def to_period(self, ordinal):
+        if self.quarterly:
+            return ordinal // 4 * 100 + ordinal % 4 + 1
+        return ordinal
+
+    def is_period(self, period: int) -> bool:
+        return not self.quarterly or 1 <= period % 100 <= 4
+
+    def locate(self, dates):
+        """the number of the records observed at `dates` (int, e.g. 20190102)"""
+        return np.searchsorted(self.dates, dates, side="right")
+
+    def lookup(self, ordinals, loc) -> np.ndarray:
+        """the values of the periods observed with the first `loc` records (broadcast with `ordinals`); NaN if the
+        period has no record in them"""
+        ordinals, loc = np.broadcast_arrays(np.asarray(ordinals, dtype=np.int64), np.asarray(loc, dtype=np.int64))
+        size = len(self) + 1
+        pos = np.searchsorted(self._keys, ordinals * size + loc, side="left") - 1
+        key = self._keys[np.maximum(pos, 0)] if len(self) > 0 else np.zeros(pos.shape, dtype=np.int64)
+        found = (pos >= 0) & (key // size == ordinals)
+        values = np.full(ordinals.shape, C.pit_record_nan["value"], dtype=self.values.dtype)
+        values[found] = self.values[key[found] % size]
+        return values
+
+
 class LocalPITProvider(PITProvider):
-    # TODO: Add PIT backend file storage
-    # NOTE: This class is not multi-threading-safe!!!!
+    """Local PIT data provider class
 
-    def period_feature(self, instrument, field, start_index, end_index, cur_time, period=None):
-        if not isinstance(cur_time, pd.Timestamp):
-            raise ValueError(
-                f"Expected pd.Timestamp for `cur_time`, got '{cur_time}'. Advices: you can't query PIT data directly(e.g. '$$roewa_q'), you must use `P` operator to convert data to each day (e.g. 'P($$roewa_q)')"
-            )
+    The records of each (instrument, field) are read once with `np.memmap` and cached (until the file is changed), and
+    the values observed at a range of times are calculated at once by `period_values`.
+    """
 
-        assert end_index <= 0  # PIT don't support querying future data
+    # TODO: Add PIT backend file storage
+    # NOTE: This class is not multi-threading-safe!!!!
 
-        DATA_RECORDS = [
-            ("date", C.pit_record_type["date"]),
-            ("period", C.pit_record_type["period"]),
-            ("value", C.pit_record_type["value"]),
-            ("_next", C.pit_record_type["index"]),
-        ]
-        VALUE_DTYPE = C.pit_record_type["value"]
+    def __init__(self):
+        self._records = {}
 
+    def get_records(self, instrument, field) -> PITRecords:
+        """get the cached records of the PIT field (e.g. "$$roewa_q") of the instrument"""
         field = str(field).lower()[2:]
         instrument = code_to_fname(instrument)
 
-        # {For acceleration
-        # start_index, end_index, cur_index = kwargs["info"]
-        # if cur_index == start_index:
-        #     if not hasattr(self, "all_fields"):
-        #         self.all_fields = []
-        #     self.all_fields.append(field)
-        #     if not hasattr(self, "period_index"):
-        #         self.period_index = {}
-        #     if field not in self.period_index:
-        #         self.period_index[field] = {}
-        # For acceleration}
-
         if not field.endswith("_q") and not field.endswith("_a"):
             raise ValueError("period field must ends with '_q' or '_a'")
-        quarterly = field.endswith("_q")
         index_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.index"
         data_path = C.dpm.get_data_uri() / "financial" / instrument.lower() / f"{field}.data"
         if not (index_path.exists() and data_path.exists()):
             raise FileNotFoundError("No file is found.")
-        # NOTE: The most significant performance loss is here.
-        # Does the acceleration that makes the program complicated really matters?
-        # - It makes parameters of the interface complicate
-        # - It does not performance in the optimal way (places all the pieces together, we may achieve higher performance)
-        #    - If we design it carefully, we can go through for only once to get the historical evolution of the data.
-        # So I decide to deprecated previous implementation and keep the logic of the program simple
-        # Instead, I'll add a cache for the index file.
-        data = np.fromfile(data_path, dtype=DATA_RECORDS)
+        stat = data_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._records.get(data_path)
+        if cached is None or cached[0] != version:
+            cached = self._records[data_path] = version, PITRecords(data_path, field.endswith("_q"))
+        return cached[1]
+
+    @staticmethod
+    def _to_date_int(cur_times) -> np.ndarray:
+        cur_times = pd.DatetimeIndex(cur_times)
+        return np.asarray(cur_times.year * 10000 + cur_times.month * 100 + cur_times.day, dtype=np.int64)
+
+    def period_feature(self, instrument, field, start_index, end_index, cur_time, period=None):
+        if not isinstance(cur_time, pd.Timestamp):
+            raise ValueError(
+                f"Expected pd.Timestamp for `cur_time`, got '{cur_time}'. Advices: you can't query PIT data directly(e.g. '$$roewa_q'), you must use `P` operator to convert data to each day (e.g. 'P($$roewa_q)')"
+            )
+
+        assert end_index <= 0  # PIT don't support querying future data
 
+        records = self.get_records(instrument, field)
         # find all revision periods before `cur_time`
-        cur_time_int = int(cur_time.year) * 10000 + int(cur_time.month) * 100 + int(cur_time.day)
-        loc = np.searchsorted(data["date"], cur_time_int, side="right")
+        loc = records.locate(int(cur_time.year) * 10000 + int(cur_time.month) * 100 + int(cur_time.day))
         if loc <= 0:
             return pd.Series(dtype=C.pit_record_type["value"])
-        last_period = data["period"][:loc].max()  # return the latest quarter
-        first_period = data["period"][:loc].min()
-        period_list = get_period_list(first_period, last_period, quarterly)
+        # the periods between the earliest and the latest quarter
+        ordinals = np.arange(records.first_ordinal[loc - 1], records.last_ordinal[loc - 1] + 1)
         if period is not None:
             # NOTE: `period` has higher priority than `start_index` & `end_index`
-            if period not in period_list:
+            if not records.is_period(period) or records.to_ordinal(period) not in ordinals:
                 return pd.Series(dtype=C.pit_record_type["value"])
-            else:
-                period_list = [period]
+            ordinals = np.array([records.to_ordinal(period)])
         else:
-            period_list = period_list[max(0, len(period_list) + start_index - 1) : len(period_list) + end_index]
-        value = np.full((len(period_list),), np.nan, dtype=VALUE_DTYPE)
-        for i, p in enumerate(period_list):
-            # last_period_index = self.period_index[field].get(period)  # For acceleration
-            value[i], now_period_index = read_period_data(
-                index_path, data_path, p, cur_time_int, quarterly  # , last_period_index  # For acceleration
-            )
-            # self.period_index[field].update({period: now_period_index})  # For acceleration
+            ordinals = ordinals[max(0, len(ordinals) + start_index - 1) : len(ordinals) + end_index]
         # NOTE: the index is period_list; So it may result in unexpected values(e.g. nan)
         # when calculation between different features and only part of its financial indicator is published
-        series = pd.Series(value, index=period_list, dtype=VALUE_DTYPE)
+        return pd.Series(
+            records.lookup(ordinals, loc),
+            index=records.to_period(ordinals).tolist(),
+            dtype=C.pit_record_type["value"],
+        )
 
-        # {For acceleration
-        # if cur_index == end_index:
-        #     self.all_fields.remove(field)
-        #     if not len(self.all_fields):
-        #         del self.all_fields
-        #         del self.period_index
-        # For acceleration}
+    def period_values(self, instrument, field, cur_times, offsets=(0,), period=None):
+        """the records are swept once for all the times; please refer to `PITProvider.period_values`"""
+        assert all(offset <= 0 for offset in offsets)  # PIT don't support querying future data
+        records = self.get_records(instrument, field)
+        loc = records.locate(self._to_date_int(cur_times))
+        if period is not None:
+            if not records.is_period(period):
+                return np.full((len(loc), 1), np.nan)
+            ordinals = np.full((len(loc), 1), records.to_ordinal(period), dtype=np.int64)
+        else:
+            ordinals = np.empty((len(loc), len(offsets)), dtype=np.int64)
+        if len(records) == 0:
+            return np.full(ordinals.shape, np.nan)
+        last = records.last_ordinal[np.maximum(loc - 1, 0)][:, None]
+        first = records.first_ordinal[np.maximum(loc - 1, 0)][:, None]
+        if period is None:
+            ordinals[:] = last + np.asarray(offsets, dtype=np.int64)[None, :]
+        values = records.lookup(ordinals, loc[:, None])
+        # the periods out of [the earliest period, the latest period] are not observed
+        return np.where((loc[:, None] > 0) & (ordinals >= first) & (ordinals <= last), values, np.nan)
 
-        return series
+    def revision_dates(self, instrument, field):
+        return np.unique(self.get_records(instrument, field).dates)
 
 
 class LocalExpressionProvider(ExpressionProvider):
@@ -839,6 +1350,31 @@ class LocalExpressionProvider(ExpressionProvider):
     def __init__(self, time2idx=True):
         super().__init__()
         self.time2idx = time2idx
+        self.expression_plan_cache = {}
+
+    def get_expression_plan(self, fields) -> ExpressionPlan:
+        fields = tuple(fields)
+        if fields not in self.expression_plan_cache:
+            self.expression_plan_cache[fields] = ExpressionPlan(list(fields))
+        return self.expression_plan_cache[fields]
+
+    def expressions(self, instrument, fields, start_time=None, end_time=None, freq="day"):
+        """The shared sub-expressions of the fields are calculated once if `C.expression_plan` is enabled"""
+        if not (self.time2idx and C.get("expression_plan", False)) or len(fields) <= 1:
+            return super().expressions(instrument, fields, start_time, end_time, freq)
+        plan = self.get_expression_plan(fields)
+        _, _, start_index, end_index = Cal.locate_index(
+            time_to_slc_point(start_time), time_to_slc_point(end_time), freq=freq, future=False
+        )
+        try:
+            return plan.evaluate(instrument, start_index, end_index, freq)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading expressions error: "
+                f"instrument={instrument}, fields={fields}, start_time={start_time}, end_time={end_time}, freq={freq}. "
+                f"error info: {str(e)}"
+            )
+            raise
 
     def expression(self, instrument, field, start_time=None, end_time=None, freq="day"):
         expression = self.get_expression_instance(field)
@@ -878,6 +1414,35 @@ class LocalExpressionProvider(ExpressionProvider):
             series = series.loc[start_index:end_index]
         return series
 
+    def expression_panel(self, instruments, field, start_time=None, end_time=None, freq="day"):
+        if not self.time2idx:
+            raise NotImplementedError("The panel engine only supports the index-based expressions")
+        expression = self.get_expression_instance(field)
+        start_time = time_to_slc_point(start_time)
+        end_time = time_to_slc_point(end_time)
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq=freq, future=False)
+        lft_etd, rght_etd = expression.get_extended_window_size()
+        query_start, query_end = max(0, start_index - lft_etd), end_index + rght_etd
+
+        try:
+            data, valid = expression.load_panel(instruments, query_start, query_end, freq)
+        except Exception as e:
+            get_module_logger("data").debug(
+                f"Loading expression panel error: "
+                f"field=({field}), start_time={start_time}, end_time={end_time}, freq={freq}. "
+                f"error info: {str(e)}"
+            )
+            raise
+        # the same type as `expression`
+        try:
+            data = data.astype(np.float32)
+        except ValueError:
+            pass
+        except TypeError:
+            pass
+        rows = slice(start_index - query_start, end_index - query_start + 1)
+        return data.iloc[rows], valid[rows]
+
 
 class LocalDatasetProvider(DatasetProvider):
     """Local dataset data provider class
@@ -926,6 +1491,19 @@ class LocalDatasetProvider(DatasetProvider):
 
         return data
 
+    def panel_dataset(self, instruments, fields, start_time=None, end_time=None, freq="day", inst_processors=[]):
+        instruments_d = self.get_instruments_d(instruments, freq)
+        column_names = self.get_column_names(fields)
+        # the panel engine works on the calendar index, so the time is always aligned to the calendar
+        cal = Cal.calendar(start_time, end_time, freq)
+        if len(cal) == 0:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_arrays([[], []], names=("instrument", "datetime")), columns=column_names
+            )
+        return self.panel_dataset_processor(
+            instruments_d, column_names, cal[0], cal[-1], freq, inst_processors=inst_processors
+        )
+
     @staticmethod
     def multi_cache_walker(instruments, fields, start_time=None, end_time=None, freq="day"):
         """
@@ -1168,12 +1746,17 @@ class BaseProvider:
         freq="day",
         disk_cache=None,
         inst_processors=[],
+        engine="instrument",
     ):
         """
         Parameters
         ----------
         disk_cache : int
             whether to skip(0)/use(1)/replace(2) disk_cache
+        engine : str
+            - "instrument": the expressions are calculated instrument by instrument (in parallel)
+            - "panel": each operator is calculated once for all the instruments on the ``calendar x instrument``
+              panel. The result is the same, but the dataset cache and the expression cache are not used.
 
 
         This function will try to use cache method which has a keyword `disk_cache`,
@@ -1182,6 +1765,12 @@ class BaseProvider:
         """
         disk_cache = C.default_disk_cache if disk_cache is None else disk_cache
         fields = list(fields)  # In case of tuple.
+        if engine == "panel":
+            return DatasetD.panel_dataset(
+                instruments, fields, start_time, end_time, freq, inst_processors=inst_processors
+            )
+        elif engine != "instrument":
+            raise ValueError(f"Unsupported engine {engine}, please use `instrument` or `panel`")
         try:
             return DatasetD.dataset(
                 instruments, fields, start_time, end_time, freq, disk_cache, inst_processors=inst_processors
@@ -1294,6 +1883,9 @@ def register_all_wrappers(C):
     logger = get_module_logger("data")
     module = get_module_by_module_path("qlib.data")
 
+    # the persistent workers of `DatasetProvider.dataset_processor` are initialized with the previous config
+    ParallelPool.shutdown()
+
     _calendar_provider = init_instance_by_config(C.calendar_provider, module)
     if getattr(C, "calendar_cache", None) is not None:
         _calendar_provider = init_instance_by_config(C.calendar_cache, module, provide=_calendar_provider)
@@ -4,6 +4,7 @@
 # coding=utf-8
 from abc import abstractmethod
 import warnings
+from pathlib import Path
 from typing import Callable, Union, Tuple, List, Iterator, Optional
 
 import pandas as pd
@@ -12,9 +13,10 @@ from qlib.typehint import Literal
 from ...log import get_module_logger, TimeInspector
 from ...utils import init_instance_by_config
 from ...utils.serial import Serializable
-from .utils import fetch_df_by_index, fetch_df_by_col
-from ...utils import lazy_sort_index
+from .utils import fetch_df_by_index, fetch_df_by_col, get_frame_buffers
+from ...utils import is_copy_on_write, lazy_sort_index
 from .loader import DataLoader
+from .pipeline import ProcessorPlan
 
 from . import processor as processor_module
 from . import loader as data_loader_module
@@ -444,6 +446,11 @@ class DataHandlerLP(DataHandler):
         shared_processors: List = [],
         process_type=PTYPE_A,
         drop_raw=False,
+        fuse_processors: bool = False,
+        chunk_freq: Optional[str] = None,
+        chunk_lookback: Optional[str] = None,
+        chunk_dir: Optional[str] = None,
+        share_data: bool = False,
         **kwargs,
     ):
         """
@@ -487,6 +494,34 @@ class DataHandlerLP(DataHandler):
               - (e.g. self._infer processed by learn_processors )
         drop_raw: bool
             Whether to drop the raw data
+        fuse_processors: bool
+            Whether to fuse the chains of the fusable processors (e.g. `ProcessInf`, `ZScoreNorm`, `Fillna`,
+            `CSRankNorm`) into a single pass over the numpy values of the data (please refer to
+            `qlib.data.dataset.pipeline`). The plans of the processors are logged and could be got by
+            `get_process_plan`.
+        chunk_freq : Optional[str]
+            Load and process the data by chunks of time (e.g. "YS" for yearly chunks, "MS" for monthly chunks of the
+            minute data, please refer to the frequency strings of `pd.date_range`) for the data which don't fit in
+            memory. `start_time` and `end_time` are required.
+
+            - the data are loaded chunk by chunk and persisted to disk (please refer to `ChunkedHandlerStorage`)
+            - the processors with `fit` are fitted by streaming the chunks (please refer to `Processor.fit_stream`)
+            - the data are processed chunk by chunk and persisted to disk; `fetch` only loads the chunks of the
+              selected time range and `fetch_chunks` streams the data chunk by chunk
+        chunk_lookback : Optional[str]
+            The time before a chunk (e.g. "30D") given to the processors together with the chunk, for the processors
+            depending on the history (e.g. the rolling ones). The results of the lookback rows are dropped.
+        chunk_dir : Optional[str]
+            The directory to persist the chunks; a temporary directory is used if it is None (then the data can't be
+            pickled, e.g. by `to_pickle` with `dump_all=True`).
+        share_data : bool
+            Whether to share the unchanged columns among `_data`, `_infer` and `_learn` instead of copying the data
+            before processing it. The data are shared copy-on-write, so a column is only duplicated when a processor
+            changes it (please refer to `memory_report`). It requires the Copy-on-Write of pandas (pandas>=3.0, or
+            `pd.options.mode.copy_on_write = True`); the data are copied as usual otherwise.
+
+            NOTE: the numpy values of the shared data are read-only, so the processors must not modify them inplace
+            (e.g. `df.values[...] = ...`).
         """
 
         # Setup preprocessor
@@ -505,6 +540,15 @@ class DataHandlerLP(DataHandler):
 
         self.process_type = process_type
         self.drop_raw = drop_raw
+        self.fuse_processors = fuse_processors
+        self.chunk_freq = chunk_freq
+        self.chunk_lookback = chunk_lookback
+        self.chunk_dir = chunk_dir
+        self.share_data = share_data
+        if share_data and not is_copy_on_write():
+            get_module_logger("DataHandlerLP").warning(
+                "`share_data` requires the Copy-on-Write of pandas, the data will be copied before processing"
+            )
         super().__init__(instruments, start_time, end_time, data_loader, **kwargs)
 
     def get_all_processors(self):
@@ -539,6 +583,80 @@ class DataHandlerLP(DataHandler):
                 df = proc(df)
         return df
 
+    def _process_df(
+        self, df: pd.DataFrame, proc_l: List[processor_module.Processor], with_fit: bool, check_for_infer: bool
+    ) -> pd.DataFrame:
+        """process the data by the processors without modifying the original data"""
+        # the unchanged columns are shared copy-on-write if `share_data`
+        deep = not (getattr(self, "share_data", False) and is_copy_on_write())
+        if not getattr(self, "fuse_processors", False):
+            if not self._is_proc_readonly(proc_l):  # avoid modifying the original data
+                df = df.copy(deep=deep)
+            return self._run_proc_l(df, proc_l, with_fit=with_fit, check_for_infer=check_for_infer)
+        if check_for_infer:
+            for proc in proc_l:
+                if not proc.is_for_infer():
+                    raise TypeError("Only processors usable for inference can be used in `infer_processors` ")
+        plan = ProcessorPlan(proc_l)
+        get_module_logger("DataHandlerLP").info(f"processors plan: {plan}")
+        if not plan.readonly():  # avoid modifying the original data
+            df = df.copy(deep=deep)
+        return plan(df, with_fit=with_fit)
+
+    def get_process_plan(self) -> str:
+        """
+        The plans of the processors (please refer to `fuse_processors`), e.g.
+
+        .. code-block:: text
+
+            infer_processors: fused[ProcessInf -> ZScoreNorm -> Fillna]
+            learn_processors: DropnaLabel => fused[CSRankNorm]
+        """
+        plans = []
+        for pname in "shared_processors", "infer_processors", "learn_processors":
+            if len(getattr(self, pname)) > 0:
+                plans.append(f"{pname}: {ProcessorPlan(getattr(self, pname))}")
+        return "\n".join(plans)
+
+    def memory_report(self) -> pd.DataFrame:
+        """
+        The memory of the values and the index of the data in memory (`_data`, `_infer` and `_learn`)
+
+        Returns
+        -------
+        pd.DataFrame
+            the bytes of each data ("raw", "infer" and "learn"; the dropped data are skipped) and of all the data
+            ("total"), e.g.
+
+            .. code-block:: text
+
+                           bytes     shared       own
+                raw    193027872  193027872         0
+                infer  193027872  193027872         0
+                learn  193876872    1229472  192647400
+                total  386904744  193027872  193876872
+
+            - bytes: the memory referenced by the data (for "total", the memory of all the data)
+            - shared: the memory also referenced by the other data (for "total", the memory saved by the sharing)
+            - own: the memory only referenced by the data
+        """
+        buffers = {}
+        for key, attr in self.ATTR_MAP.items():
+            df = getattr(self, attr, None)
+            if isinstance(df, pd.DataFrame):
+                buffers[key] = get_frame_buffers(df)
+        report = {}
+        for key, buf in buffers.items():
+            others = set().union(*[b for k, b in buffers.items() if k != key])
+            shared = sum(size for buf_id, size in buf.items() if buf_id in others)
+            report[key] = {"bytes": sum(buf.values()), "shared": shared, "own": sum(buf.values()) - shared}
+        report = pd.DataFrame.from_dict(report, orient="index", columns=["bytes", "shared", "own"])
+        total = {}
+        for buf in buffers.values():
+            total.update(buf)
+        report.loc["total"] = [sum(total.values()), report["bytes"].sum() - sum(total.values()), report["own"].sum()]
+        return report
+
     @staticmethod
     def _is_proc_readonly(proc_l: List[processor_module.Processor]):
         """
@@ -574,23 +692,24 @@ class DataHandlerLP(DataHandler):
         with_fit : bool
             The input of the `fit` will be the output of the previous processor
         """
+        self._infer, self._learn = self._process(self._data, with_fit=with_fit)
+
+        if self.drop_raw:
+            del self._data
+
+    def _process(self, df: pd.DataFrame, with_fit: bool) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """process the raw data `df` into the data for inference and learning (please refer to `process_data`)"""
         # shared data processors
         # 1) assign
-        _shared_df = self._data
-        if not self._is_proc_readonly(self.shared_processors):  # avoid modifying the original data
-            _shared_df = _shared_df.copy()
+        _shared_df = df
         # 2) process
-        _shared_df = self._run_proc_l(_shared_df, self.shared_processors, with_fit=with_fit, check_for_infer=True)
+        _shared_df = self._process_df(_shared_df, self.shared_processors, with_fit=with_fit, check_for_infer=True)
 
         # data for inference
         # 1) assign
         _infer_df = _shared_df
-        if not self._is_proc_readonly(self.infer_processors):  # avoid modifying the original data
-            _infer_df = _infer_df.copy()
         # 2) process
-        _infer_df = self._run_proc_l(_infer_df, self.infer_processors, with_fit=with_fit, check_for_infer=True)
-
-        self._infer = _infer_df
+        _infer_df = self._process_df(_infer_df, self.infer_processors, with_fit=with_fit, check_for_infer=True)
 
         # data for learning
         # 1) assign
@@ -601,15 +720,10 @@ class DataHandlerLP(DataHandler):
             _learn_df = _infer_df
         else:
             raise NotImplementedError(f"This type of input is not supported")
-        if not self._is_proc_readonly(self.learn_processors):  # avoid modifying the original  data
-            _learn_df = _learn_df.copy()
         # 2) process
-        _learn_df = self._run_proc_l(_learn_df, self.learn_processors, with_fit=with_fit, check_for_infer=False)
-
-        self._learn = _learn_df
+        _learn_df = self._process_df(_learn_df, self.learn_processors, with_fit=with_fit, check_for_infer=False)
 
-        if self.drop_raw:
-            del self._data
+        return _infer_df, _learn_df
 
     def config(self, processor_kwargs: dict = None, **kwargs):
         """
@@ -646,6 +760,10 @@ class DataHandlerLP(DataHandler):
                 the processed data will be saved on disk, and handler will load the cached data from the disk directly
                 when we call `init` next time
         """
+        if getattr(self, "chunk_freq", None) is not None:
+            self._setup_data_by_chunks(init_type)
+            return
+
         # init raw data
         super().setup_data(**kwargs)
 
@@ -662,6 +780,94 @@ class DataHandlerLP(DataHandler):
 
         # TODO: Be able to cache handler data. Save the memory for data processing
 
+    def _get_chunk_bounds(self) -> List[Tuple[pd.Timestamp, Optional[pd.Timestamp]]]:
+        """the [start, stop) of the chunks of time (the stop of the last chunk is None for `end_time`)"""
+        if self.start_time is None or self.end_time is None:
+            raise ValueError("`start_time` and `end_time` are required to process the data by chunks")
+        cuts = [
+            t
+            for t in pd.date_range(self.start_time, self.end_time, freq=self.chunk_freq)
+            if t > pd.Timestamp(self.start_time)
+        ]
+        # the first start is kept as it is (e.g. a date string)
+        return list(zip([self.start_time] + cuts, cuts + [None]))
+
+    def _trim_chunk(self, df: pd.DataFrame, start: pd.Timestamp, stop: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """the rows of the chunk [start, stop)"""
+        if stop is None:
+            return fetch_df_by_index(df, slice(start, self.end_time), level="datetime")
+        df = fetch_df_by_index(df, slice(start, None), level="datetime")
+        return df[df.index.get_level_values("datetime") < stop]
+
+    def _iter_chunk_data(self, bounds: List[Tuple]) -> Iterator[Tuple[Tuple, pd.DataFrame]]:
+        """the [start, stop) of each chunk, and the raw data of the chunk with the lookback rows"""
+        for start, stop in bounds:
+            load_start = start
+            if self.chunk_lookback is not None:
+                load_start = max(pd.Timestamp(self.start_time), pd.Timestamp(start) - pd.Timedelta(self.chunk_lookback))
+            load_end = self.end_time if stop is None else stop
+            yield (start, stop), self._data.fetch(slice(load_start, load_end), col_set=self.CS_RAW)
+
+    def _iter_fit_data(self, bounds: List[Tuple], proc_l: List[processor_module.Processor]) -> Iterator[pd.DataFrame]:
+        """the raw data of the chunks processed by the (fitted) processors, for fitting the next processor"""
+        for (start, stop), df in self._iter_chunk_data(bounds):
+            yield self._trim_chunk(self._process_df(df, proc_l, with_fit=False, check_for_infer=False), start, stop)
+
+    def _setup_data_by_chunks(self, init_type: str):
+        """
+        set up the data by chunks of time (please refer to `chunk_freq`)
+
+        1) the raw data are loaded and persisted chunk by chunk
+        2) each processor with `fit` is fitted by a pass over the chunks processed by the previous processors
+        3) the data are processed and persisted chunk by chunk
+        """
+        from .storage import ChunkedHandlerStorage  # pylint: disable=C0415
+
+        bounds = self._get_chunk_bounds()
+        chunk_dir = None if self.chunk_dir is None else Path(self.chunk_dir)
+        storages = {
+            key: ChunkedHandlerStorage(None if chunk_dir is None else chunk_dir / key)
+            for key in (self.DK_R, self.DK_I, self.DK_L)
+        }
+        with TimeInspector.logt("Loading data by chunks"):
+            for start, stop in bounds:
+                df = self.data_loader.load(self.instruments, start, self.end_time if stop is None else stop)
+                storages[self.DK_R].append(lazy_sort_index(self._trim_chunk(df, start, stop)), start, stop)
+        self._data = storages[self.DK_R]
+
+        with TimeInspector.logt("fit data by chunks"):
+            if init_type == DataHandlerLP.IT_FIT_IND:
+                for proc in self.get_all_processors():
+                    if type(proc).fit is not processor_module.Processor.fit:
+                        with TimeInspector.logt(f"{proc.__class__.__name__}"):
+                            proc.fit_stream(self._iter_fit_data(bounds, []))
+            elif init_type == DataHandlerLP.IT_FIT_SEQ:
+                # the processors before each processor in the data flow (please refer to `process_data`)
+                infer_prefix = self.shared_processors + self.infer_processors
+                learn_prefix = infer_prefix if self.process_type == DataHandlerLP.PTYPE_A else self.shared_processors
+                for prefix, proc_l in [
+                    ([], self.shared_processors),
+                    (self.shared_processors, self.infer_processors),
+                    (learn_prefix, self.learn_processors),
+                ]:
+                    for i, proc in enumerate(proc_l):
+                        if type(proc).fit is not processor_module.Processor.fit:
+                            with TimeInspector.logt(f"{proc.__class__.__name__}"):
+                                proc.fit_stream(self._iter_fit_data(bounds, prefix + proc_l[:i]))
+            elif init_type != DataHandlerLP.IT_LS:
+                raise NotImplementedError(f"This type of input is not supported")
+
+        with TimeInspector.logt("process data by chunks"):
+            for (start, stop), df in self._iter_chunk_data(bounds):
+                _infer_df, _learn_df = self._process(df, with_fit=False)
+                storages[self.DK_I].append(self._trim_chunk(_infer_df, start, stop), start, stop)
+                storages[self.DK_L].append(self._trim_chunk(_learn_df, start, stop), start, stop)
+        self._infer, self._learn = storages[self.DK_I], storages[self.DK_L]
+
+        if self.drop_raw:
+            self._data.clear()
+            del self._data
+
     def _get_df_by_key(self, data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I) -> pd.DataFrame:
         if data_key == self.DK_R and self.drop_raw:
             raise AttributeError(
@@ -709,6 +915,27 @@ class DataHandlerLP(DataHandler):
             proc_func=proc_func,
         )
 
+    def fetch_chunks(
+        self,
+        selector: Union[pd.Timestamp, slice, str] = slice(None, None),
+        level: Union[str, int] = "datetime",
+        col_set=DataHandler.CS_ALL,
+        data_key: DATA_KEY_TYPE = DataHandler.DK_I,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        fetch the data chunk by chunk, e.g. to stream the data which don't fit in memory to the models
+
+        The data are fetched as a single chunk if they are not processed by chunks (please refer to `chunk_freq`).
+        The parameters are the same as `fetch`.
+        """
+        from .storage import ChunkedHandlerStorage  # pylint: disable=C0415
+
+        data_storage = self._get_df_by_key(data_key)
+        if isinstance(data_storage, ChunkedHandlerStorage):
+            yield from data_storage.iter_chunks(selector=selector, level=level, col_set=col_set)
+        else:
+            yield self.fetch(selector=selector, level=level, col_set=col_set, data_key=data_key)
+
     def get_cols(self, col_set=DataHandler.CS_ALL, data_key: DATA_KEY_TYPE = DataHandlerABC.DK_I) -> list:
         """
         get the column names
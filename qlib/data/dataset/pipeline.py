@@ -0,0 +1,251 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+The fused execution of the processors of `DataHandlerLP`.
+
+The processors are applied one by one on the DataFrame by default, and each of them copies or re-slices the whole
+data. `ProcessorPlan` compiles the list of processors into stages: each chain of the consecutive fusable processors
+(please refer to `Processor.fusable`) becomes a `FusedProcessors` stage, which
+
+- extracts the numpy values of the columns processed by the chain once (one copy);
+- applies the fused forms (`Processor.fuse`) of the processors on the tiles of the rows (the rows of some whole
+  datetimes, so the cross sectional processors could be fused too) one after another, so the intermediates are as
+  small as a tile;
+- fits the processors with `fit` on the processed values of the previous processors (by splitting the chain) to keep
+  the sequential fitting semantics.
+
+The other processors are applied as usual, and so are the fused chains on the data which are not all float.
+"""
+
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from ...log import TimeInspector, get_module_logger
+from ...utils import lazy_sort_index
+from ...utils.data import get_datetime_segments
+from .processor import FusedOp, Processor
+
+
+class FusedProcessors:
+    """A chain of the fusable processors applied on the numpy values of the data in a single pass of the tiles"""
+
+    def __init__(self, processors: List[Processor], tile_rows: int = 2**15):
+        """
+        Parameters
+        ----------
+        processors : List[Processor]
+            the fusable processors
+        tile_rows : int
+            the approximate number of the rows of a tile
+        """
+        self.processors = processors
+        self.tile_rows = tile_rows
+
+    def __str__(self):
+        return "fused[" + " -> ".join(proc.__class__.__name__ for proc in self.processors) + "]"
+
+    def __call__(self, df: pd.DataFrame, with_fit: bool = False) -> pd.DataFrame:
+        """
+        Apply the processors on the data; `df` itself is not changed
+
+        Parameters
+        ----------
+        with_fit : bool
+            fit the processors before applying them (the input of `fit` will be the output of the previous processor)
+        """
+        if len(df) == 0 or not all(isinstance(dtype, np.dtype) and dtype.kind == "f" for dtype in df.dtypes):
+            get_module_logger("ProcessorPlan").info(f"{self} is not fused on the data which are not all float")
+            return _run_processors(df.copy(), self.processors, with_fit=with_fit)
+        blocks = _Blocks(df, self.tile_rows)
+        pending = []
+        sort_index = False
+        for proc in self.processors:
+            if with_fit and type(proc).fit is not Processor.fit:
+                # the values processed by the previous processors are needed
+                blocks.apply(pending)
+                pending = []
+                with TimeInspector.logt(f"{proc.__class__.__name__}.fit"):
+                    proc.fit(blocks.to_frame())
+            pending.append((proc, proc.fuse(df.columns)))
+            sort_index = sort_index or pending[-1][1].sort_index
+        blocks.apply(pending)
+        res = blocks.to_frame()
+        if sort_index:
+            # the rows of the fused chain are in the order of `df`; the processors are separable by datetime, so
+            # sorting the results once is the same as sorting the data at the position of the processor in the chain
+            res = lazy_sort_index(res)
+        return res
+
+
+class _Blocks:
+    """
+    The numpy values of the columns processed by the fused processors (extracted when they are processed for the first
+    time), grouped by dtype. The rows are sorted by datetime.
+    """
+
+    def __init__(self, df: pd.DataFrame, tile_rows: int):
+        self.df = df
+        self.order, self.starts = get_datetime_segments(df.index)
+        # the tiles are the rows of some whole datetimes
+        n = len(df)
+        self.cuts = np.unique(np.append(np.searchsorted(self.starts, np.arange(0, n, tile_rows)), len(self.starts)))
+        self.bounds = np.append(self.starts, n)
+        # [the positions of the columns (-1 if the column is moved to another block), the values]
+        self.blocks = []
+        self.extracted = np.zeros(df.shape[1], dtype=bool)
+
+    def _extract(self, positions: np.ndarray, dtype):
+        """extract the values of the columns (in the dtype of the data if `dtype` is None)"""
+        positions = positions[~self.extracted[positions]]
+        if len(positions) == 0:
+            return
+        dtypes = self.df.dtypes.iloc[positions].to_numpy()
+        for col_dtype in pd.unique(dtypes) if dtype is None else [dtype]:
+            pos = positions if dtype is not None else positions[dtypes == col_dtype]
+            # a single copy (the values of a block of the DataFrame are in F-order)
+            values = self.df.iloc[:, _as_slice(pos)].to_numpy(dtype=col_dtype, copy=self.order is None)
+            if self.order is not None:
+                values = np.take(values.T, self.order, axis=1).T
+            self.blocks.append([pos.copy(), np.asfortranarray(values)])
+        self.extracted[positions] = True
+
+    def _move(self, positions: np.ndarray, dtype):
+        """move the extracted columns to a block of the dtype (the columns are marked as -1 in the original blocks)"""
+        moved = []
+        for block in self.blocks:
+            block_pos, values = block
+            local = np.flatnonzero(np.isin(block_pos, positions))
+            if values.dtype == dtype or len(local) == 0:
+                continue
+            moved.append([block_pos[local], np.asfortranarray(values[:, local].astype(dtype))])
+            block[0] = block_pos.copy()
+            block[0][local] = -1
+        self.blocks.extend(moved)
+
+    def apply(self, pending: List):
+        """apply the fused processors [(processor, fused op), ...] on the tiles of the rows"""
+        ops = []
+        for proc, op in pending:
+            op: FusedOp
+            if len(op.positions) == 0:
+                continue
+            if op.dtype is not None and self.extracted[op.positions].any():
+                # the previous processors must be applied before changing the dtype
+                self._run(ops)
+                ops = []
+                self._move(op.positions, np.dtype(op.dtype))
+            self._extract(op.positions, op.dtype)
+            sorter = np.argsort(op.positions)
+            for block_pos, values in self.blocks:
+                # the columns of the block processed by the processor, and their index in `op.positions`
+                found = np.minimum(np.searchsorted(op.positions, block_pos, sorter=sorter), len(sorter) - 1)
+                local = np.flatnonzero((block_pos >= 0) & (op.positions[sorter[found]] == block_pos))
+                if len(local) > 0:
+                    ops.append((proc, op, values, _as_slice(local), sorter[found[local]]))
+        self._run(ops)
+
+    def _run(self, ops: List):
+        if len(ops) == 0:
+            return
+        with TimeInspector.logt(" -> ".join(proc.__class__.__name__ for proc, *_ in ops)):
+            for i, j in zip(self.cuts[:-1], self.cuts[1:]):
+                rows = slice(self.bounds[i], self.bounds[j])
+                starts = self.starts[i:j] - self.bounds[i]
+                for _, op, values, local, idx in ops:
+                    tile = values[rows, local]
+                    res = op.func(tile, idx, starts)
+                    if res is not None:
+                        values[rows, local] = res
+                    elif not isinstance(local, slice):
+                        # a copy of the values
+                        values[rows, local] = tile
+
+    def to_frame(self) -> pd.DataFrame:
+        """the processed data (only the processed columns are copied if the rows are sorted)"""
+        df = self.df
+        inverse = None if self.order is None else np.argsort(self.order)
+        pieces = []
+        for block_pos, values in self.blocks:
+            local = np.flatnonzero(block_pos >= 0)
+            if len(local) > 0:
+                values = values[:, _as_slice(local)]
+                if inverse is not None:
+                    # keep the values in F-order
+                    values = np.take(values.T, inverse, axis=1).T
+                frame = pd.DataFrame(values, index=df.index, columns=df.columns[block_pos[local]], copy=False)
+                pieces.append((block_pos[local], frame))
+        rest = np.flatnonzero(~self.extracted)
+        if len(rest) > 0:
+            pieces.append((rest, df.iloc[:, _as_slice(rest)]))
+        pieces.sort(key=lambda piece: piece[0][0])
+        positions = np.concatenate([pos for pos, _ in pieces])
+        res = pieces[0][1] if len(pieces) == 1 else pd.concat([frame for _, frame in pieces], axis=1)
+        if (np.diff(positions) != 1).any():
+            res = res.iloc[:, np.argsort(positions)]
+        return res
+
+
+def _as_slice(local: np.ndarray) -> Union[slice, np.ndarray]:
+    """the slice of the sorted positions if they are contiguous (to get the views of the values)"""
+    if len(local) > 0 and local[-1] - local[0] == len(local) - 1:
+        return slice(local[0], local[-1] + 1)
+    return local
+
+
+class ProcessorPlan:
+    """
+    The stages of a list of processors: the chains of the consecutive fusable processors are fused
+    (`FusedProcessors`) and the other processors are applied as usual.
+    """
+
+    def __init__(self, processors: List[Processor], tile_rows: int = 2**15):
+        """
+        Parameters
+        ----------
+        processors : List[Processor]
+            the processors
+        tile_rows : int
+            the approximate number of the rows of a tile of the fused processors
+        """
+        self.stages = []
+        for proc in processors:
+            if proc.fusable():
+                if len(self.stages) == 0 or not isinstance(self.stages[-1], FusedProcessors):
+                    self.stages.append(FusedProcessors([], tile_rows=tile_rows))
+                self.stages[-1].processors.append(proc)
+            else:
+                self.stages.append(proc)
+
+    def readonly(self) -> bool:
+        """Does the plan treat the input data readonly (i.e. only readonly processors are applied on it)"""
+        for stage in self.stages:
+            if isinstance(stage, FusedProcessors):
+                # the fused processors return new data
+                return True
+            if not stage.readonly():
+                return False
+        return True
+
+    def __str__(self):
+        return " => ".join(
+            str(stage) if isinstance(stage, FusedProcessors) else type(stage).__name__ for stage in self.stages
+        )
+
+    def __call__(self, df: pd.DataFrame, with_fit: bool = False) -> pd.DataFrame:
+        for stage in self.stages:
+            if isinstance(stage, FusedProcessors):
+                df = stage(df, with_fit=with_fit)
+            else:
+                df = _run_processors(df, [stage], with_fit=with_fit)
+        return df
+
+
+def _run_processors(df: pd.DataFrame, processors: List[Processor], with_fit: bool) -> pd.DataFrame:
+    for proc in processors:
+        with TimeInspector.logt(f"{proc.__class__.__name__}"):
+            if with_fit:
+                proc.fit(df)
+            df = proc(df)
+    return df
@@ -2,13 +2,22 @@
 # Licensed under the MIT License.
 
 import abc
-from typing import Union, Text, Optional
+from typing import Callable, Iterable, Union, Text, Optional
 import numpy as np
 import pandas as pd
 
-from qlib.utils.data import robust_zscore, zscore
+from qlib.utils.data import (
+    cs_fillna,
+    cs_rank,
+    cs_robust_zscore,
+    cs_zscore,
+    get_datetime_segments,
+    robust_zscore,
+    zscore,
+)
 from ...constant import EPS
 from .utils import fetch_df_by_index
+from ...log import get_module_logger
 from ...utils.serial import Serializable
 from ...utils.paral import datetime_groupby_apply
 from qlib.data.inst_processor import InstProcessor
@@ -32,6 +41,82 @@ def get_group_columns(df: pd.DataFrame, group: Union[Text, None]):
         return df.columns[df.columns.get_loc(group)]
 
 
+def cs_apply(df: pd.DataFrame, cols: pd.Index, func, dtype=None, block_size: int = 16) -> np.ndarray:
+    """
+    Apply the cross sectional function on the columns of `df`
+
+    The rows are grouped by datetime once, and `func(values, starts)` (e.g. `qlib.utils.data.cs_zscore`) is applied on
+    the float values of `block_size` columns at a time (to limit the memory of the intermediates).
+
+    Returns
+    -------
+    np.ndarray
+        the results in the order of the rows of `df`, in `dtype` (by default the float dtype of the columns, or float64)
+    """
+    order, starts = get_datetime_segments(df.index)
+    values = df[cols].to_numpy()
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    if dtype is None:
+        dtype = values.dtype
+    res = np.empty(values.shape, dtype=dtype, order="F")
+    if len(values) == 0:
+        return res
+    if values.ndim == 1:
+        # a single column
+        res[:] = cs_apply(df[[cols]], [cols], func, dtype=dtype, block_size=block_size)[:, 0]
+        return res
+    for i in range(0, values.shape[1], block_size):
+        block = values[:, i : i + block_size]
+        if order is not None:
+            block = block[order]
+        block = func(block, starts)
+        if order is None:
+            res[:, i : i + block_size] = block
+        else:
+            res[order, i : i + block_size] = block
+    return res
+
+
+def get_group_positions(columns: pd.Index, group: Union[Text, None, list]) -> np.ndarray:
+    """the positions of the columns of the group(s) (please refer to `get_group_columns`)"""
+    positions = np.arange(len(columns))
+    if group is None:
+        return positions
+    if isinstance(group, list):
+        return np.unique(np.concatenate([get_group_positions(columns, g) for g in group]))
+    return np.atleast_1d(positions[columns.get_loc(group)])
+
+
+class FusedOp:
+    """
+    The fused form of a processor, which is applied on the numpy values of the data in a fused chain of processors
+    (please refer to `qlib.data.dataset.pipeline`)
+
+    The processor must be separable by column: the result of a column only depends on the column itself (and on the
+    other rows of the same datetime for the cross sectional processors).
+    """
+
+    def __init__(self, positions: np.ndarray, func: Callable, dtype=None, sort_index: bool = False):
+        """
+        Parameters
+        ----------
+        positions : np.ndarray
+            the positions of the columns processed by the processor
+        func : Callable
+            `func(values, idx, starts)` processes `values`, the rows of some whole datetimes (starting at the rows
+            `starts`) and the columns `positions[idx]`. It returns the results or None if `values` is changed inplace.
+        dtype :
+            the dtype of the results; None for the dtype of the data
+        sort_index : bool
+            the processor sorts the index of the data (the results of the fused chain are sorted)
+        """
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.func = func
+        self.dtype = dtype
+        self.sort_index = sort_index
+
+
 class Processor(Serializable):
     def fit(self, df: pd.DataFrame = None):
         """
@@ -79,6 +164,34 @@ class Processor(Serializable):
         """
         return False
 
+    def fit_stream(self, chunks: Iterable[pd.DataFrame]):
+        """
+        Fit the processor on the data given by chunks of time (please refer to `DataHandlerLP(chunk_freq=...)`)
+
+        By default, the rows of the chunks in [`fit_start_time`, `fit_end_time`] (if the processor has them) are
+        concatenated to call `fit`. The processors whose states could be accumulated chunk by chunk should override it
+        to avoid loading all the fitting data in memory.
+        """
+        fit_range = slice(getattr(self, "fit_start_time", None), getattr(self, "fit_end_time", None))
+        self.fit(pd.concat([fetch_df_by_index(df, fit_range, level="datetime") for df in chunks]))
+
+    def fusable(self) -> bool:
+        """
+        Can the processor be fused with the neighbouring fusable processors (please refer to `fuse`)
+
+        The chains of the fusable processors are applied on the numpy values of the data in a single pass when
+        `DataHandlerLP(fuse_processors=True)`.
+        """
+        return False
+
+    def fuse(self, columns: pd.Index) -> FusedOp:
+        """
+        The fused form of the processor on the data with the `columns` (it is called after `fit`)
+
+        It should give the same results as `__call__`.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} can't be fused")
+
     def config(self, **kwargs):
         attr_list = {"fit_start_time", "fit_end_time"}
         for k, v in kwargs.items():
@@ -157,6 +270,16 @@ class TanhProcess(Processor):
 
         return tanh_denoise(df)
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def tanh_denoise(values, idx, starts):
+            values -= 1
+            np.tanh(values, out=values)
+
+        return FusedOp(np.flatnonzero(~columns.get_level_values(1).str.contains("LABEL")), tanh_denoise)
+
 
 class ProcessInf(Processor):
     """Process infinity"""
@@ -175,6 +298,19 @@ class ProcessInf(Processor):
 
         return replace_inf(df)
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def replace_inf(values, idx, starts):
+            # replaced by the mean of the other values of the same datetime
+            inf = np.isinf(values)
+            if inf.any():
+                values[inf] = cs_fillna(np.where(inf, np.nan, values), starts)[inf]
+
+        # the data are sorted by `datetime_groupby_apply` in `__call__`
+        return FusedOp(np.arange(len(columns)), replace_inf, sort_index=True)
+
 
 class Fillna(Processor):
     """Process NaN"""
@@ -192,6 +328,21 @@ class Fillna(Processor):
             df[self.fields_group] = df[self.fields_group].fillna(self.fill_value)
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def fillna(values, idx, starts):
+            values[np.isnan(values)] = self.fill_value
+
+        return FusedOp(get_group_positions(columns, self.fields_group), fillna)
+
+
+def _float_dtype(df: pd.DataFrame) -> np.dtype:
+    """the dtype of the fitted parameters of the data (float64 if the data are not all of the same float dtype)"""
+    dtypes = df.dtypes.unique()
+    return dtypes[0] if len(dtypes) == 1 and dtypes[0].kind == "f" else np.dtype(np.float64)
+
 
 class MinMaxNorm(Processor):
     def __init__(self, fit_start_time, fit_end_time, fields_group=None):
@@ -204,8 +355,34 @@ class MinMaxNorm(Processor):
     def fit(self, df: pd.DataFrame = None):
         df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
         cols = get_group_columns(df, self.fields_group)
-        self.min_val = np.nanmin(df[cols].values, axis=0)
-        self.max_val = np.nanmax(df[cols].values, axis=0)
+        self._set_params(np.nanmin(df[cols].values, axis=0), np.nanmax(df[cols].values, axis=0), cols)
+
+    def fit_stream(self, chunks):
+        cols = dtype = min_val = max_val = None
+        for df in chunks:
+            if cols is None:
+                cols = get_group_columns(df, self.fields_group)
+                dtype = _float_dtype(df[cols])
+            df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
+            if len(df) == 0:
+                continue
+            values = df[cols].values
+            # fmin/fmax ignore NaN
+            chunk_min, chunk_max = np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0)
+            min_val = chunk_min if min_val is None else np.fmin(min_val, chunk_min)
+            max_val = chunk_max if max_val is None else np.fmax(max_val, chunk_max)
+        if cols is None:
+            raise ValueError("MinMaxNorm can't be fitted without any data")
+        if min_val is None:
+            get_module_logger("MinMaxNorm").warning(
+                f"No data in [{self.fit_start_time}, {self.fit_end_time}] to fit, the data will be NaN"
+            )
+            min_val = max_val = np.full(len(cols), np.nan, dtype=dtype)
+        self._set_params(min_val, max_val, cols)
+
+    def _set_params(self, min_val: np.ndarray, max_val: np.ndarray, cols: pd.Index):
+        self.min_val = min_val
+        self.max_val = max_val
         self.ignore = self.min_val == self.max_val
         # To improve the speed, we set the value of `min_val` to `0` for the columns that do not need to be processed,
         # and the value of `max_val` to `1`, when using `(x - min_val) / (max_val - min_val)` for uniform calculation,
@@ -224,6 +401,16 @@ class MinMaxNorm(Processor):
         df.loc(axis=1)[self.cols] = normalize(df[self.cols].values)
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def normalize(values, idx, starts):
+            values -= self.min_val[idx]
+            values /= self.max_val[idx] - self.min_val[idx]
+
+        return FusedOp(columns.get_indexer(self.cols), normalize)
+
 
 class ZScoreNorm(Processor):
     """ZScore Normalization"""
@@ -238,8 +425,45 @@ class ZScoreNorm(Processor):
     def fit(self, df: pd.DataFrame = None):
         df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
         cols = get_group_columns(df, self.fields_group)
-        self.mean_train = np.nanmean(df[cols].values, axis=0)
-        self.std_train = np.nanstd(df[cols].values, axis=0)
+        self._set_params(np.nanmean(df[cols].values, axis=0), np.nanstd(df[cols].values, axis=0), cols)
+
+    def fit_stream(self, chunks):
+        # the count, mean and sum of the squared deviations of each column, merged chunk by chunk (Chan et al.)
+        cols = dtype = count = mean = m2 = None
+        for df in chunks:
+            if cols is None:
+                cols = get_group_columns(df, self.fields_group)
+                dtype = _float_dtype(df[cols])
+            df = fetch_df_by_index(df, slice(self.fit_start_time, self.fit_end_time), level="datetime")
+            if len(df) == 0:
+                continue
+            values = df[cols].values
+            valid = ~np.isnan(values)
+            chunk_count = valid.sum(axis=0)
+            chunk_mean = np.nansum(values, axis=0, dtype=np.float64) / np.maximum(chunk_count, 1)
+            chunk_m2 = np.square(np.where(valid, values - chunk_mean, 0), dtype=np.float64).sum(axis=0)
+            if count is None:
+                count, mean, m2 = chunk_count, chunk_mean, chunk_m2
+            else:
+                total = np.maximum(count + chunk_count, 1)
+                delta = chunk_mean - mean
+                mean = mean + delta * chunk_count / total
+                m2 = m2 + chunk_m2 + delta**2 * count * chunk_count / total
+                count = count + chunk_count
+        if cols is None:
+            raise ValueError("ZScoreNorm can't be fitted without any data")
+        if count is None:
+            get_module_logger("ZScoreNorm").warning(
+                f"No data in [{self.fit_start_time}, {self.fit_end_time}] to fit, the data will be NaN"
+            )
+            count, mean, m2 = np.zeros(len(cols)), np.zeros(len(cols)), np.zeros(len(cols))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean, std = np.where(count > 0, mean, np.nan), np.sqrt(m2 / count)
+        self._set_params(mean.astype(dtype), std.astype(dtype), cols)
+
+    def _set_params(self, mean_train: np.ndarray, std_train: np.ndarray, cols: pd.Index):
+        self.mean_train = mean_train
+        self.std_train = std_train
         self.ignore = self.std_train == 0
         # To improve the speed, we set the value of `std_train` to `1` for the columns that do not need to be processed,
         # and the value of `mean_train` to `0`, when using `(x - mean_train) / std_train` for uniform calculation,
@@ -258,6 +482,16 @@ class ZScoreNorm(Processor):
         df.loc(axis=1)[self.cols] = normalize(df[self.cols].values)
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def normalize(values, idx, starts):
+            values -= self.mean_train[idx]
+            values /= self.std_train[idx]
+
+        return FusedOp(columns.get_indexer(self.cols), normalize)
+
 
 class RobustZScoreNorm(Processor):
     """Robust ZScore Normalization
@@ -296,6 +530,18 @@ class RobustZScoreNorm(Processor):
         df[self.cols] = X
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def normalize(values, idx, starts):
+            values -= self.mean_train[idx]
+            values /= self.std_train[idx]
+            if self.clip_outlier:
+                np.clip(values, -3, 3, out=values)
+
+        return FusedOp(columns.get_indexer(self.cols), normalize)
+
 
 class CSZScoreNorm(Processor):
     """Cross Sectional ZScore Normalization"""
@@ -313,15 +559,31 @@ class CSZScoreNorm(Processor):
         # try not modify original dataframe
         if not isinstance(self.fields_group, list):
             self.fields_group = [self.fields_group]
+        # the custom zscore functions are applied by pandas
+        cs_func = {zscore: cs_zscore, robust_zscore: cs_robust_zscore}.get(self.zscore_func)
         # depress warning by references:
         # https://stackoverflow.com/questions/20625582/how-to-deal-with-settingwithcopywarning-in-pandas
         # https://pandas.pydata.org/pandas-docs/stable/user_guide/options.html#getting-and-setting-options
         with pd.option_context("mode.chained_assignment", None):
             for g in self.fields_group:
                 cols = get_group_columns(df, g)
-                df[cols] = df[cols].groupby("datetime", group_keys=False).apply(self.zscore_func)
+                if cs_func is None:
+                    df[cols] = df[cols].groupby("datetime", group_keys=False).apply(self.zscore_func)
+                else:
+                    df[cols] = cs_apply(df, cols, cs_func)
         return df
 
+    def fusable(self):
+        return self.zscore_func in (zscore, robust_zscore)
+
+    def fuse(self, columns):
+        if not isinstance(self.fields_group, list):
+            self.fields_group = [self.fields_group]
+        cs_func = cs_zscore if self.zscore_func is zscore else cs_robust_zscore
+        return FusedOp(
+            get_group_positions(columns, self.fields_group), lambda values, idx, starts: cs_func(values, starts)
+        )
+
 
 class CSRankNorm(Processor):
     """
@@ -352,12 +614,24 @@ class CSRankNorm(Processor):
     def __call__(self, df):
         # try not modify original dataframe
         cols = get_group_columns(df, self.fields_group)
-        t = df[cols].groupby("datetime", group_keys=False).rank(pct=True)
+        t = cs_apply(df, cols, cs_rank, dtype=np.float64)
         t -= 0.5
         t *= 3.46  # NOTE: towards unit std
         df[cols] = t
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        def rank_norm(values, idx, starts):
+            t = cs_rank(values, starts)
+            t -= 0.5
+            t *= 3.46  # NOTE: towards unit std
+            return t
+
+        return FusedOp(get_group_positions(columns, self.fields_group), rank_norm, dtype=np.float64)
+
 
 class CSZFillna(Processor):
     """Cross Sectional Fill Nan"""
@@ -367,9 +641,17 @@ class CSZFillna(Processor):
 
     def __call__(self, df):
         cols = get_group_columns(df, self.fields_group)
-        df[cols] = df[cols].groupby("datetime", group_keys=False).apply(lambda x: x.fillna(x.mean()))
+        df[cols] = cs_apply(df, cols, cs_fillna)
         return df
 
+    def fusable(self):
+        return True
+
+    def fuse(self, columns):
+        return FusedOp(
+            get_group_positions(columns, self.fields_group), lambda values, idx, starts: cs_fillna(values, starts)
+        )
+
 
 class HashStockFormat(Processor):
     """Process the storage of from df into hasing stock format"""
@@ -380,6 +662,22 @@ class HashStockFormat(Processor):
         return HashingStockStorage.from_df(df)
 
 
+class DatetimeOffsetFormat(Processor):
+    """
+    Process the storage of from df into datetime offset format (for fetching many small slices of dates)
+
+    NOTE: it should be the last processor, because the data are not a DataFrame anymore
+    """
+
+    def __call__(self, df: pd.DataFrame):
+        from .storage import DatetimeOffsetStorage  # pylint: disable=C0415
+
+        return DatetimeOffsetStorage.from_df(df)
+
+    def readonly(self):
+        return True
+
+
 class TimeRangeFlt(InstProcessor):
     """
     This is a filter to filter stock.
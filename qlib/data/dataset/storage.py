@@ -1,9 +1,14 @@
 from abc import abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+import pickle
+import tempfile
 import pandas as pd
 import numpy as np
 
 from .handler import DataHandler
-from typing import Union, List
+from typing import Iterator, Union, List
 from qlib.log import get_module_logger
 
 from .utils import get_level_index, fetch_df_by_index, fetch_df_by_col
@@ -189,3 +194,295 @@ class HashingStockStorage(BaseHandlerStorage):
             return fetch_stock_df_list[0]
         else:
             return pd.concat(fetch_stock_df_list, sort=False, copy=~fetch_orig)
+
+
+class ChunkedHandlerStorage(BaseHandlerStorage):
+    """Chunked data storage for datahandler
+    - The data which don't fit in memory are persisted to disk by chunks of time (one pickle file for each chunk),
+      please refer to `DataHandlerLP(chunk_freq=...)`
+    - `fetch` only loads the chunks overlapping the selected time range, and the last loaded chunks are kept in memory
+      (e.g. for fetching many small daily slices)
+    - `iter_chunks` streams the data chunk by chunk
+    """
+
+    def __init__(self, chunk_dir: Union[str, Path, None] = None, cache_size: int = 2):
+        """
+        Parameters
+        ----------
+        chunk_dir : Union[str, Path, None]
+            the directory of the chunk files; a temporary directory (removed with the storage) is used if it is None,
+            and then the storage can't be pickled
+        cache_size : int
+            the number of the loaded chunks kept in memory
+        """
+        if chunk_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix="qlib_chunks_")
+            chunk_dir = self._tmp_dir.name
+        self.chunk_dir = Path(chunk_dir)
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self.starts = []
+        self.stops = []
+        self.paths = []
+        self.columns = None
+        self.index_names = None
+        self._cache = OrderedDict()
+
+    def __getstate__(self):
+        if hasattr(self, "_tmp_dir"):
+            # the temporary directory is removed with this storage, so the unpickled one would miss the chunk files
+            raise pickle.PicklingError(
+                "The chunks in a temporary directory can't be pickled, please set `chunk_dir` of the handler "
+                "to persist them"
+            )
+        state = self.__dict__.copy()
+        state["_cache"] = OrderedDict()
+        return state
+
+    def append(self, df: pd.DataFrame, start_time, stop_time=None):
+        """
+        persist `df` as a new chunk (the chunks must be appended in time order)
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            the data of the chunk
+        start_time :
+            the start of the chunk
+        stop_time :
+            the (exclusive) end of the chunk, i.e. the start of the next chunk; None for the last chunk
+        """
+        if len(self.stops) > 0 and (self.stops[-1] is None or pd.Timestamp(start_time) < self.stops[-1]):
+            raise ValueError(f"The chunk starting at {start_time} overlaps the previous chunk")
+        if self.columns is None:
+            self.columns, self.index_names = df.columns, df.index.names
+        path = self.chunk_dir / f"chunk_{len(self.paths):05d}.pkl"
+        df.to_pickle(path)
+        self.starts.append(pd.Timestamp(start_time))
+        self.stops.append(None if stop_time is None else pd.Timestamp(stop_time))
+        self.paths.append(path)
+
+    def clear(self):
+        """remove the chunk files"""
+        for path in self.paths:
+            path.unlink(missing_ok=True)
+        self.starts, self.stops, self.paths = [], [], []
+        self._cache.clear()
+
+    def _load_chunk(self, i: int) -> pd.DataFrame:
+        if i in self._cache:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+        df = pd.read_pickle(self.paths[i])
+        self._cache[i] = df
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return df
+
+    def _select_chunks(self, selector, level) -> List[int]:
+        """the chunks which may contain the data of the selector"""
+        if level is not None and (
+            level == "datetime" or isinstance(level, int) and self.index_names[level] == "datetime"
+        ):
+            if isinstance(selector, (str, pd.Timestamp)):
+                selector = slice(selector, selector)
+            if isinstance(selector, slice):
+                # the chunks ending before the start and starting after the stop are skipped (the partial date
+                # strings, e.g. "2020-01", are handled by pandas). The first and the last chunks are not bounded.
+                first = pd.DatetimeIndex(self.stops[:-1]).slice_indexer(selector.start, None).start or 0
+                last = pd.DatetimeIndex(self.starts[1:]).slice_indexer(None, selector.stop).stop
+                return list(range(first, len(self.paths) if last is None else last + 1))
+        return list(range(len(self.paths)))
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self._load_chunk(0).head(n)
+
+    def iter_chunks(
+        self,
+        selector: Union[pd.Timestamp, slice, str, pd.Index] = slice(None, None),
+        level: Union[str, int] = "datetime",
+        col_set: Union[str, List[str]] = DataHandler.CS_ALL,
+    ) -> Iterator[pd.DataFrame]:
+        """fetch the data chunk by chunk (the empty chunks are skipped)"""
+        if isinstance(selector, (tuple, list)) and level is not None:
+            try:
+                selector = slice(*selector)
+            except ValueError:
+                get_module_logger("DataHandlerLP").info(f"Fail to converting to query to slice. It will used directly")
+        for i in self._select_chunks(selector, level):
+            data_df = fetch_df_by_col(self._load_chunk(i), col_set)
+            try:
+                data_df = fetch_df_by_index(data_df, selector, level)
+            except KeyError:
+                # e.g. the selected date is in another chunk
+                continue
+            if len(data_df) > 0:
+                yield data_df
+
+    def fetch(
+        self,
+        selector: Union[pd.Timestamp, slice, str, pd.Index] = slice(None, None),
+        level: Union[str, int] = "datetime",
+        col_set: Union[str, List[str]] = DataHandler.CS_ALL,
+        fetch_orig: bool = True,
+    ) -> pd.DataFrame:
+        fetch_df_list = list(self.iter_chunks(selector=selector, level=level, col_set=col_set))
+        if len(fetch_df_list) == 0:
+            if not isinstance(selector, (slice, tuple, list)):
+                raise KeyError(selector)
+            return fetch_df_by_col(self.head(0), col_set)
+        elif len(fetch_df_list) == 1:
+            return fetch_df_list[0]
+        return pd.concat(fetch_df_list, sort=False)
+
+
+class DatetimeOffsetStorage(BaseHandlerStorage):
+    """Datetime offset data storage for datahandler
+    - The default data storage pandas.DataFrame is slow when fetching many small slices of dates (e.g. the daily
+      samples of the graph models)
+    - DatetimeOffsetStorage keeps the data sorted by <datetime, instrument> with
+        - the row offsets of the dates: the rows of the i-th date are `offsets[i]:offsets[i + 1]`
+        - the code table of the instruments: the instrument of each row is `instruments[inst_codes[row]]`
+    - By the `fetch` method, the data of a date range is a slice of the numpy values (no copy), and the data of some
+      instruments in a date range is taken by the codes of the instruments. The other selectors are applied on the
+      DataFrame as `NaiveDFStorage` does.
+
+    NOTE: the data are fetched in <datetime, instrument> order whatever the selector is.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if get_level_index(df, "datetime") == 1:
+            df = df.swaplevel()
+        dates, date_codes = self._factorize(df.index.get_level_values(0))
+        instruments, inst_codes = self._factorize(df.index.get_level_values(1))
+        order = np.lexsort((inst_codes, date_codes))
+        if (np.diff(order) != 1).any():
+            df, date_codes, inst_codes = df.iloc[order], date_codes[order], inst_codes[order]
+        self.index = pd.MultiIndex(
+            levels=[dates, instruments], codes=[date_codes, inst_codes], names=df.index.names, verify_integrity=False
+        )
+        if df.dtypes.nunique() == 1:
+            # the values are sliced when fetching (it's a view of the values of the data in a single block)
+            self.values = df.to_numpy()
+            self.df = pd.DataFrame(self.values, index=self.index, columns=df.columns, copy=False)
+        else:
+            self.values = None
+            self.df = df.set_axis(self.index, axis=0)
+        self.dates = dates
+        self.offsets = np.searchsorted(date_codes, np.arange(len(dates) + 1))
+        self.instruments = instruments
+        self.inst_codes = inst_codes
+        self._col_cache = {}
+
+    @staticmethod
+    def from_df(df):
+        return DatetimeOffsetStorage(df)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self.df.head(n)
+
+    @staticmethod
+    def _factorize(values: pd.Index):
+        codes, uniques = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int16 if len(uniques) < 2**15 else np.int32)
+        return uniques, codes
+
+    def _get_cols(self, col_set):
+        """the positions and the names of the columns of `col_set`"""
+        key = col_set if isinstance(col_set, str) else tuple(col_set)
+        if key not in self._col_cache:
+            template = pd.DataFrame([np.arange(len(self.df.columns))], columns=self.df.columns)
+            template = fetch_df_by_col(template, col_set)
+            positions = template.values[0]
+            if len(positions) > 0 and (np.diff(positions) == 1).all():
+                # a slice of the columns is a view
+                positions = slice(positions[0], positions[-1] + 1)
+            self._col_cache[key] = positions, template.columns
+        return self._col_cache[key]
+
+    def _date_range(self, selector) -> Union[slice, None]:
+        """the range of the dates of the datetime selector (None if it is not supported)"""
+        if isinstance(selector, slice) and selector.step is None:
+            return self.dates.slice_indexer(selector.start, selector.stop)
+        if isinstance(selector, (str, datetime, np.datetime64)):
+            loc = self.dates.get_loc(selector)
+            if isinstance(loc, (int, np.integer)):
+                return slice(loc, loc + 1)
+            if isinstance(loc, slice) and loc.step in (None, 1):
+                return loc
+        return None
+
+    def _inst_codes(self, selector) -> Union[np.ndarray, None]:
+        """the codes of the instruments of the instrument selector (None for all the instruments)"""
+        if isinstance(selector, slice):
+            return None
+        selector = [selector] if isinstance(selector, str) else list(selector)
+        codes = self.instruments.get_indexer(selector)
+        if (codes < 0).any():
+            raise KeyError([inst for inst, code in zip(selector, codes) if code < 0])
+        return codes
+
+    def _parse_selector(self, selector, level) -> Union[tuple, None]:
+        """the datetime selector and the instrument selector (None if the selector is not supported)"""
+        if level is None:
+            if isinstance(selector, slice):
+                return selector, slice(None)
+            if not isinstance(selector, tuple) or len(selector) != 2:
+                return None
+            time_selector, stock_selector = selector
+            if isinstance(time_selector, (str, datetime, np.datetime64)) and isinstance(stock_selector, str):
+                # a single row is selected as a series
+                return None
+        elif level in ("datetime", 0) and not isinstance(selector, pd.MultiIndex):
+            time_selector, stock_selector = selector, slice(None)
+        elif level in ("instrument", 1):
+            time_selector, stock_selector = slice(None), selector
+        else:
+            return None
+        if isinstance(stock_selector, slice):
+            if stock_selector != slice(None):
+                return None
+        elif not isinstance(stock_selector, (str, list, pd.Index, np.ndarray)):
+            return None
+        return time_selector, stock_selector
+
+    def fetch(
+        self,
+        selector: Union[pd.Timestamp, slice, str, pd.Index] = slice(None, None),
+        level: Union[str, int] = "datetime",
+        col_set: Union[str, List[str]] = DataHandler.CS_ALL,
+        fetch_orig: bool = True,
+    ) -> pd.DataFrame:
+        if isinstance(selector, (tuple, list)) and level is not None:
+            try:
+                selector = slice(*selector)
+            except ValueError:
+                get_module_logger("DataHandlerLP").info(f"Fail to converting to query to slice. It will used directly")
+
+        parsed = self._parse_selector(selector, level)
+        dates = None if parsed is None else self._date_range(parsed[0])
+        if dates is None:
+            data_df = fetch_df_by_col(self.df, col_set)
+            return fetch_df_by_index(data_df, selector, level, fetch_orig=fetch_orig)
+
+        rows = slice(self.offsets[dates.start], self.offsets[dates.stop])
+        codes = self._inst_codes(parsed[1])
+        if codes is not None:
+            member = np.zeros(len(self.instruments), dtype=bool)
+            member[codes] = True
+            rows = rows.start + np.flatnonzero(member[self.inst_codes[rows]])
+        positions, columns = self._get_cols(col_set)
+        if self.values is None:
+            data_df = self.df.iloc[rows, positions]
+            data_df.columns = columns
+        else:
+            # a view of the values if both the rows and the columns are slices
+            values = self.values[rows][:, positions]
+            index = pd.MultiIndex(
+                levels=self.index.levels,
+                codes=[level_codes[rows] for level_codes in self.index.codes],
+                names=self.index.names,
+                verify_integrity=False,
+            )
+            data_df = pd.DataFrame(values, index=index, columns=columns, copy=not fetch_orig)
+        return data_df
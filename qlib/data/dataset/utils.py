@@ -1,8 +1,9 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from typing import Union, List, TYPE_CHECKING
+from typing import Dict, Union, List, TYPE_CHECKING
 from qlib.utils import init_instance_by_config
 
 if TYPE_CHECKING:
@@ -116,6 +117,36 @@ def convert_index_format(df: Union[pd.DataFrame, pd.Series], level: str = "datet
     return df
 
 
+def get_frame_buffers(df: pd.DataFrame) -> Dict[int, int]:
+    """
+    Get the memory buffers of the values and the index of `df`
+
+    The DataFrames sharing the data (e.g. the columns which are not copied thanks to the Copy-on-Write of pandas)
+    share the buffers.
+
+    Returns
+    -------
+    Dict[int, int]
+        {the id of the buffer: the bytes of the buffer}
+    """
+    arrays = [col.values for _, col in df.items()]
+    if isinstance(df.index, pd.MultiIndex):
+        arrays += list(df.index.codes) + [level.values for level in df.index.levels]
+    else:
+        arrays.append(df.index.values)
+    buffers = {}
+    for arr in arrays:
+        if isinstance(arr, np.ndarray):
+            # the array owning the memory
+            while isinstance(arr.base, np.ndarray):
+                arr = arr.base
+            buffers[arr.__array_interface__["data"][0]] = arr.nbytes
+        else:
+            # the extension arrays
+            buffers[id(arr)] = arr.nbytes
+    return buffers
+
+
 def init_task_handler(task: dict) -> DataHandler:
     """
     initialize the handler part of the task **inplace**
@@ -10,6 +10,7 @@ import numpy as np
 import abc
 
 from .data import Cal, DatasetD
+from .membership import InstrumentMembership
 
 
 class BaseDFilter(abc.ABC):
@@ -59,7 +60,7 @@ class SeriesDFilter(BaseDFilter):
 
     Override __init__ to assign a certain rule to filter the series.
 
-    Override _getFilterSeries to use the rule to filter the series and get a dict of {inst => series}, or override filter_main for more advanced series filter rule
+    Override _getFilterSeries to use the rule to filter the series and get a dict of {inst => series}, or override _getFilterFrame to evaluate the rule on all the instruments at once, or override filter_main for more advanced series filter rule
     """
 
     def __init__(self, fstart_time=None, fend_time=None, keep=False):
@@ -233,33 +234,65 @@ class SeriesDFilter(BaseDFilter):
         lbound, ubound = self._getTimeBound(instruments)
         start_time = pd.Timestamp(start_time or lbound)
         end_time = pd.Timestamp(end_time or ubound)
-        _instruments_filtered = {}
         _all_calendar = Cal.calendar(start_time=start_time, end_time=end_time, freq=self.filter_freq)
         _filter_calendar = Cal.calendar(
             start_time=self.filter_start_time and max(self.filter_start_time, _all_calendar[0]) or _all_calendar[0],
             end_time=self.filter_end_time and min(self.filter_end_time, _all_calendar[-1]) or _all_calendar[-1],
             freq=self.filter_freq,
         )
-        _all_filter_series = self._getFilterSeries(instruments, _filter_calendar[0], _filter_calendar[-1])
-        for inst, timestamp in instruments.items():
-            # Construct a whole map of date
-            _timestamp_series = self._toSeries(_all_calendar, timestamp)
-            # Get filter series
-            if inst in _all_filter_series:
-                _filter_series = _all_filter_series[inst]
-            else:
-                if self.keep:
-                    _filter_series = pd.Series({timestamp: True for timestamp in _filter_calendar})
-                else:
-                    _filter_series = pd.Series({timestamp: False for timestamp in _filter_calendar})
-            # Calculate bool value within the range of filter
-            _timestamp_series = self._filterSeries(_timestamp_series, _filter_series)
-            # Reform the map to (start_timestamp, end_timestamp) format
-            _timestamp = self._toTimestamp(_timestamp_series)
-            # Remove empty timestamp
-            if _timestamp:
-                _instruments_filtered[inst] = _timestamp
-        return _instruments_filtered
+        _filter_frame = self._getFilterFrame(instruments, _filter_calendar[0], _filter_calendar[-1])
+        # the membership matrix (calendar x instrument) of the instruments
+        membership = InstrumentMembership(instruments, _all_calendar)
+        _mask = membership.mask()
+        # the filter series of an instrument is applied from its first timestamp to its last one, and the instruments
+        # without filter series are filtered (or kept) on the whole filter calendar
+        _filter_frame = _filter_frame.reindex(columns=membership.instruments)
+        _present = _filter_frame.notna().to_numpy()
+        _has_series = _present.any(axis=0)
+        _fstart = np.full(len(_has_series), pd.Timestamp(_filter_calendar[0]).to_datetime64().astype("datetime64[ns]"))
+        _fend = np.full(len(_has_series), pd.Timestamp(_filter_calendar[-1]).to_datetime64().astype("datetime64[ns]"))
+        if _has_series.any():
+            _index = pd.DatetimeIndex(_filter_frame.index, dtype="datetime64[ns]").values
+            _fstart[_has_series] = _index[_present.argmax(axis=0)][_has_series]
+            _fend[_has_series] = _index[len(_present) - 1 - _present[::-1].argmax(axis=0)][_has_series]
+        _window_start = membership.calendar.values.searchsorted(_fstart, side="left")
+        _window_end = membership.calendar.values.searchsorted(_fend, side="right")
+        _rows = np.arange(len(_mask))[:, None]
+        _in_window = (_rows >= _window_start) & (_rows < _window_end)
+        # the missing values are False, and the NaN values are True (the same as `astype("bool")`)
+        _filter_values = _filter_frame.reindex(index=membership.calendar).eq(True).to_numpy(copy=True)
+        if self.keep:
+            _filter_values[:, ~_has_series] = True
+        _mask &= ~_in_window | _filter_values
+        # Reform the map to (start_timestamp, end_timestamp) format and remove empty timestamp
+        return membership.to_spans(_mask)
+
+    def _getFilterFrame(self, instruments, fstart, fend):
+        """Get the filter values of all the instruments at once.
+
+        The default implementation assembles the results of `_getFilterSeries`; override it if the rule is evaluated
+        on all the instruments at once.
+
+        Parameters
+        ----------
+        instruments : dict
+            the dict of instruments to be filtered.
+        fstart : pd.Timestamp
+            start time of filter.
+        fend : pd.Timestamp
+            end time of filter.
+
+        Returns
+        ----------
+        pd.DataFrame
+            the index is the timestamps and the columns are the instruments; the values are the bool values of the
+            filter series, and NaN if the timestamp is missing in the filter series of the instrument.
+        """
+        _all_filter_series = self._getFilterSeries(instruments, fstart, fend)
+        if isinstance(_all_filter_series, pd.Series):
+            # the series of all the instruments indexed by <instrument, datetime>
+            return _all_filter_series.astype("bool").unstack(level=0)
+        return pd.DataFrame({inst: series.astype("bool") for inst, series in _all_filter_series.items()})
 
 
 class NameDFilter(SeriesDFilter):
@@ -292,6 +325,15 @@ class NameDFilter(SeriesDFilter):
             all_filter_series[inst] = _filter_series
         return all_filter_series
 
+    def _getFilterFrame(self, instruments, fstart, fend):
+        filter_calendar = Cal.calendar(start_time=fstart, end_time=fend, freq=self.filter_freq)
+        matched = [re.match(self.name_rule_re, inst) is not None for inst in instruments]
+        return pd.DataFrame(
+            np.tile(np.array(matched, dtype=bool), (len(filter_calendar), 1)),
+            index=pd.DatetimeIndex(filter_calendar),
+            columns=list(instruments),
+        )
+
     @staticmethod
     def from_config(config):
         return NameDFilter(
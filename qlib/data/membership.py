@@ -0,0 +1,137 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+The membership index of the instruments of a market, which is built once for each market and cached in `H["i"]`
+by `LocalInstrumentProvider`.
+"""
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+class InstrumentMembership:
+    """The membership of the instruments of a market on the days of a calendar
+
+    The spans of the instruments ``{instrument: [(start_time, end_time), ...]}`` are indexed in two forms:
+
+    - the span table: the instrument, the start time and the end time of each span as arrays, which are clipped by a
+      time range at once in `spans`
+    - the membership matrix (calendar x instrument) packed by `np.packbits`: the row of a day holds one bit for each
+      instrument, so the members on a day are unpacked from one row (`members`) and the spans on the calendar are
+      extracted from the runs of the bits (`to_spans`). The matrix takes ``len(calendar) * len(instruments) / 8``
+      bytes (e.g. 2.5MB for 4000 days x 5000 instruments); it is built on the first call of `members` or `mask`.
+
+    Parameters
+    ----------
+    spans : dict
+        {instrument => list of (start_time, end_time)}; the order of the instruments is kept in the results.
+    calendar : list
+        the calendar of the matrix.
+    """
+
+    def __init__(self, spans: Dict[str, list], calendar):
+        self.instruments = list(spans)
+        self.calendar = pd.DatetimeIndex(calendar, dtype="datetime64[ns]")
+        counts = np.fromiter(map(len, spans.values()), dtype=np.int64, count=len(spans))
+        self._span_inst = np.repeat(np.arange(len(spans)), counts)
+        _flat = [span for _spans in spans.values() for span in _spans]
+        self._span_start = pd.DatetimeIndex([s for s, _ in _flat], dtype="datetime64[ns]").values
+        self._span_end = pd.DatetimeIndex([e for _, e in _flat], dtype="datetime64[ns]").values
+
+        # the membership matrix is only built when it's needed (e.g. not by `spans` or `active` of `list_instruments`)
+        self._bits = None
+
+    def _get_bits(self) -> np.ndarray:
+        """the packed membership matrix (calendar x instrument)"""
+        if self._bits is None:
+            # the spans on the calendar: [pos_start, pos_end) of the calendar index
+            pos_start = self.calendar.values.searchsorted(self._span_start, side="left")
+            pos_end = self.calendar.values.searchsorted(self._span_end, side="right")
+            mask = np.zeros((len(self.calendar), len(self.instruments)), dtype=bool)
+            for i, s, e in zip(self._span_inst.tolist(), pos_start.tolist(), pos_end.tolist()):
+                mask[s:e, i] = True
+            self._bits = np.packbits(mask, axis=1)
+        return self._bits
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = self._span_inst.nbytes + self._span_start.nbytes + self._span_end.nbytes
+        return nbytes if self._bits is None else nbytes + self._bits.nbytes
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.nbytes
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def spans(self, start_time=None, end_time=None) -> Dict[str, list]:
+        """the spans clipped by [start_time, end_time]; the instruments without any span in the range are dropped"""
+        start = self._span_start if start_time is None else np.maximum(self._span_start, _to_datetime64(start_time))
+        end = self._span_end if end_time is None else np.minimum(self._span_end, _to_datetime64(end_time))
+        keep = start <= end
+        res = {}
+        for i, s, e in zip(
+            self._span_inst[keep].tolist(), pd.DatetimeIndex(start[keep]).tolist(), pd.DatetimeIndex(end[keep]).tolist()
+        ):
+            res.setdefault(self.instruments[i], []).append((s, e))
+        return res
+
+    def active(self, start_time=None, end_time=None) -> List[str]:
+        """the instruments with any span in [start_time, end_time], i.e. ``list(self.spans(start_time, end_time))``"""
+        keep = np.ones(len(self._span_inst), dtype=bool)
+        if start_time is not None:
+            keep &= self._span_end >= _to_datetime64(start_time)
+        if end_time is not None:
+            keep &= self._span_start <= _to_datetime64(end_time)
+        return [self.instruments[i] for i in np.unique(self._span_inst[keep]).tolist()]
+
+    def members(self, date) -> List[str]:
+        """the members on the last day of the calendar on or before `date`"""
+        pos = self.calendar.searchsorted(pd.Timestamp(date), side="right") - 1
+        if pos < 0:
+            return []
+        row = np.unpackbits(self._get_bits()[pos], count=len(self.instruments)).view(bool)
+        return [self.instruments[i] for i in np.flatnonzero(row).tolist()]
+
+    def mask(self, start_index: int = 0, end_index: Union[int, None] = None) -> np.ndarray:
+        """the membership matrix (bool, calendar x instrument) of the calendar index in [start_index, end_index]"""
+        end_index = len(self.calendar) - 1 if end_index is None else end_index
+        return np.unpackbits(self._get_bits()[start_index : end_index + 1], axis=1, count=len(self.instruments)).view(
+            bool
+        )
+
+    def to_spans(self, mask: Union[np.ndarray, None] = None, start_index: int = 0) -> Dict[str, list]:
+        """extract the spans on the calendar from a membership matrix
+
+        Parameters
+        ----------
+        mask : np.ndarray
+            the membership matrix (bool, calendar x instrument) from the calendar index `start_index`, e.g. `mask()`
+            combined with the results of the filters; the matrix of the index is used by default.
+        start_index : int
+            the calendar index of the first row of `mask`.
+
+        Returns
+        ----------
+        dict
+            {instrument => list of (start_time, end_time)}, where the times are the days of the calendar; the
+            instruments without any span are dropped.
+        """
+        if mask is None:
+            mask = self.mask()
+        # the starts and the ends of the runs of True are the +1/-1 edges of each instrument
+        padded = np.zeros((mask.shape[1], mask.shape[0] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask.T
+        edges = np.diff(padded, axis=1)
+        inst, pos_start = np.nonzero(edges == 1)
+        _, pos_end = np.nonzero(edges == -1)
+        calendar = self.calendar[start_index:]
+        res = {}
+        for i, s, e in zip(inst.tolist(), calendar[pos_start].tolist(), calendar[pos_end - 1].tolist()):
+            res.setdefault(self.instruments[i], []).append((s, e))
+        return res
+
+
+def _to_datetime64(time) -> np.datetime64:
+    return pd.Timestamp(time).to_datetime64().astype("datetime64[ns]")
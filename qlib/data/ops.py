@@ -9,14 +9,22 @@ import numpy as np
 import pandas as pd
 
 from typing import Union, List, Type
-from scipy.stats import percentileofscore
 from .base import Expression, ExpressionOps, Feature, PFeature
+from ..config import C
 from ..log import get_module_logger
 from ..utils import get_callable_kwargs
+from ..utils.resam import resam_series
 
 try:
     from ._libs.rolling import rolling_slope, rolling_rsquare, rolling_resi
+    from ._libs.rolling import rolling_var, rolling_std, rolling_skew, rolling_kurt, rolling_wma, ewm_mean
+    from ._libs.rolling import rolling_max, rolling_min, rolling_idxmax, rolling_idxmin, rolling_cov, rolling_corr
+    from ._libs.rolling import rolling_rank, rolling_quantile, rolling_median, rolling_mad
     from ._libs.expanding import expanding_slope, expanding_rsquare, expanding_resi
+    from ._libs.expanding import expanding_var, expanding_std, expanding_skew, expanding_kurt, expanding_wma
+    from ._libs.expanding import expanding_max, expanding_min, expanding_idxmax, expanding_idxmin, expanding_ema
+    from ._libs.expanding import expanding_cov, expanding_corr
+    from ._libs.expanding import expanding_rank, expanding_quantile, expanding_median, expanding_mad
 except ImportError:
     print(
         "#### Do not import qlib package in the repository directory in case of importing qlib from . without compiling #####"
@@ -33,6 +41,98 @@ except ValueError:
 np.seterr(invalid="ignore")
 
 
+def _is_contiguous(valid: np.ndarray) -> bool:
+    """whether the valid rows of each instrument in the panel are contiguous"""
+    if valid.all():
+        return True
+    rows = np.arange(len(valid))[:, None]
+    first = np.where(valid, rows, len(valid)).min(axis=0)
+    last = np.where(valid, rows, -1).max(axis=0)
+    return bool(((last - first + 1 == valid.sum(axis=0)) | ~valid.any(axis=0)).all())
+
+
+def _apply_by_column(func, valid: np.ndarray, *panels) -> pd.DataFrame:
+    """apply `func` to the valid rows of each instrument in the panels
+
+    It is the same as calculating the instruments one by one, so it is used by the operators depending on the
+    positions in the window (e.g. `IdxMax`) or the panels with missing rows in the series of the instruments.
+    """
+    data = next(p for p in panels if isinstance(p, pd.DataFrame))
+    values_l = [p.values if isinstance(p, pd.DataFrame) else None for p in panels]
+    res_l = {}
+    for i in range(valid.shape[1]):
+        mask = valid[:, i]
+        if mask.any():
+            index = data.index[mask]
+            res_l[i] = func(
+                *[
+                    p if values is None else pd.Series(values[mask, i], index=index)
+                    for p, values in zip(panels, values_l)
+                ]
+            )
+    dtype = C.get("expression_dtype", None) or np.result_type(np.float32, *[res.dtype for res in res_l.values()])
+    res = np.full(data.shape, np.nan, dtype=dtype)
+    for i, series in res_l.items():
+        res[valid[:, i], i] = series.values
+    return pd.DataFrame(res, index=data.index, columns=data.columns)
+
+
+def _kernel_dtype():
+    """the dtype of the results of the Cython kernels; the kernels return float64 and accumulate in float64"""
+    return C.get("expression_dtype", None) or np.float64
+
+
+def _to_expression_dtype(data):
+    """cast the float result of an operator to `C.expression_dtype`
+
+    numpy and pandas promote the float32 features to float64 (e.g. the rolling functions and the inputs with mixed
+    dtypes). With `C.expression_dtype = "float32"`, the results of the operators stay float32, so the element-wise
+    operators calculate in float32. The Cython kernels write their results into float32 panels directly, but they
+    accumulate in float64 and the operators based on pandas (e.g. `Sum`, `Corr`) calculate the whole series (or panel)
+    in float64 before the cast. The results which are not float (e.g. bool) are kept.
+    """
+    dtype = C.get("expression_dtype", None)
+    if dtype is None:
+        return data
+    if isinstance(data, pd.DataFrame):
+        kinds = {dt.kind for dt in data.dtypes}
+        if kinds == {"f"} and (data.dtypes != dtype).any():
+            data = data.astype(dtype)
+    elif isinstance(data, (pd.Series, np.ndarray)) and data.dtype.kind == "f" and data.dtype != dtype:
+        data = data.astype(dtype)
+    return data
+
+
+def _apply_kernel(kernel, data, *args):
+    """apply the Cython kernel to the series (or each column of the panel)
+
+    The result is float64, or `C.expression_dtype` if it is set (only one float64 column is alive at a time).
+    """
+    dtype = _kernel_dtype()
+    if isinstance(data, pd.DataFrame):
+        values = data.values
+        res = np.empty(data.shape, dtype=dtype)
+        for i in range(data.shape[1]):
+            res[:, i] = kernel(values[:, i], *args)
+        return pd.DataFrame(res, index=data.index, columns=data.columns)
+    return pd.Series(kernel(data.values, *args).astype(dtype, copy=False), index=data.index)
+
+
+def _apply_pair_kernel(kernel, left, right, *args):
+    """apply the Cython kernel to the pairs without NaN of the series (or the columns of the panels)
+
+    The inputs are aligned in the same way as `pandas.core.window.Rolling.cov`.
+    """
+    left, right = left + 0 * right, right + 0 * left
+    if isinstance(left, pd.DataFrame):
+        values_left, values_right = left.values, right.values
+        res = np.empty(left.shape, dtype=_kernel_dtype())
+        for i in range(left.shape[1]):
+            res[:, i] = kernel(values_left[:, i], values_right[:, i], *args)
+        return pd.DataFrame(res, index=left.index, columns=left.columns)
+    return pd.Series(kernel(left.values, right.values, *args).astype(_kernel_dtype(), copy=False), index=left.index)
+
+
 #################### Element-Wise Operator ####################
 class ElemOperator(ExpressionOps):
     """Element-wise Operator
@@ -93,6 +193,9 @@ class ChangeInstrument(ElemOperator):
     def _load_internal(self, instrument, start_index, end_index, *args):
         return self.feature.load(instrument, start_index, end_index, *args)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        return self._load_panel_by_instrument(instruments, start_index, end_index, *args)
+
 
 class NpElemOperator(ElemOperator):
     """Numpy Element-wise Operator
@@ -116,7 +219,11 @@ class NpElemOperator(ElemOperator):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
-        return getattr(np, self.func)(series)
+        return _to_expression_dtype(getattr(np, self.func)(series))
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        data, valid = self.feature.load_panel(instruments, start_index, end_index, *args)
+        return _to_expression_dtype(getattr(np, self.func)(data)), valid
 
 
 class Abs(NpElemOperator):
@@ -163,6 +270,10 @@ class Sign(NpElemOperator):
         series = series.astype(np.float32)
         return getattr(np, self.func)(series)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        data, valid = self.feature.load_panel(instruments, start_index, end_index, *args)
+        return getattr(np, self.func)(data.astype(np.float32)), valid
+
 
 class Log(NpElemOperator):
     """Feature Log
@@ -208,6 +319,9 @@ class Mask(NpElemOperator):
     def _load_internal(self, instrument, start_index, end_index, *args):
         return self.feature.load(self.instrument, start_index, end_index, *args)
 
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        return self._load_panel_by_instrument(instruments, start_index, end_index, *args)
+
 
 class Not(NpElemOperator):
     """Not Operator
@@ -332,7 +446,21 @@ class NpPairOperator(PairOperator):
         else:
             if check_length and len(series_left) != len(series_right):
                 get_module_logger("ops").debug(warning_info)
-        return res
+        return _to_expression_dtype(res)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        # the rows of the series of an instrument are the union of the rows of the two operands
+        valid = None
+        if isinstance(self.feature_left, (Expression,)):
+            data_left, valid = self.feature_left.load_panel(instruments, start_index, end_index, *args)
+        else:
+            data_left = self.feature_left
+        if isinstance(self.feature_right, (Expression,)):
+            data_right, valid_right = self.feature_right.load_panel(instruments, start_index, end_index, *args)
+            valid = valid_right if valid is None else valid | valid_right
+        else:
+            data_right = self.feature_right
+        return _to_expression_dtype(getattr(np, self.func)(data_left, data_right)), valid
 
 
 class Power(NpPairOperator):
@@ -668,7 +796,20 @@ class If(ExpressionOps):
         else:
             series_right = self.feature_right
         series = pd.Series(np.where(series_cond, series_left, series_right), index=series_cond.index)
-        return series
+        return _to_expression_dtype(series)
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        data_cond, valid = self.condition.load_panel(instruments, start_index, end_index, *args)
+        if isinstance(self.feature_left, (Expression,)):
+            data_left, _ = self.feature_left.load_panel(instruments, start_index, end_index, *args)
+        else:
+            data_left = self.feature_left
+        if isinstance(self.feature_right, (Expression,)):
+            data_right, _ = self.feature_right.load_panel(instruments, start_index, end_index, *args)
+        else:
+            data_right = self.feature_right
+        data = np.where(data_cond, data_left, data_right)
+        return _to_expression_dtype(pd.DataFrame(data, index=data_cond.index, columns=data_cond.columns)), valid
 
     def get_longest_back_rolling(self):
         if isinstance(self.feature_left, (Expression,)):
@@ -741,6 +882,26 @@ class Rolling(ExpressionOps):
 
     def _load_internal(self, instrument, start_index, end_index, *args):
         series = self.feature.load(instrument, start_index, end_index, *args)
+        return _to_expression_dtype(self._calc(series))
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        data, valid = self.feature.load_panel(instruments, start_index, end_index, *args)
+        if (data.dtypes == bool).any():
+            data = data.astype(_kernel_dtype()).where(valid)
+        if self._calc_by_column() or not _is_contiguous(valid):
+            return _to_expression_dtype(_apply_by_column(self._calc, valid, data)), valid
+        return _to_expression_dtype(self._calc(data)), valid
+
+    def _calc_by_column(self) -> bool:
+        """whether the operator depends on the positions in the window
+
+        The window of the panel starts before the series of the instrument, so such operators are calculated
+        instrument by instrument.
+        """
+        return False
+
+    def _calc(self, series):
+        """calculate the operator on a series (or each column of a panel)"""
         # NOTE: remove all null check,
         # now it's user's responsibility to decide whether use features in null days
         # isnull = series.isnull() # NOTE: isnull = NaN, inf is not null
@@ -754,6 +915,14 @@ class Rolling(ExpressionOps):
         # series[isnull] = np.nan
         return series
 
+    def _calc_kernel(self, series, rolling_kernel, expanding_kernel, *args):
+        """calculate the operator with the Cython kernels of the rolling and expanding windows"""
+        if isinstance(self.N, int) and self.N == 0:
+            return _apply_kernel(expanding_kernel, series, *args)
+        elif isinstance(self.N, float) and 0 < self.N < 1:
+            return Rolling._calc(self, series)
+        return _apply_kernel(rolling_kernel, series, self.N, *args)
+
     def get_longest_back_rolling(self):
         if self.N == 0:
             return np.inf
@@ -797,8 +966,10 @@ class Ref(Rolling):
     def __init__(self, feature, N):
         super(Ref, self).__init__(feature, N, "ref")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return self.N == 0
+
+    def _calc(self, series):
         # N = 0, return first day
         if series.empty:
             return series  # Pandas bug, see: https://github.com/pandas-dev/pandas/issues/21049
@@ -883,6 +1054,9 @@ class Std(Rolling):
     def __init__(self, feature, N):
         super(Std, self).__init__(feature, N, "std")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_std, expanding_std)
+
 
 class Var(Rolling):
     """Rolling Variance
@@ -903,6 +1077,9 @@ class Var(Rolling):
     def __init__(self, feature, N):
         super(Var, self).__init__(feature, N, "var")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_var, expanding_var)
+
 
 class Skew(Rolling):
     """Rolling Skewness
@@ -925,6 +1102,9 @@ class Skew(Rolling):
             raise ValueError("The rolling window size of Skewness operation should >= 3")
         super(Skew, self).__init__(feature, N, "skew")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_skew, expanding_skew)
+
 
 class Kurt(Rolling):
     """Rolling Kurtosis
@@ -947,6 +1127,9 @@ class Kurt(Rolling):
             raise ValueError("The rolling window size of Kurtosis operation should >= 5")
         super(Kurt, self).__init__(feature, N, "kurt")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_kurt, expanding_kurt)
+
 
 class Max(Rolling):
     """Rolling Max
@@ -967,6 +1150,9 @@ class Max(Rolling):
     def __init__(self, feature, N):
         super(Max, self).__init__(feature, N, "max")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_max, expanding_max)
+
 
 class IdxMax(Rolling):
     """Rolling Max Index
@@ -987,13 +1173,14 @@ class IdxMax(Rolling):
     def __init__(self, feature, N):
         super(IdxMax, self).__init__(feature, N, "idxmax")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return True
+
+    def _calc(self, series):
+        # the same as `series.rolling(N, min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)`
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmax() + 1, raw=True)
-        return series
+            return _apply_kernel(expanding_idxmax, series)
+        return _apply_kernel(rolling_idxmax, series, self.N)
 
 
 class Min(Rolling):
@@ -1015,6 +1202,9 @@ class Min(Rolling):
     def __init__(self, feature, N):
         super(Min, self).__init__(feature, N, "min")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_min, expanding_min)
+
 
 class IdxMin(Rolling):
     """Rolling Min Index
@@ -1035,13 +1225,14 @@ class IdxMin(Rolling):
     def __init__(self, feature, N):
         super(IdxMin, self).__init__(feature, N, "idxmin")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return True
+
+    def _calc(self, series):
+        # the same as `series.rolling(N, min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)`
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(lambda x: x.argmin() + 1, raw=True)
-        return series
+            return _apply_kernel(expanding_idxmin, series)
+        return _apply_kernel(rolling_idxmin, series, self.N)
 
 
 class Quantile(Rolling):
@@ -1067,13 +1258,9 @@ class Quantile(Rolling):
     def __str__(self):
         return "{}({},{},{})".format(type(self).__name__, self.feature, self.N, self.qscore)
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
-        if self.N == 0:
-            series = series.expanding(min_periods=1).quantile(self.qscore)
-        else:
-            series = series.rolling(self.N, min_periods=1).quantile(self.qscore)
-        return series
+    def _calc(self, series):
+        # the same as `series.rolling(N, min_periods=1).quantile(qscore)`
+        return self._calc_kernel(series, rolling_quantile, expanding_quantile, self.qscore)
 
 
 class Med(Rolling):
@@ -1095,6 +1282,9 @@ class Med(Rolling):
     def __init__(self, feature, N):
         super(Med, self).__init__(feature, N, "median")
 
+    def _calc(self, series):
+        return self._calc_kernel(series, rolling_median, expanding_median)
+
 
 class Mad(Rolling):
     """Rolling Mean Absolute Deviation
@@ -1115,19 +1305,9 @@ class Mad(Rolling):
     def __init__(self, feature, N):
         super(Mad, self).__init__(feature, N, "mad")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def mad(x):
-            x1 = x[~np.isnan(x)]
-            return np.mean(np.abs(x1 - x1.mean()))
-
-        if self.N == 0:
-            series = series.expanding(min_periods=1).apply(mad, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(mad, raw=True)
-        return series
+    def _calc(self, series):
+        # the mean absolute deviation of the values without NaN, i.e. `np.mean(np.abs(x1 - x1.mean()))`
+        return self._calc_kernel(series, rolling_mad, expanding_mad)
 
 
 class Rank(Rolling):
@@ -1149,23 +1329,10 @@ class Rank(Rolling):
     def __init__(self, feature, N):
         super(Rank, self).__init__(feature, N, "rank")
 
-    # for compatiblity of python 3.7, which doesn't support pandas 1.4.0+ which implements Rolling.rank
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
-
-        rolling_or_expending = series.expanding(min_periods=1) if self.N == 0 else series.rolling(self.N, min_periods=1)
-        if hasattr(rolling_or_expending, "rank"):
-            return rolling_or_expending.rank(pct=True)
-
-        def rank(x):
-            if np.isnan(x[-1]):
-                return np.nan
-            x1 = x[~np.isnan(x)]
-            if x1.shape[0] == 0:
-                return np.nan
-            return percentileofscore(x1, x1[-1]) / 100
-
-        return rolling_or_expending.apply(rank, raw=True)
+    def _calc(self, series):
+        # the percentile rank of the last value (NaN if it is missing) with the average rank of the ties,
+        # i.e. `series.rolling(N, min_periods=1).rank(pct=True)`
+        return self._calc_kernel(series, rolling_rank, expanding_rank)
 
 
 class Count(Rolling):
@@ -1207,8 +1374,10 @@ class Delta(Rolling):
     def __init__(self, feature, N):
         super(Delta, self).__init__(feature, N, "delta")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return self.N == 0
+
+    def _calc(self, series):
         if self.N == 0:
             series = series - series.iloc[0]
         else:
@@ -1245,8 +1414,10 @@ class Slope(Rolling):
     def __init__(self, feature, N):
         super(Slope, self).__init__(feature, N, "slope")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return True
+
+    def _calc(self, series):
         if self.N == 0:
             series = pd.Series(expanding_slope(series.values), index=series.index)
         else:
@@ -1273,8 +1444,10 @@ class Rsquare(Rolling):
     def __init__(self, feature, N):
         super(Rsquare, self).__init__(feature, N, "rsquare")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        _series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return True
+
+    def _calc(self, _series):
         if self.N == 0:
             series = pd.Series(expanding_rsquare(_series.values), index=_series.index)
         else:
@@ -1302,8 +1475,10 @@ class Resi(Rolling):
     def __init__(self, feature, N):
         super(Resi, self).__init__(feature, N, "resi")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return True
+
+    def _calc(self, series):
         if self.N == 0:
             series = pd.Series(expanding_resi(series.values), index=series.index)
         else:
@@ -1330,20 +1505,14 @@ class WMA(Rolling):
     def __init__(self, feature, N):
         super(WMA, self).__init__(feature, N, "wma")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
-        # TODO: implement in Cython
-
-        def weighted_mean(x):
-            w = np.arange(len(x)) + 1
-            w = w / w.sum()
-            return np.nanmean(w * x)
+    def _calc_by_column(self):
+        return True
 
+    def _calc(self, series):
+        # the weighted mean of the window, i.e. `np.nanmean(w * x)` with `w = (arange(len(x)) + 1) / sum(w)`
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(weighted_mean, raw=True)
-        else:
-            series = series.rolling(self.N, min_periods=1).apply(weighted_mean, raw=True)
-        return series
+            return _apply_kernel(expanding_wma, series)
+        return _apply_kernel(rolling_wma, series, self.N)
 
 
 class EMA(Rolling):
@@ -1365,22 +1534,23 @@ class EMA(Rolling):
     def __init__(self, feature, N):
         super(EMA, self).__init__(feature, N, "ema")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        series = self.feature.load(instrument, start_index, end_index, *args)
+    def _calc_by_column(self):
+        return self.N == 0
 
-        def exp_weighted_mean(x):
-            a = 1 - 2 / (1 + len(x))
-            w = a ** np.arange(len(x))[::-1]
-            w /= w.sum()
-            return np.nansum(w * x)
+    def get_longest_back_rolling(self):
+        if isinstance(self.N, int) and self.N > 0:
+            # the exponential mean of a span accesses the whole history (the extended window is still N - 1)
+            return np.inf
+        return super(EMA, self).get_longest_back_rolling()
 
+    def _calc(self, series):
         if self.N == 0:
-            series = series.expanding(min_periods=1).apply(exp_weighted_mean, raw=True)
+            # the span of each window is its size, i.e. `np.nansum(w * x)` with `w = (1 - 2 / (1 + len(x))) ** ...`
+            return _apply_kernel(expanding_ema, series)
         elif 0 < self.N < 1:
-            series = series.ewm(alpha=self.N, min_periods=1).mean()
-        else:
-            series = series.ewm(span=self.N, min_periods=1).mean()
-        return series
+            return _apply_kernel(ewm_mean, series, self.N)
+        # the same as `series.ewm(span=N, min_periods=1).mean()`
+        return _apply_kernel(ewm_mean, series, 2.0 / (self.N + 1))
 
 
 #################### Pair-Wise Rolling ####################
@@ -1425,7 +1595,25 @@ class PairRolling(ExpressionOps):
             series_right = self.feature_right.load(instrument, start_index, end_index, *args)
         else:
             series_right = self.feature_right
+        return _to_expression_dtype(self._calc(series_left, series_right))
+
+    def _load_panel_internal(self, instruments, start_index, end_index, *args):
+        valid = None
+        if isinstance(self.feature_left, Expression):
+            data_left, valid = self.feature_left.load_panel(instruments, start_index, end_index, *args)
+        else:
+            data_left = self.feature_left
+        if isinstance(self.feature_right, Expression):
+            data_right, valid_right = self.feature_right.load_panel(instruments, start_index, end_index, *args)
+            valid = valid_right if valid is None else valid | valid_right
+        else:
+            data_right = self.feature_right
+        if not _is_contiguous(valid):
+            return _to_expression_dtype(_apply_by_column(self._calc, valid, data_left, data_right)), valid
+        return _to_expression_dtype(self._calc(data_left, data_right)), valid
 
+    def _calc(self, series_left, series_right):
+        """calculate the operator on the series (or the columns of the panels with the same instruments)"""
         if self.N == 0:
             series = getattr(series_left.expanding(min_periods=1), self.func)(series_right)
         else:
@@ -1485,16 +1673,15 @@ class Corr(PairRolling):
     def __init__(self, feature_left, feature_right, N):
         super(Corr, self).__init__(feature_left, feature_right, N, "corr")
 
-    def _load_internal(self, instrument, start_index, end_index, *args):
-        res: pd.Series = super(Corr, self)._load_internal(instrument, start_index, end_index, *args)
-
-        # NOTE: Load uses MemCache, so calling load again will not cause performance degradation
-        series_left = self.feature_left.load(instrument, start_index, end_index, *args)
-        series_right = self.feature_right.load(instrument, start_index, end_index, *args)
-        res.loc[
-            np.isclose(series_left.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
-            | np.isclose(series_right.rolling(self.N, min_periods=1).std(), 0, atol=2e-05)
-        ] = np.nan
+    def _calc(self, series_left, series_right):
+        if self.N == 0:
+            res = _apply_pair_kernel(expanding_corr, series_left, series_right)
+            std_left, std_right = _apply_kernel(expanding_std, series_left), _apply_kernel(expanding_std, series_right)
+        else:
+            res = _apply_pair_kernel(rolling_corr, series_left, series_right, self.N)
+            std_left = _apply_kernel(rolling_std, series_left, self.N)
+            std_right = _apply_kernel(rolling_std, series_right, self.N)
+        res[np.isclose(std_left, 0, atol=2e-05) | np.isclose(std_right, 0, atol=2e-05)] = np.nan
         return res
 
 
@@ -1519,6 +1706,11 @@ class Cov(PairRolling):
     def __init__(self, feature_left, feature_right, N):
         super(Cov, self).__init__(feature_left, feature_right, N, "cov")
 
+    def _calc(self, series_left, series_right):
+        if self.N == 0:
+            return _apply_pair_kernel(expanding_cov, series_left, series_right)
+        return _apply_pair_kernel(rolling_cov, series_left, series_right, self.N)
+
 
 #################### Operator which only support data with time index ####################
 # Convention
@@ -1529,7 +1721,7 @@ class TResample(ElemOperator):
     def __init__(self, feature, freq, func):
         """
         Resampling the data to target frequency.
-        The resample function of pandas is used.
+        The same as the resample function of pandas (the float data on a fixed frequency is resampled by numpy).
 
         - the timestamp will be at the start of the time span after resample.
 
@@ -1556,10 +1748,7 @@ class TResample(ElemOperator):
         if series.empty:
             return series
         else:
-            if self.func == "sum":
-                return getattr(series.resample(self.freq), self.func)(min_count=1)
-            else:
-                return getattr(series.resample(self.freq), self.func)()
+            return resam_series(series, self.freq, self.func)
 
 
 TOpsList = [TResample]
@@ -1621,9 +1810,12 @@ class OpsWrapper:
 
     def __init__(self):
         self._ops = {}
+        # changed when the operators are registered, e.g. to invalidate the parsed fields
+        self.version = 0
 
     def reset(self):
         self._ops = {}
+        self.version += 1
 
     def register(self, ops_list: List[Union[Type[ExpressionOps], dict]]):
         """register operator
@@ -1657,6 +1849,7 @@ class OpsWrapper:
                     "The custom operator [{}] will override the qlib default definition".format(_ops_class.__name__)
                 )
             self._ops[_ops_class.__name__] = _ops_class
+        self.version += 1
 
     def __getattr__(self, key):
         if key not in self._ops:
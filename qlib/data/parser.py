@@ -0,0 +1,217 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+The parser of the fields.
+
+A field like ``Mean($close, 5) / $close`` is parsed by `ast` into the tree of the operators registered in `Operators`
+(without `eval`):
+
+- ``$name`` is ``Operators.Feature("name")`` and ``$$name`` is ``Operators.PFeature("name")``
+- ``Name(...)`` is the operator ``Operators.Name(...)``
+- the arithmetic, comparison and bitwise operators (e.g. ``+``, ``>``, ``&``) are the operators of `Expression`
+- the other literals (numbers, strings, lists, ...) are the arguments of the operators
+
+The expressions are cached in the process: a field is parsed once, and the structurally identical (sub-)expressions
+of all the fields are the same instance (interned by `Expression.cache_key`). So the expressions must not be changed
+after they are parsed. The cache is cleared when the operators are registered again.
+"""
+
+import ast
+import operator
+import re
+import threading
+from typing import Dict, List, Tuple, Union
+
+from .base import Expression, ExpressionKey
+from .ops import Operators
+
+# the same characters of the feature names as `qlib.utils.parse_field` (\w and the Chinese punctuations 、：（）)
+_FEATURE_PATTERN = re.compile(r"\$(\$?)([\w\u3001\uff1a\uff08\uff09]+)")
+_FEATURE_NAME = "__qlib_feature_{}"
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_, ast.Invert: operator.invert}
+_CMP_OPS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+# field -> expression; ExpressionKey -> the interned expression
+_FIELDS: Dict[str, Expression] = {}
+_INTERNED: Dict[ExpressionKey, Expression] = {}
+_VERSION = [None]
+_LOCK = threading.Lock()
+
+
+def _tokenize(field: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """replace the features in the field with the python names; return the source and the features"""
+    features = []
+
+    def _replace(match):
+        features.append(("PFeature" if match.group(1) else "Feature", match.group(2)))
+        return _FEATURE_NAME.format(len(features) - 1)
+
+    return _FEATURE_PATTERN.sub(_replace, field), features
+
+
+class _Builder:
+    """build the expression from the ast of a field"""
+
+    def __init__(self, source: str, features: List[Tuple[str, str]]):
+        self.source = source
+        self.features = {_FEATURE_NAME.format(i): feature for i, feature in enumerate(features)}
+
+    def _source(self, node: ast.AST) -> str:
+        """the source of the node in the field (for the error messages)"""
+        # NOTE: some nodes have no position before python 3.9 (e.g. the keywords), the whole field is used then
+        source = ast.get_source_segment(self.source, node) or self.source
+        for key, (op_name, name) in sorted(self.features.items(), key=lambda item: -len(item[0])):
+            source = source.replace(key, ("$$" if op_name == "PFeature" else "$") + name)
+        return source
+
+    def build(self, node: ast.AST):
+        method = getattr(self, f"_build_{type(node).__name__}", None)
+        if method is None:
+            raise SyntaxError(f"unsupported syntax in the field: {self._source(node)}")
+        res = method(node)
+        if isinstance(res, Expression):
+            res = _intern(res)
+        return res
+
+    def _build_Expression(self, node: ast.Expression):
+        return self.build(node.body)
+
+    def _build_Constant(self, node: ast.Constant):
+        return node.value
+
+    def _build_Name(self, node: ast.Name):
+        if node.id in self.features:
+            op_name, name = self.features[node.id]
+            return _get_op(op_name)(name)
+        raise NameError(f"name '{node.id}' is not defined")
+
+    def _build_Call(self, node: ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id in self.features:
+            raise SyntaxError(f"the operator must be a name: {self._source(node.func)}")
+        args = [self.build(arg) for arg in node.args]
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                raise SyntaxError(f"unsupported syntax in the field: {self._source(keyword)}")
+            kwargs[keyword.arg] = self.build(keyword.value)
+        return _get_op(node.func.id)(*args, **kwargs)
+
+    def _build_BinOp(self, node: ast.BinOp):
+        if type(node.op) not in _BIN_OPS:
+            raise SyntaxError(f"unsupported operator in the field: {self._source(node)}")
+        return _BIN_OPS[type(node.op)](self.build(node.left), self.build(node.right))
+
+    def _build_UnaryOp(self, node: ast.UnaryOp):
+        return _UNARY_OPS[type(node.op)](self.build(node.operand))
+
+    def _build_Compare(self, node: ast.Compare):
+        # `a < b < c` is `a < b and b < c` as python
+        left = self.build(node.left)
+        res = True
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _CMP_OPS:
+                raise SyntaxError(f"unsupported operator in the field: {self._source(node)}")
+            right = self.build(comparator)
+            res = _CMP_OPS[type(op)](left, right)
+            if not res:
+                break
+            left = right
+        return res
+
+    def _build_BoolOp(self, node: ast.BoolOp):
+        res = None
+        for value in node.values:
+            res = self.build(value)
+            if isinstance(node.op, ast.And) and not res or isinstance(node.op, ast.Or) and res:
+                break
+        return res
+
+    def _build_List(self, node: ast.List):
+        return [self.build(elt) for elt in node.elts]
+
+    def _build_Tuple(self, node: ast.Tuple):
+        return tuple(self.build(elt) for elt in node.elts)
+
+    def _build_Dict(self, node: ast.Dict):
+        return {self.build(key): self.build(value) for key, value in zip(node.keys, node.values)}
+
+
+def _get_op(name: str):
+    """the registered operator (not the other attributes of `Operators`, e.g. `reset`)"""
+    return Operators.__getattr__(name)
+
+
+def _intern(expr: Expression) -> Expression:
+    with _LOCK:
+        return _INTERNED.setdefault(expr.cache_key, expr)
+
+
+def _check_version():
+    """clear the cache if the operators are registered again"""
+    if _VERSION[0] != Operators.version:
+        clear_expression_cache()
+        _VERSION[0] = Operators.version
+
+
+def parse_expression(field: Union[str, Expression]) -> Expression:
+    """
+    Parse the field into the expression (please refer to the module docstring)
+
+    Parameters
+    ----------
+    field : Union[str, Expression]
+        the field, e.g. "Mean($close, 5) / $close"; the expression is returned as it is
+
+    Returns
+    -------
+    Expression
+        the cached expression; it must not be changed
+
+    Raises
+    ------
+    SyntaxError
+        the syntax of the field is invalid or not supported
+    NameError
+        the field contains a name which is not a feature, e.g. "close" instead of "$close"
+    AttributeError
+        the operator is not registered
+    """
+    if isinstance(field, Expression):
+        return field
+    if not isinstance(field, str):
+        field = str(field)
+    _check_version()
+    expression = _FIELDS.get(field)
+    if expression is None:
+        source, features = _tokenize(field)
+        source = source.strip()
+        expression = _Builder(source, features).build(ast.parse(source, mode="eval"))
+        _FIELDS[field] = expression
+    return expression
+
+
+def clear_expression_cache():
+    """clear the parsed fields and the interned expressions"""
+    with _LOCK:
+        _FIELDS.clear()
+        _INTERNED.clear()
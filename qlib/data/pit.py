@@ -18,36 +18,80 @@ import numpy as np
 import pandas as pd
 from qlib.data.ops import ElemOperator
 from qlib.log import get_module_logger
-from .data import Cal
+from .base import Expression, PFeature
+from .data import Cal, PITD
 
 
 class P(ElemOperator):
-    def _load_internal(self, instrument, start_index, end_index, freq):
-        _calendar = Cal.calendar(freq=freq)
-        resample_data = np.empty(end_index - start_index + 1, dtype="float32")
-
-        for cur_index in range(start_index, end_index + 1):
-            cur_time = _calendar[cur_index]
-            # To load expression accurately, more historical data are required
-            start_ws, end_ws = self.feature.get_extended_window_size()
-            if end_ws > 0:
-                raise ValueError(
-                    "PIT database does not support referring to future period (e.g. expressions like `Ref('$$roewa_q', -1)` are not supported"
-                )
+    """Collapse the period data into the data of each day
 
-            # The calculated value will always the last element, so the end_offset is zero.
-            try:
-                s = self._load_feature(instrument, -start_ws, 0, cur_time)
-                resample_data[cur_index - start_index] = s.iloc[-1] if len(s) > 0 else np.nan
-            except FileNotFoundError:
-                get_module_logger("base").warning(f"WARN: period data not found for {str(self)}")
-                return pd.Series(dtype="float32", name=str(self))
+    The value of a day is the last element of the feature calculated with the data observed on that day. The data
+    observed is only changed by the revisions of the PIT fields, so:
+
+    - the PIT field itself (e.g. `P($$roewa_q)`) is looked up for all the days at once by `PITD.period_values`
+    - the other expressions are calculated once for each day when a PIT field of them is revised (the days between
+      two revisions share the value)
+    """
+
+    def _load_internal(self, instrument, start_index, end_index, freq):
+        cur_times = pd.DatetimeIndex(Cal.calendar(freq=freq)[start_index : end_index + 1])
+        # To load expression accurately, more historical data are required
+        start_ws, end_ws = self.feature.get_extended_window_size()
+        if end_ws > 0:
+            raise ValueError(
+                "PIT database does not support referring to future period (e.g. expressions like `Ref('$$roewa_q', -1)` are not supported"
+            )
+
+        try:
+            if type(self.feature) is PFeature:
+                resample_data = self._load_period_values(instrument, cur_times)
+            else:
+                resample_data = self._load_by_revision(instrument, cur_times, start_ws)
+        except FileNotFoundError:
+            get_module_logger("base").warning(f"WARN: period data not found for {str(self)}")
+            return pd.Series(dtype="float32", name=str(self))
 
         resample_series = pd.Series(
             resample_data, index=pd.RangeIndex(start_index, end_index + 1), dtype="float32", name=str(self)
         )
         return resample_series
 
+    def _load_period_values(self, instrument, cur_times):
+        return PITD.period_values(instrument, str(self.feature), cur_times)[:, 0]
+
+    def _load_by_revision(self, instrument, cur_times, start_ws):
+        revision_dates = self._get_revision_dates(instrument)
+        if revision_dates is None:
+            # every day is calculated
+            states = np.arange(len(cur_times))
+        else:
+            dates = np.asarray(cur_times.year * 10000 + cur_times.month * 100 + cur_times.day, dtype=np.int64)
+            states = np.searchsorted(revision_dates, dates, side="right")
+        _, first_days, inverse = np.unique(states, return_index=True, return_inverse=True)
+        resample_data = np.empty(len(first_days), dtype="float32")
+        for i, cur_index in enumerate(first_days):
+            # The calculated value will always the last element, so the end_offset is zero.
+            s = self._load_feature(instrument, -start_ws, 0, cur_times[cur_index])
+            resample_data[i] = s.iloc[-1] if len(s) > 0 else np.nan
+        return resample_data[inverse]
+
+    def _get_revision_dates(self, instrument):
+        """the dates when any of the PIT fields of the feature is revised; None if they are unknown"""
+        dates, stack = [], [self.feature]
+        while stack:
+            expr = stack.pop()
+            if type(expr) is PFeature:
+                _dates = PITD.revision_dates(instrument, str(expr))
+                if _dates is None:
+                    return None
+                dates.append(_dates)
+            elif isinstance(expr, PFeature):
+                # the customized PIT features
+                return None
+            else:
+                stack.extend(v for v in vars(expr).values() if isinstance(v, Expression))
+        return np.unique(np.concatenate(dates)) if dates else None
+
     def _load_feature(self, instrument, start_index, end_index, cur_time):
         return self.feature.load(instrument, start_index, end_index, cur_time)
 
@@ -68,5 +112,8 @@ class PRef(P):
     def __str__(self):
         return f"{super().__str__()}[{self.period}]"
 
+    def _load_period_values(self, instrument, cur_times):
+        return PITD.period_values(instrument, str(self.feature), cur_times, period=self.period)[:, 0]
+
     def _load_feature(self, instrument, start_index, end_index, cur_time):
         return self.feature.load(instrument, start_index, end_index, cur_time, self.period)
@@ -0,0 +1,250 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+The evaluation plan of a list of fields.
+
+The fields of a dataset share many sub-expressions (e.g. `Ref($close, 1)` and `Mean($close, 5)` in Alpha158).
+`ExpressionPlan` parses all the fields into one DAG, in which the identical nodes are merged by their structure, and
+evaluates each unique node once for an instrument. The result of a node is released after its last consumer.
+
+Each field is loaded in an extended window (please refer to `Expression.get_extended_window_size`). A node shared by
+fields with different windows is evaluated once in the union of the windows, which does not change the values of the
+fields in [start_index, end_index]. The nodes whose values depend on the start of the window (e.g. the expanding
+operators `Mean($close, 0)`, `EMA`) are only shared by the fields with the same window.
+"""
+
+import copy
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import base, ops
+from .base import Expression
+
+
+class _PlanInput(Expression):
+    """The input of a planned operator; it returns the result of a node of the plan"""
+
+    def __init__(self, plan: "ExpressionPlan", node_id: int):
+        self.plan = plan
+        self.node_id = node_id
+
+    def __str__(self):
+        return str(self.plan.exprs[self.node_id])
+
+    def load(self, instrument, start_index, end_index, *args):
+        series = self.plan._results.data[self.node_id]
+        if (start_index, end_index) != self.plan._results.windows[self.node_id]:
+            series = series.loc[start_index:end_index]
+        return series
+
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        raise NotImplementedError("_PlanInput is loaded from the results of the plan")
+
+    def get_longest_back_rolling(self):
+        return self.plan.exprs[self.node_id].get_longest_back_rolling()
+
+    def get_extended_window_size(self):
+        return self.plan.exprs[self.node_id].get_extended_window_size()
+
+
+class ExpressionPlan:
+    """Evaluate a list of fields with the common sub-expressions calculated once
+
+    .. code-block:: python
+
+        plan = ExpressionPlan(["Mean($close, 5)/$close", "Std($close, 5)/$close"])
+        print(plan.explain())
+        data = plan.evaluate("SH600000", start_index, end_index, "day")
+    """
+
+    # the operators that load the data of other instruments or change the index; they are evaluated as a whole
+    OPAQUE_OPS = (ops.ChangeInstrument, ops.Mask, ops.TResample)
+
+    def __init__(self, fields: List[Union[str, Expression]]):
+        """
+        Parameters
+        ----------
+        fields : List[Union[str, Expression]]
+            the fields; the strings are parsed by `ExpressionD.get_expression_instance`
+        """
+        from .data import ExpressionD  # pylint: disable=C0415
+
+        self.fields = [str(f) for f in fields]
+        roots = [ExpressionD.get_expression_instance(f) if isinstance(f, str) else f for f in fields]
+        # the nodes; the children of a node are always before it
+        self.exprs: List[Expression] = []  # the original expression of each node
+        self.node_ops: List[Union[Expression, None]] = (
+            []
+        )  # the operator evaluated with the `_PlanInput` of the children
+        self.children: List[List[int]] = []
+        self.sensitive: List[bool] = []  # whether the values depend on the start of the window
+        self.extensions: List[Tuple[int, int]] = []  # the (left, right) extension of the window
+        self._node_index: Dict[tuple, int] = {}
+        # the number of nodes in the expression trees of the fields, i.e. the evaluations without the plan
+        self.tree_size = 0
+        self.root_ids = [self._add(expr, expr.get_extended_window_size()) for expr in roots]
+
+        self.consumers: List[List[int]] = [[] for _ in self.exprs]
+        for node_id, children in enumerate(self.children):
+            for child_id in children:
+                self.consumers[child_id].append(node_id)
+        # a node is released after its last consumer (or after it is returned as a field)
+        self.last_use = [max(consumers, default=node_id) for node_id, consumers in enumerate(self.consumers)]
+        self.field_ids: Dict[int, List[int]] = {}
+        for i, node_id in enumerate(self.root_ids):
+            self.field_ids.setdefault(node_id, []).append(i)
+        self._results = threading.local()
+
+    def _is_opaque(self, expr: Expression) -> bool:
+        return isinstance(expr, self.OPAQUE_OPS) or type(expr).__module__ not in (ops.__name__, base.__name__)
+
+    @staticmethod
+    def _is_sensitive(expr: Expression) -> bool:
+        """whether the values of the operator itself depend on the start of the window"""
+        if isinstance(expr, ops.EMA):
+            return True
+        if isinstance(expr, (ops.Rolling, ops.PairRolling)):
+            return expr.N == 0 or (isinstance(expr.N, float) and 0 < expr.N < 1)
+        return False
+
+    def _add(self, expr: Expression, extension: Tuple[int, int]) -> int:
+        """add the expression tree into the plan with the extension of the window of its field; return the node id"""
+        self.tree_size += 1
+        opaque = self._is_opaque(expr)
+        attrs = {}
+        if not opaque:
+            for attr, value in vars(expr).items():
+                if attr == "_cache_key":
+                    continue
+                if isinstance(value, Expression):
+                    attrs[attr] = ("node", self._add(value, extension))
+                else:
+                    attrs[attr] = (type(value).__name__, value)
+            try:
+                key = (type(expr), tuple(sorted(attrs.items())))
+                hash(key)
+            except TypeError:
+                opaque = True
+        if opaque:
+            key = (type(expr), str(expr))
+        children = [value[1] for value in attrs.values() if value[0] == "node"] if not opaque else []
+        sensitive = opaque or self._is_sensitive(expr) or any(self.sensitive[c] for c in children)
+        if sensitive:
+            # the values depend on the start of the window, so the node is only shared in the same window
+            key += (extension,)
+
+        node_id = self._node_index.get(key)
+        if node_id is not None:
+            lft, rght = self.extensions[node_id]
+            self.extensions[node_id] = max(lft, extension[0]), max(rght, extension[1])
+            return node_id
+
+        node_id = len(self.exprs)
+        self._node_index[key] = node_id
+        self.exprs.append(expr)
+        self.children.append(children)
+        self.sensitive.append(sensitive)
+        self.extensions.append(tuple(extension))
+        if opaque or len(children) == 0:
+            self.node_ops.append(None)
+        else:
+            op = copy.copy(expr)
+            op.__dict__.pop("_cache_key", None)
+            for attr, value in attrs.items():
+                if value[0] == "node":
+                    setattr(op, attr, _PlanInput(self, value[1]))
+            self.node_ops.append(op)
+        return node_id
+
+    def evaluate(self, instrument, start_index, end_index, *args) -> Dict[str, pd.Series]:
+        """evaluate the fields for an instrument
+
+        Parameters
+        ----------
+        instrument : str
+            instrument code.
+        start_index : int
+            start index [in calendar].
+        end_index : int
+            end index [in calendar].
+        *args :
+            the same as `Expression.load`.
+
+        Returns
+        -------
+        Dict[str, pd.Series]
+            the float32 series of each field in [start_index, end_index], the same as `ExpressionD.expression`
+        """
+        res = {}
+        self._results.data, self._results.windows = {}, {}
+        try:
+            for node_id, expr in enumerate(self.exprs):
+                lft, rght = self.extensions[node_id]
+                window = max(0, start_index - lft), end_index + rght
+                if self.node_ops[node_id] is None:
+                    series = expr.load(instrument, *window, *args)
+                else:
+                    series = self.node_ops[node_id]._load_internal(instrument, *window, *args)
+                self._results.data[node_id] = series
+                self._results.windows[node_id] = window
+                for i in self.field_ids.get(node_id, []):
+                    res[self.fields[i]] = self._to_field(series, start_index, end_index)
+                for child_id in set(self.children[node_id] + [node_id]):
+                    if self.last_use[child_id] == node_id:
+                        del self._results.data[child_id]
+        finally:
+            self._results.data, self._results.windows = {}, {}
+        # the fields are evaluated in the order of the DAG, so they are returned in the requested order
+        return {field: res[field] for field in self.fields}
+
+    @staticmethod
+    def _to_field(series: pd.Series, start_index, end_index) -> pd.Series:
+        # Please refer to `LocalExpressionProvider.expression`
+        try:
+            series = series.astype(np.float32)
+        except ValueError:
+            pass
+        except TypeError:
+            pass
+        if not series.empty:
+            series = series.loc[start_index:end_index]
+        return series
+
+    def explain(self, top: int = 10) -> str:
+        """describe the sharing of the nodes and the estimated savings
+
+        Parameters
+        ----------
+        top : int
+            the number of the most shared nodes to show
+        """
+        n_nodes = len(self.exprs)
+        saved = self.tree_size - n_nodes
+        n_fields = Counter(node_id for node_id in self.root_ids)
+        lines = [
+            f"ExpressionPlan: {len(self.fields)} fields ({len(n_fields)} unique), "
+            f"{self.tree_size} nodes in the expression trees, {n_nodes} unique nodes",
+            f"node evaluations per instrument: {self.tree_size} -> {n_nodes} "
+            f"({saved / max(self.tree_size, 1):.1%} saved)",
+            f"window-sensitive nodes (shared in the same window only): {sum(self.sensitive)}",
+        ]
+        shared = sorted(
+            (node_id for node_id in range(n_nodes) if len(self.consumers[node_id]) + n_fields[node_id] > 1),
+            key=lambda node_id: -(len(self.consumers[node_id]) + n_fields[node_id]),
+        )
+        if len(shared) > 0:
+            lines.append(f"shared nodes: {len(shared)}, the most shared:")
+            for node_id in shared[:top]:
+                lines.append(
+                    f"    {self.exprs[node_id]}: {len(self.consumers[node_id])} consumers"
+                    + (f", {n_fields[node_id]} fields" if n_fields[node_id] > 0 else "")
+                    + f", window extension {self.extensions[node_id]}"
+                )
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.explain()
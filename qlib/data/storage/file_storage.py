@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import lzma
+import zlib
 import struct
 from pathlib import Path
 from typing import Iterable, Union, Dict, Mapping, Tuple, List
@@ -11,7 +13,7 @@ import pandas as pd
 from qlib.utils.time import Freq
 from qlib.utils.resam import resam_calendar
 from qlib.config import C
-from qlib.data.cache import H
+from qlib.data.cache import H, MemCacheLengthUnit
 from qlib.log import get_module_logger
 from qlib.data.storage import CalendarStorage, InstrumentStorage, FeatureStorage, CalVT, InstKT, InstVT
 
@@ -52,10 +54,12 @@ class FileStorageMixin:
         if len(provider_uri) == 1 and C.DEFAULT_FREQ in provider_uri:
             calendar_dir = self.dpm.get_data_uri(C.DEFAULT_FREQ).joinpath("calendars")
             if calendar_dir.exists():
-                freq_l = list(filter(
-                    lambda _freq: not _freq.endswith("_future"),
-                    map(lambda x: x.stem, calendar_dir.glob("*.txt")),
-                ))
+                freq_l = list(
+                    filter(
+                        lambda _freq: not _freq.endswith("_future"),
+                        map(lambda x: x.stem, calendar_dir.glob("*.txt")),
+                    )
+                )
                 # 如果没有找到频率，使用默认频率
                 if not freq_l:
                     freq_l = ["day"]
@@ -389,3 +393,396 @@ class FileFeatureStorage(FileStorageMixin, FeatureStorage):
     def __len__(self) -> int:
         self.check()
         return self.uri.stat().st_size // 4 - 1
+
+
+class MmapFileFeatureStorage(FileFeatureStorage):
+    """FileFeatureStorage that serves reads from a per-process memory map
+
+    The ``.bin`` file of each (instrument, field, freq) is mapped once per process.
+    Its header (``start_index``) and length are cached with the mapping, so the following reads
+    neither open nor stat the file, and ``__getitem__(slice)`` returns a zero-copy view of the mapping.
+
+    It can be selected by the ``backend`` of the feature provider:
+
+        .. code-block:: python
+
+            qlib.init(
+                provider_uri=...,
+                feature_provider={
+                    "class": "LocalFeatureProvider",
+                    "module_path": "qlib.data.data",
+                    "kwargs": {
+                        "backend": {
+                            "class": "MmapFileFeatureStorage",
+                            "module_path": "qlib.data.storage.file_storage",
+                        }
+                    },
+                },
+            )
+
+    NOTE:
+        - The mapping is invalidated by ``write``/``clear`` of this process. Data appended by other processes
+          (e.g. `dump_bin.py dump_update`) is not visible until ``MmapFileFeatureStorage.clear_mmap_cache()`` is called.
+        - At most 1024 features are kept mapped (``MmapFileFeatureStorage.set_mmap_cache_size``); the least recently
+          read ones are unmapped first.
+        - The returned data is read-only, the same as ``FileFeatureStorage``.
+    """
+
+    # {(data_uri, file_name): (uri, start_index, np.ndarray)}; each mapping keeps a file descriptor open, so only
+    # the recently read features are kept mapped (the mapping is closed when the evicted data is not referenced)
+    _mmap_cache = MemCacheLengthUnit(size_limit=1024)
+
+    @property
+    def _mmap_key(self) -> Tuple[str, str]:
+        return str(self.dpm.get_data_uri(self.freq)), self.file_name
+
+    @classmethod
+    def set_mmap_cache_size(cls, size_limit: int):
+        """set the max number of features kept mapped by the current process"""
+        cls._mmap_cache.set_limit_size(size_limit)
+
+    @classmethod
+    def clear_mmap_cache(cls):
+        """drop all the mappings of the current process"""
+        cls._mmap_cache.clear()
+
+    def _invalidate(self):
+        key = self._mmap_key
+        with self._mmap_cache._lock:
+            if key in self._mmap_cache:
+                self._mmap_cache.pop(key)
+
+    def _get_mmap(self) -> Union[Tuple[int, np.ndarray], Tuple[None, None]]:
+        """get the (start_index, data) of the feature; return (None, None) if the feature does not exist"""
+        key = self._mmap_key
+        cached = self._mmap_cache.get(key)
+        if cached is None:
+            uri = self.uri
+            if not uri.exists():
+                # NOTE: don't cache the missing feature, it may be created later
+                return None, None
+            size = uri.stat().st_size
+            if size <= 4:
+                start_index = int(np.fromfile(uri, dtype="<f", count=1)[0]) if size == 4 else 0
+                data = np.empty(0, dtype="<f")
+            else:
+                _mmap = np.memmap(uri, dtype="<f", mode="r", shape=(size // 4,))
+                start_index = int(_mmap[0])
+                # a plain ndarray view; the mapping is kept alive by the view's base
+                data = _mmap[1:].view(np.ndarray)
+            cached = uri, start_index, data
+            self._mmap_cache[key] = cached
+        _, start_index, data = cached
+        return start_index, data
+
+    def clear(self):
+        self._invalidate()
+        super().clear()
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        # NOTE: the mapping must be released before writing, the file may be truncated or extended
+        self._invalidate()
+        try:
+            super().write(data_array, index)
+        finally:
+            self._invalidate()
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        start_index, _ = self._get_mmap()
+        return start_index
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        start_index, data = self._get_mmap()
+        if start_index is None:
+            return None
+        return start_index + len(data) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        storage_start_index, data = self._get_mmap()
+        if storage_start_index is None:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            return i, float(data[i - storage_start_index])
+        elif isinstance(i, slice):
+            storage_end_index = storage_start_index + len(data) - 1
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            if si > end_index:
+                return pd.Series(dtype=np.float32)
+            _data = data[si - storage_start_index : end_index - storage_start_index + 1]
+            return pd.Series(_data, index=pd.RangeIndex(si, si + len(_data)), copy=False)
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        start_index, data = self._get_mmap()
+        if start_index is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+        return len(data)
+
+
+class CompressedFileFeatureStorage(FileFeatureStorage):
+    """FileFeatureStorage that stores each series as compressed calendar chunks
+
+    The series is split into chunks of ``chunk_size`` calendar points, each chunk is byte-shuffled (the 4 bytes of the
+    float32 values are grouped by their significance, which makes the data much more compressible) and compressed
+    with ``zlib`` or ``lzma`` independently. ``__getitem__`` only decompresses the chunks the query touches, and the
+    decoded chunks are kept in a per-process LRU cache.
+
+    File layout (``features/<instrument>/<field>.<freq>.cbin``, little-endian)
+
+        .. code-block::
+
+            header:   magic(4s) codec(B) shuffle(B) reserved(H) start_index(i) length(I) chunk_size(I) n_chunks(I)
+            offsets:  (n_chunks + 1) * uint64, the offsets of the chunks relative to the end of the offsets
+            chunks:   compressed chunks
+
+    It can be selected by the ``backend`` of the feature provider (please refer to ``MmapFileFeatureStorage``),
+    and written by ``scripts/dump_bin.py`` with ``--compress zlib`` or ``--compress lzma``.
+    """
+
+    MAGIC = b"QLCB"
+    HEADER_FORMAT = "<4sBBHiIII"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    DUMP_FILE_SUFFIX = ".cbin"
+    CODECS = {"zlib": 0, "lzma": 1}
+    DEFAULT_CHUNK_SIZE = 512
+
+    # {uri: (stat key, header, offsets)}
+    _index_cache: Dict[str, Tuple[Tuple[int, int], dict, np.ndarray]] = {}
+    # {(uri, stat key, chunk id): np.ndarray}
+    _chunk_cache = MemCacheLengthUnit(size_limit=4096)
+
+    def __init__(
+        self,
+        instrument: str,
+        field: str,
+        freq: str,
+        provider_uri: dict = None,
+        compress: str = "zlib",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs,
+    ):
+        super(CompressedFileFeatureStorage, self).__init__(instrument, field, freq, provider_uri=provider_uri, **kwargs)
+        if compress not in self.CODECS:
+            raise ValueError(f"compress must be one of {list(self.CODECS)}, your compress is {compress}")
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.file_name = f"{instrument.lower()}/{field.lower()}.{freq.lower()}{self.DUMP_FILE_SUFFIX}"
+
+    @classmethod
+    def set_chunk_cache_size(cls, size_limit: int):
+        """set the max number of decoded chunks kept in the memory of the current process"""
+        cls._chunk_cache.set_limit_size(size_limit)
+
+    @classmethod
+    def clear_chunk_cache(cls):
+        cls._index_cache.clear()
+        cls._chunk_cache.clear()
+
+    @staticmethod
+    def _shuffle(values: np.ndarray) -> bytes:
+        return values.astype("<f").view(np.uint8).reshape(-1, 4).T.tobytes()
+
+    @staticmethod
+    def _unshuffle(buf: bytes) -> np.ndarray:
+        return np.frombuffer(buf, dtype=np.uint8).reshape(4, -1).T.copy().view("<f").reshape(-1)
+
+    @classmethod
+    def write_file(
+        cls,
+        path: Union[str, Path],
+        data_array: Union[List, np.ndarray],
+        start_index: int,
+        compress: str = "zlib",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        shuffle: bool = True,
+    ):
+        """write `data_array` starting from `start_index` to `path`; the existing file will be overwritten"""
+        values = np.asarray(data_array, dtype="<f")
+        codec = cls.CODECS[compress]
+        chunks = []
+        for i in range(0, len(values), chunk_size):
+            _chunk = values[i : i + chunk_size]
+            _buf = cls._shuffle(_chunk) if shuffle else _chunk.tobytes()
+            chunks.append(zlib.compress(_buf) if codec == cls.CODECS["zlib"] else lzma.compress(_buf))
+        offsets = np.cumsum([0] + [len(_c) for _c in chunks], dtype="<u8")
+        header = struct.pack(
+            cls.HEADER_FORMAT, cls.MAGIC, codec, int(shuffle), 0, int(start_index), len(values), chunk_size, len(chunks)
+        )
+        path = Path(path)
+        # NOTE: write to a temporary file and rename it, so that the readers never see a partially written file
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with tmp_path.open("wb") as fp:
+            fp.write(header)
+            fp.write(offsets.tobytes())
+            for _c in chunks:
+                fp.write(_c)
+        tmp_path.replace(path)
+
+    @classmethod
+    def read_file(cls, path: Union[str, Path]) -> Tuple[int, np.ndarray]:
+        """read the whole file; return (start_index, data)"""
+        with Path(path).open("rb") as fp:
+            header, offsets = cls._read_index(fp)
+            data = [cls._decode(header, fp.read(int(offsets[i + 1] - offsets[i]))) for i in range(header["n_chunks"])]
+        return header["start_index"], np.concatenate(data) if data else np.empty(0, dtype="<f")
+
+    @classmethod
+    def _read_index(cls, fp) -> Tuple[dict, np.ndarray]:
+        magic, codec, shuffle, _, start_index, length, chunk_size, n_chunks = struct.unpack(
+            cls.HEADER_FORMAT, fp.read(cls.HEADER_SIZE)
+        )
+        if magic != cls.MAGIC:
+            raise ValueError(f"{getattr(fp, 'name', fp)} is not a compressed feature file")
+        offsets = np.frombuffer(fp.read(8 * (n_chunks + 1)), dtype="<u8")
+        header = dict(
+            codec=codec,
+            shuffle=bool(shuffle),
+            start_index=start_index,
+            length=length,
+            chunk_size=chunk_size,
+            n_chunks=n_chunks,
+            data_offset=cls.HEADER_SIZE + 8 * (n_chunks + 1),
+        )
+        return header, offsets
+
+    @classmethod
+    def _decode(cls, header: dict, buf: bytes) -> np.ndarray:
+        buf = zlib.decompress(buf) if header["codec"] == cls.CODECS["zlib"] else lzma.decompress(buf)
+        if header["shuffle"]:
+            return cls._unshuffle(buf)
+        return np.frombuffer(buf, dtype="<f")
+
+    def _get_index(self) -> Union[Tuple[str, Tuple[int, int], dict, np.ndarray], Tuple[None, None, None, None]]:
+        """(uri, stat key, header, offsets) of the file; the cached index is reused until the file changes"""
+        uri = self.uri
+        try:
+            _stat = uri.stat()
+        except FileNotFoundError:
+            return None, None, None, None
+        key = str(uri)
+        stat_key = (_stat.st_mtime_ns, _stat.st_size)
+        if key not in self._index_cache or self._index_cache[key][0] != stat_key:
+            with uri.open("rb") as fp:
+                header, offsets = self._read_index(fp)
+            self._index_cache[key] = stat_key, header, offsets
+        _, header, offsets = self._index_cache[key]
+        return key, stat_key, header, offsets
+
+    def _read_range(self, si: int, ei: int, index=None) -> np.ndarray:
+        """read the data between [si, ei] (relative to start_index, both sides are closed)"""
+        key, stat_key, header, offsets = self._get_index() if index is None else index
+        chunk_size = header["chunk_size"]
+        first_chunk, last_chunk = si // chunk_size, ei // chunk_size
+        chunks = []
+        fp = None
+        try:
+            for _chunk_id in range(first_chunk, last_chunk + 1):
+                cache_key = (key, stat_key, _chunk_id)
+                if cache_key not in self._chunk_cache:
+                    if fp is None:
+                        fp = open(key, "rb")
+                    fp.seek(header["data_offset"] + int(offsets[_chunk_id]))
+                    _data = self._decode(header, fp.read(int(offsets[_chunk_id + 1] - offsets[_chunk_id])))
+                    _data.flags.writeable = False
+                    self._chunk_cache[cache_key] = _data
+                chunks.append(self._chunk_cache[cache_key])
+        finally:
+            if fp is not None:
+                fp.close()
+        data = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        offset = first_chunk * chunk_size
+        return data[si - offset : ei - offset + 1]
+
+    def clear(self):
+        self.write_file(self.uri, [], 0, self.compress, self.chunk_size)
+
+    def write(self, data_array: Union[List, np.ndarray], index: int = None) -> None:
+        if len(data_array) == 0:
+            logger.info(
+                "len(data_array) == 0, write"
+                "if you need to clear the FeatureStorage, please execute: FeatureStorage.clear"
+            )
+            return
+        data_array = np.asarray(data_array, dtype="<f")
+        old_index, old_data = self.read_file(self.uri) if self.uri.exists() else (0, [])
+        if len(old_data) == 0:
+            # write
+            index = 0 if index is None else index
+            self.write_file(self.uri, data_array, index, self.compress, self.chunk_size)
+        elif index is None or index > old_index + len(old_data) - 1:
+            # append
+            index = old_index + len(old_data) if index is None else index
+            _nan = np.full(index - old_index - len(old_data), np.nan, dtype="<f")
+            self.write_file(
+                self.uri, np.hstack([old_data, _nan, data_array]), old_index, self.compress, self.chunk_size
+            )
+        else:
+            # rewrite
+            start_index = min(index, old_index)
+            end_index = max(index + len(data_array), old_index + len(old_data))
+            data = np.full(end_index - start_index, np.nan, dtype="<f")
+            data[old_index - start_index : old_index - start_index + len(old_data)] = old_data
+            _slc = slice(index - start_index, index - start_index + len(data_array))
+            # the same as FileFeatureStorage: the NaNs of the new data are filled with the old data
+            data[_slc] = np.where(np.isnan(data_array), data[_slc], data_array)
+            self.write_file(self.uri, data, start_index, self.compress, self.chunk_size)
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        _, _, header, _ = self._get_index()
+        return None if header is None else header["start_index"]
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        _, _, header, _ = self._get_index()
+        # The next  data appending index point will be  `end_index + 1`
+        return None if header is None else header["start_index"] + header["length"] - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        index = self._get_index()
+        _, _, header, _ = index
+        if header is None:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        storage_start_index = header["start_index"]
+        storage_end_index = storage_start_index + header["length"] - 1
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            if i > storage_end_index:
+                raise IndexError(f"{i}: end index is {storage_end_index}")
+            return i, float(self._read_range(i - storage_start_index, i - storage_start_index, index)[0])
+        elif isinstance(i, slice):
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            ei = min(end_index, storage_end_index)
+            if si > ei:
+                return pd.Series(dtype=np.float32)
+            data = self._read_range(si - storage_start_index, ei - storage_start_index, index)
+            return pd.Series(data, index=pd.RangeIndex(si, si + len(data)))
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        self.check()
+        _, _, header, _ = self._get_index()
+        return header["length"]
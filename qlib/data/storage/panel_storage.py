@@ -0,0 +1,236 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Field-major (panel) feature storage
+
+The default layout ``features/<instrument>/<field>.<freq>.bin`` needs one file open per instrument per field.
+The panel layout stores each field as one dense ``calendar x instrument`` float32 matrix (row-major), so
+loading a field for the whole universe in a time range is a single contiguous read.
+
+.. code-block::
+
+    <provider_uri>/panels/
+        instruments.<freq>.txt      # "<instrument>\\t<start_index>\\t<end_index>" per line; line number == column
+        <field>.<freq>.bin          # float32 matrix with shape (len(calendar), len(instruments))
+
+- The instrument name is the name of the directory in ``features`` (i.e. ``code_to_fname(code).lower()``).
+- ``start_index``/``end_index`` are the valid range (both sides are closed) of the instrument; the values out of the
+  valid range are NaN.
+
+The panel files can be converted from the output of ``scripts/dump_bin.py`` by ``scripts/dump_panel.py`` and checked
+by ``scripts/check_dump_panel.py``.
+"""
+
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from qlib.config import C
+from qlib.utils.time import Freq
+from qlib.data.storage import FeatureStorage
+from qlib.data.storage.storage import BaseStorage
+from qlib.data.storage.file_storage import FileStorageMixin
+
+# instrument -> (column, start_index, end_index)
+PanelIndexVT = Dict[str, Tuple[int, int, int]]
+
+
+class PanelStorageMixin(FileStorageMixin):
+    """PanelStorageMixin, applicable to PanelXXXStorage
+
+    The panels and the instrument index are mapped/read once per process and shared by all the storage instances.
+    """
+
+    PANEL_DIR_NAME = "panels"
+    INDEX_SEP = "\t"
+
+    # {(data_uri, freq): PanelIndexVT}
+    _index_cache: Dict[Tuple[str, str], PanelIndexVT] = {}
+    # {(data_uri, file_name): np.ndarray}
+    _panel_cache: Dict[Tuple[str, str], np.ndarray] = {}
+
+    @classmethod
+    def clear_panel_cache(cls):
+        """drop the instrument indexes and the panel mappings of the current process"""
+        PanelStorageMixin._index_cache.clear()
+        PanelStorageMixin._panel_cache.clear()
+
+    @property
+    def panel_dir(self) -> Path:
+        if Freq(self.freq) not in self.support_freq:
+            raise ValueError(f"{self.storage_name}: {self.provider_uri} does not contain data for {self.freq}")
+        return self.dpm.get_data_uri(self.freq).joinpath(self.PANEL_DIR_NAME)
+
+    @property
+    def index_uri(self) -> Path:
+        return self.panel_dir.joinpath(f"instruments.{self.freq.lower()}.txt")
+
+    @property
+    def _cache_prefix(self) -> str:
+        return str(self.dpm.get_data_uri(self.freq))
+
+    @property
+    def panel_index(self) -> PanelIndexVT:
+        """instrument -> (column, start_index, end_index)
+
+        Raises
+        ------
+        ValueError
+            If the index does not exist, raise ValueError
+        """
+        key = (self._cache_prefix, self.freq.lower())
+        if key not in self._index_cache:
+            index_uri = self.index_uri
+            if not index_uri.exists():
+                raise ValueError(f"panel index not exists: {index_uri}")
+            df = pd.read_csv(index_uri, sep=self.INDEX_SEP, header=None, names=["instrument", "start", "end"])
+            self._index_cache[key] = {
+                str(inst): (col, int(s), int(e))
+                for col, (inst, s, e) in enumerate(df.itertuples(index=False, name=None))
+            }
+        return self._index_cache[key]
+
+
+class PanelFieldStorage(PanelStorageMixin, BaseStorage):
+    """The ``calendar x instrument`` panel of one field"""
+
+    def __init__(self, field: str, freq: str, provider_uri: dict = None, **kwargs):
+        self.field = field
+        self.freq = freq
+        self.kwargs = kwargs
+        self._provider_uri = None if provider_uri is None else C.DataPathManager.format_provider_uri(provider_uri)
+        self.file_name = f"{field.lower()}.{freq.lower()}.bin"
+
+    @property
+    def uri(self) -> Path:
+        return self.panel_dir.joinpath(self.file_name)
+
+    @property
+    def data(self) -> Union[np.ndarray, None]:
+        """the read-only panel with shape (len(calendar), len(instruments)); return None if the panel does not exist"""
+        key = (self._cache_prefix, self.file_name)
+        if key not in self._panel_cache:
+            uri = self.uri
+            if not uri.exists():
+                return None
+            n_cols = len(self.panel_index)
+            n_rows = uri.stat().st_size // (4 * n_cols) if n_cols > 0 else 0
+            if n_rows == 0:
+                panel = np.empty((0, n_cols), dtype="<f")
+            else:
+                panel = np.memmap(uri, dtype="<f", mode="r", shape=(n_rows, n_cols)).view(np.ndarray)
+            self._panel_cache[key] = panel
+        return self._panel_cache[key]
+
+    def column(self, instrument: str) -> Union[Tuple[int, int, int], Tuple[None, None, None]]:
+        """(column, start_index, end_index) of `instrument`"""
+        return self.panel_index.get(instrument.lower(), (None, None, None))
+
+    def __getitem__(self, i: slice) -> pd.DataFrame:
+        """x.__getitem__(slice(start: int, stop: int)) <==> x[start:stop]
+
+        Returns
+        -------
+            pd.DataFrame(values, index=pd.RangeIndex(start, stop), columns=instruments); a view of the panel
+
+        Notes
+        -------
+        if the panel does not exist, return empty pd.DataFrame
+        """
+        if not isinstance(i, slice):
+            raise TypeError(f"type(i) = {type(i)}")
+        panel = self.data
+        columns = list(self.panel_index)
+        if panel is None:
+            return pd.DataFrame(columns=columns, dtype=np.float32)
+        si = 0 if i.start is None else max(i.start, 0)
+        ei = len(panel) if i.stop is None else min(i.stop, len(panel))
+        if si >= ei:
+            return pd.DataFrame(columns=columns, dtype=np.float32)
+        return pd.DataFrame(panel[si:ei], index=pd.RangeIndex(si, ei), columns=columns, copy=False)
+
+    def __len__(self) -> int:
+        panel = self.data
+        if panel is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+        return len(panel)
+
+
+class PanelFeatureStorage(PanelStorageMixin, FeatureStorage):
+    """FeatureStorage of one (instrument, field) served from the column of the field panel
+
+    The panel format is read-only for the FeatureStorage interface; please use ``scripts/dump_panel.py`` to write it.
+    """
+
+    def __init__(self, instrument: str, field: str, freq: str, provider_uri: dict = None, **kwargs):
+        super(PanelFeatureStorage, self).__init__(instrument, field, freq, **kwargs)
+        self._field_storage = PanelFieldStorage(field, freq, provider_uri=provider_uri)
+        self._provider_uri = self._field_storage._provider_uri
+        self.file_name = self._field_storage.file_name
+
+    @property
+    def uri(self) -> Path:
+        return self._field_storage.uri
+
+    @property
+    def field_storage(self) -> PanelFieldStorage:
+        """the panel of the field, which can be used for cross-sectional reads"""
+        return self._field_storage
+
+    def _column(self) -> Union[Tuple[np.ndarray, int, int, int], Tuple[None, None, None, None]]:
+        panel = self._field_storage.data
+        if panel is None:
+            return None, None, None, None
+        col, start_index, end_index = self._field_storage.column(self.instrument)
+        if col is None:
+            return None, None, None, None
+        return panel, col, start_index, min(end_index, len(panel) - 1)
+
+    @property
+    def data(self) -> pd.Series:
+        return self[:]
+
+    @property
+    def start_index(self) -> Union[int, None]:
+        _, _, start_index, _ = self._column()
+        return start_index
+
+    @property
+    def end_index(self) -> Union[int, None]:
+        _, _, _, end_index = self._column()
+        return end_index
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Tuple[int, float], pd.Series]:
+        panel, col, storage_start_index, storage_end_index = self._column()
+        if panel is None:
+            if isinstance(i, int):
+                return None, None
+            elif isinstance(i, slice):
+                return pd.Series(dtype=np.float32)
+            else:
+                raise TypeError(f"type(i) = {type(i)}")
+
+        if isinstance(i, int):
+            if storage_start_index > i:
+                raise IndexError(f"{i}: start index is {storage_start_index}")
+            if i > storage_end_index:
+                raise IndexError(f"{i}: end index is {storage_end_index}")
+            return i, float(panel[i, col])
+        elif isinstance(i, slice):
+            start_index = storage_start_index if i.start is None else i.start
+            end_index = storage_end_index if i.stop is None else i.stop - 1
+            si = max(start_index, storage_start_index)
+            ei = min(end_index, storage_end_index)
+            if si > ei:
+                return pd.Series(dtype=np.float32)
+            return pd.Series(panel[si : ei + 1, col], index=pd.RangeIndex(si, ei + 1))
+        else:
+            raise TypeError(f"type(i) = {type(i)}")
+
+    def __len__(self) -> int:
+        panel, _, start_index, end_index = self._column()
+        if panel is None:
+            raise ValueError(f"{self.storage_name} not exists: {self.uri}")
+        return end_index - start_index + 1
@@ -10,6 +10,7 @@ import os
 import re
 import copy
 import json
+
 # import redis  # Redis is not needed according to user requirements
 import bisect
 import struct
@@ -39,6 +40,17 @@ log = get_module_logger("utils")
 is_deprecated_lexsorted_pandas = version.parse(pd.__version__) > version.parse("1.3.0")
 
 
+def is_copy_on_write() -> bool:
+    """Is the Copy-on-Write of pandas enabled (it is always enabled since pandas 3.0)"""
+    if version.parse(pd.__version__).major >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except KeyError:
+        # the option is added in pandas 1.5
+        return False
+
+
 #################### Server ####################
 def get_redis_connection():
     """get redis connection instance."""
@@ -5,7 +5,7 @@ This module covers some utility functions that operate on data or basic object
 """
 
 from copy import deepcopy
-from typing import List, Union
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -36,6 +36,136 @@ def zscore(x: Union[pd.Series, pd.DataFrame]):
     return (x - x.mean()).div(x.std())
 
 
+def get_datetime_segments(index: pd.Index, level: str = "datetime") -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """
+    Group the rows of the index by datetime for the cross sectional operations (the `cs_*` functions)
+
+    Parameters
+    ----------
+    index : pd.Index
+        the index with the datetime level, e.g. <datetime, instrument>
+    level : str
+        the name of the datetime level
+
+    Returns
+    -------
+    Tuple[Optional[np.ndarray], np.ndarray]
+        `order`: the rows sorted by datetime (None if the rows of each datetime are contiguous already);
+        `starts`: the first row (of the sorted rows) of each datetime
+    """
+    if isinstance(index, pd.MultiIndex):
+        codes = index.codes[index.names.index(level)]
+    else:
+        codes = pd.factorize(index.get_level_values(level))[0]
+    order = None
+    if len(codes) > 1 and (codes[1:] < codes[:-1]).any():
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+    starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    return order, np.concatenate([[0], starts]) if len(codes) else starts
+
+
+def _segment_ids(starts: np.ndarray, n: int) -> np.ndarray:
+    ids = np.zeros(n, dtype=np.int64)
+    ids[starts[1:]] = 1
+    return np.cumsum(ids)
+
+
+def _segment_mean(values: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """the count and the mean of the valid values in each segment"""
+    valid = ~np.isnan(values)
+    count = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.add.reduceat(np.where(valid, values, 0), starts, axis=0, dtype=np.float64) / count
+    return count, mean
+
+
+def _segment_cube(values: np.ndarray, starts: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scatter the values into the cube of <segment, column, row in the segment> padded with NaN, so that the values of
+    each segment and column are contiguous (e.g. to be sorted); `cube[ids, :, pos]` are the values
+    """
+    pos = np.arange(len(values)) - starts[ids]
+    lengths = np.diff(np.append(starts, len(values)))
+    cube = np.full((len(starts), values.shape[1], lengths.max()), np.nan, dtype=values.dtype)
+    cube[ids, :, pos] = values
+    return cube, pos
+
+
+def _segment_median(values: np.ndarray, starts: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """the median of the valid values in each segment (the mean of the two middle values if the count is even)"""
+    # the NaNs are the last ones of the sorted values
+    cube = np.sort(_segment_cube(values, starts, ids)[0], axis=-1)
+    count = (~np.isnan(cube)).sum(axis=-1)
+    lower = np.take_along_axis(cube, np.maximum(count - 1, 0)[..., None] // 2, axis=-1)[..., 0]
+    upper = np.take_along_axis(cube, count[..., None] // 2, axis=-1)[..., 0]
+    return (lower + upper) / 2
+
+
+def cs_zscore(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    The `zscore` of the columns in each segment, i.e. (x - mean) / std with the NaNs skipped and ddof=1
+
+    As pandas, the sums are accumulated in float64 and the results are in the dtype of `values`.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        the float data of 2 dimensions, whose rows are sorted by the segments (please refer to `get_datetime_segments`)
+    starts : np.ndarray
+        the first row of each segment
+    """
+    ids = _segment_ids(starts, len(values))
+    count, mean = _segment_mean(values, starts)
+    dev = values - mean.astype(values.dtype)[ids]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sqr = np.square(np.where(np.isnan(values), 0, dev), dtype=np.float64)
+        std = np.sqrt(np.add.reduceat(sqr, starts, axis=0) / (count - 1))
+    std[count < 2] = np.nan
+    return dev / std.astype(values.dtype)[ids]
+
+
+def cs_robust_zscore(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """The `robust_zscore` of the columns in each segment (please refer to `cs_zscore` for the parameters)"""
+    ids = _segment_ids(starts, len(values))
+    dev = values - _segment_median(values, starts, ids)[ids]
+    mad = _segment_median(np.abs(dev), starts, ids)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.clip(dev / mad[ids] / 1.4826, -3, 3)
+
+
+def cs_rank(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    The percentage rank of the columns in each segment, i.e. `rank(pct=True)` of pandas: the ties get the average rank
+    and the NaNs are kept (please refer to `cs_zscore` for the parameters)
+    """
+    ids = _segment_ids(starts, len(values))
+    cube, pos = _segment_cube(values, starts, ids)
+    order = np.argsort(cube, axis=-1)
+    cube = np.take_along_axis(cube, order, axis=-1)
+    # the first and the last position of the ties (the NaNs are the last ones and ranked as NaN)
+    first = np.ones(cube.shape, dtype=bool)
+    first[..., 1:] = cube[..., 1:] != cube[..., :-1]
+    last = np.ones(cube.shape, dtype=bool)
+    last[..., :-1] = first[..., 1:]
+    rows = np.arange(cube.shape[-1])
+    first_pos = np.maximum.accumulate(np.where(first, rows, 0), axis=-1)
+    last_pos = np.minimum.accumulate(np.where(last, rows, len(rows))[..., ::-1], axis=-1)[..., ::-1]
+    count = (~np.isnan(cube)).sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rank = np.where(np.isnan(cube), np.nan, ((first_pos + last_pos) / 2 + 1) / count)
+    res = np.empty(rank.shape)
+    np.put_along_axis(res, order, rank, axis=-1)
+    return res[ids, :, pos]
+
+
+def cs_fillna(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Fill the NaNs of the columns with the mean of each segment (please refer to `cs_zscore` for the parameters)"""
+    ids = _segment_ids(starts, len(values))
+    _, mean = _segment_mean(values, starts)
+    return np.where(np.isnan(values), mean.astype(values.dtype)[ids], values)
+
+
 def deepcopy_basic_type(obj: object) -> object:
     """
     deepcopy an object without copy the complicated objects.
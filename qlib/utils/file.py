@@ -2,6 +2,7 @@
 # Licensed under the MIT License.
 
 import os
+import time
 import shutil
 import tempfile
 import contextlib
@@ -188,3 +189,105 @@ def get_io_object(file: Union[IO, str, Path], *args, **kwargs) -> IO:
             raise NotImplementedError(f"This type[{type(file)}] of input is not supported")
         with file.open(*args, **kwargs) as f:
             yield f
+
+
+class FileRWLock:
+    """A reader/writer lock between the processes (and the threads) of a machine based on a lock file
+
+    The readers share the lock and a writer holds it exclusively. It uses `fcntl.flock`, which is released by the OS
+    even if the process is killed. On the platforms without `fcntl` (e.g. Windows), the lock file is created
+    exclusively (`O_EXCL`) instead and the readers are exclusive too.
+
+    Example:
+
+        .. code-block:: python
+
+            lock = FileRWLock("/path/to/the.lock")
+            with lock.writer():
+                ...
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None, poll_interval: float = 0.01):
+        """
+        Parameters
+        ----------
+        path : Union[str, Path]
+            the path of the lock file; its directory is created if it doesn't exist
+        timeout : Optional[float]
+            the seconds to wait for the lock before `TimeoutError` is raised; None waits forever
+        poll_interval : float
+            the seconds between the attempts to acquire the lock
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @contextlib.contextmanager
+    def reader(self):
+        """hold the lock shared with the other readers"""
+        with self._acquire(shared=True):
+            yield
+
+    @contextlib.contextmanager
+    def writer(self):
+        """hold the lock exclusively"""
+        with self._acquire(shared=False):
+            yield
+
+    @contextlib.contextmanager
+    def _acquire(self, shared: bool):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            import fcntl  # pylint: disable=C0415
+        except ImportError:
+            fcntl = None
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        if fcntl is None:
+            fd = None
+            while fd is None:
+                try:
+                    fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                except FileExistsError:
+                    self._wait(deadline)
+            try:
+                yield
+            finally:
+                os.close(fd)
+                os.unlink(self.path)
+            return
+
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o666)
+        try:
+            op = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            if deadline is None:
+                fcntl.flock(fd, op)
+            else:
+                while True:
+                    try:
+                        fcntl.flock(fd, op | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        self._wait(deadline)
+            yield
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+    def _wait(self, deadline):
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Timeout to acquire the lock {self.path}")
+        time.sleep(self.poll_interval)
+
+
+def atomic_write(path: Union[str, Path], data: bytes):
+    """write `data` to a temporary file and rename it to `path`, so the readers never see a partial file"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
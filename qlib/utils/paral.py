@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 
+import time
+import atexit
 import threading
 from functools import partial
 from threading import Thread
@@ -30,6 +32,89 @@ class ParallelExt(Parallel):
                 self._backend_kwargs["maxtasksperchild"] = maxtasksperchild  # pylint: disable=E1101
 
 
+class ParallelPool:
+    """
+    A process-wide ``ParallelExt`` whose workers are kept alive and reused across calls.
+
+    Spawning the workers (and warming them up with the config and the calendar) is paid once instead of on every
+    call. The pool is rebuilt when the parameters of ``ParallelExt`` change, and it is shut down when it has been
+    idle for more than ``lifetime`` seconds (by a timer, so the idle workers don't hold their memory while the
+    process is idle), by ``shutdown`` or at exit.
+
+    NOTE: the workers forked by the pool keep the state of the process when the pool is created, so the pool must be
+    shut down when the config is changed (``qlib.init`` does it).
+    """
+
+    _lock = threading.RLock()
+    _paral: Union[ParallelExt, None] = None
+    _key = None
+    _last_used = 0.0
+    _reaper: Union[threading.Timer, None] = None
+
+    @classmethod
+    def run(cls, task_l: list, lifetime: Union[float, None] = None, **kwargs) -> list:
+        """
+        Run the delayed tasks with the pool
+
+        Parameters
+        ----------
+        task_l : list
+            the delayed tasks
+        lifetime : Union[float, None]
+            the max idle seconds of the pool; None means the pool lives until `shutdown` is called
+        kwargs :
+            the parameters of `ParallelExt`
+        """
+        with cls._lock:
+            cls._cancel_reaper()
+            key = tuple(sorted(kwargs.items()))
+            expired = lifetime is not None and time.time() - cls._last_used > lifetime
+            if cls._paral is not None and (cls._key != key or expired):
+                cls.shutdown()
+            if cls._paral is None:
+                cls._paral = ParallelExt(**kwargs)
+                cls._paral.__enter__()
+                cls._key = key
+            try:
+                res = cls._paral(task_l)
+            except BaseException:
+                # the workers may be broken by the failed call
+                cls.shutdown()
+                raise
+            cls._last_used = time.time()
+            if lifetime is not None:
+                cls._reaper = threading.Timer(lifetime, cls._reap, args=(lifetime,))
+                cls._reaper.daemon = True
+                cls._reaper.start()
+            return res
+
+    @classmethod
+    def _reap(cls, lifetime: float):
+        """shut down the pool if it has been idle for `lifetime` seconds"""
+        with cls._lock:
+            if cls._paral is not None and time.time() - cls._last_used >= lifetime:
+                cls.shutdown()
+
+    @classmethod
+    def _cancel_reaper(cls):
+        if cls._reaper is not None:
+            cls._reaper.cancel()
+            cls._reaper = None
+
+    @classmethod
+    def shutdown(cls):
+        """terminate the workers of the pool"""
+        with cls._lock:
+            cls._cancel_reaper()
+            if cls._paral is not None:
+                cls._paral.__exit__(None, None, None)
+            cls._paral = None
+            cls._key = None
+
+
+atexit.register(ParallelPool.shutdown)
+
+
 def datetime_groupby_apply(
     df, apply_func: Union[Callable, Text], axis=0, level="datetime", resample_rule="ME", n_jobs=-1
 ):
@@ -1,8 +1,11 @@
+import threading
+
 import numpy as np
 import pandas as pd
 
+from collections import OrderedDict
 from functools import partial
-from typing import Union, Callable
+from typing import Union, Callable, Optional, Tuple
 
 from . import lazy_sort_index
 from .time import Freq, cal_sam_minute
@@ -99,6 +102,209 @@ def get_higher_eq_freq_feature(instruments, fields, start_time=None, end_time=No
     return _result, _freq
 
 
+# the bucket maps of the latest indexes, which are shared by the series on the same timestamps (e.g. the instruments
+# on the same 1min calendar)
+_RESAM_BUCKETS = OrderedDict()
+_RESAM_BUCKETS_SIZE = 16
+_RESAM_BUCKETS_LOCK = threading.Lock()
+
+
+def _resam_step(freq) -> Optional[int]:
+    """the length (ns) of the fixed frequency `freq` of `pd.Series.resample`; None if the length is not fixed"""
+    try:
+        offset = pd.tseries.frequencies.to_offset(freq)
+    except ValueError:
+        return None
+    if isinstance(offset, pd.offsets.Tick):
+        return offset.nanos
+    if isinstance(offset, pd.offsets.Day):
+        return offset.n * pd.Timedelta(days=1).value
+    return None
+
+
+def _as_ns(values) -> np.ndarray:
+    """the int64 nanoseconds of the timestamps (whatever their unit is)"""
+    return np.asarray(values, dtype="datetime64[ns]").view(np.int64)
+
+
+def get_resam_buckets(index: pd.Index, freq) -> Optional[Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]]:
+    """
+    The bucket map to resample the data on `index` into `freq` in the same way as `pd.Series.resample`, i.e. the
+    buckets of the fixed length are closed on the left and labeled by the left edges, starting from the midnight of
+    the first day.
+
+    Parameters
+    ----------
+    index : pd.Index
+        the sorted DatetimeIndex of the data
+    freq : str
+        the fixed frequency, e.g. "30min", "3s", "1D"
+
+    Returns
+    -------
+    Optional[Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]]
+        the labels of all the buckets between the first and the last timestamp, the bucket of each row and the first
+        row of each non-empty bucket; None if the data is not supported (e.g. the calendar frequencies like "W").
+    """
+    step = _resam_step(freq)
+    if (
+        step is None
+        or not isinstance(index, pd.DatetimeIndex)
+        or index.tz is not None
+        or len(index) == 0
+        or not index.is_monotonic_increasing
+    ):
+        return None
+    stamps = _as_ns(index)
+    key = freq, len(stamps), stamps[0], stamps[-1]
+    with _RESAM_BUCKETS_LOCK:
+        cached = _RESAM_BUCKETS.get(key)
+        if cached is not None and np.array_equal(cached[0], stamps):
+            _RESAM_BUCKETS.move_to_end(key)
+            return cached[1]
+    origin = int(_as_ns(index[0].normalize()))
+    codes = (stamps - origin) // step
+    codes -= codes[0]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+    label_kwargs = dict(
+        start=pd.Timestamp(origin + (stamps[0] - origin) // step * step),
+        periods=codes[-1] + 1,
+        freq=freq,
+        name=index.name,
+    )
+    try:
+        # the labels are of the same unit as the index
+        labels = pd.date_range(**label_kwargs, unit=index.unit)
+    except AttributeError:
+        # pandas < 2.0: the unit is always "ns"
+        labels = pd.date_range(**label_kwargs)
+    buckets = labels, codes, starts
+    with _RESAM_BUCKETS_LOCK:
+        _RESAM_BUCKETS[key] = stamps, buckets
+        if len(_RESAM_BUCKETS) > _RESAM_BUCKETS_SIZE:
+            _RESAM_BUCKETS.popitem(last=False)
+    return buckets
+
+
+# the methods aggregated by `reduce_buckets`
+_VECTORIZED_METHODS = ("sum", "mean", "max", "min", "first", "last", "count")
+
+
+def reduce_buckets(
+    values: np.ndarray, codes: np.ndarray, starts: np.ndarray, n_buckets: int, method: str, min_count: int = 0
+) -> np.ndarray:
+    """
+    Aggregate the rows of `values` in the buckets in the same way as the groupby methods of pandas (the NaNs are
+    skipped).
+
+    Parameters
+    ----------
+    values : np.ndarray
+        the float data (1 or 2 dimensions), whose rows are sorted by the buckets
+    codes : np.ndarray
+        the bucket of each row
+    starts : np.ndarray
+        the first row of each non-empty bucket
+    n_buckets : int
+        the number of the buckets
+    method : str
+        sum, mean, max, min, first, last or count
+    min_count : int
+        the minimum number of the valid values to get a sum (otherwise NaN)
+
+    Returns
+    -------
+    np.ndarray
+        the results of the buckets (the empty buckets are NaN, or 0 for count/sum with `min_count=0`)
+    """
+    valid = ~np.isnan(values)
+    shape = (n_buckets,) + values.shape[1:]
+    buckets = codes[starts]
+    if method == "count":
+        res = np.zeros(shape, dtype=np.int64)
+        res[buckets] = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+        return res
+    if method in ("sum", "mean"):
+        count = np.zeros(shape, dtype=np.int64)
+        count[buckets] = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+        total = np.zeros(shape, dtype=np.float64)
+        total[buckets] = np.add.reduceat(np.where(valid, values, 0), starts, axis=0, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            res = total / count if method == "mean" else np.where(count >= max(min_count, 1), total, np.nan)
+        if method == "sum" and min_count == 0:
+            res[count == 0] = 0
+        return res.astype(values.dtype, copy=False)
+    res = np.full(shape, np.nan, dtype=values.dtype)
+    if method in ("max", "min"):
+        func = np.fmax if method == "max" else np.fmin
+        res[buckets] = func.reduceat(values, starts, axis=0)
+    elif method in ("first", "last"):
+        rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+        if method == "first":
+            pos = np.minimum.reduceat(np.where(valid, rows, len(values)), starts, axis=0)
+        else:
+            pos = np.maximum.reduceat(np.where(valid, rows, -1), starts, axis=0)
+        found = (pos >= 0) & (pos < len(values))
+        pos = np.where(found, pos, 0)
+        taken = values[pos] if values.ndim == 1 else np.take_along_axis(values, pos, axis=0)
+        res[buckets] = np.where(found, taken, np.nan)
+    else:
+        raise ValueError(f"method {method} is not supported")
+    return res
+
+
+def resam_series(series: pd.Series, freq: str, method: str) -> pd.Series:
+    """
+    Resample the series into `freq` by `method`, the same as ``getattr(series.resample(freq), method)()`` (the sum is
+    calculated with `min_count=1`).
+
+    The float series on a fixed frequency are resampled by `reduce_buckets` on the shared bucket maps; the others are
+    resampled by pandas.
+    """
+    buckets = None
+    values = series.to_numpy()
+    if method in _VECTORIZED_METHODS + ("ffill",) and (
+        values.dtype.kind == "f" or method == "mean" and values.dtype.kind in "biu"
+    ):
+        buckets = get_resam_buckets(series.index, freq)
+    if buckets is None:
+        if method == "sum":
+            return series.resample(freq).sum(min_count=1)
+        return getattr(series.resample(freq), method)()
+    labels, codes, starts = buckets
+    if method == "ffill":
+        # the latest value at or before each label
+        pos = _as_ns(series.index).searchsorted(_as_ns(labels), side="right") - 1
+        res = np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan).astype(values.dtype, copy=False)
+    else:
+        if values.dtype.kind != "f":
+            values = values.astype(np.float64)
+        res = reduce_buckets(values, codes, starts, len(labels), method, min_count=1)
+    return pd.Series(res, index=labels, name=series.name)
+
+
+def _resam_groups(feature: Union[pd.DataFrame, pd.Series], method: str) -> Union[pd.DataFrame, pd.Series, None]:
+    """aggregate each instrument of the feature indexed by <instrument, datetime> or <datetime, instrument> in the
+    same way as ``getattr(feature.groupby(level="instrument"), method)()``; None if it is not supported"""
+    if isinstance(feature, pd.DataFrame) and feature.dtypes.nunique() > 1:
+        return None
+    values = feature.to_numpy()
+    if values.dtype.kind != "f":
+        return None
+    level = feature.index.names.index("instrument") if "instrument" in feature.index.names else 1
+    inst_codes = feature.index.codes[level]
+    if level != 0:
+        order = np.argsort(inst_codes, kind="stable")
+        inst_codes, values = inst_codes[order], values[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(inst_codes)) + 1])
+    codes = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(inst_codes))))
+    res = reduce_buckets(values, codes, starts, len(starts), method)
+    index = feature.index.levels[level][inst_codes[starts]].rename(feature.index.names[level])
+    if isinstance(feature, pd.DataFrame):
+        return pd.DataFrame(res, index=index, columns=feature.columns)
+    return pd.Series(res, index=index, name=feature.name)
+
+
 def resam_ts_data(
     ts_feature: Union[pd.DataFrame, pd.Series],
     start_time: Union[str, pd.Timestamp] = None,
@@ -169,6 +375,8 @@ def resam_ts_data(
         sample method, apply method function to each stock series data, by default "last"
         - If type(method) is str or callable function, it should be an attribute of SeriesGroupBy or DataFrameGroupby, and applies groupy.method for the sliced time-series data
         - If method is None, do nothing for the sliced time-series data.
+        - The float data with MultiIndex is aggregated by numpy (`reduce_buckets`) for sum, mean, max, min, first,
+          last, count, `ts_data_last` and `ts_data_first` without `method_kwargs`.
     method_kwargs : dict, optional
         arguments of method, by default {}
 
@@ -192,6 +400,11 @@ def resam_ts_data(
     if feature.empty:
         return None
     if isinstance(feature.index, pd.MultiIndex):
+        _method = {ts_data_last: "last", ts_data_first: "first"}.get(method, method)
+        if not method_kwargs and isinstance(_method, str) and _method in _VECTORIZED_METHODS:
+            res = _resam_groups(feature, _method)
+            if res is not None:
+                return res
         if callable(method):
             method_func = method
             return feature.groupby(level="instrument", group_keys=False).apply(method_func, **method_kwargs)
@@ -222,7 +435,11 @@ def get_valid_value(series, last=True):
     Nan | float
         the first/last valid value
     """
-    return series.ffill().iloc[-1] if last else series.bfill().iloc[0]
+    values = series.to_numpy()
+    pos = np.flatnonzero(pd.notna(values))
+    if len(pos) == 0:
+        return values[-1] if last else values[0]
+    return values[pos[-1]] if last else values[pos[0]]
 
 
 def _ts_data_valid(ts_feature, last=False):
@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import qlib
+
+import fire
+import numpy as np
+from tqdm import tqdm
+from loguru import logger
+
+from qlib.data.storage.file_storage import FileFeatureStorage
+from qlib.data.storage.panel_storage import PanelFeatureStorage
+
+
+class CheckPanel:
+    NOT_IN_PANEL = "not in panel"
+    COMPARE_FALSE = "compare False"
+    COMPARE_TRUE = "compare True"
+    COMPARE_ERROR = "compare error"
+
+    def __init__(
+        self,
+        qlib_dir: str,
+        check_fields: str = None,
+        freq: str = "day",
+        max_workers: int = 16,
+    ):
+        """
+
+        Parameters
+        ----------
+        qlib_dir : str
+            qlib dir
+        check_fields : str, optional
+            check fields, by default None, check qlib_dir/features/<first_dir>/*.<freq>.bin
+        freq : str, optional
+            freq, value from ["day", "1m"]
+        max_workers: int, optional
+            max workers, by default 16
+        """
+        self.qlib_dir = Path(qlib_dir).expanduser()
+        bin_path_list = list(self.qlib_dir.joinpath("features").iterdir())
+        self.qlib_symbols = sorted(map(lambda x: x.name.lower(), bin_path_list))
+        qlib.init(
+            provider_uri=str(self.qlib_dir.resolve()),
+            mount_path=str(self.qlib_dir.resolve()),
+            auto_mount=False,
+            redis_port=-1,
+        )
+        if check_fields is None:
+            check_fields = list(map(lambda x: x.name.split(".")[0], bin_path_list[0].glob(f"*.{freq}.bin")))
+        else:
+            check_fields = check_fields.split(",") if isinstance(check_fields, str) else check_fields
+        self.check_fields = list(map(lambda x: x.strip(), check_fields))
+        self.max_workers = max_workers
+        self.freq = freq
+
+    def _compare(self, symbol: str):
+        try:
+            for field in self.check_fields:
+                bin_s = FileFeatureStorage(instrument=symbol, field=field, freq=self.freq)[:]
+                panel_s = PanelFeatureStorage(instrument=symbol, field=field, freq=self.freq)
+                if panel_s.start_index is None:
+                    if bin_s.dropna().empty:
+                        continue
+                    return self.NOT_IN_PANEL
+                panel_s = panel_s[:]
+                # the valid range of the panel is shared by all the fields of the symbol
+                if not bin_s.drop(panel_s.index, errors="ignore").dropna().empty:
+                    return self.COMPARE_FALSE
+                if not np.array_equal(bin_s.reindex(panel_s.index).values, panel_s.values, equal_nan=True):
+                    return self.COMPARE_FALSE
+            return self.COMPARE_TRUE
+        except Exception as e:
+            logger.warning(f"{symbol} compare error: {e}")
+            return self.COMPARE_ERROR
+
+    def check(self):
+        """Check whether the panel files after ``dump_panel.py`` is executed are consistent with the bin files"""
+        logger.info("start check......")
+
+        error_list = []
+        not_in_panel = []
+        compare_false = []
+        with tqdm(total=len(self.qlib_symbols)) as p_bar:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                for symbol, _check_res in zip(self.qlib_symbols, executor.map(self._compare, self.qlib_symbols)):
+                    if _check_res == self.NOT_IN_PANEL:
+                        not_in_panel.append(symbol)
+                    elif _check_res == self.COMPARE_ERROR:
+                        error_list.append(symbol)
+                    elif _check_res == self.COMPARE_FALSE:
+                        compare_false.append(symbol)
+                    p_bar.update()
+
+        logger.info("end of check......")
+        if error_list:
+            logger.warning(f"compare error: {error_list}")
+        if not_in_panel:
+            logger.warning(f"not in panel: {not_in_panel}")
+        if compare_false:
+            logger.warning(f"compare False: {compare_false}")
+        logger.info(
+            f"total {len(self.qlib_symbols)}, {len(error_list)} errors, {len(not_in_panel)} not in panel, {len(compare_false)} compare false"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(CheckPanel)
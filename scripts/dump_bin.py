@@ -15,6 +15,7 @@ import pandas as pd
 from tqdm import tqdm
 from loguru import logger
 from qlib.utils import fname_to_code, code_to_fname
+from qlib.data.storage.file_storage import CompressedFileFeatureStorage
 
 
 def read_as_df(file_path: Union[str, Path], **kwargs) -> pd.DataFrame:
@@ -78,6 +79,8 @@ class DumpDataBase:
         exclude_fields: str = "",
         include_fields: str = "",
         limit_nums: int = None,
+        compress: str = None,
+        chunk_size: int = CompressedFileFeatureStorage.DEFAULT_CHUNK_SIZE,
     ):
         """
 
@@ -105,6 +108,11 @@ class DumpDataBase:
             fields not dumped
         limit_nums: int
             Use when debugging, default None
+        compress: str, default None
+            None: dump the plain `.bin` files; "zlib"/"lzma": dump the chunked compressed `.cbin` files, which can be
+            read by `qlib.data.storage.file_storage.CompressedFileFeatureStorage`
+        chunk_size: int
+            the number of calendar points per compressed chunk, only used when `compress` is not None
         """
         data_path = Path(data_path).expanduser()
         if isinstance(exclude_fields, str):
@@ -132,6 +140,12 @@ class DumpDataBase:
         self._calendars_dir = self.qlib_dir.joinpath(self.CALENDARS_DIR_NAME)
         self._features_dir = self.qlib_dir.joinpath(self.FEATURES_DIR_NAME)
         self._instruments_dir = self.qlib_dir.joinpath(self.INSTRUMENTS_DIR_NAME)
+        if compress is not None and compress not in CompressedFileFeatureStorage.CODECS:
+            raise ValueError(f"compress must be one of {list(CompressedFileFeatureStorage.CODECS)}, got {compress}")
+        self.compress = compress
+        self.chunk_size = chunk_size
+        if self.compress is not None:
+            self.DUMP_FILE_SUFFIX = CompressedFileFeatureStorage.DUMP_FILE_SUFFIX
 
         self._calendars_list = []
 
@@ -260,7 +274,17 @@ class DumpDataBase:
             bin_path = features_dir.joinpath(f"{field.lower()}.{self.freq}{self.DUMP_FILE_SUFFIX}")
             if field not in _df.columns:
                 continue
-            if bin_path.exists() and self._mode == self.UPDATE_MODE:
+            if self.compress is not None:
+                if bin_path.exists() and self._mode == self.UPDATE_MODE:
+                    # update; the compressed file is rewritten with the appended data
+                    _start_index, _data = CompressedFileFeatureStorage.read_file(bin_path)
+                    _data = np.hstack([_data, _df[field]])
+                else:
+                    _start_index, _data = date_index, np.array(_df[field])
+                CompressedFileFeatureStorage.write_file(
+                    bin_path.resolve(), _data, _start_index, compress=self.compress, chunk_size=self.chunk_size
+                )
+            elif bin_path.exists() and self._mode == self.UPDATE_MODE:
                 # update
                 with bin_path.open("ab") as fp:
                     np.array(_df[field]).astype("<f").tofile(fp)
@@ -403,6 +427,8 @@ class DumpDataUpdate(DumpDataBase):
         exclude_fields: str = "",
         include_fields: str = "",
         limit_nums: int = None,
+        compress: str = None,
+        chunk_size: int = CompressedFileFeatureStorage.DEFAULT_CHUNK_SIZE,
     ):
         """
 
@@ -430,6 +456,11 @@ class DumpDataUpdate(DumpDataBase):
             fields not dumped
         limit_nums: int
             Use when debugging, default None
+        compress: str, default None
+            None: dump the plain `.bin` files; "zlib"/"lzma": dump the chunked compressed `.cbin` files, which can be
+            read by `qlib.data.storage.file_storage.CompressedFileFeatureStorage`
+        chunk_size: int
+            the number of calendar points per compressed chunk, only used when `compress` is not None
         """
         super().__init__(
             data_path,
@@ -442,6 +473,9 @@ class DumpDataUpdate(DumpDataBase):
             symbol_field_name,
             exclude_fields,
             include_fields,
+            limit_nums,
+            compress,
+            chunk_size,
         )
         self._mode = self.UPDATE_MODE
         self._old_calendar_list = self._read_calendars(self._calendars_dir.joinpath(f"{self.freq}.txt"))
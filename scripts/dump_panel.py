@@ -0,0 +1,148 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+from pathlib import Path
+from functools import partial
+from typing import Iterable, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+import fire
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from loguru import logger
+
+from qlib.data.storage.panel_storage import PanelStorageMixin
+
+
+class DumpPanel:
+    CALENDARS_DIR_NAME = "calendars"
+    FEATURES_DIR_NAME = "features"
+    PANEL_DIR_NAME = PanelStorageMixin.PANEL_DIR_NAME
+    INDEX_SEP = PanelStorageMixin.INDEX_SEP
+    DUMP_FILE_SUFFIX = ".bin"
+
+    def __init__(
+        self,
+        qlib_dir: str,
+        freq: str = "day",
+        max_workers: int = 16,
+        include_fields: str = "",
+        exclude_fields: str = "",
+    ):
+        """Convert the output of ``dump_bin.py`` to the field-major panel format
+
+        Each field is stored as one ``calendar x instrument`` float32 matrix in ``<qlib_dir>/panels``,
+        please refer to ``qlib.data.storage.panel_storage`` for the details of the format.
+
+        Parameters
+        ----------
+        qlib_dir: str
+            qlib(dump) data directory
+        freq: str, default "day"
+            transaction frequency
+        max_workers: int, default 16
+            number of processes; one field is converted by one process
+        include_fields: str
+            fields to convert, separated by ","; by default all the fields in ``features``
+        exclude_fields: str
+            fields not converted, separated by ","
+        """
+        self.qlib_dir = Path(qlib_dir).expanduser().resolve()
+        self.freq = freq
+        self.works = max_workers
+        if isinstance(include_fields, str):
+            include_fields = include_fields.split(",")
+        if isinstance(exclude_fields, str):
+            exclude_fields = exclude_fields.split(",")
+        self._include_fields = tuple(filter(lambda x: len(x) > 0, map(lambda x: x.strip().lower(), include_fields)))
+        self._exclude_fields = tuple(filter(lambda x: len(x) > 0, map(lambda x: x.strip().lower(), exclude_fields)))
+
+        self._features_dir = self.qlib_dir.joinpath(self.FEATURES_DIR_NAME)
+        self._panel_dir = self.qlib_dir.joinpath(self.PANEL_DIR_NAME)
+        self._bin_suffix = f".{self.freq.lower()}{self.DUMP_FILE_SUFFIX}"
+
+    @property
+    def calendar_size(self) -> int:
+        calendar_path = self.qlib_dir.joinpath(self.CALENDARS_DIR_NAME, f"{self.freq}.txt")
+        with calendar_path.open("r") as fp:
+            return sum(1 for line in fp if line.strip())
+
+    @property
+    def instruments(self) -> List[str]:
+        return sorted(p.name for p in self._features_dir.iterdir() if p.is_dir())
+
+    def get_dump_fields(self) -> Iterable[str]:
+        if self._include_fields:
+            return self._include_fields
+        fields = set()
+        for inst in self.instruments:
+            fields |= set(
+                p.name[: -len(self._bin_suffix)] for p in self._features_dir.joinpath(inst).glob(f"*{self._bin_suffix}")
+            )
+        return sorted(fields - set(self._exclude_fields))
+
+    def _get_range(self, inst: str, fields: Iterable[str]) -> Tuple[str, int, int]:
+        """the union of the valid ranges of all the fields of `inst`"""
+        start_index, end_index = None, None
+        for field in fields:
+            bin_path = self._features_dir.joinpath(inst, f"{field}{self._bin_suffix}")
+            if not bin_path.exists() or bin_path.stat().st_size <= 4:
+                continue
+            _start = int(np.fromfile(bin_path, dtype="<f", count=1)[0])
+            _end = _start + bin_path.stat().st_size // 4 - 2
+            start_index = _start if start_index is None else min(start_index, _start)
+            end_index = _end if end_index is None else max(end_index, _end)
+        return inst, start_index, end_index
+
+    def _dump_field(self, field: str, instruments: List[str], n_rows: int):
+        panel_path = self._panel_dir.joinpath(f"{field}{self._bin_suffix}")
+        panel = np.memmap(panel_path, dtype="<f", mode="w+", shape=(n_rows, len(instruments)))
+        panel[:] = np.nan
+        for col, inst in enumerate(instruments):
+            bin_path = self._features_dir.joinpath(inst, f"{field}{self._bin_suffix}")
+            if not bin_path.exists():
+                continue
+            data = np.fromfile(bin_path, dtype="<f")
+            if len(data) <= 1:
+                continue
+            start_index = int(data[0])
+            values = data[1 : n_rows - start_index + 1]
+            panel[start_index : start_index + len(values), col] = values
+        panel.flush()
+        del panel
+
+    def dump(self):
+        fields = self.get_dump_fields()
+        n_rows = self.calendar_size
+        logger.info(f"start dump panels: {len(fields)} fields, calendar size {n_rows}......")
+
+        ranges = []
+        with tqdm(total=len(self.instruments)) as p_bar:
+            with ProcessPoolExecutor(max_workers=self.works) as executor:
+                for _range in executor.map(partial(self._get_range, fields=fields), self.instruments):
+                    if _range[1] is not None:
+                        ranges.append(_range)
+                    p_bar.update()
+        instruments = [_range[0] for _range in ranges]
+
+        self._panel_dir.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(ranges).to_csv(
+            self._panel_dir.joinpath(f"instruments.{self.freq.lower()}.txt"),
+            sep=self.INDEX_SEP,
+            header=False,
+            index=False,
+        )
+        _dump_func = partial(self._dump_field, instruments=instruments, n_rows=n_rows)
+        with tqdm(total=len(fields)) as p_bar:
+            with ProcessPoolExecutor(max_workers=self.works) as executor:
+                for _ in executor.map(_dump_func, fields):
+                    p_bar.update()
+        logger.info("end of panels dump.\n")
+
+    def __call__(self, *args, **kwargs):
+        self.dump()
+
+
+if __name__ == "__main__":
+    fire.Fire(DumpPanel)
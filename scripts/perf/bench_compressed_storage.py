@@ -0,0 +1,106 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the disk footprint and the read latency of ``FileFeatureStorage`` and ``CompressedFileFeatureStorage``.
+
+The ``.bin`` files of ``provider_uri`` are converted to ``.cbin`` files in ``output_dir`` (``provider_uri`` is not
+changed), and the same slices are read from both providers.
+
+Example:
+
+    python bench_compressed_storage.py --provider_uri ~/.qlib/qlib_data/cn_data --compress zlib --chunk_size 512
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple, Union
+
+import fire
+import numpy as np
+from loguru import logger
+
+import qlib
+from qlib.data import D
+from qlib.data.data import Cal
+from qlib.data.storage.file_storage import FileFeatureStorage, CompressedFileFeatureStorage
+
+RAW_FIELDS = ["open", "close", "high", "low", "volume", "vwap"]
+
+
+def _convert(provider_uri: Path, output_dir: Path, compress: str, chunk_size: int) -> Tuple[int, int]:
+    """convert the raw fields to the compressed format; return (bin bytes, cbin bytes)"""
+    for _dir in ["calendars", "instruments"]:
+        shutil.copytree(provider_uri.joinpath(_dir), output_dir.joinpath(_dir), dirs_exist_ok=True)
+    bin_size = cbin_size = 0
+    for bin_path in provider_uri.joinpath("features").glob("*/*.day.bin"):
+        if bin_path.name.split(".")[0] not in RAW_FIELDS:
+            continue
+        cbin_path = output_dir.joinpath("features", bin_path.parent.name, bin_path.name).with_suffix(".cbin")
+        cbin_path.parent.mkdir(parents=True, exist_ok=True)
+        data = np.fromfile(bin_path, dtype="<f")
+        CompressedFileFeatureStorage.write_file(cbin_path, data[1:], int(data[0]), compress, chunk_size)
+        bin_size += bin_path.stat().st_size
+        cbin_size += cbin_path.stat().st_size
+    return bin_size, cbin_size
+
+
+def _bench_storage(
+    storage_cls: type, provider_uri: str, instruments: list, start_index: int, end_index: int, repeat: int
+) -> float:
+    """return the average seconds of reading every (instrument, field) once"""
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        for inst in instruments:
+            for field in RAW_FIELDS:
+                storage_cls(instrument=inst, field=field, freq="day", provider_uri=provider_uri)[
+                    start_index : end_index + 1
+                ]
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs))
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = "2018-01-01",
+    end_time: Union[str, None] = "2018-12-31",
+    compress: str = "zlib",
+    chunk_size: int = CompressedFileFeatureStorage.DEFAULT_CHUNK_SIZE,
+    output_dir: str = None,
+    repeat: int = 5,
+):
+    provider_uri = Path(provider_uri).expanduser()
+    _output_dir = Path(tempfile.mkdtemp() if output_dir is None else output_dir).expanduser()
+    try:
+        bin_size, cbin_size = _convert(provider_uri, _output_dir, compress, chunk_size)
+        logger.info(f"bin: {bin_size / 1024 ** 2:.2f}MB, cbin({compress}): {cbin_size / 1024 ** 2:.2f}MB")
+
+        qlib.init(provider_uri=str(provider_uri), kernels=1)
+        instruments = [inst.lower() for inst in D.list_instruments(D.instruments(market), as_list=True)]
+        _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq="day")
+        n_reads = len(instruments) * len(RAW_FIELDS)
+
+        _bench_storage(FileFeatureStorage, str(provider_uri), instruments, start_index, end_index, 1)
+        cost = _bench_storage(FileFeatureStorage, str(provider_uri), instruments, start_index, end_index, repeat)
+        logger.info(f"FileFeatureStorage: {cost / n_reads * 1e6:.1f}us per read")
+
+        costs = []
+        for _ in range(repeat):
+            CompressedFileFeatureStorage.clear_chunk_cache()
+            costs.append(
+                _bench_storage(CompressedFileFeatureStorage, str(_output_dir), instruments, start_index, end_index, 1)
+            )
+        logger.info(f"CompressedFileFeatureStorage(cold chunk cache): {np.mean(costs) / n_reads * 1e6:.1f}us per read")
+        cost = _bench_storage(
+            CompressedFileFeatureStorage, str(_output_dir), instruments, start_index, end_index, repeat
+        )
+        logger.info(f"CompressedFileFeatureStorage(warm chunk cache): {cost / n_reads * 1e6:.1f}us per read")
+    finally:
+        if output_dir is None:
+            shutil.rmtree(_output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the cross sectional processors (`CSZScoreNorm`, robust `CSZScoreNorm`, `CSRankNorm` and `CSZFillna`) with
+their original pandas `groupby("datetime")` implementations on random data of the shape of Alpha158 and Alpha360, and
+check that their results are the same.
+
+Example:
+
+    python bench_cs_processors.py --n_instruments 800 --n_days 1000
+"""
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from qlib.data.dataset.processor import CSRankNorm, CSZFillna, CSZScoreNorm, get_group_columns
+from qlib.utils.data import robust_zscore, zscore
+
+HANDLERS = {"Alpha158": 158, "Alpha360": 360}
+
+
+def _timeit(func, repeat):
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        res = func()
+        costs.append(time.perf_counter() - _start)
+    return float(np.min(costs)), res
+
+
+def _groupby_apply(df, group, func):
+    cols = get_group_columns(df, group)
+    df[cols] = func(df[cols].groupby("datetime", group_keys=False))
+    return df
+
+
+def _rank(grouped):
+    t = grouped.rank(pct=True)
+    t -= 0.5
+    t *= 3.46
+    return t
+
+
+PROCESSORS = {
+    "CSZScoreNorm": (lambda group: CSZScoreNorm(group), lambda g: g.apply(zscore)),
+    "CSZScoreNorm(robust)": (lambda group: CSZScoreNorm(group, method="robust"), lambda g: g.apply(robust_zscore)),
+    "CSRankNorm": (CSRankNorm, _rank),
+    "CSZFillna": (CSZFillna, lambda g: g.apply(lambda x: x.fillna(x.mean()))),
+}
+
+
+def main(n_instruments: int = 300, n_days: int = 500, nan_ratio: float = 0.05, repeat: int = 1, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [pd.bdate_range("2010-01-01", periods=n_days), [f"SH{600000 + i}" for i in range(n_instruments)]],
+        names=["datetime", "instrument"],
+    )
+    for handler, n_features in HANDLERS.items():
+        values = rng.normal(size=(len(index), n_features)).astype(np.float32)
+        values[rng.random(values.shape) < nan_ratio] = np.nan
+        columns = pd.MultiIndex.from_tuples([("feature", f"F{i}") for i in range(n_features)] + [("label", "LABEL0")])
+        df = pd.DataFrame(np.hstack([values, values[:, :1]]), index=index, columns=columns)
+        logger.info(f"{handler}: {n_days} days x {n_instruments} instruments x {n_features} features")
+        # the features, and the label (e.g. CSRankNorm/CSZScoreNorm in the learn processors of Alpha158)
+        for group in ["feature", "label"]:
+            for name, (processor, func) in PROCESSORS.items():
+                pandas_cost, expected = _timeit(lambda: _groupby_apply(df.copy(), group, func), repeat)
+                numpy_cost, res = _timeit(lambda: processor(group)(df.copy()), repeat)
+                pd.testing.assert_frame_equal(res, expected, rtol=1e-5, atol=1e-5)
+                logger.info(
+                    f"{handler} {name}({group}): pandas {pandas_cost:.2f}s, numpy {numpy_cost:.2f}s "
+                    f"({pandas_cost / numpy_cost:.1f}x)"
+                )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
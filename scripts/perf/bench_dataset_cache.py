@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Measure the read throughput of the columnar ``DiskDatasetCache`` (and of the legacy HDF5 cache if pytables is
+installed) for the whole cache, time slices and subsets of the fields.
+
+Example:
+
+    python bench_dataset_cache.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300
+"""
+import importlib.util
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Union
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import DiskDatasetCache, H
+from qlib.utils import remove_fields_space
+
+FIELDS = [
+    "$open",
+    "$close",
+    "$high",
+    "$low",
+    "$volume",
+    "$vwap",
+    "Mean($close, 5)",
+    "Std($close, 20)",
+    "$close/Ref($close, 1) - 1",
+    "Corr($close, Log($volume + 1), 10)",
+    "Max($high, 30)",
+    "Min($low, 30)",
+]
+
+
+def _write_legacy_cache(cache_path: Path, df: pd.DataFrame):
+    """write the cache in the format before the columnar one (HDF5 + IndexManager)"""
+    df = df.swaplevel("datetime", "instrument").sort_index()
+    df.to_hdf(cache_path, key=DiskDatasetCache.IndexManager.KEY, mode="w", format="table")
+    im = DiskDatasetCache.IndexManager(cache_path)
+    im.update(im.build_index_from_data(df))
+
+
+def _bench(read, repeat: int) -> tuple:
+    """return the average seconds and the shape of the result"""
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        df = read()
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs)), df.shape
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = None,
+    end_time: Union[str, None] = None,
+    repeat: int = 5,
+):
+    qlib.init(provider_uri=provider_uri, dataset_cache="DiskDatasetCache", expression_cache=None, kernels=1)
+    instruments = D.instruments(market)
+    _start = time.perf_counter()
+    D.features(instruments, FIELDS, start_time, end_time, disk_cache=2)
+    logger.info(f"generate the cache of {len(FIELDS)} fields of {market}: {time.perf_counter() - _start:.2f}s")
+
+    cache_dir = Path(C.dpm.get_data_uri("day")).joinpath(C.dataset_cache_dir_name)
+    cache_path = max(cache_dir.glob("*.meta"), key=lambda p: p.stat().st_mtime).with_suffix("")
+    columns = remove_fields_space(FIELDS)
+    full = DiskDatasetCache.read_data_from_cache(cache_path, None, None, FIELDS)
+    calendar = full.index.get_level_values("datetime").unique().sort_values()
+    logger.info(f"{cache_dir}: {full.shape[0]} rows, data {cache_path.stat().st_size / 1024 ** 2:.1f}MB")
+
+    cases = {
+        "all": (None, None, columns),
+        "last 10%": (calendar[int(len(calendar) * 0.9)], None, columns),
+        "one day": (calendar[-1], calendar[-1], columns),
+        "2 fields": (None, None, columns[:2]),
+    }
+    readers = {"columnar": lambda s, e, c: DiskDatasetCache._read_columnar_cache(cache_path, s, e, c)}
+    tmp_dir = None
+    if importlib.util.find_spec("tables") is not None:
+        tmp_dir = Path(tempfile.mkdtemp())
+        legacy_path = tmp_dir.joinpath(cache_path.name)
+        _write_legacy_cache(legacy_path, DiskDatasetCache._read_columnar_cache(cache_path))
+        readers["hdf5"] = lambda s, e, c: DiskDatasetCache._read_legacy_cache(legacy_path, s, e).loc[:, c]
+    else:
+        logger.warning("pytables is not installed, the legacy HDF5 cache is skipped")
+
+    try:
+        for name, (s, e, c) in cases.items():
+            for reader, read in readers.items():
+                read(s, e, c)  # warm up the page cache
+                cost, shape = _bench(lambda: read(s, e, c), repeat)
+                logger.info(
+                    f"{name:>8} {reader:>8}: {cost:.4f}s, {shape[0] / cost:,.0f} rows/s, "
+                    f"{shape[0] * shape[1] * 4 / cost / 1024 ** 2:.1f}MB/s"
+                )
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        H.clear()
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
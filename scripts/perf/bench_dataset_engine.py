@@ -0,0 +1,70 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the "thread" and "process" engines of ``DatasetProvider.dataset_processor`` (``C.dataset_engine``).
+
+Example:
+
+    python bench_dataset_engine.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300 --kernels 8
+"""
+import time
+from typing import Union
+
+import fire
+import numpy as np
+from loguru import logger
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import DatasetProvider
+
+FIELD_SETS = {
+    "raw": ["$open", "$close", "$high", "$low", "$volume", "$vwap"],
+    "simple": ["$close/Ref($close, 1) - 1", "Mean($close, 5)/$close", "Std($close, 20)", "$volume/Mean($volume, 5)"],
+    "heavy": [
+        f"{op}($close, {w})" for op in ["Mean", "Std", "Slope", "Rsquare", "Max", "Min", "Rank"] for w in [5, 20, 60]
+    ]
+    + [f"Quantile($close, {w}, 0.8)" for w in [5, 20, 60]]
+    + [f"Corr($close, Log($volume+1), {w})" for w in [5, 20, 60]],
+}
+
+
+def _bench(fields: list, market: str, start_time, end_time, engine: str, repeat: int) -> float:
+    C.dataset_engine = engine
+    instruments = D.instruments(market)
+    costs = []
+    for _ in range(repeat):
+        H.clear()
+        _start = time.perf_counter()
+        D.features(instruments, fields, start_time, end_time)
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs))
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = "2018-01-01",
+    end_time: Union[str, None] = "2018-12-31",
+    kernels: int = 4,
+    repeat: int = 3,
+):
+    qlib.init(provider_uri=provider_uri, kernels=kernels, expression_cache=None, dataset_cache=None)
+    inst_num = len(D.list_instruments(D.instruments(market), start_time, end_time, as_list=True))
+    logger.info(f"{inst_num} instruments, kernels={kernels}")
+    for name, fields in FIELD_SETS.items():
+        costs = {
+            engine: _bench(fields, market, start_time, end_time, engine, repeat) for engine in ["thread", "process"]
+        }
+        C.dataset_engine = "auto"
+        auto = DatasetProvider.get_dataset_engine(fields, inst_num)
+        logger.info(
+            f"{name}({len(fields)} fields): thread {costs['thread']:.3f}s, process {costs['process']:.3f}s; "
+            f"auto chooses {auto}"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
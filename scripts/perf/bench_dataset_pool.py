@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Measure the task batching (``C.dataset_chunk_size``) and the persistent worker pool (``C.dataset_pool_lifetime``)
+of ``DatasetProvider.dataset_processor`` with many small ``D.features`` calls, e.g. the rolling retraining.
+
+Example:
+
+    python bench_dataset_pool.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300 --kernels 8
+"""
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.utils.paral import ParallelPool
+
+FIELDS = ["$close/Ref($close, 1) - 1", "Mean($close, 5)/$close", "Std($close, 20)", "$volume/Mean($volume, 5)"]
+
+
+def _bench(market: str, windows: list, chunk_size, lifetime) -> float:
+    C.dataset_chunk_size = chunk_size
+    C.dataset_pool_lifetime = lifetime
+    instruments = D.instruments(market)
+    _start = time.perf_counter()
+    for start_time, end_time in windows:
+        H.clear()
+        D.features(instruments, FIELDS, start_time, end_time)
+    cost = time.perf_counter() - _start
+    ParallelPool.shutdown()
+    return cost
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: str = "2018-01-01",
+    n_windows: int = 10,
+    window_months: int = 12,
+    kernels: int = 4,
+    engine: str = "process",
+):
+    qlib.init(provider_uri=provider_uri, kernels=kernels, expression_cache=None, dataset_cache=None)
+    C.dataset_engine = engine
+    starts = pd.date_range(start_time, periods=n_windows, freq="MS")
+    windows = [(s, s + pd.DateOffset(months=window_months) - pd.Timedelta(days=1)) for s in starts]
+    logger.info(f"{n_windows} calls of {window_months}-month windows, kernels={kernels}, engine={engine}")
+    for chunk_size, lifetime in [(1, 0), ("auto", 0), (1, None), ("auto", None)]:
+        cost = _bench(market, windows, chunk_size, lifetime)
+        logger.info(
+            f"dataset_chunk_size={chunk_size}, dataset_pool_lifetime={lifetime}: "
+            f"{cost:.3f}s, {cost / n_windows:.3f}s per call"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
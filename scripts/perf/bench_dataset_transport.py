@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the peak memory and the time of the result transports of ``DatasetProvider.dataset_processor``
+(``C.dataset_result_transport``). Each transport is measured in a fresh process.
+
+Example:
+
+    python bench_dataset_transport.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300 --kernels 8
+"""
+import multiprocessing
+import resource
+import time
+from typing import Union
+
+import fire
+from loguru import logger
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+
+FIELDS = (
+    [f"${f}" for f in ["open", "close", "high", "low", "volume", "vwap"]]
+    + [f"Ref($close, {d})/$close" for d in range(1, 21)]
+    + [f"Mean($close, {d})/$close" for d in [5, 10, 20, 30, 60]]
+    + [f"Std($close, {d})/$close" for d in [5, 10, 20, 30, 60]]
+    + [f"Max($high, {d})/$close" for d in [5, 10, 20, 30, 60]]
+    + [f"Min($low, {d})/$close" for d in [5, 10, 20, 30, 60]]
+    + [f"Mean($volume, {d})/($volume+1e-12)" for d in [5, 10, 20, 30, 60]]
+)
+
+
+def _run(provider_uri, market, start_time, end_time, kernels, transport, queue):
+    qlib.init(provider_uri=provider_uri, kernels=kernels, expression_cache=None, dataset_cache=None)
+    C.dataset_result_transport = transport
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    _start = time.perf_counter()
+    df = D.features(D.instruments(market), FIELDS, start_time, end_time)
+    cost = time.perf_counter() - _start
+    # ru_maxrss is in KB on Linux
+    queue.put(
+        (
+            df.shape,
+            df.memory_usage(index=False).sum() / 1024**2,
+            cost,
+            base_rss,
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        )
+    )
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = None,
+    end_time: Union[str, None] = None,
+    kernels: int = 4,
+):
+    ctx = multiprocessing.get_context("spawn")
+    for transport in ["pickle", "shm"]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(provider_uri, market, start_time, end_time, kernels, transport, queue))
+        proc.start()
+        shape, size, cost, base_rss, rss, children_rss = queue.get()
+        proc.join()
+        logger.info(
+            f"{transport}: result {shape} {size:.1f}MB, {cost:.3f}s, "
+            f"peak RSS main process {rss:.1f}MB (+{rss - base_rss:.1f}MB by D.features), worker {children_rss:.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,81 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the latency of fetching small slices of dates by `DataHandlerLP.fetch` with the default DataFrame storage and
+with `DatetimeOffsetStorage` (the `DatetimeOffsetFormat` processor) on random data of the shape of Alpha158, and check
+that the fetched data are the same.
+
+The fetches are the ones of the models sampling the data by date (e.g. GATs, HIST and `MTSDatasetH`):
+
+- a single date;
+- a single date of some instruments;
+- a range of dates (`--n_range_days`).
+
+Example:
+
+    python bench_datetime_offset_storage.py --n_instruments 800 --n_days 1000 --n_fetches 500
+"""
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.processor import DatetimeOffsetFormat
+
+
+def _timeit(handler, selectors, col_set):
+    res = []
+    _start = time.perf_counter()
+    for selector in selectors:
+        res.append(handler.fetch(selector, level=None, col_set=col_set, data_key=DataHandlerLP.DK_I))
+    return (time.perf_counter() - _start) / len(selectors), res
+
+
+def main(
+    n_instruments: int = 300,
+    n_days: int = 1000,
+    n_fetches: int = 200,
+    n_range_days: int = 20,
+    n_selected: int = 50,
+    seed: int = 0,
+):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2010-01-01", periods=n_days)
+    instruments = np.array([f"SH{600000 + i}" for i in range(n_instruments)])
+    index = pd.MultiIndex.from_product([dates, instruments], names=["datetime", "instrument"])
+    columns = pd.MultiIndex.from_tuples([("feature", f"F{i}") for i in range(158)] + [("label", "LABEL0")])
+    df = pd.DataFrame(rng.normal(size=(len(index), 159)).astype(np.float32), index=index, columns=columns)
+    logger.info(f"{n_days} days x {n_instruments} instruments x 158 features: {df.values.nbytes / 1024 ** 2:.0f}MB")
+
+    handlers = {}
+    for name, infer_processors in [("DataFrame", []), ("DatetimeOffsetStorage", [DatetimeOffsetFormat()])]:
+        _start = time.perf_counter()
+        handlers[name] = DataHandlerLP(data_loader=StaticDataLoader(df), infer_processors=infer_processors)
+        logger.info(f"{name}: initialized in {time.perf_counter() - _start:.2f}s")
+
+    days = rng.choice(dates[: n_days - n_range_days], size=n_fetches)
+    cases = {
+        "single date": [(day, slice(None)) for day in days],
+        f"single date x {n_selected} instruments": [
+            (day, list(rng.choice(instruments, size=n_selected, replace=False))) for day in days
+        ],
+        f"{n_range_days} dates": [(slice(day, day + pd.offsets.BDay(n_range_days - 1)), slice(None)) for day in days],
+    }
+    for case, selectors in cases.items():
+        for col_set in [DataHandlerLP.CS_ALL, ["feature", "label"]]:
+            expected_cost, expected = _timeit(handlers["DataFrame"], selectors, col_set)
+            cost, res = _timeit(handlers["DatetimeOffsetStorage"], selectors, col_set)
+            for res_df, expected_df in zip(res, expected):
+                pd.testing.assert_frame_equal(res_df, expected_df.sort_index(), check_index_type=False)
+            logger.info(
+                f"{case} (col_set={col_set}): DataFrame {expected_cost * 1e6:.0f}us, "
+                f"DatetimeOffsetStorage {cost * 1e6:.0f}us ({expected_cost / cost:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
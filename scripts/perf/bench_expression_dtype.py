@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare ``C.expression_dtype`` None (the dtypes promoted by numpy/pandas, mostly float64) and "float32" on the
+Alpha158 features: the time of ``D.features``, the peak memory of the intermediate results and the numerical drift
+of the features.
+
+The drift of a feature is measured by the max absolute difference divided by the standard deviation of the feature
+and by the correlation between the two results.
+
+Example:
+
+    python bench_expression_dtype.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300
+"""
+import time
+import tracemalloc
+from typing import Union
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import qlib
+from qlib.config import C
+from qlib.contrib.data.loader import Alpha158DL
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import ExpressionD
+
+
+def _features(fields, market, start_time, end_time, dtype):
+    C.expression_dtype = dtype
+    H.clear()
+    _start = time.perf_counter()
+    df = D.features(D.instruments(market), fields, start_time, end_time)
+    return df, time.perf_counter() - _start
+
+
+def _peak_memory(fields, market, start_time, end_time, dtype, n_instruments: int):
+    """the mean peak memory of evaluating the fields of an instrument, i.e. the memory of the intermediate results"""
+    C.expression_dtype = dtype
+    instruments = D.list_instruments(D.instruments(market), start_time, end_time, as_list=True)[:n_instruments]
+    peaks = []
+    for inst in instruments:
+        H.clear()
+        tracemalloc.start()
+        ExpressionD.expressions(inst, fields, start_time, end_time, "day")
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return float(np.mean(peaks))
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = "2018-01-01",
+    end_time: Union[str, None] = "2018-12-31",
+    top: int = 10,
+    n_instruments: int = 20,
+):
+    qlib.init(provider_uri=provider_uri, kernels=1, expression_cache=None, dataset_cache=None)
+    fields, names = Alpha158DL.get_feature_config()
+    logger.info(f"market={market}, {len(fields)} Alpha158 fields")
+
+    res = {}
+    for dtype in [None, "float32"]:
+        res[dtype], cost = _features(fields, market, start_time, end_time, dtype)
+        peak = _peak_memory(fields, market, start_time, end_time, dtype, n_instruments)
+        logger.info(
+            f"expression_dtype={dtype}: D.features {cost:.2f}s, "
+            f"peak memory of the intermediates of an instrument {peak / 1024 ** 2:.2f}MB"
+        )
+
+    base, df = res[None].values.astype(np.float64), res["float32"].values.astype(np.float64)
+    # the NaN of the results should be the same
+    nan_diff = (np.isnan(base) != np.isnan(df)).sum(axis=0)
+    std = np.nanstd(base, axis=0)
+    drift = np.nanmax(np.abs(base - df), axis=0) / np.where(std > 0, std, 1)
+    corr = pd.DataFrame(base).corrwith(pd.DataFrame(df)).values
+    report = pd.DataFrame({"drift/std": drift, "corr": corr, "nan_diff": nan_diff}, index=names)
+    logger.info(
+        f"drift/std: median {np.nanmedian(drift):.2e}, max {np.nanmax(drift):.2e}; min corr {np.nanmin(corr):.8f}; "
+        f"fields with different NaN: {(nan_diff > 0).sum()}"
+    )
+    logger.info(f"the most drifted fields:\n{report.sort_values('drift/std', ascending=False).head(top)}")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,56 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the parsing of the fields of Alpha158 (and Alpha360) by `eval(parse_field(field))` with `parse_expression`
+(uncached and cached), and check that the expressions are the same.
+
+Example:
+
+    python bench_expression_parser.py --repeat 5
+"""
+import time
+
+import fire
+import numpy as np
+from loguru import logger
+
+import qlib
+from qlib.contrib.data.loader import Alpha158DL, Alpha360DL
+from qlib.data.ops import Operators  # pylint: disable=W0611  # noqa: F401
+from qlib.data.parser import clear_expression_cache, parse_expression
+from qlib.utils import parse_field
+
+
+def _timeit(func, repeat):
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        res = func()
+        costs.append(time.perf_counter() - _start)
+    return float(np.min(costs)), res
+
+
+def main(repeat: int = 5):
+    qlib.init(kernels=1)
+    fields = Alpha158DL.get_feature_config()[0] + Alpha360DL.get_feature_config()[0]
+    logger.info(f"{len(fields)} fields")
+
+    eval_cost, expected = _timeit(lambda: [eval(parse_field(f)) for f in fields], repeat)  # pylint: disable=W0123
+
+    def _uncached():
+        clear_expression_cache()
+        return [parse_expression(f) for f in fields]
+
+    uncached_cost, res = _timeit(_uncached, repeat)
+    cached_cost, _ = _timeit(lambda: [parse_expression(f) for f in fields], repeat)
+    for r, e in zip(res, expected):
+        assert r.cache_key == e.cache_key, (r, e)
+    n_nodes = len({id(e) for e in res})
+    logger.info(
+        f"eval {eval_cost * 1e3:.2f}ms, ast {uncached_cost * 1e3:.2f}ms ({eval_cost / uncached_cost:.1f}x), "
+        f"cached {cached_cost * 1e3:.3f}ms ({eval_cost / cached_cost:.0f}x); {n_nodes} distinct expressions"
+    )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the read path of ``FileFeatureStorage`` and ``MmapFileFeatureStorage``.
+
+Example:
+
+    python bench_feature_storage.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300
+"""
+import time
+from typing import Union
+
+import fire
+import numpy as np
+from loguru import logger
+
+import qlib
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import Cal
+from qlib.data.storage.file_storage import FileFeatureStorage, MmapFileFeatureStorage
+
+RAW_FIELDS = ["open", "close", "high", "low", "volume", "vwap"]
+
+
+def _backend_config(storage_cls: type) -> dict:
+    return {
+        "class": "LocalFeatureProvider",
+        "module_path": "qlib.data.data",
+        "kwargs": {"backend": {"class": storage_cls.__name__, "module_path": "qlib.data.storage.file_storage"}},
+    }
+
+
+def _bench_storage(storage_cls: type, instruments: list, start_index: int, end_index: int, repeat: int) -> float:
+    """return the average seconds of reading every (instrument, field) once"""
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        for inst in instruments:
+            for field in RAW_FIELDS:
+                storage_cls(instrument=inst.lower(), field=field, freq="day")[start_index : end_index + 1]
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs))
+
+
+def _bench_features(storage_cls: type, provider_uri: str, market: str, start_time, end_time, repeat: int) -> float:
+    qlib.init(provider_uri=provider_uri, feature_provider=_backend_config(storage_cls), kernels=1)
+    fields = [f"${f}" for f in RAW_FIELDS] + ["Mean($close, 5)", "Std($close, 20)", "$close/Ref($close, 1)"]
+    instruments = D.instruments(market)
+    costs = []
+    for _ in range(repeat):
+        H.clear()
+        _start = time.perf_counter()
+        D.features(instruments, fields, start_time, end_time)
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs))
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = "2018-01-01",
+    end_time: Union[str, None] = "2018-12-31",
+    repeat: int = 5,
+):
+    qlib.init(provider_uri=provider_uri, kernels=1)
+    instruments = D.list_instruments(D.instruments(market), as_list=True)
+    _, _, start_index, end_index = Cal.locate_index(start_time, end_time, freq="day")
+    logger.info(
+        f"{len(instruments)} instruments * {len(RAW_FIELDS)} fields, calendar index [{start_index}, {end_index}]"
+    )
+
+    # warm up the page cache, so that both readers are measured on hot files
+    _bench_storage(FileFeatureStorage, instruments, start_index, end_index, 1)
+    MmapFileFeatureStorage.clear_mmap_cache()
+    _bench_storage(MmapFileFeatureStorage, instruments, start_index, end_index, 1)
+    for storage_cls in [FileFeatureStorage, MmapFileFeatureStorage]:
+        cost = _bench_storage(storage_cls, instruments, start_index, end_index, repeat)
+        logger.info(
+            f"{storage_cls.__name__}: {cost:.4f}s per pass, "
+            f"{cost / (len(instruments) * len(RAW_FIELDS)) * 1e6:.1f}us per read"
+        )
+    for storage_cls in [FileFeatureStorage, MmapFileFeatureStorage]:
+        cost = _bench_features(storage_cls, provider_uri, market, start_time, end_time, repeat)
+        logger.info(f"D.features with {storage_cls.__name__}: {cost:.4f}s")
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,113 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare `DataHandlerLP(fuse_processors=True)` with the processors applied one by one: the time and the peak memory
+(traced by tracemalloc) of `process_data` on random data of the shape of Alpha158, and check that the processed data
+are the same.
+
+NOTE: `ProcessInf` is very slow when it is applied alone (`groupby("datetime").apply` on each column), so its chain
+is not run by default.
+
+Example:
+
+    python bench_fused_processors.py --n_instruments 800 --n_days 1000
+    python bench_fused_processors.py --n_instruments 100 --n_days 200 --chains "['ProcessInf/ZScoreNorm/Fillna']"
+"""
+import copy
+import time
+import tracemalloc
+from typing import List
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.processor import (
+    CSRankNorm,
+    CSZScoreNorm,
+    DropnaLabel,
+    Fillna,
+    ProcessInf,
+    RobustZScoreNorm,
+    ZScoreNorm,
+)
+
+FIT = dict(fit_start_time="2010-01-01", fit_end_time="2011-12-31")
+
+CHAINS = {
+    # the default processors of Alpha158
+    "Alpha158 default": ([], [DropnaLabel(), CSZScoreNorm(fields_group="label")]),
+    # the processors of the benchmarks (e.g. LightGBM/MLP on Alpha158)
+    "benchmarks": (
+        [RobustZScoreNorm(fields_group="feature", clip_outlier=True, **FIT), Fillna(fields_group="feature")],
+        [DropnaLabel(), CSRankNorm(fields_group="label")],
+    ),
+    "ProcessInf/ZScoreNorm/Fillna": (
+        [ProcessInf(), ZScoreNorm(fields_group="feature", **FIT), Fillna(fields_group="feature")],
+        [DropnaLabel(), CSRankNorm(fields_group="label")],
+    ),
+}
+
+
+def _process(handler, repeat):
+    """the time and the peak memory of `process_data`"""
+    costs, peaks = [], []
+    for _ in range(repeat):
+        handler._infer = handler._learn = None
+        tracemalloc.start()
+        _start = time.perf_counter()
+        handler.process_data(with_fit=True)
+        costs.append(time.perf_counter() - _start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return float(np.min(costs)), float(np.min(peaks))
+
+
+def main(
+    n_instruments: int = 300,
+    n_days: int = 1000,
+    chains: List[str] = ("Alpha158 default", "benchmarks"),
+    nan_ratio: float = 0.05,
+    repeat: int = 1,
+    seed: int = 0,
+):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [pd.bdate_range("2010-01-01", periods=n_days), [f"SH{600000 + i}" for i in range(n_instruments)]],
+        names=["datetime", "instrument"],
+    )
+    values = rng.normal(size=(len(index), 159)).astype(np.float32)
+    values[rng.random(values.shape) < nan_ratio] = np.nan
+    values[rng.random(values.shape) < 1e-4] = np.inf
+    values[:, -1][np.isinf(values[:, -1])] = np.nan
+    columns = pd.MultiIndex.from_tuples([("feature", f"F{i}") for i in range(158)] + [("label", "LABEL0")])
+    # the <instrument, datetime> order of the handlers
+    df = pd.DataFrame(values, index=index, columns=columns).swaplevel().sort_index()
+    logger.info(f"{n_days} days x {n_instruments} instruments x 158 features: {df.values.nbytes / 1024 ** 2:.0f}MB")
+
+    for name in chains:
+        infer_processors, learn_processors = CHAINS[name]
+        results = []
+        for fuse in [False, True]:
+            handler = DataHandlerLP(
+                data_loader=StaticDataLoader(df),
+                infer_processors=copy.deepcopy(infer_processors),
+                learn_processors=copy.deepcopy(learn_processors),
+                fuse_processors=fuse,
+            )
+            results.append((handler, *_process(handler, repeat)))
+        (expected, cost, peak), (res, fused_cost, fused_peak) = results
+        pd.testing.assert_frame_equal(res._infer, expected._infer, rtol=1e-5, atol=1e-5)
+        pd.testing.assert_frame_equal(res._learn, expected._learn, rtol=1e-5, atol=1e-5)
+        logger.info(f"{name}: {res.get_process_plan()}")
+        logger.info(
+            f"{name}: one by one {cost:.2f}s / {peak / 1024 ** 2:.0f}MB, "
+            f"fused {fused_cost:.2f}s / {fused_peak / 1024 ** 2:.0f}MB ({cost / fused_cost:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the per-instrument engine and the panel engine of ``D.features`` (the ``engine`` argument), and check
+that their results are the same.
+
+Example:
+
+    python bench_panel_engine.py --provider_uri ~/.qlib/qlib_data/cn_data --market csi300 --kernels 8
+"""
+import time
+from typing import Union
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import qlib
+from qlib.data import D
+from qlib.data.cache import H
+
+FIELD_SETS = {
+    "simple": (
+        [f"Ref($close, {d})/$close" for d in range(1, 21)]
+        + [f"Mean($close, {d})/$close" for d in [5, 10, 20, 30, 60]]
+        + [f"Std($close, {d})/$close" for d in [5, 10, 20, 30, 60]]
+        + [f"Max($high, {d})/$close" for d in [5, 10, 20, 30, 60]]
+        + [f"Min($low, {d})/$close" for d in [5, 10, 20, 30, 60]]
+    ),
+    "pair": [f"Corr($close, Log($volume+1), {d})" for d in [5, 10, 20, 30, 60]]
+    + [f"Cov($close/Ref($close,1), Log($volume/Ref($volume, 1)+1), {d})" for d in [5, 10, 20, 30, 60]],
+    "by_column": [f"{op}($close, {d})" for op in ["Slope", "Rsquare", "IdxMax", "WMA"] for d in [5, 20, 60]],
+}
+
+
+def _bench(fields: list, market: str, start_time, end_time, engine: str, repeat: int):
+    instruments = D.instruments(market)
+    costs = []
+    for _ in range(repeat):
+        H.clear()
+        _start = time.perf_counter()
+        df = D.features(instruments, fields, start_time, end_time, engine=engine)
+        costs.append(time.perf_counter() - _start)
+    return float(np.mean(costs)), df
+
+
+def main(
+    provider_uri: str = "~/.qlib/qlib_data/cn_data",
+    market: str = "csi300",
+    start_time: Union[str, None] = "2018-01-01",
+    end_time: Union[str, None] = "2018-12-31",
+    kernels: int = 4,
+    repeat: int = 3,
+):
+    qlib.init(provider_uri=provider_uri, kernels=kernels, expression_cache=None, dataset_cache=None)
+    logger.info(f"market={market}, kernels={kernels}")
+    for name, fields in FIELD_SETS.items():
+        inst_cost, inst_df = _bench(fields, market, start_time, end_time, "instrument", repeat)
+        panel_cost, panel_df = _bench(fields, market, start_time, end_time, "panel", repeat)
+        pd.testing.assert_frame_equal(inst_df, panel_df, check_exact=False, rtol=1e-5)
+        logger.info(
+            f"{name}({len(fields)} fields, {inst_df.shape}): instrument {inst_cost:.3f}s, panel {panel_cost:.3f}s "
+            f"({inst_cost / panel_cost:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
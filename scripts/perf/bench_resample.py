@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the vectorized resampling (`resam_series` used by `TResample`, and `resam_ts_data`) with pandas on random
+1min data of many instruments, and check that their results are the same.
+
+Example:
+
+    python bench_resample.py --n_instruments 1000 --n_days 20 --freqs "['30min', '1D']"
+"""
+import time
+from typing import List
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from qlib.utils.resam import resam_series, resam_ts_data, ts_data_last
+
+METHODS = ["last", "first", "mean", "sum", "max", "min", "count"]
+
+
+def _timeit(func, repeat):
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        res = func()
+        costs.append(time.perf_counter() - _start)
+    return float(np.min(costs)), res
+
+
+def _minute_calendar(n_days: int) -> pd.DatetimeIndex:
+    """the 1min calendar of the cn market (240 bars each day)"""
+    bars = np.concatenate([np.arange(9 * 60 + 30, 11 * 60 + 30), np.arange(13 * 60, 15 * 60)])
+    days = pd.bdate_range("2020-01-02", periods=n_days)
+    return pd.DatetimeIndex((days.values[:, None] + (bars * 60 * 10**9).astype("timedelta64[ns]")).ravel())
+
+
+def main(
+    n_instruments: int = 300,
+    n_days: int = 20,
+    freqs: List[str] = ("5min", "30min", "1D"),
+    repeat: int = 3,
+    seed: int = 0,
+):
+    rng = np.random.default_rng(seed)
+    calendar = _minute_calendar(n_days)
+    data = rng.normal(10, 1, (n_instruments, len(calendar))).astype(np.float32)
+    data[rng.random(data.shape) < 0.05] = np.nan
+    series_l = [pd.Series(values, index=calendar) for values in data]
+    logger.info(f"{n_instruments} instruments x {len(calendar)} 1min bars")
+
+    # TResample: each instrument is resampled on the bucket map shared by all the instruments
+    for freq in freqs:
+        for method in METHODS:
+
+            def _pandas():
+                if method == "sum":
+                    return [s.resample(freq).sum(min_count=1) for s in series_l]
+                return [getattr(s.resample(freq), method)() for s in series_l]
+
+            pandas_cost, expected = _timeit(_pandas, repeat)
+            numpy_cost, res = _timeit(lambda: [resam_series(s, freq, method) for s in series_l], repeat)
+            for r, e in zip(res, expected):
+                pd.testing.assert_series_equal(r, e, rtol=1e-5, atol=1e-5)
+            logger.info(
+                f"TResample(1min -> {freq}, {method}): pandas {pandas_cost:.3f}s, numpy {numpy_cost:.3f}s "
+                f"({pandas_cost / numpy_cost:.1f}x)"
+            )
+
+    # resam_ts_data: the values of all the instruments in a day of the <instrument, datetime> frame
+    df = pd.concat(series_l, keys=[f"SH{600000 + i}" for i in range(n_instruments)], names=["instrument", "datetime"])
+    df = df.to_frame("$close").assign(**{"$volume": df.values * 100})
+    start_time, end_time = calendar[len(calendar) // 2].normalize(), calendar[len(calendar) // 2 + 239]
+    for method in METHODS + [ts_data_last]:
+        name = method if isinstance(method, str) else "ts_data_last"
+        if callable(method):
+            reference = lambda f: f.groupby(level="instrument", group_keys=False).apply(
+                lambda d: d.apply(lambda c: c.ffill().iloc[-1])
+            )
+        else:
+            reference = lambda f: getattr(f.groupby(level="instrument", group_keys=False), method)()
+        pandas_cost, expected = _timeit(
+            lambda: reference(df.loc(axis=0)[(slice(None), slice(start_time, end_time))]), repeat
+        )
+        numpy_cost, res = _timeit(lambda: resam_ts_data(df, start_time, end_time, method=method), repeat)
+        pd.testing.assert_frame_equal(res, expected, rtol=1e-5, atol=1e-5)
+        logger.info(
+            f"resam_ts_data(1 day, {name}): pandas {pandas_cost:.3f}s, numpy {numpy_cost:.3f}s "
+            f"({pandas_cost / numpy_cost:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""
+Compare the Cython kernels of the rolling operators with their original pandas implementations on random series,
+and check that their results are the same.
+
+Example:
+
+    python bench_rolling_kernels.py --length 5000 --windows "[0, 5, 20, 60]"
+"""
+import time
+from typing import List
+
+import fire
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from qlib.data.base import Feature
+from qlib.data import ops
+
+
+def _weighted_mean(x):
+    w = np.arange(len(x)) + 1
+    w = w / w.sum()
+    return np.nanmean(w * x)
+
+
+def _exp_weighted_mean(x):
+    a = 1 - 2 / (1 + len(x))
+    w = a ** np.arange(len(x))[::-1]
+    w /= w.sum()
+    return np.nansum(w * x)
+
+
+def _mad(x):
+    x1 = x[~np.isnan(x)]
+    return np.mean(np.abs(x1 - x1.mean()))
+
+
+def _window(series, N):
+    return series.expanding(min_periods=1) if N == 0 else series.rolling(N, min_periods=1)
+
+
+# operator -> the original pandas implementation
+PANDAS_IMPL = {
+    "Std": lambda s, N: _window(s, N).std(),
+    "Var": lambda s, N: _window(s, N).var(),
+    "Skew": lambda s, N: _window(s, N).skew(),
+    "Kurt": lambda s, N: _window(s, N).kurt(),
+    "Max": lambda s, N: _window(s, N).max(),
+    "Min": lambda s, N: _window(s, N).min(),
+    "IdxMax": lambda s, N: _window(s, N).apply(lambda x: x.argmax() + 1, raw=True),
+    "IdxMin": lambda s, N: _window(s, N).apply(lambda x: x.argmin() + 1, raw=True),
+    "WMA": lambda s, N: _window(s, N).apply(_weighted_mean, raw=True),
+    "EMA": lambda s, N: (
+        s.expanding(min_periods=1).apply(_exp_weighted_mean, raw=True)
+        if N == 0
+        else s.ewm(span=N, min_periods=1).mean()
+    ),
+    "Rank": lambda s, N: _window(s, N).rank(pct=True),
+    "Quantile": lambda s, N: _window(s, N).quantile(0.8),
+    "Med": lambda s, N: _window(s, N).median(),
+    "Mad": lambda s, N: _window(s, N).apply(_mad, raw=True),
+}
+PAIR_PANDAS_IMPL = {
+    "Cov": lambda s, t, N: _window(s, N).cov(t),
+    "Corr": lambda s, t, N: _window(s, N)
+    .corr(t)
+    .where(~(np.isclose(_window(s, N).std(), 0, atol=2e-05) | np.isclose(_window(t, N).std(), 0, atol=2e-05))),
+}
+
+
+def _timeit(func, repeat):
+    costs = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        res = func()
+        costs.append(time.perf_counter() - _start)
+    return float(np.min(costs)), res
+
+
+def main(length: int = 5000, windows: List[int] = (0, 5, 20, 60), repeat: int = 3, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    left, right = rng.normal(10, 3, length), rng.normal(10, 3, length)
+    missing = rng.random(length) < 0.05
+    missing[1:] &= ~missing[:-1]
+    left[missing] = np.nan
+    left, right = pd.Series(left.astype(np.float32)), pd.Series(right.astype(np.float32))
+    logger.info(f"length={length}, windows={list(windows)}")
+    for N in windows:
+        for name, impl in {**PANDAS_IMPL, **PAIR_PANDAS_IMPL}.items():
+            if (name == "Skew" and 0 < N < 3) or (name == "Kurt" and 0 < N < 4):
+                continue
+            if name in PAIR_PANDAS_IMPL:
+                expr = getattr(ops, name)(Feature("close"), Feature("volume"), N)
+                pandas_cost, expected = _timeit(lambda: impl(left, right, N), repeat)
+                kernel_cost, res = _timeit(lambda: expr._calc(left, right), repeat)
+            else:
+                expr = (
+                    ops.Quantile(Feature("close"), N, 0.8)
+                    if name == "Quantile"
+                    else getattr(ops, name)(Feature("close"), N)
+                )
+                pandas_cost, expected = _timeit(lambda: impl(left, N), repeat)
+                kernel_cost, res = _timeit(lambda: expr._calc(left), repeat)
+            np.testing.assert_allclose(res.values, expected.values, rtol=1e-7, atol=1e-9)
+            logger.info(
+                f"{name}(N={N}): pandas {pandas_cost * 1e3:.2f}ms, kernel {kernel_cost * 1e3:.2f}ms "
+                f"({pandas_cost / kernel_cost:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -0,0 +1,139 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import copy
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.processor import (
+    CSRankNorm,
+    DropnaLabel,
+    Fillna,
+    MinMaxNorm,
+    Processor,
+    RobustZScoreNorm,
+    ZScoreNorm,
+)
+from qlib.data.dataset.storage import ChunkedHandlerStorage
+
+
+class Diff(Processor):
+    """a processor depending on the history"""
+
+    def __call__(self, df):
+        return df.groupby(level="instrument", group_keys=False).diff()
+
+
+class TestChunkedHandler(unittest.TestCase):
+    FIT = dict(fit_start_time="2020-01-01", fit_end_time="2020-03-31")
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        index = pd.MultiIndex.from_product(
+            [pd.bdate_range("2020-01-01", periods=120), [f"SH6000{i:02d}" for i in range(20)]],
+            names=["datetime", "instrument"],
+        )
+        values = np.round(rng.normal(size=(len(index), 5)), 2)
+        values[rng.random(values.shape) < 0.1] = np.nan
+        columns = pd.MultiIndex.from_tuples([("feature", f"f{i}") for i in range(4)] + [("label", "LABEL0")])
+        self.df = pd.DataFrame(values, index=index, columns=columns)
+
+    def _handlers(self, infer_processors, learn_processors, **kwargs):
+        handlers = []
+        for chunk_kwargs in [{}, kwargs]:
+            handlers.append(
+                DataHandlerLP(
+                    data_loader=StaticDataLoader(self.df),
+                    start_time="2020-01-01",
+                    end_time="2020-06-10",
+                    infer_processors=copy.deepcopy(infer_processors),
+                    learn_processors=copy.deepcopy(learn_processors),
+                    **chunk_kwargs,
+                )
+            )
+        return handlers
+
+    def test_chunked_handler(self):
+        for infer_processors, learn_processors in [
+            (
+                [ZScoreNorm(fields_group="feature", **self.FIT), Fillna(fields_group="feature")],
+                [DropnaLabel(), CSRankNorm(fields_group="label")],
+            ),
+            ([RobustZScoreNorm(fields_group="feature", **self.FIT)], [MinMaxNorm(**self.FIT)]),
+        ]:
+            expected, res = self._handlers(infer_processors, learn_processors, chunk_freq="MS")
+            self.assertIsInstance(res._learn, ChunkedHandlerStorage)
+            self.assertEqual(len(res._learn.paths), 6)
+            for data_key in [DataHandlerLP.DK_R, DataHandlerLP.DK_I, DataHandlerLP.DK_L]:
+                for selector in [slice(None), slice("2020-02-10", "2020-04-03"), "2020-03", pd.Timestamp("2020-03-02")]:
+                    pd.testing.assert_frame_equal(
+                        res.fetch(selector, data_key=data_key),
+                        expected.fetch(selector, data_key=data_key),
+                        rtol=1e-5,
+                        atol=1e-6,
+                    )
+                pd.testing.assert_frame_equal(
+                    res.fetch("SH600003", level="instrument", col_set="feature", data_key=data_key),
+                    expected.fetch("SH600003", level="instrument", col_set="feature", data_key=data_key),
+                    rtol=1e-5,
+                    atol=1e-6,
+                )
+            # streaming the data chunk by chunk
+            chunks = list(res.fetch_chunks(slice("2020-02-10", None), col_set="label", data_key=DataHandlerLP.DK_L))
+            self.assertEqual(len(chunks), 5)
+            pd.testing.assert_frame_equal(
+                pd.concat(chunks), expected.fetch(slice("2020-02-10", None), col_set="label", data_key="learn")
+            )
+            self.assertEqual(res.get_cols(), expected.get_cols())
+
+    def test_fit_without_data(self):
+        # no chunk has data in the fitting time range
+        fit = dict(fit_start_time="2021-01-01", fit_end_time="2021-03-31")
+        for proc in [ZScoreNorm(fields_group="feature", **fit), MinMaxNorm(fields_group="feature", **fit)]:
+            res = DataHandlerLP(
+                data_loader=StaticDataLoader(self.df),
+                start_time="2020-01-01",
+                end_time="2020-06-10",
+                infer_processors=[proc],
+                chunk_freq="MS",
+            )
+            self.assertTrue(res.fetch(col_set="feature").isna().all().all())
+            pd.testing.assert_frame_equal(
+                res.fetch(col_set="label"), self.df.loc[:"2020-06-10", ["label"]].droplevel(0, axis=1)
+            )
+        with self.assertRaises(ValueError):
+            ZScoreNorm(**fit).fit_stream([])
+
+    def test_lookback(self):
+        expected, res = self._handlers([Diff()], [], chunk_freq="MS", chunk_lookback="7D")
+        pd.testing.assert_frame_equal(res.fetch(), expected.fetch())
+        # the first day of each chunk can't be processed without the lookback
+        _, res = self._handlers([Diff()], [], chunk_freq="MS")
+        self.assertTrue(res.fetch("2020-02-03").isna().all().all())
+
+    def test_chunk_dir(self):
+        with tempfile.TemporaryDirectory() as chunk_dir:
+            _, res = self._handlers([], [DropnaLabel()], chunk_freq="MS", chunk_dir=chunk_dir, drop_raw=True)
+            self.assertEqual(len(list(Path(chunk_dir, "learn").glob("*.pkl"))), 6)
+            # the raw data are dropped
+            self.assertEqual(len(list(Path(chunk_dir, "raw").glob("*.pkl"))), 0)
+            with self.assertRaises(AttributeError):
+                res.fetch(data_key=DataHandlerLP.DK_R)
+            # the chunks are reloaded from the directory
+            storage = pickle.loads(pickle.dumps(res._learn))
+            pd.testing.assert_frame_equal(storage.fetch("2020-03"), res.fetch("2020-03", data_key="learn"))
+        # the chunks in a temporary directory can't be pickled
+        _, res = self._handlers([], [DropnaLabel()], chunk_freq="MS")
+        with self.assertRaises(pickle.PicklingError):
+            pickle.dumps(res._learn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.dataset.processor import CSRankNorm, CSZFillna, CSZScoreNorm, get_group_columns
+from qlib.utils.data import robust_zscore, zscore
+
+
+def _groupby_apply(df, fields_group, func):
+    """the pandas implementation of the cross sectional processors"""
+    cols = get_group_columns(df, fields_group)
+    df[cols] = func(df[cols].groupby("datetime", group_keys=False))
+    return df
+
+
+class TestCSProcessor(unittest.TestCase):
+    def _df(self, dtype, n_inst=40, n_days=30):
+        rng = np.random.default_rng(0)
+        index = pd.MultiIndex.from_product(
+            [pd.bdate_range("2020-01-01", periods=n_days), [f"SH6000{i:02d}" for i in range(n_inst)]],
+            names=["datetime", "instrument"],
+        )
+        # rounded to get the ties of the ranks
+        values = np.round(rng.normal(size=(len(index), 5)), 1)
+        values[rng.random(values.shape) < 0.2] = np.nan
+        values[5, 0], values[7, 1] = np.inf, -np.inf
+        columns = [("feature", f"f{i}") for i in range(4)] + [("label", "LABEL0")]
+        df = pd.DataFrame(values.astype(dtype), index=index, columns=pd.MultiIndex.from_tuples(columns))
+        # a cross section without any valid value, one with a single value and a constant one
+        df.iloc[n_inst : 2 * n_inst, 2] = np.nan
+        df.iloc[2 * n_inst + 1 : 3 * n_inst, 3] = np.nan
+        df.iloc[3 * n_inst : 4 * n_inst, 1] = 1.5
+        return df.iloc[np.sort(rng.permutation(len(df))[: len(df) - 37])]
+
+    def test_cs_processors(self):
+        def _rank(grouped):
+            t = grouped.rank(pct=True)
+            t -= 0.5
+            t *= 3.46
+            return t
+
+        for dtype in [np.float32, np.float64]:
+            for df in [self._df(dtype), self._df(dtype).swaplevel().sort_index()]:
+                for group in [None, "feature"]:
+                    for processor, func in [
+                        (CSZScoreNorm(group), lambda g: g.apply(zscore)),
+                        (CSZScoreNorm(group, method="robust"), lambda g: g.apply(robust_zscore)),
+                        (CSRankNorm(group), _rank),
+                        (CSZFillna(group), lambda g: g.apply(lambda x: x.fillna(x.mean()))),
+                    ]:
+                        res = processor(df.copy())
+                        expected = _groupby_apply(df.copy(), group, func)
+                        pd.testing.assert_frame_equal(res, expected, rtol=1e-5, atol=1e-6)
+
+        # the custom zscore function is still applied by pandas
+        processor = CSZScoreNorm("label")
+        processor.zscore_func = lambda x: x - x.mean()
+        df = self._df(np.float64)
+        pd.testing.assert_frame_equal(
+            processor(df.copy()), _groupby_apply(df.copy(), "label", lambda g: g.apply(lambda x: x - x.mean()))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.processor import DatetimeOffsetFormat
+from qlib.data.dataset.storage import DatetimeOffsetStorage, NaiveDFStorage
+
+
+class TestDatetimeOffsetStorage(unittest.TestCase):
+    SELECTORS = [
+        (slice(None), "datetime"),
+        (slice("2020-02-03", "2020-02-20"), "datetime"),
+        ("2020-02", "datetime"),
+        ("2020-02-03", "datetime"),
+        (pd.Timestamp("2020-02-04"), "datetime"),
+        (np.datetime64("2020-02-04"), "datetime"),
+        (["2020-02-03", "2020-02-07"], "datetime"),
+        (slice("2021", "2022"), "datetime"),
+        ("SH600004", "instrument"),
+        (["SH600001", "SH600004"], "instrument"),
+        ((slice("2020-02-03", "2020-02-20"), ["SH600003", "SH600001"]), None),
+        ((pd.Timestamp("2020-02-04"), ["SH600003"]), None),
+        ((pd.Timestamp("2020-02-04"), "SH600003"), None),
+        (slice("2020-02-03", "2020-02-04"), None),
+        ("2020-02-03", None),
+    ]
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        index = pd.MultiIndex.from_product(
+            [pd.bdate_range("2020-01-01", periods=60), [f"SH6000{i:02d}" for i in range(30)]],
+            names=["datetime", "instrument"],
+        )
+        columns = pd.MultiIndex.from_tuples([("feature", f"f{i}") for i in range(4)] + [("label", "LABEL0")])
+        df = pd.DataFrame(rng.normal(size=(len(index), 5)).astype(np.float32), index=index, columns=columns)
+        self.df = df.iloc[np.sort(rng.permutation(len(df))[:-100])]
+
+    def test_fetch(self):
+        # the data of mixed dtypes
+        mixed_df = self.df.copy()
+        mixed_df[("feature", "f4")] = np.arange(len(mixed_df))
+        for df, expected_df in [
+            (self.df, self.df),
+            (self.df.swaplevel().sort_index(), self.df),
+            (self.df.sample(frac=1, random_state=0), self.df),
+            (mixed_df, mixed_df),
+        ]:
+            storage = DatetimeOffsetStorage(df)
+            expected_storage = NaiveDFStorage(expected_df)
+            for selector, level in self.SELECTORS:
+                for col_set in [DataHandlerLP.CS_ALL, DataHandlerLP.CS_RAW, "feature", ["feature", "label"]]:
+                    res = storage.fetch(selector, level, col_set)
+                    expected = expected_storage.fetch(selector, level, col_set)
+                    if isinstance(expected, pd.Series):
+                        pd.testing.assert_series_equal(res, expected)
+                        continue
+                    if isinstance(expected.index, pd.MultiIndex):
+                        # the data are fetched in <datetime, instrument> order
+                        expected = expected.sort_index()
+                    pd.testing.assert_frame_equal(res, expected, check_index_type=False, check_column_type=False)
+            with self.assertRaises(KeyError):
+                storage.fetch(pd.Timestamp("2021-01-04"))
+            with self.assertRaises(KeyError):
+                storage.fetch((slice(None), ["SH600001", "SH600099"]), level=None)
+
+        # the date slices are the views of the data
+        storage = DatetimeOffsetStorage(self.df)
+        self.assertTrue(np.shares_memory(storage.fetch("2020-02-03").values, storage.values))
+        self.assertEqual(storage.offsets[-1], len(self.df))
+
+    def test_handler(self):
+        handler = DataHandlerLP(data_loader=StaticDataLoader(self.df), infer_processors=[DatetimeOffsetFormat()])
+        self.assertIsInstance(handler._infer, DatetimeOffsetStorage)
+        self.assertEqual(handler.get_cols(), list(self.df.columns.get_level_values(-1)))
+        pd.testing.assert_frame_equal(
+            handler.fetch(("2020-02-03", ["SH600003", "SH600001"]), level=None, col_set="label", data_key="infer"),
+            self.df.loc[pd.IndexSlice["2020-02-03", ["SH600001", "SH600003"]], "label"],
+            check_index_type=False,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
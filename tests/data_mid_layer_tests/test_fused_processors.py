@@ -0,0 +1,119 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import copy
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.pipeline import FusedProcessors, ProcessorPlan
+from qlib.data.dataset.processor import (
+    CSRankNorm,
+    CSZFillna,
+    CSZScoreNorm,
+    DropnaLabel,
+    Fillna,
+    MinMaxNorm,
+    ProcessInf,
+    RobustZScoreNorm,
+    TanhProcess,
+    ZScoreNorm,
+)
+
+
+class TestFusedProcessors(unittest.TestCase):
+    FIT = dict(fit_start_time="2020-01-01", fit_end_time="2020-02-15")
+
+    def _df(self, dtype, n_inst=30, n_days=60):
+        rng = np.random.default_rng(0)
+        index = pd.MultiIndex.from_product(
+            [pd.bdate_range("2020-01-01", periods=n_days), [f"SH6000{i:02d}" for i in range(n_inst)]],
+            names=["datetime", "instrument"],
+        )
+        values = np.round(rng.normal(size=(len(index), 6)), 2)
+        values[rng.random(values.shape) < 0.1] = np.nan
+        values[:, :5][rng.random((len(index), 5)) < 0.01] = np.inf
+        columns = [("feature", f"f{i}") for i in range(5)] + [("label", "LABEL0")]
+        df = pd.DataFrame(values.astype(dtype), index=index, columns=pd.MultiIndex.from_tuples(columns))
+        return df.iloc[np.sort(rng.permutation(len(df))[: len(df) - 37])]
+
+    def _chains(self):
+        return [
+            (
+                [ProcessInf(), ZScoreNorm(fields_group="feature", **self.FIT), Fillna(fields_group="feature")],
+                [DropnaLabel(), CSRankNorm(fields_group="label")],
+            ),
+            (
+                [ProcessInf(), RobustZScoreNorm(fields_group="feature", **self.FIT), Fillna(fields_group="feature")],
+                [DropnaLabel(), CSZScoreNorm(fields_group="label")],
+            ),
+            (
+                [ProcessInf(), TanhProcess(), MinMaxNorm(fields_group="feature", **self.FIT), CSZFillna("feature")],
+                [DropnaLabel(), CSZScoreNorm(fields_group="feature", method="robust"), Fillna()],
+            ),
+        ]
+
+    def test_fused_handler(self):
+        for dtype in [np.float32, np.float64]:
+            for df in [self._df(dtype), self._df(dtype).swaplevel().sort_index()]:
+                for infer_processors, learn_processors in self._chains():
+                    handlers = []
+                    for fuse in [False, True]:
+                        handler = DataHandlerLP(
+                            data_loader=StaticDataLoader(df.copy()),
+                            infer_processors=copy.deepcopy(infer_processors),
+                            learn_processors=copy.deepcopy(learn_processors),
+                            fuse_processors=fuse,
+                        )
+                        # the raw data is not modified
+                        pd.testing.assert_frame_equal(handler._data, df)
+                        handlers.append(handler)
+                    expected, res = handlers
+                    pd.testing.assert_frame_equal(res._infer, expected._infer, rtol=1e-5, atol=1e-6)
+                    pd.testing.assert_frame_equal(res._learn, expected._learn, rtol=1e-5, atol=1e-6)
+        self.assertEqual(
+            res.get_process_plan(),
+            "infer_processors: fused[ProcessInf -> TanhProcess -> MinMaxNorm -> CSZFillna]\n"
+            "learn_processors: DropnaLabel => fused[CSZScoreNorm -> Fillna]",
+        )
+
+    def test_plan(self):
+        plan = ProcessorPlan(
+            [DropnaLabel(), ProcessInf(), Fillna(), CSZScoreNorm(method="robust"), CSZScoreNorm(), CSRankNorm()]
+        )
+        self.assertEqual(
+            str(plan), "DropnaLabel => fused[ProcessInf -> Fillna -> CSZScoreNorm -> CSZScoreNorm -> CSRankNorm]"
+        )
+        # the fused processors don't modify their input
+        self.assertTrue(plan.readonly())
+
+        # the custom zscore functions are not fused
+        processor = CSZScoreNorm()
+        processor.zscore_func = lambda x: x - x.mean()
+        self.assertEqual(str(ProcessorPlan([ProcessInf(), processor])), "fused[ProcessInf] => CSZScoreNorm")
+        self.assertTrue(ProcessorPlan([ProcessInf(), processor]).readonly())
+        self.assertFalse(ProcessorPlan([processor, ProcessInf()]).readonly())
+
+    def test_unsorted(self):
+        # ProcessInf sorts the data
+        df = self._df(np.float32).sample(frac=1, random_state=0)
+        expected = Fillna()(ProcessInf()(df.copy()))
+        res = ProcessorPlan([ProcessInf(), Fillna()])(df)
+        self.assertTrue(res.index.is_monotonic_increasing)
+        pd.testing.assert_frame_equal(res, expected, rtol=1e-5, atol=1e-6)
+
+    def test_fallback(self):
+        # the data which are not all float are processed as usual
+        df = self._df(np.float64)
+        df[("feature", "f0")] = np.arange(len(df))
+        fused = FusedProcessors([ProcessInf(), Fillna(fill_value=-1)])
+        expected = Fillna(fill_value=-1)(ProcessInf()(df.copy()))
+        pd.testing.assert_frame_equal(fused(df), expected)
+        self.assertTrue(np.isinf(df.values).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
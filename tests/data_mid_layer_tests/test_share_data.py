@@ -0,0 +1,89 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import copy
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.dataset.handler import DataHandlerLP
+from qlib.data.dataset.loader import StaticDataLoader
+from qlib.data.dataset.processor import (
+    CSRankNorm,
+    CSZFillna,
+    CSZScoreNorm,
+    DropnaLabel,
+    Fillna,
+    MinMaxNorm,
+    ProcessInf,
+    RobustZScoreNorm,
+    TanhProcess,
+    ZScoreNorm,
+)
+
+
+class TestShareData(unittest.TestCase):
+    FIT = dict(fit_start_time="2020-01-01", fit_end_time="2020-02-15")
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        index = pd.MultiIndex.from_product(
+            [pd.bdate_range("2020-01-01", periods=60), [f"SH6000{i:02d}" for i in range(30)]],
+            names=["datetime", "instrument"],
+        )
+        values = np.round(rng.normal(size=(len(index), 6)), 2)
+        values[rng.random(values.shape) < 0.1] = np.nan
+        values[:, :5][rng.random((len(index), 5)) < 0.01] = np.inf
+        columns = pd.MultiIndex.from_tuples([("feature", f"f{i}") for i in range(5)] + [("label", "LABEL0")])
+        self.df = pd.DataFrame(values, index=index, columns=columns)
+
+    def _handler(self, infer_processors, learn_processors, **kwargs):
+        return DataHandlerLP(
+            data_loader=StaticDataLoader(self.df.copy()),
+            infer_processors=copy.deepcopy(infer_processors),
+            learn_processors=copy.deepcopy(learn_processors),
+            **kwargs,
+        )
+
+    def test_share_data(self):
+        for infer_processors, learn_processors in [
+            ([Fillna(fields_group="feature")], [CSRankNorm(fields_group="label")]),
+            (
+                [ProcessInf(), ZScoreNorm(fields_group="feature", **self.FIT), Fillna(fields_group="feature")],
+                [DropnaLabel(), CSZScoreNorm(fields_group="label")],
+            ),
+            (
+                [RobustZScoreNorm(fields_group="feature", clip_outlier=True, **self.FIT), CSZFillna("feature")],
+                [TanhProcess(), MinMaxNorm(fields_group="label", **self.FIT)],
+            ),
+        ]:
+            for fuse in [False, True]:
+                expected = self._handler(infer_processors, learn_processors, fuse_processors=fuse)
+                res = self._handler(infer_processors, learn_processors, fuse_processors=fuse, share_data=True)
+                pd.testing.assert_frame_equal(res._data, self.df)
+                pd.testing.assert_frame_equal(res._infer, expected._infer)
+                pd.testing.assert_frame_equal(res._learn, expected._learn)
+                report = res.memory_report()
+                self.assertLessEqual(report.loc["total", "bytes"], expected.memory_report().loc["total", "bytes"])
+                self.assertEqual(
+                    report.loc["total", "bytes"] + report.loc["total", "shared"], report["bytes"].iloc[:-1].sum()
+                )
+
+    def test_memory_report(self):
+        # only the label column is changed by the learn processors
+        expected = self._handler([Fillna(fields_group="feature")], [CSRankNorm(fields_group="label")])
+        res = self._handler([Fillna(fields_group="feature")], [CSRankNorm(fields_group="label")], share_data=True)
+        report, expected_report = res.memory_report(), expected.memory_report()
+        self.assertEqual(list(report.index), ["raw", "infer", "learn", "total"])
+        self.assertEqual(report.loc["raw", "own"], 0)
+        self.assertEqual(report.loc["learn", "own"], self.df["label"].values.nbytes)
+        self.assertGreaterEqual(expected_report.loc["learn", "own"], expected._learn.values.nbytes)
+
+        # the raw data are not reported if they are dropped
+        res = self._handler([], [DropnaLabel()], share_data=True, drop_raw=True)
+        self.assertEqual(list(res.memory_report().index), ["infer", "learn", "total"])
+
+
+if __name__ == "__main__":
+    unittest.main()
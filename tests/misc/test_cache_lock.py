@@ -0,0 +1,111 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import time
+import unittest
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.storage.file_storage import FileFeatureStorage
+from qlib.utils.file import FileRWLock
+
+
+def increase(lock_path, counter_path, n):
+    lock = FileRWLock(lock_path)
+    for _ in range(n):
+        with lock.writer():
+            value = int(Path(counter_path).read_text())
+            # the readers should never see it
+            Path(counter_path).write_text("writing")
+            time.sleep(0.001)
+            Path(counter_path).write_text(str(value + 1))
+
+
+def read(lock_path, counter_path, n):
+    lock = FileRWLock(lock_path)
+    for _ in range(n):
+        with lock.reader():
+            int(Path(counter_path).read_text())
+
+
+def get_features(provider_uri, fields, n):
+    qlib.init(provider_uri=provider_uri, expression_cache="DiskExpressionCache", dataset_cache=None, kernels=1)
+    return [D.features(D.instruments("all"), fields) for _ in range(n)]
+
+
+class TestCacheLock(unittest.TestCase):
+    FIELDS = ["Mean($close, 5)", "Std($close, 10) / $close", "Corr($close, $volume, 10)", "Ref($close, -2)"]
+    N_PROC = 6
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=300)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        instruments = []
+        for i in range(4):
+            inst = f"SH60000{i}"
+            instruments.append(f"{inst}\t{dates[i * 10].date()}\t{dates[-1].date()}")
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in ["close", "volume"]:
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(
+                    rng.random(300 - i * 10).astype(np.float32), index=i * 10
+                )
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def test_rw_lock(self):
+        lock_path, counter_path = self.qlib_dir / "locks" / "test.lock", self.qlib_dir / "counter"
+        counter_path.write_text("0")
+        with Pool(self.N_PROC) as pool:
+            res = [pool.apply_async(increase, (lock_path, counter_path, 20)) for _ in range(self.N_PROC // 2)]
+            res += [pool.apply_async(read, (lock_path, counter_path, 100)) for _ in range(self.N_PROC // 2)]
+            for r in res:
+                r.get()
+        self.assertEqual(int(counter_path.read_text()), self.N_PROC // 2 * 20)
+
+    def test_timeout(self):
+        lock_path = self.qlib_dir / "locks" / "timeout.lock"
+        with FileRWLock(lock_path).reader():
+            # the readers share the lock
+            with FileRWLock(lock_path, timeout=0.05).reader():
+                pass
+            with self.assertRaises(TimeoutError):
+                with FileRWLock(lock_path, timeout=0.05).writer():
+                    pass
+
+    def test_unsupported_lock(self):
+        with self.assertRaisesRegex(ValueError, "cache_lock"):
+            qlib.init(provider_uri=str(self.qlib_dir), cache_lock="redis", kernels=1)
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+
+    def test_disk_expression_cache(self):
+        expected = D.features(D.instruments("all"), self.FIELDS)
+        for _ in range(2):
+            # all the processes generate and read the same cache at the same time
+            shutil.rmtree(self.qlib_dir / C.features_cache_dir_name, ignore_errors=True)
+            with Pool(self.N_PROC) as pool:
+                res = [pool.apply_async(get_features, (str(self.qlib_dir), self.FIELDS, 5)) for _ in range(self.N_PROC)]
+                for r in res:
+                    for df in r.get():
+                        pd.testing.assert_frame_equal(df, expected, rtol=1e-6)
+        self.assertTrue(any((self.qlib_dir / C.features_cache_dir_name).rglob("*.meta")))
+
+
+if __name__ == "__main__":
+    unittest.main()
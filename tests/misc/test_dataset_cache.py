@@ -0,0 +1,108 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import pickle
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import DiskDatasetCache, H
+from qlib.data.data import DatasetD
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestDiskDatasetCache(unittest.TestCase):
+    FIELDS = ["$close", "Mean($close, 5)", "Ref($close, -2)", "Corr($close, Log($volume + 1), 10)"]
+
+    def setUp(self) -> None:
+        self.qlib_dir = Path(tempfile.mkdtemp())
+        self.qlib_dir.joinpath("calendars").mkdir()
+        self.qlib_dir.joinpath("instruments").mkdir()
+        self.dates = pd.bdate_range("2020-01-01", periods=200)
+        rng = np.random.default_rng(0)
+        self.data = {f"SH60000{i}": rng.random((2, 200 - i * 20)).astype(np.float32) for i in range(4)}
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), self.dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        self._dump(150)
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache="DiskDatasetCache", kernels=1)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.qlib_dir, ignore_errors=True)
+
+    def _dump(self, n_days):
+        """dump the data of the first `n_days` days"""
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), self.dates[:n_days].strftime("%Y-%m-%d"), fmt="%s")
+        instruments = []
+        for i, (inst, data) in enumerate(self.data.items()):
+            start, end = i * 20, min(i * 20 + data.shape[1], n_days) - 1
+            instruments.append(f"{inst}\t{self.dates[start].date()}\t{self.dates[end].date()}")
+            shutil.rmtree(self.qlib_dir.joinpath("features", inst.lower()), ignore_errors=True)
+            self.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field, values in zip(["close", "volume"], data):
+                FileFeatureStorage(inst, field, "day", provider_uri=str(self.qlib_dir)).write(
+                    values[: end - start + 1], index=start
+                )
+        self.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+        H.clear()
+
+    def _cache_paths(self):
+        return [p.with_suffix("") for p in self.qlib_dir.joinpath(C.dataset_cache_dir_name).glob("*.meta")]
+
+    def test_read(self):
+        for start_time, end_time in [(None, None), ("2020-02-01", "2020-04-01"), ("2020-03-10", "2020-03-10")]:
+            for fields in [self.FIELDS, self.FIELDS[::-1]]:
+                expected = D.features(D.instruments("all"), fields, start_time, end_time, disk_cache=0)
+                for _ in range(2):
+                    # generate the cache and read it
+                    df = D.features(D.instruments("all"), fields, start_time, end_time)
+                    pd.testing.assert_frame_equal(df, expected)
+
+        (cache_path,) = set(self._cache_paths())
+        self.assertFalse(DiskDatasetCache.is_legacy_cache(cache_path))
+        # a part of the instruments and the fields
+        df = DiskDatasetCache.read_data_from_cache(
+            cache_path, "2020-02-01", None, self.FIELDS[2:], instruments=["SH600001", "SH600003"]
+        )
+        expected = D.features(["SH600001", "SH600003"], self.FIELDS[2:], "2020-02-01", disk_cache=0)
+        pd.testing.assert_frame_equal(df, expected)
+        df = DiskDatasetCache.read_data_from_cache(cache_path, "2021-01-01", None, self.FIELDS)
+        self.assertTrue(df.empty)
+
+    def test_update(self):
+        D.features(D.instruments("all"), self.FIELDS)
+        self._dump(200)
+        (cache_path,) = self._cache_paths()
+        self.assertEqual(DatasetD.update(cache_path.name), 0)
+        self.assertEqual(DatasetD.update(cache_path.name), 1)
+        pd.testing.assert_frame_equal(
+            D.features(D.instruments("all"), self.FIELDS),
+            D.features(D.instruments("all"), self.FIELDS, disk_cache=0),
+        )
+
+    def test_migrate(self):
+        D.features(D.instruments("all"), self.FIELDS)
+        (cache_path,) = self._cache_paths()
+        # a legacy cache which can't be read is removed and generated again
+        meta_path = cache_path.with_suffix(".meta")
+        meta = pickle.loads(meta_path.read_bytes())
+        meta["info"].pop("format")
+        meta_path.write_bytes(pickle.dumps(meta))
+        self.assertTrue(DiskDatasetCache.is_legacy_cache(cache_path))
+        self.assertEqual(DatasetD.migrate(cache_path.name), 2)
+        self.assertFalse(cache_path.exists())
+        pd.testing.assert_frame_equal(
+            D.features(D.instruments("all"), self.FIELDS),
+            D.features(D.instruments("all"), self.FIELDS, disk_cache=0),
+        )
+        self.assertFalse(DiskDatasetCache.is_legacy_cache(cache_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.data import DatasetProvider
+from qlib.data.storage.file_storage import FileFeatureStorage
+from qlib.utils.paral import ParallelPool
+
+
+class TestDatasetEngine(unittest.TestCase):
+    FIELDS = ["$close", "$volume", "Mean($close, 5)", "Corr($close, Log($volume + 1), 10)", "Ref($close, 1)"]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=200)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=2)
+        rng = np.random.default_rng(0)
+        instruments = []
+        for i in range(8):
+            inst = f"SH60000{i}"
+            start, end = i * 5, 199 - i * 3
+            instruments.append(f"{inst}\t{dates[start].date()}\t{dates[end].date()}")
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in ["close", "volume"]:
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(
+                    rng.random(end - start + 1).astype(np.float32), index=start
+                )
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        C.dataset_engine = "process"
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def test_engine_result(self):
+        df_l = []
+        for engine in ["process", "thread", "auto"]:
+            C.dataset_engine = engine
+            df_l.append(D.features(D.instruments("all"), self.FIELDS))
+        self.assertFalse(df_l[0].empty)
+        for df in df_l[1:]:
+            pd.testing.assert_frame_equal(df_l[0], df)
+
+    def test_chunk_and_pool(self):
+        C.dataset_engine = "process"
+        expected = D.features(D.instruments("all"), self.FIELDS)
+        try:
+            for chunk_size, lifetime in [(1, 0), (3, 0), ("auto", None), ("auto", 600), (100, None)]:
+                C.dataset_chunk_size = chunk_size
+                C.dataset_pool_lifetime = lifetime
+                for _ in range(2):
+                    pd.testing.assert_frame_equal(expected, D.features(D.instruments("all"), self.FIELDS))
+                if lifetime != 0:
+                    self.assertIsNotNone(ParallelPool._paral)
+        finally:
+            C.dataset_chunk_size = "auto"
+            C.dataset_pool_lifetime = 0
+            ParallelPool.shutdown()
+        self.assertIsNone(ParallelPool._paral)
+
+    def test_pool_lifetime(self):
+        C.dataset_engine = "process"
+        C.dataset_pool_lifetime = 0.5
+        try:
+            D.features(D.instruments("all"), self.FIELDS)
+            self.assertIsNotNone(ParallelPool._paral)
+            # the idle pool is shut down without any other call
+            time.sleep(1.5)
+            self.assertIsNone(ParallelPool._paral)
+        finally:
+            C.dataset_pool_lifetime = 0
+            ParallelPool.shutdown()
+
+    def test_shm_transport(self):
+        expected = D.features(D.instruments("all"), self.FIELDS)
+        try:
+            C.dataset_result_transport = "shm"
+            for engine in ["process", "thread"]:
+                C.dataset_engine = engine
+                df = D.features(D.instruments("all"), self.FIELDS)
+                pd.testing.assert_frame_equal(expected, df, check_dtype=False)
+                self.assertTrue((df.dtypes == np.float32).all())
+            # the instruments without spans and the instruments without data
+            df = D.features(["SH600003", "SH600000", "SH699999"], self.FIELDS, start_time="2020-03-01")
+            pd.testing.assert_frame_equal(
+                D.features(["SH600003", "SH600000"], self.FIELDS, start_time="2020-03-01"), df, check_dtype=False
+            )
+        finally:
+            C.dataset_result_transport = "pickle"
+            C.dataset_engine = "process"
+
+    def test_shm_shared_fields(self):
+        # the sub-expressions shared by the fields are evaluated before the fields requested earlier
+        fields = ["Corr($close, Log($volume + 1), 10)", "Mean($close, 5) / $close", "Log($volume + 1)", "$close"]
+        expected = D.features(D.instruments("all"), fields)
+        try:
+            C.dataset_result_transport = "shm"
+            df = D.features(D.instruments("all"), fields)
+            self.assertEqual(list(df.columns), fields)
+            pd.testing.assert_frame_equal(expected, df, check_dtype=False)
+        finally:
+            C.dataset_result_transport = "pickle"
+
+    def test_get_chunk_size(self):
+        C.dataset_chunk_size = "auto"
+        self.assertEqual(DatasetProvider.get_chunk_size(100, 5), 5)
+        self.assertEqual(DatasetProvider.get_chunk_size(3, 5), 1)
+        C.dataset_chunk_size = 7
+        self.assertEqual(DatasetProvider.get_chunk_size(100, 5), 7)
+        C.dataset_chunk_size = 0
+        with self.assertRaises(ValueError):
+            DatasetProvider.get_chunk_size(100, 5)
+        C.dataset_chunk_size = "auto"
+
+    def test_get_dataset_engine(self):
+        C.dataset_engine = "auto"
+        self.assertEqual(DatasetProvider.get_dataset_engine(["$close", "$open"], 3000), "thread")
+        self.assertEqual(DatasetProvider.get_dataset_engine(self.FIELDS, 10), "thread")
+        self.assertEqual(DatasetProvider.get_dataset_engine(self.FIELDS * 100, 3000), "process")
+        # the PIT provider is not multi-threading-safe
+        self.assertEqual(DatasetProvider.get_dataset_engine(["$close", "P($$roewa_q)"], 3), "process")
+        C.dataset_engine = "thread"
+        self.assertEqual(DatasetProvider.get_dataset_engine(self.FIELDS * 100, 3000), "thread")
+        self.assertEqual(DatasetProvider.get_dataset_engine(["P($$roewa_q)"], 3), "process")
+        C.dataset_engine = "unknown"
+        with self.assertRaises(ValueError):
+            DatasetProvider.get_dataset_engine(self.FIELDS, 10)
+        C.dataset_engine = "process"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import CacheUtils, DiskCacheManager
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestDiskCacheManager(unittest.TestCase):
+    FIELDS = ["Mean($close, 5)", "Std($close, 10)", "Ref($close, 1)"]
+
+    def setUp(self) -> None:
+        self.qlib_dir = Path(tempfile.mkdtemp())
+        self.qlib_dir.joinpath("calendars").mkdir()
+        self.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=100)
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        self.instruments = [f"SH60000{i}" for i in range(3)]
+        self.qlib_dir.joinpath("instruments", "all.txt").write_text(
+            "\n".join(f"{inst}\t{dates[0].date()}\t{dates[-1].date()}" for inst in self.instruments)
+        )
+        self._init()
+        rng = np.random.default_rng(0)
+        for inst in self.instruments:
+            self.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            FileFeatureStorage(inst, "close", "day", provider_uri=str(self.qlib_dir)).write(rng.random(100), index=0)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.qlib_dir, ignore_errors=True)
+        DiskCacheManager._usage.clear()
+
+    def _init(self, **kwargs):
+        qlib.init(
+            provider_uri=str(self.qlib_dir),
+            expression_cache="DiskExpressionCache",
+            dataset_cache="DiskDatasetCache",
+            kernels=1,
+            **kwargs,
+        )
+
+    def _visit(self, fields):
+        """visit the expression caches of the fields of all the instruments (the memory cache is skipped)"""
+        qlib.data.cache.H.clear()
+        return D.features(self.instruments, fields, disk_cache=0)
+
+    def test_stats(self):
+        expected = self._visit(self.FIELDS)
+        # the dataset cache is generated from the expression caches
+        D.features(D.instruments("all"), self.FIELDS)
+        for _ in range(2):
+            pd.testing.assert_frame_equal(self._visit(self.FIELDS[:1]), expected.iloc[:, :1])
+
+        manager = DiskCacheManager()
+        entries = manager.entries()
+        self.assertEqual(len(entries), len(self.FIELDS) * len(self.instruments) + 1)
+        self.assertTrue(all(row.bytes == manager.cache_size(row.path) for row in entries.itertuples()))
+        self.assertEqual(manager.usage(), entries["bytes"].sum())
+
+        stats = manager.stats()
+        mean_stats = stats.loc[("expression", "Mean($close,5)")]
+        self.assertEqual(mean_stats["entries"], 3)
+        self.assertEqual(mean_stats["hits"], 9)
+        self.assertEqual(mean_stats["misses"], 3)
+        self.assertAlmostEqual(mean_stats["hit_rate"], 9 / 12)
+        self.assertEqual(stats.loc[("expression", "Std($close,10)"), "hits"], 3)
+        self.assertEqual(stats.xs("dataset")["entries"].sum(), 1)
+
+    def test_gc(self):
+        expected = self._visit(self.FIELDS)
+        time.sleep(0.01)
+        self._visit(self.FIELDS[:1])
+        manager = DiskCacheManager()
+        usage = manager.usage()
+        self.assertTrue(manager.gc(size_limit=usage).empty)
+
+        # the least recently visited entries are evicted
+        evicted = manager.gc(size_limit=usage - 1, target=0.5)
+        self.assertNotIn("Mean($close,5)", set(evicted["name"]))
+        self.assertLessEqual(manager.usage(), usage * 0.5)
+        self.assertEqual(manager.usage(), usage - evicted["bytes"].sum())
+        # the evicted entries are generated again
+        pd.testing.assert_frame_equal(self._visit(self.FIELDS), expected)
+        self.assertEqual(manager.usage(), usage)
+
+        # the entries with the least value (visits * cost / bytes) are evicted
+        self._visit(self.FIELDS[1:2])
+        entries = manager.entries()
+        evicted = manager.gc(size_limit=usage - 1, eviction="value", target=0.9)
+        value = entries["visits"] * entries["cost"] / entries["bytes"]
+        self.assertTrue((value.loc[evicted.index].max() <= value.drop(evicted.index)).all())
+
+        with self.assertRaises(ValueError):
+            manager.gc(size_limit=0, eviction="unknown")
+
+    def test_gc_with_readers(self):
+        D.features(D.instruments("all"), self.FIELDS)
+        manager = DiskCacheManager()
+        (entry,) = manager.entries().query("kind == 'dataset'").itertuples()
+        lock_name = f"{C.dpm.get_data_uri('day')}:dataset-{entry.uri}"
+        started, release = threading.Event(), threading.Event()
+
+        def read():
+            with CacheUtils.reader_lock(None, lock_name):
+                started.set()
+                release.wait()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        started.wait()
+        # the entry being read is skipped
+        evicted = manager.gc(size_limit=0)
+        release.set()
+        reader.join()
+        self.assertEqual(set(evicted["kind"]), {"expression"})
+        self.assertTrue(os.path.exists(entry.path))
+        self.assertEqual(len(manager.gc(size_limit=0)), 1)
+
+    def test_budget(self):
+        size_limit = 3000
+        self._init(disk_cache_size_limit=size_limit, disk_cache_gc_target=0.5)
+        self._visit(self.FIELDS + ["Max($close, 5)", "Min($close, 5)"])
+        self.assertLessEqual(DiskCacheManager().usage(), size_limit)
+
+    def test_cli(self):
+        self._visit(self.FIELDS)
+        cmd = [sys.executable, "-m", "qlib.cli.cache"]
+        args = ["--provider_uri", str(self.qlib_dir)]
+        env = {**os.environ, "PYTHONPATH": str(Path(qlib.__file__).parents[1])}
+        proc = subprocess.run(cmd + ["stats"] + args, env=env, capture_output=True, text=True, check=True)
+        self.assertIn("Mean($close,5)", proc.stdout)
+        self.assertNotIn("RuntimeWarning", proc.stderr)
+        out = subprocess.run(
+            cmd + ["warm"] + args + ["--fields", '["Max($close, 5)"]', "--disk_cache", "0"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertIn("Max($close,5)", out)
+        out = subprocess.run(cmd + ["gc"] + args + ["--size_limit", "0"], env=env, capture_output=True, text=True)
+        self.assertIn("12 caches", out.stdout)
+        self.assertEqual(DiskCacheManager().usage(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
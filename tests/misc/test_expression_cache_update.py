@@ -0,0 +1,109 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import ExpressionD
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestExpressionCacheUpdate(unittest.TestCase):
+    FIELDS = ["Mean($close, 5)", "Std($close, 20) / $close", "Ref($close, -2)", "EMA($close, 10)", "Sum($close, 0)"]
+
+    def setUp(self) -> None:
+        self.qlib_dir = Path(tempfile.mkdtemp())
+        self.qlib_dir.joinpath("calendars").mkdir()
+        self.qlib_dir.joinpath("instruments").mkdir()
+        self.dates = pd.bdate_range("2020-01-01", periods=300)
+        rng = np.random.default_rng(0)
+        self.data = {f"SH60000{i}": rng.random((2, 300 - i * 10)).astype(np.float32) for i in range(3)}
+        # the instrument delisted before the last update
+        self.data["SH600003"] = rng.random((2, 150)).astype(np.float32)
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), self.dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        self._dump(250)
+        qlib.init(
+            provider_uri=str(self.qlib_dir), expression_cache="DiskExpressionCache", dataset_cache=None, kernels=1
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.qlib_dir, ignore_errors=True)
+
+    def _dump(self, n_days):
+        """dump the data of the first `n_days` days"""
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), self.dates[:n_days].strftime("%Y-%m-%d"), fmt="%s")
+        instruments = []
+        for inst, data in self.data.items():
+            start = len(self.dates) - data.shape[1] if inst != "SH600003" else 0
+            end = min(start + data.shape[1], n_days) - 1
+            instruments.append(f"{inst}\t{self.dates[start].date()}\t{self.dates[end].date()}")
+            shutil.rmtree(self.qlib_dir.joinpath("features", inst.lower()), ignore_errors=True)
+            self.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field, values in zip(["close", "volume"], data):
+                FileFeatureStorage(inst, field, "day", provider_uri=str(self.qlib_dir)).write(
+                    values[: end - start + 1], index=start
+                )
+        self.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    def test_update_cache(self):
+        self._check_update(n_jobs=1)
+
+    def test_update_cache_parallel(self):
+        self._check_update(n_jobs=2)
+
+    def _check_update(self, n_jobs):
+        D.features(D.instruments("all"), self.FIELDS)
+        n_cache = len(list(self.qlib_dir.joinpath(C.features_cache_dir_name).glob("*/*.meta")))
+        self.assertEqual(n_cache, len(self.data) * len(self.FIELDS))
+
+        self._dump(300)
+        provider = ExpressionD._provider.provider
+        with mock.patch.object(provider, "expression", wraps=provider.expression) as expression:
+            res = ExpressionD.update_cache("day", n_jobs=n_jobs)
+        self.assertEqual(len(res), n_cache)
+        self.assertTrue((res == 0).all())
+        # only the tails are recomputed except the expressions depending on the whole history (the provider of the
+        # processes is not patched)
+        self.assertEqual(expression.call_count, n_cache if n_jobs == 1 else 0)
+        for call in expression.call_args_list:
+            inst, field, start_time = call.args[:3]
+            if field not in ["Sum($close,0)", "EMA($close,10)"]:
+                # the delisted instrument is updated since its last data
+                self.assertGreaterEqual(start_time, self.dates[147 if inst.upper() == "SH600003" else 247])
+        # no need to update again
+        self.assertTrue((ExpressionD.update_cache("day", n_jobs=1) == 1).all())
+
+        updated = D.features(D.instruments("all"), self.FIELDS)
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        expected = D.features(D.instruments("all"), self.FIELDS)
+        pd.testing.assert_frame_equal(updated, expected, rtol=1e-6)
+        self.assertEqual(updated.index.get_level_values("datetime").max(), self.dates[-1])
+
+    def test_update_without_new_data(self):
+        D.features(["SH600003"], ["Ref($close, -2)"])
+        (meta_path,) = self.qlib_dir.joinpath(C.features_cache_dir_name).glob("*/*.meta")
+        cache_path = meta_path.with_suffix("")
+        # the cache of the days [0, 149]; the last 2 days used the missing future data
+        self.assertEqual(cache_path.stat().st_size, 4 * (1 + 150))
+
+        self._dump(300)
+        provider = ExpressionD._provider.provider
+        with mock.patch.object(provider, "expression", return_value=pd.Series(dtype=np.float32)):
+            self.assertTrue((ExpressionD.update_cache("day", n_jobs=1) == 0).all())
+        # the stale tail is dropped
+        self.assertEqual(cache_path.stat().st_size, 4 * (1 + 148))
+
+
+if __name__ == "__main__":
+    unittest.main()
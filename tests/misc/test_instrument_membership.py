@@ -0,0 +1,175 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import Cal, Inst
+from qlib.data.filter import ExpressionDFilter, NameDFilter, SeriesDFilter
+from qlib.data.membership import InstrumentMembership
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+def _reference_filter_main(self, instruments, start_time=None, end_time=None):
+    """the series by series implementation of `SeriesDFilter.filter_main`"""
+    lbound, ubound = self._getTimeBound(instruments)
+    start_time = pd.Timestamp(start_time or lbound)
+    end_time = pd.Timestamp(end_time or ubound)
+    _instruments_filtered = {}
+    _all_calendar = Cal.calendar(start_time=start_time, end_time=end_time, freq=self.filter_freq)
+    _filter_calendar = Cal.calendar(
+        start_time=self.filter_start_time and max(self.filter_start_time, _all_calendar[0]) or _all_calendar[0],
+        end_time=self.filter_end_time and min(self.filter_end_time, _all_calendar[-1]) or _all_calendar[-1],
+        freq=self.filter_freq,
+    )
+    _all_filter_series = self._getFilterSeries(instruments, _filter_calendar[0], _filter_calendar[-1])
+    for inst, timestamp in instruments.items():
+        _timestamp_series = self._toSeries(_all_calendar, timestamp)
+        if inst in _all_filter_series:
+            _filter_series = _all_filter_series[inst]
+        else:
+            _filter_series = pd.Series({timestamp: self.keep for timestamp in _filter_calendar})
+        _timestamp_series = self._filterSeries(_timestamp_series, _filter_series)
+        _timestamp = self._toTimestamp(_timestamp_series)
+        if _timestamp:
+            _instruments_filtered[inst] = _timestamp
+    return _instruments_filtered
+
+
+class TestInstrumentMembership(unittest.TestCase):
+    def setUp(self) -> None:
+        self.qlib_dir = Path(tempfile.mkdtemp())
+        self.qlib_dir.joinpath("calendars").mkdir()
+        self.qlib_dir.joinpath("instruments").mkdir()
+        self.dates = pd.bdate_range("2020-01-01", periods=120)
+        np.savetxt(self.qlib_dir.joinpath("calendars", "day.txt"), self.dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        # some spans start/end on the weekends or out of the calendar
+        self.spans = {
+            "SH600000": [("2019-12-01", "2020-01-10"), ("2020-02-01", "2020-03-15"), ("2020-04-01", "2020-12-31")],
+            "SH600001": [("2020-01-01", "2020-06-30")],
+            "SH600002": [("2020-01-04", "2020-01-05"), ("2020-03-02", "2020-04-20")],
+            "SZ000001": [("2020-02-15", "2020-05-01")],
+            "SZ000002": [("2020-05-20", "2021-01-01")],
+        }
+        for i, inst in enumerate(self.spans):
+            self.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            values = rng.random(len(self.dates) - i * 10).astype(np.float32)
+            # the rule of the expression filters is NaN on some days
+            values[rng.random(len(values)) < 0.1] = np.nan
+            FileFeatureStorage(inst, "close", "day", provider_uri=str(self.qlib_dir)).write(values, index=i * 10)
+        self.qlib_dir.joinpath("instruments", "all.txt").write_text(
+            "\n".join(f"{inst}\t{s}\t{e}" for inst, spans in self.spans.items() for s, e in spans)
+        )
+        H.clear()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.qlib_dir, ignore_errors=True)
+
+    def test_index(self):
+        spans = {inst: [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in _spans] for inst, _spans in self.spans.items()}
+        membership = InstrumentMembership(spans, self.dates)
+        self.assertEqual(membership.spans(), spans)
+        for start_time, end_time in [
+            ("2020-01-01", "2020-06-16"),
+            ("2020-01-05", "2020-03-01"),
+            ("2020-01-04", "2020-01-05"),
+        ]:
+            start_time, end_time = pd.Timestamp(start_time), pd.Timestamp(end_time)
+            expected = {}
+            for inst, _spans in spans.items():
+                clipped = [(max(start_time, s), min(end_time, e)) for s, e in _spans]
+                clipped = [(s, e) for s, e in clipped if s <= e]
+                if clipped:
+                    expected[inst] = clipped
+            self.assertEqual(membership.spans(start_time, end_time), expected)
+            self.assertEqual(list(membership.spans(start_time, end_time)), list(expected))
+            self.assertEqual(membership.active(start_time, end_time), list(expected))
+
+        mask = membership.mask()
+        self.assertEqual(mask.shape, (len(self.dates), len(spans)))
+        for j, _spans in enumerate(spans.values()):
+            expected = np.zeros(len(self.dates), dtype=bool)
+            for s, e in _spans:
+                expected |= (self.dates >= s) & (self.dates <= e)
+            np.testing.assert_array_equal(mask[:, j], expected)
+        for i in [0, 5, 40, len(self.dates) - 1]:
+            self.assertEqual(membership.members(self.dates[i]), list(np.array(list(spans))[mask[i]]))
+        # the weekend
+        self.assertEqual(membership.members("2020-01-05"), membership.members("2020-01-03"))
+        self.assertEqual(membership.members("2019-12-31"), [])
+        np.testing.assert_array_equal(membership.mask(5, 9), mask[5:10])
+
+        # the spans on the calendar
+        res = membership.to_spans()
+        self.assertEqual(list(res), ["SH600000", "SH600001", "SH600002", "SZ000001", "SZ000002"])
+        self.assertEqual(res["SH600000"][0], (self.dates[0], pd.Timestamp("2020-01-10")))
+        self.assertEqual(res["SH600002"], [(pd.Timestamp("2020-03-02"), pd.Timestamp("2020-04-20"))])
+        self.assertEqual(
+            membership.to_spans(mask[40:41], start_index=40), membership.spans(self.dates[40], self.dates[40])
+        )
+
+    def test_list_instruments(self):
+        for start_time, end_time in [(None, None), ("2020-01-04", "2020-03-01"), ("2020-02-03", "2020-02-03")]:
+            instruments = D.list_instruments(D.instruments("all"), start_time, end_time)
+            start_time = pd.Timestamp(start_time or self.dates[0])
+            end_time = pd.Timestamp(end_time or self.dates[-1])
+            expected = {}
+            for inst, _spans in self.spans.items():
+                clipped = [(max(start_time, pd.Timestamp(s)), min(end_time, pd.Timestamp(e))) for s, e in _spans]
+                clipped = [(s, e) for s, e in clipped if s <= e]
+                if clipped:
+                    expected[inst] = clipped
+            self.assertEqual(instruments, expected)
+            self.assertEqual(
+                D.list_instruments(D.instruments("all"), start_time, end_time, as_list=True), list(expected)
+            )
+        self.assertIs(Inst.membership("all"), Inst.membership("all"))
+        # the membership matrix is not needed by `list_instruments` without filters
+        self.assertIsNone(Inst.membership("all")._bits)
+        self.assertEqual(Inst.membership("all").members("2020-01-06"), ["SH600000", "SH600001"])
+
+    def test_filter(self):
+        filters = [
+            NameDFilter(name_rule_re="SH"),
+            NameDFilter(name_rule_re="SZ", fstart_time="2020-02-20", fend_time="2020-04-01"),
+            ExpressionDFilter(rule_expression="$close>0.5"),
+            ExpressionDFilter(rule_expression="$close>Mean($close, 5)", fstart_time="2020-02-01", keep=True),
+            ExpressionDFilter(rule_expression="Ref($close, 5)", fend_time="2020-05-01"),
+        ]
+        for filter_t in filters:
+            for start_time, end_time in [("2020-01-03", "2020-06-10"), ("2020-02-01", "2020-03-01"), (None, None)]:
+                instruments = D.list_instruments(D.instruments("all"), start_time, end_time)
+                filter_t.filter_freq = "day"
+                expected = _reference_filter_main(filter_t, instruments, start_time, end_time)
+                res = filter_t(instruments, start_time, end_time)
+                self.assertEqual(res, expected)
+                self.assertEqual(list(res), list(expected))
+
+        # the filters with the filter series of `_getFilterSeries` only
+        class _SeriesFilter(SeriesDFilter):
+            def _getFilterSeries(self, instruments, fstart, fend):
+                calendar = Cal.calendar(fstart, fend)
+                return {"SH600000": pd.Series(np.arange(len(calendar)) % 3 > 0, index=calendar)}
+
+            def to_config(self):
+                return {"filter_type": "_SeriesFilter", "keep": self.keep}
+
+        instruments = D.list_instruments(D.instruments("all"), "2020-01-03", "2020-06-10")
+        for keep in [False, True]:
+            filter_t = _SeriesFilter(keep=keep)
+            filter_t.filter_freq = "day"
+            self.assertEqual(filter_t(instruments), _reference_filter_main(filter_t, instruments))
+
+
+if __name__ == "__main__":
+    unittest.main()
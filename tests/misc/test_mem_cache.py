@@ -0,0 +1,103 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.base import Expression, Feature
+from qlib.data.cache import H, MemCache, MemCacheNbytesUnit
+from qlib.data.ops import Mean, Ref
+
+
+class Scaled(Expression):
+    """the `scale` is missing in the string of the expression"""
+
+    def __init__(self, value, scale):
+        self.value = value
+        self.scale = scale
+
+    def __str__(self):
+        return f"Scaled({self.value})"
+
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        return pd.Series(np.full(end_index - start_index + 1, self.value * self.scale), dtype=np.float64)
+
+    def get_longest_back_rolling(self):
+        return 0
+
+    def get_extended_window_size(self):
+        return 0, 0
+
+
+class TestMemCache(unittest.TestCase):
+    def tearDown(self) -> None:
+        H.reset()
+
+    def test_cache_key(self):
+        self.assertEqual(Mean(Feature("close"), 5).cache_key, Mean(Feature("close"), 5).cache_key)
+        self.assertNotEqual(Mean(Feature("close"), 5).cache_key, Mean(Feature("close"), 10).cache_key)
+        self.assertNotEqual(Mean(Feature("close"), 5).cache_key, Mean(Feature("open"), 5).cache_key)
+        # the integer and the float parameters are different even if they are equal
+        self.assertNotEqual(Ref(Feature("close"), 1).cache_key, Ref(Feature("close"), 1.0).cache_key)
+        self.assertEqual(str(Scaled(1, 2)), str(Scaled(1, 3)))
+        self.assertNotEqual(Scaled(1, 2).cache_key, Scaled(1, 3).cache_key)
+
+        # the expressions with the same string are not mixed up in the cache
+        H.clear()
+        self.assertEqual(Scaled(1, 2).load("SH600000", 0, 9).iloc[0], 2)
+        self.assertEqual(Scaled(1, 3).load("SH600000", 0, 9).iloc[0], 3)
+
+    def test_nbytes_limit(self):
+        unit = MemCacheNbytesUnit(size_limit=10_000)
+        for i in range(20):
+            unit.set(i, np.zeros(100), cost=1)
+            self.assertLessEqual(unit.total_size, 10_000)
+        self.assertEqual(len(unit), 12)
+        # the same costs: the least recently used items are evicted
+        self.assertEqual(list(unit.od), list(range(8, 20)))
+        # the item larger than the limit is not cached
+        unit.set("large", np.zeros(10_000), cost=100)
+        self.assertNotIn("large", unit)
+        self.assertEqual(unit.total_size, sum(v.nbytes for v in unit.od.values()))
+
+    def test_cost_aware_eviction(self):
+        unit = MemCacheNbytesUnit(size_limit=10_000)
+        unit.set("expensive", np.zeros(500), cost=10)
+        unit.set("cheap", np.zeros(500), cost=0.001)
+        unit.set("new", np.zeros(400), cost=0.1)
+        # the cheap one is evicted although it is used more recently
+        self.assertIn("expensive", unit)
+        self.assertNotIn("cheap", unit)
+        # the priorities of the items not hit are caught up by the evicted ones
+        for i in range(100):
+            unit.set(i, np.zeros(500), cost=20)
+        self.assertNotIn("expensive", unit)
+        self.assertEqual(len(unit), 2)
+        self.assertEqual(unit.stats().loc["int", "evictions"], 98)
+
+    def test_stats(self):
+        H.clear()
+        for inst in ["SH600000", "SH600001"]:
+            for _ in range(3):
+                Scaled(1, 2).load(inst, 0, 9)
+        stats = H.stats().loc["f"]
+        self.assertEqual(stats.loc["Scaled", "entries"], 2)
+        self.assertEqual(
+            stats.loc["Scaled", "bytes"], sum(v.values.nbytes + v.index.nbytes for v in H["f"].od.values())
+        )
+        self.assertEqual(stats.loc["Scaled", "hits"], 4)
+        self.assertEqual(stats.loc["Scaled", "misses"], 2)
+        self.assertAlmostEqual(stats.loc["Scaled", "hit_rate"], 4 / 6)
+
+    def test_limit_type(self):
+        with self.assertRaises(ValueError):
+            MemCache(limit_type="unknown")
+        cache = MemCache(mem_cache_size_limit=1000, limit_type="nbytes")
+        self.assertIsInstance(cache["f"], MemCacheNbytesUnit)
+        self.assertEqual(cache["f"].size_limit, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
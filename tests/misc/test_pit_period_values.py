@@ -0,0 +1,157 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import PITD, LocalPITProvider, PITProvider
+from qlib.data.storage.file_storage import FileFeatureStorage
+from qlib.utils import code_to_fname, get_period_list, read_period_data, register_wrapper
+
+sys.path.append(str(Path(__file__).resolve().parents[2].joinpath("scripts")))
+from dump_pit import DumpPitData  # pylint: disable=C0413
+
+
+class ReferencePITProvider(PITProvider):
+    """the PIT provider reading the records of each period by following the links of the file"""
+
+    def period_feature(self, instrument, field, start_index, end_index, cur_time, period=None):
+        field = str(field).lower()[2:]
+        quarterly = field.endswith("_q")
+        path = C.dpm.get_data_uri() / "financial" / code_to_fname(instrument).lower()
+        index_path, data_path = path / f"{field}.index", path / f"{field}.data"
+        if not (index_path.exists() and data_path.exists()):
+            raise FileNotFoundError("No file is found.")
+        dtype = [(k, C.pit_record_type[k]) for k in ["date", "period", "value"]] + [("_next", "I")]
+        data = np.fromfile(data_path, dtype=dtype)
+        cur_time_int = int(cur_time.year) * 10000 + int(cur_time.month) * 100 + int(cur_time.day)
+        loc = np.searchsorted(data["date"], cur_time_int, side="right")
+        if loc <= 0:
+            return pd.Series(dtype=C.pit_record_type["value"])
+        period_list = get_period_list(data["period"][:loc].min(), data["period"][:loc].max(), quarterly)
+        if period is not None:
+            if period not in period_list:
+                return pd.Series(dtype=C.pit_record_type["value"])
+            period_list = [period]
+        else:
+            period_list = period_list[max(0, len(period_list) + start_index - 1) : len(period_list) + end_index]
+        value = [read_period_data(index_path, data_path, p, cur_time_int, quarterly)[0] for p in period_list]
+        return pd.Series(value, index=period_list, dtype=C.pit_record_type["value"])
+
+
+class TestPITPeriodValues(unittest.TestCase):
+    FIELDS = [
+        "P($$roewa_q)",
+        "P($$yoyni_a)",
+        "P(Mean($$roewa_q, 2))",
+        "P(Ref($$roewa_q, 1))",
+        "P(($$roewa_q / $$yoyni_q) / Ref($$roewa_q / $$yoyni_q, 1) - 1)",
+        "P(Sum($$yoyni_q, 4))",
+        "PRef($$roewa_q, 201802)",
+        "PRef($$yoyni_a, 2016)",
+        "PRef($$roewa_q, 201805)",
+        "P($$roewa_q) * $close",
+    ]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        cls.calendar = pd.bdate_range("2015-01-01", "2019-12-31")
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), cls.calendar.strftime("%Y-%m-%d"), fmt="%s")
+        cls.instruments = ["SH600000", "SH600001", "SH600002"]
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text(
+            "\n".join(f"{inst}\t{cls.calendar[0].date()}\t{cls.calendar[-1].date()}" for inst in cls.instruments)
+        )
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        for inst in cls.instruments:
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            FileFeatureStorage(inst, "close", "day", provider_uri=str(cls.qlib_dir)).write(
+                rng.random(len(cls.calendar)) + 1, index=0
+            )
+
+        # the quarterly and the annual reports and their revisions; the last instrument has no PIT data
+        for interval in ["quarterly", "annual"]:
+            csv_dir = cls.qlib_dir.joinpath(f"csv_{interval}")
+            csv_dir.mkdir()
+            for inst in cls.instruments[:-1]:
+                rows = []
+                for field in ["roewa", "yoyni"]:
+                    for year in range(2014, 2020):
+                        for quarter in range(1, 5) if interval == "quarterly" else [4]:
+                            if rng.random() < 0.1:
+                                # the missing period
+                                continue
+                            date = pd.Timestamp(year, quarter * 3, 1) + pd.Timedelta(days=int(rng.integers(40, 130)))
+                            for _ in range(int(rng.integers(1, 4))):
+                                period = year * 100 + quarter if interval == "quarterly" else year
+                                rows.append((date.strftime("%Y-%m-%d"), period, rng.normal(), field))
+                                date += pd.Timedelta(days=int(rng.integers(0, 200)))
+                df = pd.DataFrame(rows, columns=["date", "period", "value", "field"])
+                df.query("date <= '2019-12-31'").to_csv(csv_dir.joinpath(f"{inst.lower()}.csv"), index=False)
+            DumpPitData(csv_path=str(csv_dir), qlib_dir=str(cls.qlib_dir), max_workers=1).dump(interval=interval)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def setUp(self) -> None:
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+
+    def test_period_feature(self):
+        provider, reference = LocalPITProvider(), ReferencePITProvider()
+        rng = np.random.default_rng(1)
+        for inst in self.instruments[:-1]:
+            for field in ["$$roewa_q", "$$yoyni_a"]:
+                for cur_time in self.calendar[rng.choice(len(self.calendar), 50)]:
+                    for start_index, period in [(0, None), (-3, None), (-30, None), (0, 201704), (0, 2016), (0, 2030)]:
+                        args = (inst, field, start_index, 0, cur_time, period)
+                        pd.testing.assert_series_equal(provider.period_feature(*args), reference.period_feature(*args))
+        with self.assertRaises(FileNotFoundError):
+            provider.period_feature(self.instruments[-1], "$$roewa_q", 0, 0, self.calendar[-1])
+
+    def test_period_values(self):
+        provider, reference = LocalPITProvider(), ReferencePITProvider()
+        for inst in self.instruments[:-1]:
+            for field, period in [("$$roewa_q", 201704), ("$$yoyni_a", 2016), ("$$roewa_q", 201705)]:
+                for offsets in [(0,), (0, -1, -4)]:
+                    np.testing.assert_array_equal(
+                        provider.period_values(inst, field, self.calendar, offsets),
+                        reference.period_values(inst, field, self.calendar, offsets),
+                    )
+                np.testing.assert_array_equal(
+                    provider.period_values(inst, field, self.calendar, period=period),
+                    reference.period_values(inst, field, self.calendar, period=period),
+                )
+        dates = provider.revision_dates(self.instruments[0], "$$roewa_q")
+        self.assertTrue((np.diff(dates) > 0).all())
+
+    def test_operator(self):
+        for start_time, end_time in [("2017-03-01", "2017-09-30"), (None, None)]:
+            H.clear()
+            data = D.features(self.instruments, self.FIELDS, start_time, end_time)
+            # the reference evaluates the fields day by day with the reference provider
+            register_wrapper(PITD, ReferencePITProvider(), "qlib.data")
+            H.clear()
+            expected = D.features(self.instruments, self.FIELDS, start_time, end_time)
+            register_wrapper(PITD, LocalPITProvider(), "qlib.data")
+            pd.testing.assert_frame_equal(data, expected)
+        # 201805 is not a quarter
+        self.assertTrue(data.pop("PRef($$roewa_q, 201805)").isna().all())
+        self.assertTrue(data.notna().any().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.utils.resam import (
+    get_resam_buckets,
+    get_valid_value,
+    resam_series,
+    resam_ts_data,
+    ts_data_first,
+    ts_data_last,
+)
+
+
+class TestResample(unittest.TestCase):
+    METHODS = ["sum", "mean", "max", "min", "first", "last", "count"]
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(0)
+        days = pd.bdate_range("2020-01-02", periods=4)
+        minutes = pd.DatetimeIndex([d + pd.Timedelta(minutes=570 + i) for d in days for i in range(240)])
+        # some bars are missing
+        self.minutes = minutes[np.sort(self.rng.choice(len(minutes), 600, replace=False))]
+
+    def _series(self, dtype):
+        values = self.rng.normal(size=len(self.minutes))
+        if np.dtype(dtype).kind == "f":
+            values[self.rng.random(len(values)) < 0.2] = np.nan
+            values[:50] = np.nan
+        elif dtype is bool:
+            values = values > 0
+        else:
+            values = values * 100
+        return pd.Series(values.astype(dtype), index=self.minutes, name="$close")
+
+    def test_resam_series(self):
+        for dtype in [np.float32, np.float64, bool, np.int64]:
+            series = self._series(dtype)
+            for freq in ["1min", "3min", "30min", "7min", "1D", "2D", "W"]:
+                for method in self.METHODS + ["ffill", "std"]:
+                    if method == "sum":
+                        expected = series.resample(freq).sum(min_count=1)
+                    else:
+                        expected = getattr(series.resample(freq), method)()
+                    pd.testing.assert_series_equal(
+                        resam_series(series, freq, method), expected, rtol=1e-5, atol=1e-5, obj=f"{freq} {method}"
+                    )
+
+    def test_buckets(self):
+        labels, codes, starts = get_resam_buckets(self.minutes, "30min")
+        self.assertEqual(labels[0], pd.Timestamp("2020-01-02 09:30"))
+        self.assertEqual(len(starts), len(np.unique(codes)))
+        # shared by the series on the same timestamps
+        self.assertIs(get_resam_buckets(self.minutes.copy(), "30min")[1], codes)
+        self.assertIsNot(get_resam_buckets(self.minutes[:-1], "30min")[1], codes)
+        self.assertIsNone(get_resam_buckets(self.minutes, "ME"))
+        self.assertIsNone(get_resam_buckets(self.minutes[::-1], "30min"))
+
+    def test_resam_ts_data(self):
+        insts = [f"SH6000{i:02d}" for i in range(20)]
+        index = pd.MultiIndex.from_product(
+            [insts, pd.bdate_range("2020-01-01", periods=30)], names=["instrument", "datetime"]
+        )
+        df = pd.DataFrame(self.rng.normal(size=(len(index), 2)).astype(np.float32), index=index, columns=["$a", "$b"])
+        df = df.iloc[np.sort(self.rng.choice(len(df), 400, replace=False))]
+        df = df.mask(df > 1)
+        # an instrument without any valid value
+        df.loc["SH600003"] = np.nan
+
+        def _last(x):
+            return x.ffill().iloc[-1]
+
+        def _first(x):
+            return x.bfill().iloc[0]
+
+        for data in [df, df["$a"], df.swaplevel().sort_index(), df["$a"].swaplevel().sort_index()]:
+            for start_time, end_time in [(None, None), ("2020-01-10", "2020-01-31"), ("2020-01-15", "2020-01-15")]:
+                if data.index.names[0] == "instrument":
+                    sliced = data.loc(axis=0)[(slice(None), slice(start_time, end_time))]
+                else:
+                    sliced = data.loc[slice(start_time, end_time)]
+                grouped = sliced.groupby(level="instrument", group_keys=False)
+                for method in self.METHODS + ["std", ts_data_last, ts_data_first]:
+                    if method in (ts_data_last, ts_data_first):
+                        func = _last if method is ts_data_last else _first
+                        expected = grouped.apply(func if isinstance(data, pd.Series) else lambda d: d.apply(func))
+                    else:
+                        expected = getattr(grouped, method)()
+                    res = resam_ts_data(data, start_time, end_time, method=method)
+                    if isinstance(expected, pd.DataFrame):
+                        pd.testing.assert_frame_equal(res, expected, rtol=1e-5, atol=1e-5)
+                    else:
+                        pd.testing.assert_series_equal(res, expected, rtol=1e-5, atol=1e-5)
+
+    def test_valid_value(self):
+        series = pd.Series([np.nan, 1.0, 2.0, np.nan])
+        self.assertEqual(get_valid_value(series), 2.0)
+        self.assertEqual(get_valid_value(series, last=False), 1.0)
+        self.assertTrue(np.isnan(get_valid_value(pd.Series([np.nan, np.nan]))))
+        pd.testing.assert_series_equal(
+            ts_data_last(pd.DataFrame({"a": [1.0, np.nan], "b": [np.nan, np.nan]})), pd.Series({"a": 1.0, "b": np.nan})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.data import ExpressionD
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestExpressionDtype(unittest.TestCase):
+    FIELDS = [
+        "$close",
+        "$close / Ref($close, 1) - 1",
+        "Mean($close, 5) / $close",
+        "Std($close, 10)",
+        "Log($volume + 1)",
+        "Corr($close, Log($volume + 1), 10)",
+        "Rank($close, 10)",
+        "Slope($close, 5) / $close",
+        "If($close > Mean($close, 5), $close, Mean($close, 5))",
+        "Power($close, 2.5)",
+        "EMA($close, 0)",
+        "Mean($close > $volume, 5)",
+    ]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=100)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        instruments = []
+        for i in range(3):
+            inst = f"SH60000{i}"
+            instruments.append(f"{inst}\t{dates[i * 5].date()}\t{dates[-1].date()}")
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in ["close", "volume"]:
+                data = (rng.random(100 - i * 5) * 10).astype(np.float32)
+                data[rng.random(len(data)) < 0.05] = np.nan
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(data, index=i * 5)
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    def tearDown(self) -> None:
+        C.expression_dtype = None
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def test_intermediate_dtype(self):
+        for dtype, expected in [(None, np.float64), ("float32", np.float32)]:
+            C.expression_dtype = dtype
+            H.clear()
+            for field in ["Mean($close, 5)", "Corr($close, $volume, 5)", "$close + Std($close, 5)"]:
+                expr = ExpressionD.get_expression_instance(field)
+                self.assertEqual(expr.load("SH600000", 10, 50, "day").dtype, expected)
+            # the bool results are kept
+            expr = ExpressionD.get_expression_instance("Mean($close, 5) > $close")
+            self.assertEqual(expr.load("SH600000", 10, 50, "day").dtype, bool)
+
+    def test_kernel_dtype(self):
+        from qlib.data.ops import _apply_kernel  # pylint: disable=C0415
+        from qlib.data._libs.rolling import rolling_mean  # pylint: disable=C0415
+
+        panel = pd.DataFrame(np.arange(20, dtype=np.float32).reshape(10, 2))
+        for dtype, expected in [(None, np.float64), ("float32", np.float32)]:
+            C.expression_dtype = dtype
+            # the kernels write into the panel of the expression dtype without a float64 panel
+            self.assertTrue((_apply_kernel(rolling_mean, panel, 3).dtypes == expected).all())
+            self.assertEqual(_apply_kernel(rolling_mean, panel[0], 3).dtype, expected)
+
+    def test_features(self):
+        res = {}
+        for dtype in [None, "float32"]:
+            C.expression_dtype = dtype
+            for engine in ["instrument", "panel"]:
+                H.clear()
+                res[dtype, engine] = D.features(D.instruments("all"), self.FIELDS, engine=engine)
+        pd.testing.assert_frame_equal(res[None, "instrument"], res["float32", "instrument"], rtol=1e-4)
+        pd.testing.assert_frame_equal(res["float32", "instrument"], res["float32", "panel"], rtol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import qlib
+from qlib.contrib.data.loader import Alpha158DL
+from qlib.data.base import Expression, Feature
+from qlib.data.data import ExpressionD
+from qlib.data.ops import ElemOperator, Mean, Operators, Ref
+from qlib.data.parser import parse_expression
+from qlib.utils import parse_field
+
+
+class Diff(ElemOperator):
+    def _load_internal(self, instrument, start_index, end_index, *args):
+        return self.feature.load(instrument, start_index, end_index, *args).diff()
+
+
+class TestExpressionParser(unittest.TestCase):
+    FIELDS = [
+        "$close",
+        " $close",
+        "-$close",
+        "Ref($close, -1) - -2",
+        "Mean ($close,5)",
+        "$close > 3 > 2",
+        "$close > 1 and $open",
+        "($close & $open) | ~$high",
+        "If($close > Mean($close, 5), $close, 2.5 ** 2)",
+        "$$roewa_q",
+        "PRef($$roewa_q, 201901)",
+        "TResample($ask1, '1min', 'last')",
+        "ChangeInstrument('SH000300', $close)",
+        "$收盘价（前复权）",
+    ]
+
+    def setUp(self) -> None:
+        qlib.init(kernels=1)
+
+    def _assert_same(self, field):
+        try:
+            expected = eval(parse_field(field))  # pylint: disable=W0123
+        except TypeError:
+            # e.g. -$close
+            with self.assertRaises(TypeError):
+                parse_expression(field)
+            return
+        expr = parse_expression(field)
+        if isinstance(expected, Expression):
+            self.assertEqual(expr.cache_key, expected.cache_key, field)
+            self.assertEqual(str(expr), str(expected), field)
+        else:
+            self.assertEqual(expr, expected, field)
+
+    def test_parse(self):
+        fields, _ = Alpha158DL.get_feature_config()
+        for field in fields + self.FIELDS:
+            self._assert_same(field)
+        self.assertEqual(str(parse_expression("$close/Ref($close, 1)")), "Div($close,Ref($close,1))")
+
+    def test_cache(self):
+        expr = parse_expression("Mean($close, 5) / $close")
+        self.assertIs(parse_expression("Mean($close, 5) / $close"), expr)
+        self.assertIs(ExpressionD.get_expression_instance("Mean($close, 5) / $close"), expr)
+        # the identical sub-expressions are interned
+        self.assertIs(parse_expression("Mean($close,5)"), expr.feature_left)
+        self.assertIs(parse_expression("Ref($close, 1)").feature, expr.feature_right)
+        self.assertIsNot(parse_expression("Ref($close, 1.0)"), parse_expression("Ref($close, 1)"))
+        self.assertIs(parse_expression(expr), expr)
+        self.assertIsInstance(parse_expression("Ref($close, 1)"), Ref)
+        self.assertIsInstance(expr.feature_left, Mean)
+        self.assertIsInstance(expr.feature_right, Feature)
+
+        # the cache is cleared when the operators are registered again
+        with self.assertRaises(AttributeError):
+            parse_expression("Diff($close)")
+        Operators.register([Diff])
+        self.assertIsInstance(parse_expression("Diff($close)"), Diff)
+        self.assertIsNot(parse_expression("Mean($close, 5) / $close"), expr)
+
+    def test_errors(self):
+        with self.assertRaises(NameError):
+            parse_expression("close")
+        with self.assertRaises(AttributeError):
+            parse_expression("Foo($close)")
+        with self.assertRaises(SyntaxError):
+            parse_expression("Mean($close, 5")
+        with self.assertRaisesRegex(SyntaxError, r"\$close\.x"):
+            parse_expression("Mean($close.x, 5)")
+        with self.assertRaises(SyntaxError):
+            parse_expression("__import__('os').getcwd()")
+        with self.assertRaises(SyntaxError):
+            parse_expression("[x for x in $close]")
+        with self.assertRaises(AttributeError):
+            parse_expression("reset()")
+
+
+if __name__ == "__main__":
+    unittest.main()
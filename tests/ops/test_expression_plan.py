@@ -0,0 +1,127 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.config import C
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.ops import Mean
+from qlib.data.plan import ExpressionPlan
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestExpressionPlan(unittest.TestCase):
+    FIELDS = [
+        "$close",
+        "$close / Ref($close, 1) - 1",
+        "Ref($close, 1) / $close",
+        "Mean($close, 5) / $close",
+        "Std($close, 5) / $close",
+        "Mean($close, 20) / $close",
+        "Rank(Mean($close, 5), 10)",
+        "Corr($close, Log($volume + 1), 10)",
+        "Corr($close / Ref($close, 1), Log($volume / Ref($volume, 1) + 1), 20)",
+        "Ref($close, -2) / $close",
+        "If($close > Mean($close, 5), $close, $volume)",
+        "Add($close, $close)",
+        "Mean($close, 0)",
+        "Mean($close, 0) / Mean($close, 5)",
+        "EMA($close, 10)",
+        "EMA($close, 10) / Mean($close, 20)",
+        "Mean($close, 0.5)",
+        "Mask($close, 'SH600001') / $close",
+        "ChangeInstrument('SH600002', Mean($close, 5)) / Mean($close, 5)",
+        "Mean($close, 5) / $close",
+    ]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=200)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        instruments = []
+        for i in range(6):
+            inst = f"SH60000{i}"
+            start, end = i * 7, 199 - i * 5
+            instruments.append(f"{inst}\t{dates[start].date()}\t{dates[end].date()}")
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in ["close", "volume"]:
+                data = rng.random(end - start + 1).astype(np.float32)
+                data[rng.random(len(data)) < 0.05] = np.nan
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(data, index=start)
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        C.expression_plan = True
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def test_plan_result(self):
+        df_l = []
+        for plan in [False, True]:
+            C.expression_plan = plan
+            for start_time, end_time in [(None, None), ("2020-03-02", "2020-08-31")]:
+                H.clear()
+                df_l.append(D.features(D.instruments("all"), self.FIELDS, start_time, end_time))
+        C.expression_plan = True
+        pd.testing.assert_frame_equal(df_l[0], df_l[2], check_exact=False, rtol=1e-5)
+        pd.testing.assert_frame_equal(df_l[1], df_l[3], check_exact=False, rtol=1e-5)
+
+    def test_field_order(self):
+        fields = ["Corr($close, Log($volume + 1), 10)", "Log($volume + 1)", "Mean($close, 5) / $close", "$close"]
+        res = ExpressionPlan(fields).evaluate("SH600000", 30, 150, "day")
+        self.assertEqual(list(res), fields)
+        df_l = []
+        for plan in [False, True]:
+            C.expression_plan = plan
+            H.clear()
+            df_l.append(D.features(D.instruments("all"), fields))
+        C.expression_plan = True
+        self.assertEqual(list(df_l[1].columns), fields)
+        pd.testing.assert_frame_equal(df_l[0], df_l[1], check_exact=False, rtol=1e-5)
+        for field in fields:
+            pd.testing.assert_series_equal(
+                res[field], df_l[0].loc["SH600000", field].iloc[30:151], check_names=False, check_index=False
+            )
+
+    def test_sharing(self):
+        plan = ExpressionPlan(["Mean($close, 5)/$close", "Std($close, 5)/$close", "Mean($close, 5)/$close"])
+        # $close, Mean, Div, Std, Div
+        self.assertEqual(len(plan.exprs), 5)
+        self.assertEqual(plan.tree_size, 12)
+        self.assertEqual(plan.root_ids[0], plan.root_ids[2])
+        # the node shared by different windows is evaluated in the union of them
+        self.assertEqual(plan.extensions[0], (4, 0))
+        explain = plan.explain()
+        self.assertIn("12 -> 5", explain)
+        self.assertIn("$close: 4 consumers", explain)
+
+        # the expanding operators are shared in the same window only
+        plan = ExpressionPlan(["Mean($close, 0)", "Ref(Mean($close, 0), 1)", "Mean($close, 0)/$close"])
+        self.assertEqual(sum(isinstance(expr, Mean) for expr in plan.exprs), 2)
+
+    def test_release(self):
+        plan = ExpressionPlan(self.FIELDS)
+        res = plan.evaluate("SH600000", 30, 150, "day")
+        self.assertEqual(list(res), list(dict.fromkeys(self.FIELDS)))
+        # the intermediate results are released
+        self.assertEqual(plan._results.data, {})
+        for node_id, last_use in enumerate(plan.last_use):
+            self.assertTrue(all(consumer <= last_use for consumer in plan.consumers[node_id]))
+            self.assertGreaterEqual(last_use, node_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data import D
+from qlib.data.cache import H
+from qlib.data.storage.file_storage import FileFeatureStorage
+
+
+class TestPanelEngine(unittest.TestCase):
+    ROLLING_OPS = [
+        "Mean",
+        "Sum",
+        "Std",
+        "Var",
+        "Skew",
+        "Kurt",
+        "Max",
+        "Min",
+        "IdxMax",
+        "IdxMin",
+        "Med",
+        "Mad",
+        "Rank",
+        "Count",
+        "Delta",
+        "Slope",
+        "Rsquare",
+        "Resi",
+        "WMA",
+        "EMA",
+        "Ref",
+    ]
+    FIELDS = [
+        "$close",
+        "$volume",
+        "$close / Ref($close, 1) - 1",
+        "Ref($close, -2)",
+        "If($close > $volume, $close, $volume)",
+        "Abs($close - 0.5)",
+        "Sign($close - 0.5)",
+        "Log($volume + 1)",
+        "Power($close, 2)",
+        "Greater($close, $volume)",
+        "Less($close, $volume)",
+        "Not($close > $volume)",
+        "($close > 0.5) & ($volume > 0.5)",
+        "Mean($close > $volume, 5)",
+        "Quantile($close, 10, 0.8)",
+        "Corr($close, Log($volume + 1), 10)",
+        "Cov($close, $volume, 10)",
+        "Mean($close, 0.5)",
+        "Mask($close, 'SH600001')",
+        "ChangeInstrument('SH600002', $close)",
+        "Rank(Mean($close, 5), 10) / Ref($close, 1)",
+    ] + [f"{op}($close, {n})" for op in ROLLING_OPS for n in [0, 5, 20]]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=200)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        qlib.init(provider_uri=str(cls.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        rng = np.random.default_rng(0)
+        instruments = []
+        for i in range(8):
+            inst = f"SH60000{i}"
+            start, end = i * 7, 199 - i * 5
+            # the instruments are listed later than their data
+            instruments.append(f"{inst}\t{dates[start + 3].date()}\t{dates[end].date()}")
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in ["close", "volume"]:
+                data = rng.random(end - start + 1).astype(np.float32)
+                data[rng.random(len(data)) < 0.05] = np.nan
+                if i == 3:
+                    data[50:60] = data[49]
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(data, index=start)
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(instruments))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def _check(self, instruments, fields, start_time=None, end_time=None):
+        H.clear()
+        expected = D.features(instruments, fields, start_time, end_time)
+        H.clear()
+        df = D.features(instruments, fields, start_time, end_time, engine="panel")
+        self.assertFalse(expected.empty)
+        pd.testing.assert_frame_equal(expected, df, check_exact=False, rtol=1e-5)
+
+    def test_panel_engine(self):
+        self._check(D.instruments("all"), self.FIELDS)
+        self._check(D.instruments("all"), self.FIELDS, "2020-03-01", "2020-08-31")
+
+    def test_list_instruments(self):
+        # the instruments without data are skipped; the duplicated fields are kept
+        self._check(["SH600005", "SH600000", "SH699999"], ["$close", "Mean($close, 5)", "$close"], "2020-02-01")
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            D.features(D.instruments("all"), ["$close"], engine="unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#  Copyright (c) Microsoft Corporation.
+#  Licensed under the MIT License.
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from qlib.data.base import Feature
+from qlib.data.ops import Corr, Cov, EMA, IdxMax, IdxMin, Kurt, Mad, Max, Med, Min, Quantile, Rank, Skew, Std, Var, WMA
+
+
+def weighted_mean(x):
+    w = np.arange(len(x)) + 1
+    w = w / w.sum()
+    return np.nanmean(w * x)
+
+
+def exp_weighted_mean(x):
+    a = 1 - 2 / (1 + len(x))
+    w = a ** np.arange(len(x))[::-1]
+    w /= w.sum()
+    return np.nansum(w * x)
+
+
+class TestRollingKernels(unittest.TestCase):
+    """The Cython kernels of the operators are compared with their original pandas implementations"""
+
+    WINDOWS = [0, 1, 2, 3, 4, 5, 20]
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.series_l = []
+        for size in [1, 3, 50, 300]:
+            left, right = rng.normal(10, 3, size), rng.normal(-5, 1, size)
+            for values in [left, right]:
+                # NOTE: pandas (>=3.0) returns NaN for the skewness after a window without any value, so the missing
+                # values are not consecutive here; please refer to `test_moments_after_missing_window`
+                missing = rng.random(size) < 0.1
+                missing[1:] &= ~missing[:-1]
+                values[missing] = np.nan
+            if size > 100:
+                # the same values and the ties of the extremum
+                left[30:40] = left[29]
+                right[35:45] = right[34]
+                # +/-inf is regarded as NaN by pandas
+                left[[50, 80]] = np.inf, -np.inf
+                right[90] = np.inf
+            self.series_l.append((pd.Series(left.astype(np.float32)), pd.Series(right)))
+
+    @staticmethod
+    def _window(series, N):
+        return series.expanding(min_periods=1) if N == 0 else series.rolling(N, min_periods=1)
+
+    def _check(self, expr, expected):
+        for left, right in self.series_l:
+            np.testing.assert_allclose(expr._calc(left).values, expected(left).values, rtol=1e-7, atol=1e-9)
+
+    def test_moments(self):
+        for N in self.WINDOWS:
+            self._check(Var(Feature("close"), N), lambda s: self._window(s, N).var())
+            self._check(Std(Feature("close"), N), lambda s: self._window(s, N).std())
+            if N == 0 or N >= 3:
+                self._check(Skew(Feature("close"), N), lambda s: self._window(s, N).skew())
+            if N == 0 or N >= 4:
+                self._check(Kurt(Feature("close"), N), lambda s: self._window(s, N).kurt())
+
+    def test_moments_after_missing_window(self):
+        # the power sums restart after a window without any value
+        series = pd.Series([1.0, 2, 4, np.nan, np.nan, np.nan, 1, 5, 2, 7, 3, 8])
+        for expr, func in [(Skew(Feature("close"), 3), "skew"), (Kurt(Feature("close"), 4), "kurt")]:
+            res = expr._calc(series)
+            expected = getattr(series.iloc[6:].rolling(expr.N, min_periods=1), func)()
+            np.testing.assert_allclose(res.iloc[6:].values, expected.values)
+
+    def test_extremum(self):
+        for N in self.WINDOWS:
+            self._check(Max(Feature("close"), N), lambda s: self._window(s, N).max())
+            self._check(Min(Feature("close"), N), lambda s: self._window(s, N).min())
+            self._check(
+                IdxMax(Feature("close"), N), lambda s: self._window(s, N).apply(lambda x: x.argmax() + 1, raw=True)
+            )
+            self._check(
+                IdxMin(Feature("close"), N), lambda s: self._window(s, N).apply(lambda x: x.argmin() + 1, raw=True)
+            )
+
+    def test_weighted_mean(self):
+        for N in self.WINDOWS:
+            self._check(WMA(Feature("close"), N), lambda s: self._window(s, N).apply(weighted_mean, raw=True))
+        self._check(EMA(Feature("close"), 0), lambda s: s.expanding(min_periods=1).apply(exp_weighted_mean, raw=True))
+        for N in [1, 5, 20]:
+            self._check(EMA(Feature("close"), N), lambda s: s.ewm(span=N, min_periods=1).mean())
+        self._check(EMA(Feature("close"), 0.3), lambda s: s.ewm(alpha=0.3, min_periods=1).mean())
+
+    def test_order_statistics(self):
+        def mad(x):
+            x1 = x[~np.isnan(x)]
+            return np.mean(np.abs(x1 - x1.mean()))
+
+        # the ties of the values
+        self.series_l.append((self.series_l[-1][0].round(), None))
+        for N in self.WINDOWS:
+            self._check(Rank(Feature("close"), N), lambda s: self._window(s, N).rank(pct=True))
+            self._check(Med(Feature("close"), N), lambda s: self._window(s, N).median())
+            self._check(Mad(Feature("close"), N), lambda s: self._window(s, N).apply(mad, raw=True))
+            for qscore in [0, 0.2, 0.5, 1]:
+                self._check(Quantile(Feature("close"), N, qscore), lambda s: self._window(s, N).quantile(qscore))
+
+    def test_pair(self):
+        for N in self.WINDOWS:
+            for left, right in self.series_l:
+                np.testing.assert_allclose(
+                    Cov(Feature("close"), Feature("open"), N)._calc(left, right).values,
+                    self._window(left, N).cov(right).values,
+                    rtol=1e-7,
+                    atol=1e-9,
+                )
+                res = Corr(Feature("close"), Feature("open"), N)._calc(left, right)
+                expected = self._window(left, N).corr(right)
+                # the windows with the same values are NaN
+                constant = np.isclose(self._window(left, N).std(), 0, atol=2e-05) | np.isclose(
+                    self._window(right, N).std(), 0, atol=2e-05
+                )
+                self.assertTrue(res[constant].isna().all())
+                np.testing.assert_allclose(res[~constant].values, expected[~constant].values, rtol=1e-7, atol=1e-9)
+
+    def test_panel(self):
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame(rng.random((100, 4)))
+        data[data > 0.9] = np.nan
+        for expr in [Std(Feature("close"), 10), Max(Feature("close"), 0), WMA(Feature("close"), 5)]:
+            res = expr._calc(data)
+            for column in data:
+                pd.testing.assert_series_equal(res[column], expr._calc(data[column]), check_names=False)
+        res = Corr(Feature("close"), Feature("open"), 10)._calc(data, data.iloc[:, ::-1].set_axis(data.columns, axis=1))
+        pd.testing.assert_series_equal(res[0], res[3], check_names=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
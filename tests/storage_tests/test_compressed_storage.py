@@ -0,0 +1,116 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data import D
+from qlib.data.storage.file_storage import FileFeatureStorage, CompressedFileFeatureStorage
+
+
+class TestCompressedFeatureStorage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("features", "sh600000").mkdir(parents=True)
+        dates = pd.bdate_range("2020-01-01", periods=100).strftime("%Y-%m-%d")
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates, fmt="%s")
+        cls.provider_uri = str(cls.qlib_dir)
+        qlib.init(
+            provider_uri=cls.provider_uri,
+            expression_cache=None,
+            dataset_cache=None,
+            kernels=1,
+            feature_provider={
+                "class": "LocalFeatureProvider",
+                "module_path": "qlib.data.data",
+                "kwargs": {
+                    "backend": {
+                        "class": "CompressedFileFeatureStorage",
+                        "module_path": "qlib.data.storage.file_storage",
+                        "kwargs": {"chunk_size": 8},
+                    }
+                },
+            },
+        )
+        data = np.arange(50, dtype=np.float32)
+        data[[3, 7, 21]] = np.nan
+        FileFeatureStorage("SH600000", "close", "day", provider_uri=cls.provider_uri).write(data, index=10)
+        for compress in CompressedFileFeatureStorage.CODECS:
+            CompressedFileFeatureStorage(
+                "SH600000", f"close_{compress}", "day", provider_uri=cls.provider_uri, compress=compress, chunk_size=8
+            ).write(data, index=10)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        CompressedFileFeatureStorage.clear_chunk_cache()
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def _storage(self, field, **kwargs):
+        return CompressedFileFeatureStorage("SH600000", field, "day", provider_uri=self.provider_uri, **kwargs)
+
+    def test_read(self):
+        file_s = FileFeatureStorage("SH600000", "close", "day", provider_uri=self.provider_uri)
+        for compress in CompressedFileFeatureStorage.CODECS:
+            comp_s = self._storage(f"close_{compress}", compress=compress)
+            self.assertEqual(file_s.start_index, comp_s.start_index)
+            self.assertEqual(file_s.end_index, comp_s.end_index)
+            self.assertEqual(len(file_s), len(comp_s))
+            for slc in [slice(None), slice(0, 20), slice(12, 30), slice(55, 100), slice(70, 80), slice(30, 20)]:
+                pd.testing.assert_series_equal(file_s[slc], comp_s[slc], check_index_type=False)
+            for i in [10, 13, 17, 59]:
+                np.testing.assert_equal(file_s[i], comp_s[i])
+            for i in [9, 60]:
+                with self.assertRaises(IndexError):
+                    comp_s[i]
+
+    def test_missing(self):
+        comp_s = self._storage("not_exists")
+        self.assertIsNone(comp_s.start_index)
+        self.assertIsNone(comp_s.end_index)
+        self.assertEqual(comp_s[0], (None, None))
+        self.assertTrue(comp_s[:].empty)
+        with self.assertRaises(ValueError):
+            len(comp_s)
+
+    def test_write(self):
+        file_s = FileFeatureStorage("SH600000", "tmp", "day", provider_uri=self.provider_uri)
+        comp_s = self._storage("tmp", chunk_size=4)
+        for _s in [file_s, comp_s]:
+            _s.write(np.arange(10), index=5)
+            # append
+            _s.write(np.arange(3))
+            _s.write(np.arange(3), index=25)
+        pd.testing.assert_series_equal(file_s[:], comp_s[:], check_index_type=False)
+        # rewrite; the NaNs of the new data are filled with the old data
+        comp_s.write(np.array([np.nan, 100, 101, np.nan]), index=3)
+        expected = np.hstack([[np.nan, 100, 101, 1], np.arange(2, 10), np.arange(3), [np.nan] * 7, np.arange(3)])
+        np.testing.assert_array_equal(comp_s[:].values, expected.astype(np.float32))
+        self.assertEqual(comp_s.start_index, 3)
+        comp_s.clear()
+        self.assertEqual(len(comp_s), 0)
+        self.assertTrue(comp_s[:].empty)
+
+    def test_file_format(self):
+        data = np.random.rand(100).astype(np.float32)
+        path = self.qlib_dir.joinpath("test.cbin")
+        CompressedFileFeatureStorage.write_file(path, data, 7, compress="lzma", chunk_size=16)
+        start_index, _data = CompressedFileFeatureStorage.read_file(path)
+        self.assertEqual(start_index, 7)
+        np.testing.assert_array_equal(data, _data)
+
+    def test_provider_backend(self):
+        df = D.features(["SH600000"], ["$close_zlib", "Mean($close_lzma, 3)"], freq="day")
+        close = FileFeatureStorage("SH600000", "close", "day", provider_uri=self.provider_uri)[:]
+        np.testing.assert_array_equal(df["$close_zlib"].values, close.values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data import D
+from qlib.data.storage.file_storage import FileFeatureStorage, MmapFileFeatureStorage
+
+
+class TestMmapFeatureStorage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("features", "sh600000").mkdir(parents=True)
+        dates = pd.bdate_range("2020-01-01", periods=100).strftime("%Y-%m-%d")
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates, fmt="%s")
+        cls.provider_uri = str(cls.qlib_dir)
+        data = np.arange(50, dtype=np.float32)
+        data[[3, 7]] = np.nan
+        qlib.init(
+            provider_uri=cls.provider_uri,
+            expression_cache=None,
+            dataset_cache=None,
+            kernels=1,
+            feature_provider={
+                "class": "LocalFeatureProvider",
+                "module_path": "qlib.data.data",
+                "kwargs": {
+                    "backend": {"class": "MmapFileFeatureStorage", "module_path": "qlib.data.storage.file_storage"}
+                },
+            },
+        )
+        FileFeatureStorage("SH600000", "close", "day", provider_uri=cls.provider_uri).write(data, index=10)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        MmapFileFeatureStorage.clear_mmap_cache()
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def _storages(self, field="close"):
+        return (
+            FileFeatureStorage("SH600000", field, "day", provider_uri=self.provider_uri),
+            MmapFileFeatureStorage("SH600000", field, "day", provider_uri=self.provider_uri),
+        )
+
+    def test_read(self):
+        file_s, mmap_s = self._storages()
+        self.assertEqual(file_s.start_index, mmap_s.start_index)
+        self.assertEqual(file_s.end_index, mmap_s.end_index)
+        self.assertEqual(len(file_s), len(mmap_s))
+        for slc in [slice(None), slice(0, 20), slice(12, 30), slice(55, 100), slice(70, 80), slice(30, 20)]:
+            pd.testing.assert_series_equal(file_s[slc], mmap_s[slc], check_index_type=False)
+        self.assertEqual(file_s[15], mmap_s[15])
+        with self.assertRaises(IndexError):
+            mmap_s[0]
+
+    def test_provider_backend(self):
+        df = D.features(["SH600000"], ["$close", "Ref($close, 1)"], start_time="2020-01-10", end_time="2020-03-31")
+        file_s, _ = self._storages()
+        expected = file_s[:]
+        expected.index = D.calendar()[expected.index]
+        np.testing.assert_array_equal(
+            df.loc["SH600000", "$close"].values, expected.loc["2020-01-10":"2020-03-31"].values
+        )
+
+    def test_missing(self):
+        _, mmap_s = self._storages(field="not_exists")
+        self.assertEqual(mmap_s[0], (None, None))
+        self.assertTrue(mmap_s[:].empty)
+        self.assertIsNone(mmap_s.start_index)
+        with self.assertRaises(ValueError):
+            len(mmap_s)
+
+    def test_write_invalidate(self):
+        mmap_s = MmapFileFeatureStorage("SH600000", "open", "day", provider_uri=self.provider_uri)
+        mmap_s.write(np.ones(5), index=10)
+        self.assertEqual(mmap_s.end_index, 14)
+        # append through another instance of the same process
+        MmapFileFeatureStorage("SH600000", "open", "day", provider_uri=self.provider_uri).write([2, 3], index=16)
+        self.assertEqual(mmap_s.end_index, 17)
+        np.testing.assert_array_equal(mmap_s[14:18].values, np.array([1, np.nan, 2, 3], dtype=np.float32))
+        mmap_s.clear()
+        self.assertEqual(len(mmap_s), 0)
+
+    def test_cache_limit(self):
+        for field in ["high", "low", "volume"]:
+            FileFeatureStorage("SH600000", field, "day", provider_uri=self.provider_uri).write(np.ones(5), index=0)
+        MmapFileFeatureStorage.clear_mmap_cache()
+        MmapFileFeatureStorage.set_mmap_cache_size(2)
+        try:
+            for field in ["high", "low", "volume"]:
+                self.assertEqual(self._storages(field)[1].end_index, 4)
+            # only the mappings of the last read features are kept
+            self.assertEqual(len(MmapFileFeatureStorage._mmap_cache), 2)
+            self.assertEqual(
+                [key[1] for key in MmapFileFeatureStorage._mmap_cache.od],
+                ["sh600000/low.day.bin", "sh600000/volume.day.bin"],
+            )
+        finally:
+            MmapFileFeatureStorage.set_mmap_cache_size(1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import qlib
+from qlib.data import D
+from qlib.data.data import FeatureD
+from qlib.data.storage.file_storage import FileFeatureStorage
+from qlib.data.storage.panel_storage import PanelFeatureStorage, PanelFieldStorage, PanelStorageMixin
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent.joinpath("scripts")))
+from dump_panel import DumpPanel
+
+
+class TestPanelStorage(unittest.TestCase):
+    FIELDS = ["close", "volume"]
+    # instrument -> (start_index, length)
+    RANGES = {"SH600000": (0, 80), "SH600001": (10, 90), "SZ000001": (50, 20)}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.qlib_dir = Path(tempfile.mkdtemp())
+        cls.qlib_dir.joinpath("calendars").mkdir()
+        cls.qlib_dir.joinpath("instruments").mkdir()
+        dates = pd.bdate_range("2020-01-01", periods=100)
+        np.savetxt(cls.qlib_dir.joinpath("calendars", "day.txt"), dates.strftime("%Y-%m-%d"), fmt="%s")
+        inst_lines = []
+        rng = np.random.default_rng(0)
+        for inst, (start, length) in cls.RANGES.items():
+            cls.qlib_dir.joinpath("features", inst.lower()).mkdir(parents=True)
+            for field in cls.FIELDS:
+                data = rng.random(length).astype(np.float32)
+                data[rng.random(length) < 0.1] = np.nan
+                FileFeatureStorage(inst, field, "day", provider_uri=str(cls.qlib_dir)).write(data, index=start)
+            inst_lines.append(f"{inst}\t{dates[start].date()}\t{dates[start + length - 1].date()}")
+        cls.qlib_dir.joinpath("instruments", "all.txt").write_text("\n".join(inst_lines))
+        DumpPanel(qlib_dir=str(cls.qlib_dir), max_workers=1).dump()
+        qlib.init(
+            provider_uri=str(cls.qlib_dir),
+            expression_cache=None,
+            dataset_cache=None,
+            kernels=1,
+            feature_provider="PanelFeatureProvider",
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        PanelStorageMixin.clear_panel_cache()
+        shutil.rmtree(cls.qlib_dir, ignore_errors=True)
+
+    def test_feature_storage(self):
+        for inst in self.RANGES:
+            for field in self.FIELDS:
+                bin_s = FileFeatureStorage(inst, field, "day")
+                panel_s = PanelFeatureStorage(inst, field, "day")
+                self.assertEqual(bin_s.start_index, panel_s.start_index)
+                self.assertEqual(bin_s.end_index, panel_s.end_index)
+                for slc in [slice(None), slice(0, 30), slice(45, 60), slice(95, 120)]:
+                    pd.testing.assert_series_equal(bin_s[slc], panel_s[slc], check_index_type=False)
+        self.assertEqual(PanelFeatureStorage("SH600000", "not_exists", "day")[0], (None, None))
+        self.assertTrue(PanelFeatureStorage("SH600002", "close", "day")[:].empty)
+
+    def test_field_storage(self):
+        panel = PanelFieldStorage("close", "day")
+        self.assertEqual(len(panel), 100)
+        df = panel[40:60]
+        self.assertEqual(df.shape, (20, len(self.RANGES)))
+        np.testing.assert_array_equal(
+            df["sz000001"].values, FileFeatureStorage("SZ000001", "close", "day")[40:60].reindex(df.index).values
+        )
+
+    def test_provider(self):
+        df = D.features(D.instruments("all"), ["$close", "Mean($volume, 3)"], start_time="2020-01-15")
+        qlib.init(provider_uri=str(self.qlib_dir), expression_cache=None, dataset_cache=None, kernels=1)
+        expected = D.features(D.instruments("all"), ["$close", "Mean($volume, 3)"], start_time="2020-01-15")
+        qlib.init(
+            provider_uri=str(self.qlib_dir),
+            expression_cache=None,
+            dataset_cache=None,
+            kernels=1,
+            feature_provider="PanelFeatureProvider",
+        )
+        pd.testing.assert_frame_equal(df, expected)
+
+        cross_section = FeatureD.panel("$close", 10, 59, "day", instruments=["SZ000001", "SH600000", "NOT_EXISTS"])
+        self.assertEqual(cross_section.shape, (50, 3))
+        self.assertTrue(cross_section["NOT_EXISTS"].isna().all())
+        np.testing.assert_array_equal(
+            cross_section["SH600000"].values, FileFeatureStorage("SH600000", "close", "day")[10:60].values
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()